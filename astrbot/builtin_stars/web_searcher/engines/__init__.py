@@ -2,9 +2,10 @@ import random
 import urllib.parse
 from dataclasses import dataclass
 
-from aiohttp import ClientSession
 from bs4 import BeautifulSoup, Tag
 
+from astrbot.core.utils.http_client import http_client
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 6.1; rv:84.0) Gecko/20100101 Firefox/84.0",
     "Accept": "*/*",
@@ -56,26 +57,20 @@ class SearchEngine:
         headers["Referer"] = url
         headers["User-Agent"] = random.choice(USER_AGENTS)
         if data:
-            async with (
-                ClientSession() as session,
-                session.post(
-                    url,
-                    headers=headers,
-                    data=data,
-                    timeout=self.TIMEOUT,
-                ) as resp,
-            ):
+            async with http_client.get_session().post(
+                url,
+                headers=headers,
+                data=data,
+                timeout=self.TIMEOUT,
+            ) as resp:
                 ret = await resp.text(encoding="utf-8")
                 return ret
         else:
-            async with (
-                ClientSession() as session,
-                session.get(
-                    url,
-                    headers=headers,
-                    timeout=self.TIMEOUT,
-                ) as resp,
-            ):
+            async with http_client.get_session().get(
+                url,
+                headers=headers,
+                timeout=self.TIMEOUT,
+            ) as resp:
                 ret = await resp.text(encoding="utf-8")
                 return ret
 
@@ -1,7 +1,6 @@
 import asyncio
 import random
 
-import aiohttp
 from bs4 import BeautifulSoup
 from readability import Document
 
@@ -9,6 +8,7 @@ from astrbot.api import AstrBotConfig, llm_tool, logger, star
 from astrbot.api.event import AstrMessageEvent, MessageEventResult, filter
 from astrbot.api.provider import ProviderRequest
 from astrbot.core.provider.func_tool_manager import FunctionToolManager
+from astrbot.core.utils.http_client import http_client
 
 from .engines import HEADERS, USER_AGENTS, SearchResult
 from .engines.bing import Bing
@@ -55,14 +55,14 @@ class Main(star.Star):
         """获取网页内容"""
         header = HEADERS
         header.update({"User-Agent": random.choice(USER_AGENTS)})
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.get(url, headers=header, timeout=6) as response:
-                html = await response.text(encoding="utf-8")
-                doc = Document(html)
-                ret = doc.summary(html_partial=True)
-                soup = BeautifulSoup(ret, "html.parser")
-                ret = await self._tidy_text(soup.get_text())
-                return ret
+        session = http_client.get_session()
+        async with session.get(url, headers=header, timeout=6) as response:
+            html = await response.text(encoding="utf-8")
+            doc = Document(html)
+            ret = doc.summary(html_partial=True)
+            soup = BeautifulSoup(ret, "html.parser")
+            ret = await self._tidy_text(soup.get_text())
+            return ret
 
     async def _process_search_result(
         self,
@@ -132,28 +132,28 @@ class Main(star.Star):
             "Authorization": f"Bearer {tavily_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(
-                url,
-                json=payload,
-                headers=header,
-                timeout=6,
-            ) as response:
-                if response.status != 200:
-                    reason = await response.text()
-                    raise Exception(
-                        f"Tavily web search failed: {reason}, status: {response.status}",
-                    )
-                data = await response.json()
-                results = []
-                for item in data.get("results", []):
-                    result = SearchResult(
-                        title=item.get("title"),
-                        url=item.get("url"),
-                        snippet=item.get("content"),
-                    )
-                    results.append(result)
-                return results
+        session = http_client.get_session()
+        async with session.post(
+            url,
+            json=payload,
+            headers=header,
+            timeout=6,
+        ) as response:
+            if response.status != 200:
+                reason = await response.text()
+                raise Exception(
+                    f"Tavily web search failed: {reason}, status: {response.status}",
+                )
+            data = await response.json()
+            results = []
+            for item in data.get("results", []):
+                result = SearchResult(
+                    title=item.get("title"),
+                    url=item.get("url"),
+                    snippet=item.get("content"),
+                )
+                results.append(result)
+            return results
 
     async def _extract_tavily(self, cfg: AstrBotConfig, payload: dict) -> list[dict]:
         """使用 Tavily 提取网页内容"""
@@ -163,25 +163,25 @@ class Main(star.Star):
             "Authorization": f"Bearer {tavily_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(
-                url,
-                json=payload,
-                headers=header,
-                timeout=6,
-            ) as response:
-                if response.status != 200:
-                    reason = await response.text()
-                    raise Exception(
-                        f"Tavily web search failed: {reason}, status: {response.status}",
-                    )
-                data = await response.json()
-                results: list[dict] = data.get("results", [])
-                if not results:
-                    raise ValueError(
-                        "Error: Tavily web searcher does not return any results.",
-                    )
-                return results
+        session = http_client.get_session()
+        async with session.post(
+            url,
+            json=payload,
+            headers=header,
+            timeout=6,
+        ) as response:
+            if response.status != 200:
+                reason = await response.text()
+                raise Exception(
+                    f"Tavily web search failed: {reason}, status: {response.status}",
+                )
+            data = await response.json()
+            results: list[dict] = data.get("results", [])
+            if not results:
+                raise ValueError(
+                    "Error: Tavily web searcher does not return any results.",
+                )
+            return results
 
     @filter.command("websearch")
     async def websearch(self, event: AstrMessageEvent, oper: str | None = None):
@@ -192,7 +192,7 @@ class Main(star.Star):
             ),
         )
 
-    @llm_tool(name="web_search")
+    @llm_tool(name="web_search", parallel_safe=True)
     async def search_from_search_engine(
         self,
         event: AstrMessageEvent,
@@ -256,7 +256,7 @@ class Main(star.Star):
         self.baidu_initialized = True
         logger.info("Successfully initialized Baidu AI Search MCP server.")
 
-    @llm_tool(name="fetch_url")
+    @llm_tool(name="fetch_url", parallel_safe=True)
     async def fetch_website_content(self, event: AstrMessageEvent, url: str) -> str:
         """Fetch the content of a website with the given web url
 
@@ -267,7 +267,7 @@ class Main(star.Star):
         resp = await self._get_from_url(url)
         return resp
 
-    @llm_tool("web_search_tavily")
+    @llm_tool("web_search_tavily", parallel_safe=True)
     async def search_from_tavily(
         self,
         event: AstrMessageEvent,
@@ -338,7 +338,7 @@ class Main(star.Star):
             ret += "\n\n针对问题，请根据上面的结果分点总结，并且在结尾处附上对应内容的参考链接（如有）。"
         return ret
 
-    @llm_tool("tavily_extract_web_page")
+    @llm_tool("tavily_extract_web_page", parallel_safe=True)
     async def tavily_extract_web_page(
         self,
         event: AstrMessageEvent,
@@ -15,6 +15,8 @@ else:
 if TYPE_CHECKING:
     from astrbot.core.provider.provider import Provider
 
+    from .token_counter import TokenCounter
+
 from ..context.truncator import ContextTruncator
 
 
@@ -94,6 +96,89 @@ class TruncateByTurnsCompressor:
         return truncated_messages
 
 
+class BlockTruncateCompressor:
+    """Prompt-cache friendly truncate compressor implementation.
+
+    Instead of dropping a few of the oldest turns every time the limit is hit, this
+    drops a large block of the oldest turns at once, until the context is below
+    `target_ratio` of the max tokens. The system messages and the remaining prefix
+    then stay byte-stable for many turns, so provider-side prefix caching
+    (Anthropic cache_control, OpenAI / DeepSeek automatic caching) keeps hitting.
+    """
+
+    def __init__(
+        self,
+        token_counter: "TokenCounter",
+        max_tokens: int,
+        target_ratio: float = 0.5,
+        compression_threshold: float = 0.82,
+    ):
+        """Initialize the block truncate compressor.
+
+        Args:
+            token_counter: The token counter used to measure the messages.
+            max_tokens: The maximum allowed tokens for the model.
+            target_ratio: The usage rate to truncate down to (default: 0.5).
+            compression_threshold: The compression trigger threshold (default: 0.82).
+        """
+        self.token_counter = token_counter
+        self.max_tokens = max_tokens
+        self.target_ratio = target_ratio
+        self.compression_threshold = compression_threshold
+
+    def should_compress(
+        self, messages: list[Message], current_tokens: int, max_tokens: int
+    ) -> bool:
+        """Check if compression is needed.
+
+        Args:
+            messages: The message list to evaluate.
+            current_tokens: The current token count.
+            max_tokens: The maximum allowed tokens.
+
+        Returns:
+            True if compression is needed, False otherwise.
+        """
+        if max_tokens <= 0 or current_tokens <= 0:
+            return False
+        usage_rate = current_tokens / max_tokens
+        return usage_rate > self.compression_threshold
+
+    async def __call__(self, messages: list[Message]) -> list[Message]:
+        first_non_system = len(messages)
+        for i, msg in enumerate(messages):
+            if msg.role != "system":
+                first_non_system = i
+                break
+
+        system_messages = messages[:first_non_system]
+        non_system_messages = messages[first_non_system:]
+
+        budget = int(self.max_tokens * self.target_ratio)
+        tokens = [self.token_counter.count_tokens([m]) for m in non_system_messages]
+        remaining = sum(tokens) + self.token_counter.count_tokens(system_messages)
+
+        # drop whole turns from the front, a turn starts with a user message.
+        # the latest turn is always kept.
+        last_user = max(
+            (i for i, m in enumerate(non_system_messages) if m.role == "user"),
+            default=0,
+        )
+        start = 0
+        while start < last_user and remaining > budget:
+            remaining -= tokens[start]
+            start += 1
+            while start < last_user and non_system_messages[start].role != "user":
+                remaining -= tokens[start]
+                start += 1
+
+        if start == 0:
+            return messages
+        return ContextTruncator().fix_messages(
+            system_messages + non_system_messages[start:]
+        )
+
+
 def split_history(
     messages: list[Message], keep_recent: int
 ) -> tuple[list[Message], list[Message], list[Message]]:
@@ -23,6 +23,10 @@ class ContextConfig:
     1. Enforce max turns truncation.
     2. Truncation by turns compression strategy.
     """
+    block_truncate: bool = False
+    """Truncate a large block of the oldest turns at once when the token limit is reached,
+    keeping the prompt prefix stable for provider prompt caching. Ignored when LLM-based
+    compression is used."""
     llm_compress_instruction: str | None = None
     """Instruction prompt for LLM-based compression."""
     llm_compress_keep_recent: int = 0
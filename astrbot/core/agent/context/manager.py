@@ -1,7 +1,11 @@
 from astrbot import logger
 
 from ..message import Message
-from .compressor import LLMSummaryCompressor, TruncateByTurnsCompressor
+from .compressor import (
+    BlockTruncateCompressor,
+    LLMSummaryCompressor,
+    TruncateByTurnsCompressor,
+)
 from .config import ContextConfig
 from .token_counter import EstimateTokenCounter
 from .truncator import ContextTruncator
@@ -16,9 +20,11 @@ class ContextManager:
     ):
         """Initialize the context manager.
 
-        There are two strategies to handle context limit reached:
+        There are three strategies to handle context limit reached:
         1. Truncate by turns: remove older messages by turns.
-        2. LLM-based compression: use LLM to summarize old messages.
+        2. Block truncation: remove a large block of older turns at once, keeping
+           the prompt prefix stable for provider prompt caching.
+        3. LLM-based compression: use LLM to summarize old messages.
 
         Args:
             config: The context configuration.
@@ -28,6 +34,13 @@ class ContextManager:
         self.token_counter = config.custom_token_counter or EstimateTokenCounter()
         self.truncator = ContextTruncator()
 
+        # running total of the last counted message list, agent runners append
+        # messages to the same list between steps.
+        self._counted_messages: list[Message] | None = None
+        self._counted_len = 0
+        self._counted_last: Message | None = None
+        self._counted_tokens = 0
+
         if config.custom_compressor:
             self.compressor = config.custom_compressor
         elif config.llm_compress_provider:
@@ -36,6 +49,11 @@ class ContextManager:
                 keep_recent=config.llm_compress_keep_recent,
                 instruction_text=config.llm_compress_instruction,
             )
+        elif config.block_truncate:
+            self.compressor = BlockTruncateCompressor(
+                token_counter=self.token_counter,
+                max_tokens=config.max_context_tokens,
+            )
         else:
             self.compressor = TruncateByTurnsCompressor(
                 truncate_turns=config.truncate_turns
@@ -65,9 +83,7 @@ class ContextManager:
 
             # 2. 基于 token 的压缩
             if self.config.max_context_tokens > 0:
-                total_tokens = self.token_counter.count_tokens(
-                    result, trusted_token_usage
-                )
+                total_tokens = self._count_tokens(result, trusted_token_usage)
 
                 if self.compressor.should_compress(
                     result, total_tokens, self.config.max_context_tokens
@@ -79,6 +95,40 @@ class ContextManager:
             logger.error(f"Error during context processing: {e}", exc_info=True)
             return messages
 
+    def _count_tokens(
+        self, messages: list[Message], trusted_token_usage: int = 0
+    ) -> int:
+        """Count the tokens of the messages.
+
+        When the same list was counted before and has only been appended to since,
+        only the new messages are counted and added to the running total.
+        Custom token counters always count the whole list.
+        """
+        if trusted_token_usage > 0 or not isinstance(
+            self.token_counter, EstimateTokenCounter
+        ):
+            return self.token_counter.count_tokens(messages, trusted_token_usage)
+
+        if (
+            messages is self._counted_messages
+            and len(messages) >= self._counted_len
+            and (
+                self._counted_len == 0
+                or messages[self._counted_len - 1] is self._counted_last
+            )
+        ):
+            total = self._counted_tokens + self.token_counter.count_tokens(
+                messages[self._counted_len :]
+            )
+        else:
+            total = self.token_counter.count_tokens(messages)
+
+        self._counted_messages = messages
+        self._counted_len = len(messages)
+        self._counted_last = messages[-1] if messages else None
+        self._counted_tokens = total
+        return total
+
     async def _run_compression(
         self, messages: list[Message], prev_tokens: int
     ) -> list[Message]:
@@ -97,7 +147,7 @@ class ContextManager:
         messages = await self.compressor(messages)
 
         # double check
-        tokens_after_summary = self.token_counter.count_tokens(messages)
+        tokens_after_summary = self._count_tokens(messages)
 
         # calculate compress rate
         compress_rate = (tokens_after_summary / self.config.max_context_tokens) * 100
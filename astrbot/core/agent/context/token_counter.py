@@ -1,8 +1,12 @@
 import json
-from typing import Protocol, runtime_checkable
+import re
+from collections import OrderedDict
+from typing import Any, Protocol, runtime_checkable
 
 from ..message import Message, TextPart
 
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+
 
 @runtime_checkable
 class TokenCounter(Protocol):
@@ -31,34 +35,102 @@ class TokenCounter(Protocol):
 class EstimateTokenCounter:
     """Estimate token counter implementation.
     Provides a simple estimation of token count based on character types.
+
+    The token count of each message is memoized, so counting a growing message
+    list on every agent step only does real work for the new messages.
     """
 
+    CACHE_SIZE = 4096
+    """Maximum number of memoized message token counts."""
+
+    def __init__(self):
+        # id(message) -> (fingerprint, token count)
+        self._message_tokens: OrderedDict[int, tuple[tuple, int]] = OrderedDict()
+
     def count_tokens(
         self, messages: list[Message], trusted_token_usage: int = 0
     ) -> int:
         if trusted_token_usage > 0:
             return trusted_token_usage
 
+        return sum(self.count_message_tokens(msg) for msg in messages)
+
+    def count_message_tokens(self, message: Message) -> int:
+        """Count the tokens of a single message, using the memoized value if the
+        message content has not changed since it was last counted."""
+        fingerprint = self._fingerprint(message)
+        key = id(message)
+        cached = self._message_tokens.get(key)
+        # tuple comparison checks identity first, so unchanged messages are cheap
+        if cached is not None and cached[0] == fingerprint:
+            self._message_tokens.move_to_end(key)
+            return cached[1]
+
+        tokens = self._count_message_tokens(message)
+        self._message_tokens[key] = (fingerprint, tokens)
+        if len(self._message_tokens) > self.CACHE_SIZE:
+            self._message_tokens.popitem(last=False)
+        return tokens
+
+    def _count_message_tokens(self, message: Message) -> int:
         total = 0
-        for msg in messages:
-            content = msg.content
-            if isinstance(content, str):
-                total += self._estimate_tokens(content)
-            elif isinstance(content, list):
-                # 处理多模态内容
-                for part in content:
-                    if isinstance(part, TextPart):
-                        total += self._estimate_tokens(part.text)
-
-            # 处理 Tool Calls
-            if msg.tool_calls:
-                for tc in msg.tool_calls:
-                    tc_str = json.dumps(tc if isinstance(tc, dict) else tc.model_dump())
-                    total += self._estimate_tokens(tc_str)
+        content = message.content
+        if isinstance(content, str):
+            total += self._estimate_tokens(content)
+        elif isinstance(content, list):
+            # 处理多模态内容
+            for part in content:
+                if isinstance(part, TextPart):
+                    total += self._estimate_tokens(part.text)
+
+        # 处理 Tool Calls
+        if message.tool_calls:
+            for tc in message.tool_calls:
+                tc_str = json.dumps(tc if isinstance(tc, dict) else tc.model_dump())
+                total += self._estimate_tokens(tc_str)
 
         return total
 
+    @staticmethod
+    def _fingerprint(message: Message) -> tuple:
+        content: Any = message.content
+        if isinstance(content, list):
+            content = tuple(
+                part.text if isinstance(part, TextPart) else None for part in content
+            )
+        tool_calls = tuple(message.tool_calls) if message.tool_calls else None
+        return (content, tool_calls)
+
     def _estimate_tokens(self, text: str) -> int:
-        chinese_count = len([c for c in text if "\u4e00" <= c <= "\u9fff"])
+        chinese_count = len(_CJK_RE.findall(text))
         other_count = len(text) - chinese_count
         return int(chinese_count * 0.6 + other_count * 0.3)
+
+
+class TiktokenTokenCounter(EstimateTokenCounter):
+    """Token counter backed by a real tokenizer (`tiktoken`).
+
+    Requires the optional `tiktoken` package. The encoding is loaded once and
+    shared by all counters using the same encoding name.
+    """
+
+    _encodings: dict[str, Any] = {}
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        super().__init__()
+        self.encoding = self._get_encoding(encoding_name)
+
+    @classmethod
+    def _get_encoding(cls, encoding_name: str):
+        if encoding_name not in cls._encodings:
+            try:
+                import tiktoken
+            except ImportError as e:
+                raise ImportError(
+                    "tiktoken is required for TiktokenTokenCounter. Please install it with: pip install tiktoken",
+                ) from e
+            cls._encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+        return cls._encodings[encoding_name]
+
+    def _estimate_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
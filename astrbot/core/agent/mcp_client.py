@@ -374,6 +374,9 @@ class MCPTool(FunctionTool, Generic[TContext]):
         self.mcp_tool = mcp_tool
         self.mcp_client = mcp_client
         self.mcp_server_name = mcp_server_name
+        # MCP 服务声明为只读的工具没有副作用, 可以并发执行
+        annotations = mcp_tool.annotations
+        self.parallel_safe = bool(annotations and annotations.readOnlyHint)
 
     async def call(
         self, context: ContextWrapper[TContext], **kwargs
@@ -29,6 +29,7 @@ class AgentStats:
     def to_dict(self) -> dict:
         return {
             "token_usage": self.token_usage.__dict__,
+            "cache_hit_ratio": self.token_usage.cache_hit_ratio,
             "start_time": self.start_time,
             "end_time": self.end_time,
             "time_to_first_token": self.time_to_first_token,
@@ -17,6 +17,8 @@ class ContextWrapper(Generic[TContext]):
     messages: list[Message] = Field(default_factory=list)
     """This field stores the llm message context for the agent run, agent runners will maintain this field automatically."""
     tool_call_timeout: int = 60  # Default tool call timeout in seconds
+    tool_call_timings: list[dict[str, Any]] = Field(default_factory=list)
+    """Timings of the tool calls in this run, in call order. Each item has `id`, `name`, `start` (unix timestamp), `duration` (seconds) and `concurrent` keys."""
 
 
 NoContext = ContextWrapper[None]
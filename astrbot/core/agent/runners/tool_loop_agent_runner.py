@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import time
 import traceback
@@ -61,9 +62,14 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         llm_compress_provider: Provider | None = None,
         # truncate by turns compressor
         truncate_turns: int = 1,
+        # truncate a large block of turns at once to keep the prompt prefix cacheable
+        block_truncate: bool = False,
         # customize
         custom_token_counter: TokenCounter | None = None,
         custom_compressor: ContextCompressor | None = None,
+        # max number of parallel-safe tool calls executed concurrently
+        # 1 means all tool calls are executed sequentially
+        max_parallel_tool_calls: int = 1,
         **kwargs: T.Any,
     ) -> None:
         self.req = request
@@ -73,8 +79,10 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         self.llm_compress_keep_recent = llm_compress_keep_recent
         self.llm_compress_provider = llm_compress_provider
         self.truncate_turns = truncate_turns
+        self.block_truncate = block_truncate
         self.custom_token_counter = custom_token_counter
         self.custom_compressor = custom_compressor
+        self.max_parallel_tool_calls = max_parallel_tool_calls
         # we will do compress when:
         # 1. before requesting LLM
         # TODO: 2. after LLM output a tool call
@@ -84,6 +92,7 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
             # enforce max turns before compression
             enforce_max_turns=self.enforce_max_turns,
             truncate_turns=self.truncate_turns,
+            block_truncate=self.block_truncate,
             llm_compress_instruction=self.llm_compress_instruction,
             llm_compress_keep_recent=self.llm_compress_keep_recent,
             llm_compress_provider=self.llm_compress_provider,
@@ -326,214 +335,287 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         req: ProviderRequest,
         llm_response: LLMResponse,
     ) -> T.AsyncGenerator[MessageChain | list[ToolCallMessageSegment], None]:
-        """处理函数工具调用。"""
+        """处理函数工具调用。
+
+        开启并发执行后, 连续的可并发（`parallel_safe`）工具调用会作为一批同时执行,
+        其余工具调用仍按顺序逐个执行。输出和结果始终按照原始的调用顺序返回。
+        """
         tool_call_result_blocks: list[ToolCallMessageSegment] = []
         logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
 
-        # 执行函数调用
-        for func_tool_name, func_tool_args, func_tool_id in zip(
-            llm_response.tools_call_name,
-            llm_response.tools_call_args,
-            llm_response.tools_call_ids,
-        ):
+        for batch in self._split_tool_call_batches(req, llm_response):
+            concurrent = len(batch) > 1
+            timings = []
+            for func_tool_name, func_tool_args, func_tool_id in batch:
+                yield MessageChain(
+                    type="tool_call",
+                    chain=[
+                        Json(
+                            data={
+                                "id": func_tool_id,
+                                "name": func_tool_name,
+                                "args": func_tool_args,
+                                "ts": time.time(),
+                            }
+                        )
+                    ],
+                )
+                timing = {
+                    "id": func_tool_id,
+                    "name": func_tool_name,
+                    "concurrent": concurrent,
+                }
+                self.run_context.tool_call_timings.append(timing)
+                timings.append(timing)
+            if not req.func_tool:
+                return
+
+            if concurrent:
+                logger.info(f"并发执行工具: {[call[0] for call in batch]}")
+                semaphore = asyncio.Semaphore(self.max_parallel_tool_calls)
+                batch_outputs = await asyncio.gather(
+                    *(
+                        self._collect_tool_call(semaphore, req, *call, timing)
+                        for call, timing in zip(batch, timings)
+                    )
+                )
+                for items in batch_outputs:
+                    for item in items:
+                        if isinstance(item, ToolCallMessageSegment):
+                            tool_call_result_blocks.append(item)
+                        else:
+                            yield item
+            else:
+                async for item in self._execute_tool_call(req, *batch[0], timings[0]):
+                    if isinstance(item, ToolCallMessageSegment):
+                        tool_call_result_blocks.append(item)
+                    else:
+                        yield item
+
+        # yield the last tool call result
+        if tool_call_result_blocks:
+            last_tcr = tool_call_result_blocks[-1]
             yield MessageChain(
-                type="tool_call",
+                type="tool_call_result",
                 chain=[
                     Json(
                         data={
-                            "id": func_tool_id,
-                            "name": func_tool_name,
-                            "args": func_tool_args,
+                            "id": last_tcr.tool_call_id,
                             "ts": time.time(),
+                            "result": str(last_tcr.content),
                         }
                     )
                 ],
             )
-            try:
-                if not req.func_tool:
-                    return
-                func_tool = req.func_tool.get_func(func_tool_name)
-                logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
-
-                if not func_tool:
-                    logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
-                    tool_call_result_blocks.append(
-                        ToolCallMessageSegment(
-                            role="tool",
-                            tool_call_id=func_tool_id,
-                            content=f"error: 未找到工具 {func_tool_name}",
-                        ),
-                    )
-                    continue
 
-                valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+        # 处理函数调用响应
+        if tool_call_result_blocks:
+            yield tool_call_result_blocks
 
-                # 获取实际的 handler 函数
-                if func_tool.handler:
-                    logger.debug(
-                        f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
-                    )
-                    if func_tool.parameters and func_tool.parameters.get("properties"):
-                        expected_params = set(func_tool.parameters["properties"].keys())
+    def _split_tool_call_batches(
+        self,
+        req: ProviderRequest,
+        llm_response: LLMResponse,
+    ) -> list[list[tuple[str, dict, str]]]:
+        """将工具调用按顺序分批。连续的可并发工具调用合为一批, 其余每个调用单独一批。"""
+        batches: list[list[tuple[str, dict, str]]] = []
+        parallel_batch: list[tuple[str, dict, str]] | None = None
+        for call in zip(
+            llm_response.tools_call_name,
+            llm_response.tools_call_args,
+            llm_response.tools_call_ids,
+        ):
+            func_tool = req.func_tool.get_tool(call[0]) if req.func_tool else None
+            if (
+                self.max_parallel_tool_calls > 1
+                and func_tool
+                and func_tool.parallel_safe
+            ):
+                if parallel_batch is None:
+                    parallel_batch = []
+                    batches.append(parallel_batch)
+                parallel_batch.append(call)
+            else:
+                parallel_batch = None
+                batches.append([call])
+        return batches
+
+    async def _collect_tool_call(
+        self,
+        semaphore: asyncio.Semaphore,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+        timing: dict[str, T.Any],
+    ) -> list[MessageChain | ToolCallMessageSegment]:
+        """在并发上限内执行一个工具调用, 并收集它的全部输出。"""
+        async with semaphore:
+            return [
+                item
+                async for item in self._execute_tool_call(
+                    req, func_tool_name, func_tool_args, func_tool_id, timing
+                )
+            ]
 
-                        valid_params = {
-                            k: v
-                            for k, v in func_tool_args.items()
-                            if k in expected_params
-                        }
+    async def _execute_tool_call(
+        self,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+        timing: dict[str, T.Any],
+    ) -> T.AsyncGenerator[MessageChain | ToolCallMessageSegment, None]:
+        """执行单个工具调用, 产出直接发送给用户的消息和工具调用结果。"""
+        timing["start"] = time.time()
+        started = time.perf_counter()
+        try:
+            func_tool = (
+                req.func_tool.get_func(func_tool_name) if req.func_tool else None
+            )
+            logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+
+            if not func_tool:
+                logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
+                yield ToolCallMessageSegment(
+                    role="tool",
+                    tool_call_id=func_tool_id,
+                    content=f"error: 未找到工具 {func_tool_name}",
+                )
+                return
 
-                    # 记录被忽略的参数
-                    ignored_params = set(func_tool_args.keys()) - set(
-                        valid_params.keys(),
-                    )
-                    if ignored_params:
-                        logger.warning(
-                            f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
-                        )
-                else:
-                    # 如果没有 handler（如 MCP 工具），使用所有参数
-                    valid_params = func_tool_args
-
-                try:
-                    await self.agent_hooks.on_tool_start(
-                        self.run_context,
-                        func_tool,
-                        valid_params,
+            valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+
+            # 获取实际的 handler 函数
+            if func_tool.handler:
+                logger.debug(
+                    f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
+                )
+                if func_tool.parameters and func_tool.parameters.get("properties"):
+                    expected_params = set(func_tool.parameters["properties"].keys())
+
+                    valid_params = {
+                        k: v for k, v in func_tool_args.items() if k in expected_params
+                    }
+
+                # 记录被忽略的参数
+                ignored_params = set(func_tool_args.keys()) - set(
+                    valid_params.keys(),
+                )
+                if ignored_params:
+                    logger.warning(
+                        f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+            else:
+                # 如果没有 handler（如 MCP 工具），使用所有参数
+                valid_params = func_tool_args
 
-                executor = self.tool_executor.execute(
-                    tool=func_tool,
-                    run_context=self.run_context,
-                    **valid_params,  # 只传递有效的参数
+            try:
+                await self.agent_hooks.on_tool_start(
+                    self.run_context,
+                    func_tool,
+                    valid_params,
                 )
+            except Exception as e:
+                logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
 
-                _final_resp: CallToolResult | None = None
-                async for resp in executor:  # type: ignore
-                    if isinstance(resp, CallToolResult):
-                        res = resp
-                        _final_resp = resp
-                        if isinstance(res.content[0], TextContent):
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content=res.content[0].text,
-                                ),
-                            )
-                        elif isinstance(res.content[0], ImageContent):
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content="返回了图片(已直接发送给用户)",
-                                ),
-                            )
-                            yield MessageChain(type="tool_direct_result").base64_image(
-                                res.content[0].data,
-                            )
-                        elif isinstance(res.content[0], EmbeddedResource):
-                            resource = res.content[0].resource
-                            if isinstance(resource, TextResourceContents):
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content=resource.text,
-                                    ),
-                                )
-                            elif (
-                                isinstance(resource, BlobResourceContents)
-                                and resource.mimeType
-                                and resource.mimeType.startswith("image/")
-                            ):
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content="返回了图片(已直接发送给用户)",
-                                    ),
-                                )
-                                yield MessageChain(
-                                    type="tool_direct_result",
-                                ).base64_image(resource.blob)
-                            else:
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content="返回的数据类型不受支持",
-                                    ),
-                                )
-
-                    elif resp is None:
-                        # Tool 直接请求发送消息给用户
-                        # 这里我们将直接结束 Agent Loop
-                        # 发送消息逻辑在 ToolExecutor 中处理了
-                        logger.warning(
-                            f"{func_tool_name} 没有返回值，或者已将结果直接发送给用户。"
+            executor = self.tool_executor.execute(
+                tool=func_tool,
+                run_context=self.run_context,
+                **valid_params,  # 只传递有效的参数
+            )
+
+            _final_resp: CallToolResult | None = None
+            async for resp in executor:  # type: ignore
+                if isinstance(resp, CallToolResult):
+                    res = resp
+                    _final_resp = resp
+                    if isinstance(res.content[0], TextContent):
+                        yield ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content=res.content[0].text,
                         )
-                        self._transition_state(AgentState.DONE)
-                        self.stats.end_time = time.time()
-                        tool_call_result_blocks.append(
-                            ToolCallMessageSegment(
-                                role="tool",
-                                tool_call_id=func_tool_id,
-                                content="*工具没有返回值或者将结果直接发送给了用户*",
-                            ),
+                    elif isinstance(res.content[0], ImageContent):
+                        yield ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content="返回了图片(已直接发送给用户)",
                         )
-                    else:
-                        # 不应该出现其他类型
-                        logger.warning(
-                            f"Tool 返回了不支持的类型: {type(resp)}。",
+                        yield MessageChain(type="tool_direct_result").base64_image(
+                            res.content[0].data,
                         )
-                        tool_call_result_blocks.append(
-                            ToolCallMessageSegment(
+                    elif isinstance(res.content[0], EmbeddedResource):
+                        resource = res.content[0].resource
+                        if isinstance(resource, TextResourceContents):
+                            yield ToolCallMessageSegment(
                                 role="tool",
                                 tool_call_id=func_tool_id,
-                                content="*工具返回了不支持的类型，请告诉用户检查这个工具的定义和实现。*",
-                            ),
-                        )
+                                content=resource.text,
+                            )
+                        elif (
+                            isinstance(resource, BlobResourceContents)
+                            and resource.mimeType
+                            and resource.mimeType.startswith("image/")
+                        ):
+                            yield ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content="返回了图片(已直接发送给用户)",
+                            )
+                            yield MessageChain(
+                                type="tool_direct_result",
+                            ).base64_image(resource.blob)
+                        else:
+                            yield ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content="返回的数据类型不受支持",
+                            )
 
-                try:
-                    await self.agent_hooks.on_tool_end(
-                        self.run_context,
-                        func_tool,
-                        func_tool_args,
-                        _final_resp,
+                elif resp is None:
+                    # Tool 直接请求发送消息给用户
+                    # 这里我们将直接结束 Agent Loop
+                    # 发送消息逻辑在 ToolExecutor 中处理了
+                    logger.warning(
+                        f"{func_tool_name} 没有返回值，或者已将结果直接发送给用户。"
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
-            except Exception as e:
-                logger.warning(traceback.format_exc())
-                tool_call_result_blocks.append(
-                    ToolCallMessageSegment(
+                    self._transition_state(AgentState.DONE)
+                    self.stats.end_time = time.time()
+                    yield ToolCallMessageSegment(
                         role="tool",
                         tool_call_id=func_tool_id,
-                        content=f"error: {e!s}",
-                    ),
-                )
-
-        # yield the last tool call result
-        if tool_call_result_blocks:
-            last_tcr_content = str(tool_call_result_blocks[-1].content)
-            yield MessageChain(
-                type="tool_call_result",
-                chain=[
-                    Json(
-                        data={
-                            "id": func_tool_id,
-                            "ts": time.time(),
-                            "result": last_tcr_content,
-                        }
+                        content="*工具没有返回值或者将结果直接发送给了用户*",
+                    )
+                else:
+                    # 不应该出现其他类型
+                    logger.warning(
+                        f"Tool 返回了不支持的类型: {type(resp)}。",
+                    )
+                    yield ToolCallMessageSegment(
+                        role="tool",
+                        tool_call_id=func_tool_id,
+                        content="*工具返回了不支持的类型，请告诉用户检查这个工具的定义和实现。*",
                     )
-                ],
-            )
 
-        # 处理函数调用响应
-        if tool_call_result_blocks:
-            yield tool_call_result_blocks
+            try:
+                await self.agent_hooks.on_tool_end(
+                    self.run_context,
+                    func_tool,
+                    func_tool_args,
+                    _final_resp,
+                )
+            except Exception as e:
+                logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
+        except Exception as e:
+            logger.warning(traceback.format_exc())
+            yield ToolCallMessageSegment(
+                role="tool",
+                tool_call_id=func_tool_id,
+                content=f"error: {e!s}",
+            )
+        finally:
+            timing["duration"] = time.perf_counter() - started
 
     def done(self) -> bool:
         """检查 Agent 是否已完成工作"""
@@ -57,6 +57,12 @@ class FunctionTool(ToolSchema, Generic[TContext]):
     Whether the tool is active. This field is a special field for AstrBot.
     You can ignore it when integrating with other frameworks.
     """
+    parallel_safe: bool = False
+    """
+    Whether the tool is free of side effects and can be executed concurrently with
+    other parallel-safe tools in the same LLM response. Agent runners only run such
+    tools concurrently when parallel tool execution is enabled.
+    """
 
     def __repr__(self):
         return f"FuncTool(name={self.name}, parameters={self.parameters}, description={self.description})"
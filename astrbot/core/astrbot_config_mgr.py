@@ -1,3 +1,4 @@
+import asyncio
 import os
 import uuid
 from typing import TypedDict, TypeVar
@@ -13,6 +14,13 @@ from astrbot.core.utils.shared_preferences import SharedPreferences
 _VT = TypeVar("_VT")
 
 
+def _remove_if_exists(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    os.remove(path)
+    return True
+
+
 class ConfInfo(TypedDict):
     """Configuration information for a specific session or platform."""
 
@@ -46,7 +54,10 @@ class AstrBotConfigManager:
         self._load_all_configs()
 
     def _get_abconf_data(self) -> dict:
-        """获取所有的 abconf 数据"""
+        """获取所有的 abconf 数据
+
+        启动时 global 范围已预加载到 SharedPreferences 的缓存中, 这里不会访问数据库。
+        """
         if self.abconf_data is None:
             self.abconf_data = self.sp.get(
                 "abconf_mapping",
@@ -100,26 +111,19 @@ class AstrBotConfigManager:
 
         return DEFAULT_CONFIG_CONF_INFO
 
-    def _save_conf_mapping(
+    def _set_conf_mapping(
         self,
+        abconf_data: dict,
         abconf_path: str,
         abconf_id: str,
         abconf_name: str | None = None,
-    ) -> None:
-        """保存配置文件的映射关系"""
-        abconf_data = self.sp.get(
-            "abconf_mapping",
-            {},
-            scope="global",
-            scope_id="global",
-        )
+    ) -> dict:
         random_word = abconf_name or uuid.uuid4().hex[:8]
         abconf_data[abconf_id] = {
             "path": abconf_path,
             "name": random_word,
         }
-        self.sp.put("abconf_mapping", abconf_data, scope="global", scope_id="global")
-        self.abconf_data = abconf_data
+        return abconf_data
 
     def get_conf(self, umo: str | MessageSession | None) -> AstrBotConfig:
         """获取指定 umo 的配置文件。如果不存在，则 fallback 到默认配置文件。"""
@@ -160,22 +164,72 @@ class AstrBotConfigManager:
         conf_list.append(DEFAULT_CONFIG_CONF_INFO)
         return conf_list
 
-    def create_conf(
-        self,
-        config: dict = DEFAULT_CONFIG,
-        name: str | None = None,
-    ) -> str:
+    def _new_conf(self, config: dict) -> tuple[str, str, AstrBotConfig]:
         conf_uuid = str(uuid.uuid4())
         conf_file_name = f"abconf_{conf_uuid}.json"
         conf_path = os.path.join(get_astrbot_config_path(), conf_file_name)
         conf = AstrBotConfig(config_path=conf_path, default_config=config)
         conf.save_config()
-        self._save_conf_mapping(conf_file_name, conf_uuid, abconf_name=name)
+        return conf_uuid, conf_file_name, conf
+
+    def create_conf(
+        self,
+        config: dict = DEFAULT_CONFIG,
+        name: str | None = None,
+    ) -> str:
+        """创建配置文件。在事件循环中请使用 create_conf_async"""
+        conf_uuid, conf_file_name, conf = self._new_conf(config)
+        abconf_data = self._set_conf_mapping(
+            self.sp.get("abconf_mapping", {}, scope="global", scope_id="global"),
+            conf_file_name,
+            conf_uuid,
+            abconf_name=name,
+        )
+        self.sp.put("abconf_mapping", abconf_data, scope="global", scope_id="global")
+        self.abconf_data = abconf_data
+        self.confs[conf_uuid] = conf
+        return conf_uuid
+
+    async def create_conf_async(
+        self,
+        config: dict = DEFAULT_CONFIG,
+        name: str | None = None,
+    ) -> str:
+        """创建配置文件"""
+        conf_uuid, conf_file_name, conf = self._new_conf(config)
+        abconf_data = self._set_conf_mapping(
+            await self.sp.global_get("abconf_mapping", {}),
+            conf_file_name,
+            conf_uuid,
+            abconf_name=name,
+        )
+        await self.sp.global_put("abconf_mapping", abconf_data)
+        self.abconf_data = abconf_data
         self.confs[conf_uuid] = conf
         return conf_uuid
 
+    def _deletable_conf_path(self, abconf_data: dict, conf_id: str) -> str | None:
+        """获取待删除的配置文件路径, 配置文件不存在于映射中时返回 None"""
+        if conf_id == "default":
+            raise ValueError("不能删除默认配置文件")
+        if conf_id not in abconf_data:
+            logger.warning(f"配置文件 {conf_id} 不存在于映射中")
+            return None
+        return os.path.join(
+            get_astrbot_config_path(),
+            abconf_data[conf_id]["path"],
+        )
+
+    def _forget_conf(self, abconf_data: dict, conf_id: str) -> dict:
+        # 从内存中移除
+        if conf_id in self.confs:
+            del self.confs[conf_id]
+        # 从映射中移除
+        del abconf_data[conf_id]
+        return abconf_data
+
     def delete_conf(self, conf_id: str) -> bool:
-        """删除指定配置文件
+        """删除指定配置文件。在事件循环中请使用 delete_conf_async
 
         Args:
             conf_id: 配置文件的 UUID
@@ -187,49 +241,67 @@ class AstrBotConfigManager:
             ValueError: 如果试图删除默认配置文件
 
         """
-        if conf_id == "default":
-            raise ValueError("不能删除默认配置文件")
-
-        # 从映射中移除
         abconf_data = self.sp.get(
             "abconf_mapping",
             {},
             scope="global",
             scope_id="global",
         )
-        if conf_id not in abconf_data:
-            logger.warning(f"配置文件 {conf_id} 不存在于映射中")
+        conf_path = self._deletable_conf_path(abconf_data, conf_id)
+        if conf_path is None:
             return False
 
-        # 获取配置文件路径
-        conf_path = os.path.join(
-            get_astrbot_config_path(),
-            abconf_data[conf_id]["path"],
-        )
-
         # 删除配置文件
         try:
-            if os.path.exists(conf_path):
-                os.remove(conf_path)
+            if _remove_if_exists(conf_path):
                 logger.info(f"已删除配置文件: {conf_path}")
         except Exception as e:
             logger.error(f"删除配置文件 {conf_path} 失败: {e}")
             return False
 
-        # 从内存中移除
-        if conf_id in self.confs:
-            del self.confs[conf_id]
-
-        # 从映射中移除
-        del abconf_data[conf_id]
+        abconf_data = self._forget_conf(abconf_data, conf_id)
         self.sp.put("abconf_mapping", abconf_data, scope="global", scope_id="global")
         self.abconf_data = abconf_data
 
         logger.info(f"成功删除配置文件 {conf_id}")
         return True
 
+    async def delete_conf_async(self, conf_id: str) -> bool:
+        """删除指定配置文件, 参数和返回值同 delete_conf"""
+        abconf_data = await self.sp.global_get("abconf_mapping", {})
+        conf_path = self._deletable_conf_path(abconf_data, conf_id)
+        if conf_path is None:
+            return False
+
+        # 删除配置文件
+        try:
+            if await asyncio.to_thread(_remove_if_exists, conf_path):
+                logger.info(f"已删除配置文件: {conf_path}")
+        except Exception as e:
+            logger.error(f"删除配置文件 {conf_path} 失败: {e}")
+            return False
+
+        abconf_data = self._forget_conf(abconf_data, conf_id)
+        await self.sp.global_put("abconf_mapping", abconf_data)
+        self.abconf_data = abconf_data
+
+        logger.info(f"成功删除配置文件 {conf_id}")
+        return True
+
+    @staticmethod
+    def _rename_conf(abconf_data: dict, conf_id: str, name: str | None) -> bool:
+        if conf_id == "default":
+            raise ValueError("不能更新默认配置文件的信息")
+        if conf_id not in abconf_data:
+            logger.warning(f"配置文件 {conf_id} 不存在于映射中")
+            return False
+        # 更新名称
+        if name is not None:
+            abconf_data[conf_id]["name"] = name
+        return True
+
     def update_conf_info(self, conf_id: str, name: str | None = None) -> bool:
-        """更新配置文件信息
+        """更新配置文件信息。在事件循环中请使用 update_conf_info_async
 
         Args:
             conf_id: 配置文件的 UUID
@@ -239,29 +311,37 @@ class AstrBotConfigManager:
             bool: 更新是否成功
 
         """
-        if conf_id == "default":
-            raise ValueError("不能更新默认配置文件的信息")
-
         abconf_data = self.sp.get(
             "abconf_mapping",
             {},
             scope="global",
             scope_id="global",
         )
-        if conf_id not in abconf_data:
-            logger.warning(f"配置文件 {conf_id} 不存在于映射中")
+        if not self._rename_conf(abconf_data, conf_id, name):
             return False
 
-        # 更新名称
-        if name is not None:
-            abconf_data[conf_id]["name"] = name
-
         # 保存更新
         self.sp.put("abconf_mapping", abconf_data, scope="global", scope_id="global")
         self.abconf_data = abconf_data
         logger.info(f"成功更新配置文件 {conf_id} 的信息")
         return True
 
+    async def update_conf_info_async(
+        self,
+        conf_id: str,
+        name: str | None = None,
+    ) -> bool:
+        """更新配置文件信息, 参数和返回值同 update_conf_info"""
+        abconf_data = await self.sp.global_get("abconf_mapping", {})
+        if not self._rename_conf(abconf_data, conf_id, name):
+            return False
+
+        # 保存更新
+        await self.sp.global_put("abconf_mapping", abconf_data)
+        self.abconf_data = abconf_data
+        logger.info(f"成功更新配置文件 {conf_id} 的信息")
+        return True
+
     def g(
         self,
         umo: str | None = None,
@@ -9,6 +9,7 @@ from astrbot.core.db.po import (
     Attachment,
     CommandConfig,
     CommandConflict,
+    ConversationMessage,
     ConversationV2,
     Persona,
     PlatformMessageHistory,
@@ -38,6 +39,7 @@ from astrbot.core.utils.astrbot_path import (
 MAIN_DB_MODELS: dict[str, type[SQLModel]] = {
     "platform_stats": PlatformStat,
     "conversations": ConversationV2,
+    "conversation_messages": ConversationMessage,
     "personas": Persona,
     "preferences": Preference,
     "platform_message_history": PlatformMessageHistory,
@@ -18,7 +18,7 @@ from typing import TYPE_CHECKING, Any
 
 from sqlalchemy import delete
 
-from astrbot.core import logger
+from astrbot.core import logger, sp
 from astrbot.core.config.default import VERSION
 from astrbot.core.db import BaseDatabase
 from astrbot.core.utils.astrbot_path import (
@@ -345,6 +345,9 @@ class AstrBotImporter:
                 except Exception as e:
                     result.add_error(f"导入主数据库失败: {e}")
                     return result
+                finally:
+                    # 偏好设置表被直接改写, 丢弃缓存
+                    sp.invalidate()
 
                 if progress_callback:
                     await progress_callback("main_db", 100, 100, "主数据库导入完成")
@@ -26,6 +26,9 @@ DEFAULT_CONFIG = {
             "time": 60,
             "count": 30,
             "strategy": "stall",  # stall, discard
+            "scope": "session",  # session, sender, platform, global
+            "max_queue": -1,  # -1 表示不限制
+            "notify": False,
         },
         "reply_prefix": "",
         "forward_threshold": 1500,
@@ -83,7 +86,7 @@ DEFAULT_CONFIG = {
         "default_personality": "default",
         "persona_pool": ["*"],
         "prompt_prefix": "{{prompt}}",
-        "context_limit_reached_strategy": "truncate_by_turns",  # or llm_compress
+        "context_limit_reached_strategy": "truncate_by_turns",  # or truncate_by_blocks, llm_compress
         "llm_compress_instruction": (
             "Based on our full conversation history, produce a concise summary of key takeaways and/or project progress.\n"
             "1. Systematically cover all core topics discussed and the final conclusion/outcome for each; clearly highlight the latest primary focus.\n"
@@ -93,6 +96,7 @@ DEFAULT_CONFIG = {
         ),
         "llm_compress_keep_recent": 4,
         "llm_compress_provider_id": "",
+        "context_token_counter": "estimate",  # or tiktoken
         "max_context_length": -1,
         "dequeue_context_length": 1,
         "streaming_response": False,
@@ -106,11 +110,25 @@ DEFAULT_CONFIG = {
         "reachability_check": False,
         "max_agent_step": 30,
         "tool_call_timeout": 60,
+        "max_parallel_tool_calls": 1,
         "file_extract": {
             "enable": False,
             "provider": "moonshotai",
             "moonshotai_api_key": "",
         },
+        "embedding_cache": {
+            "enable": True,
+            "disk": False,  # 是否在 data/embedding_cache.db 中持久化
+            "memory_max_entries": 4096,
+            "disk_max_entries": 20000,  # 1536 维时约 120 MB
+            "ttl": 604800,  # 秒, 0 表示永不过期
+        },
+        "media_cache": {
+            "enable": True,  # 在 data/media_cache 中按内容哈希缓存下载的图片
+            "max_disk_mb": 512,
+            "max_memory_mb": 64,  # 内存中已编码的 base64 图片
+            "url_ttl": 3600,  # 秒, 0 表示永不过期
+        },
     },
     "provider_stt_settings": {
         "enable": False,
@@ -181,6 +199,19 @@ DEFAULT_CONFIG = {
     "kb_fusion_top_k": 20,  # 知识库检索融合阶段返回结果数量
     "kb_final_top_k": 5,  # 知识库检索最终返回结果数量
     "kb_agentic_mode": False,
+    "kb_faiss_workers": 0,  # 知识库向量检索线程池大小, 0 表示自动
+    "kb_cross_kb_dedup": False,  # 导入时复用其他知识库中相同文本块的向量
+    "event_bus_max_concurrency": 32,  # 同时处理的消息事件上限, 0 表示不限制
+    "event_bus_max_pending": 1000,  # 排队等待处理的消息事件上限, 0 表示不限制
+    "event_bus_overflow_policy": "drop_oldest",  # drop_oldest, drop_newest, coalesce
+    "event_bus_session_serial": True,  # 同一会话的消息按顺序逐条处理
+    "pipeline_metrics_enable": False,  # 统计消息管道各阶段、插件处理函数的耗时
+    "pipeline_metrics_prometheus": False,  # 通过 /api/stat/metrics 导出 Prometheus 指标
+    "pipeline_metrics_prometheus_token": "",  # 访问 Prometheus 指标所需的 Bearer Token
+    "conversation_cache_size": 256,  # 缓存在内存中的对话数量, 0 表示不缓存
+    "conversation_flush_interval": 60,  # 缓存的对话历史记录写入数据库的间隔(秒)
+    "http_pool_limit": 100,  # 共享 HTTP 连接池的最大连接数
+    "http_pool_limit_per_host": 10,  # 共享 HTTP 连接池中每个主机的最大连接数
     "disable_builtin_commands": False,
 }
 
@@ -720,6 +751,12 @@ CONFIG_METADATA_2 = {
                                 "type": "string",
                                 "options": ["stall", "discard"],
                             },
+                            "scope": {
+                                "type": "string",
+                                "options": ["session", "sender", "platform", "global"],
+                            },
+                            "max_queue": {"type": "int"},
+                            "notify": {"type": "bool"},
                         },
                     },
                     "no_permission_reply": {
@@ -910,6 +947,7 @@ CONFIG_METADATA_2 = {
                         "api_base": "https://api.anthropic.com/v1",
                         "timeout": 120,
                         "anth_thinking_config": {"budget": 0},
+                        "anth_prompt_caching": True,
                     },
                     "Moonshot": {
                         "id": "moonshot",
@@ -1828,6 +1866,11 @@ CONFIG_METADATA_2 = {
                             },
                         },
                     },
+                    "anth_prompt_caching": {
+                        "description": "启用提示词缓存",
+                        "type": "bool",
+                        "hint": "在工具定义、系统提示词和最近的消息上标记 cache_control 缓存断点，长对话中可复用已缓存的前缀，降低费用和首字延迟。See: https://platform.claude.com/docs/en/build-with-claude/prompt-caching",
+                    },
                     "minimax-group-id": {
                         "type": "string",
                         "description": "用户组",
@@ -2160,6 +2203,9 @@ CONFIG_METADATA_2 = {
                     "tool_call_timeout": {
                         "type": "int",
                     },
+                    "max_parallel_tool_calls": {
+                        "type": "int",
+                    },
                     "file_extract": {
                         "type": "object",
                         "items": {
@@ -2174,6 +2220,43 @@ CONFIG_METADATA_2 = {
                             },
                         },
                     },
+                    "embedding_cache": {
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "type": "bool",
+                            },
+                            "disk": {
+                                "type": "bool",
+                            },
+                            "memory_max_entries": {
+                                "type": "int",
+                            },
+                            "disk_max_entries": {
+                                "type": "int",
+                            },
+                            "ttl": {
+                                "type": "int",
+                            },
+                        },
+                    },
+                    "media_cache": {
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "type": "bool",
+                            },
+                            "max_disk_mb": {
+                                "type": "int",
+                            },
+                            "max_memory_mb": {
+                                "type": "int",
+                            },
+                            "url_ttl": {
+                                "type": "int",
+                            },
+                        },
+                    },
                 },
             },
             "provider_stt_settings": {
@@ -2306,6 +2389,19 @@ CONFIG_METADATA_2 = {
             "kb_fusion_top_k": {"type": "int", "default": 20},
             "kb_final_top_k": {"type": "int", "default": 5},
             "kb_agentic_mode": {"type": "bool"},
+            "kb_faiss_workers": {"type": "int", "default": 0},
+            "kb_cross_kb_dedup": {"type": "bool", "default": False},
+            "event_bus_max_concurrency": {"type": "int", "default": 32},
+            "event_bus_max_pending": {"type": "int", "default": 1000},
+            "event_bus_overflow_policy": {"type": "string", "default": "drop_oldest"},
+            "event_bus_session_serial": {"type": "bool", "default": True},
+            "pipeline_metrics_enable": {"type": "bool", "default": False},
+            "pipeline_metrics_prometheus": {"type": "bool", "default": False},
+            "pipeline_metrics_prometheus_token": {"type": "string", "default": ""},
+            "conversation_cache_size": {"type": "int", "default": 256},
+            "conversation_flush_interval": {"type": "int", "default": 60},
+            "http_pool_limit": {"type": "int", "default": 100},
+            "http_pool_limit_per_host": {"type": "int", "default": 10},
         },
     },
 }
@@ -2572,12 +2668,20 @@ CONFIG_METADATA_3 = {
                     "provider_settings.context_limit_reached_strategy": {
                         "description": "超出模型上下文窗口时的处理方式",
                         "type": "string",
-                        "options": ["truncate_by_turns", "llm_compress"],
-                        "labels": ["按对话轮数截断", "由 LLM 压缩上下文"],
+                        "options": [
+                            "truncate_by_turns",
+                            "truncate_by_blocks",
+                            "llm_compress",
+                        ],
+                        "labels": [
+                            "按对话轮数截断",
+                            "按大块截断（利于提示词缓存）",
+                            "由 LLM 压缩上下文",
+                        ],
                         "condition": {
                             "provider_settings.agent_runner_type": "local",
                         },
-                        "hint": "",
+                        "hint": "按大块截断会一次性丢弃较早的对话直到上下文低于窗口的一半，之后多轮对话的前缀保持不变，可以持续命中模型提供商的提示词缓存。",
                     },
                     "provider_settings.llm_compress_instruction": {
                         "description": "上下文压缩提示词",
@@ -2607,6 +2711,16 @@ CONFIG_METADATA_3 = {
                             "provider_settings.agent_runner_type": "local",
                         },
                     },
+                    "provider_settings.context_token_counter": {
+                        "description": "上下文 Token 计数方式",
+                        "type": "string",
+                        "options": ["estimate", "tiktoken"],
+                        "labels": ["按字符估算", "使用 tiktoken 分词器"],
+                        "hint": "用于判断上下文是否超出模型上下文窗口。使用 tiktoken 需要先安装 tiktoken，未安装时回退为按字符估算。",
+                        "condition": {
+                            "provider_settings.agent_runner_type": "local",
+                        },
+                    },
                 },
             },
             "others": {
@@ -2667,6 +2781,14 @@ CONFIG_METADATA_3 = {
                             "provider_settings.agent_runner_type": "local",
                         },
                     },
+                    "provider_settings.max_parallel_tool_calls": {
+                        "description": "工具并发执行上限",
+                        "type": "int",
+                        "hint": "同一轮中声明为无副作用的工具调用最多同时执行的数量。设置为 1 时所有工具调用按顺序执行。",
+                        "condition": {
+                            "provider_settings.agent_runner_type": "local",
+                        },
+                    },
                     "provider_settings.streaming_response": {
                         "description": "流式输出",
                         "type": "bool",
@@ -2807,6 +2929,22 @@ CONFIG_METADATA_3 = {
                         "type": "string",
                         "options": ["stall", "discard"],
                     },
+                    "platform_settings.rate_limit.scope": {
+                        "description": "速率限制范围",
+                        "type": "string",
+                        "options": ["session", "sender", "platform", "global"],
+                        "hint": "session: 每个会话单独限流; sender: 每个发送者跨会话限流; platform: 每个平台实例共享额度; global: 所有消息共享额度。",
+                    },
+                    "platform_settings.rate_limit.max_queue": {
+                        "description": "限流等待队列长度",
+                        "type": "int",
+                        "hint": "stall 策略下每个限流键最多排队等待的消息数，超出的消息将被丢弃。-1 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.notify": {
+                        "description": "限流时提醒用户",
+                        "type": "bool",
+                        "hint": "消息因限流需要排队等待或被丢弃时，回复一条提示。",
+                    },
                 },
             },
             "content_safety": {
@@ -3122,6 +3260,72 @@ CONFIG_METADATA_3_SYSTEM = {
                         "type": "string",
                         "hint": "安装 Python 依赖时请求的 PyPI 软件仓库地址。默认为 https://mirrors.aliyun.com/pypi/simple/",
                     },
+                    "kb_faiss_workers": {
+                        "description": "知识库向量检索线程数",
+                        "type": "int",
+                        "hint": "知识库向量检索、插入和删除在独立的线程池中执行, 避免阻塞消息处理。0 表示自动 (CPU 核数, 最多 4)。重启后生效。",
+                    },
+                    "kb_cross_kb_dedup": {
+                        "description": "跨知识库复用文本块向量",
+                        "type": "bool",
+                        "hint": "导入文档时, 与其他使用同一嵌入模型的知识库中内容相同的文本块直接复用其向量, 不再调用嵌入接口。同一知识库内始终会复用。重启后生效。",
+                    },
+                    "event_bus_max_concurrency": {
+                        "description": "消息处理并发上限",
+                        "type": "int",
+                        "hint": "同时处理的消息事件数量上限, 超出的消息排队等待。0 表示不限制。重启后生效。",
+                    },
+                    "event_bus_max_pending": {
+                        "description": "消息排队上限",
+                        "type": "int",
+                        "hint": "排队等待处理的消息事件数量上限, 超出时按溢出策略丢弃消息。0 表示不限制。重启后生效。",
+                    },
+                    "event_bus_overflow_policy": {
+                        "description": "消息排队溢出策略",
+                        "type": "string",
+                        "options": ["drop_oldest", "drop_newest", "coalesce"],
+                        "hint": "drop_oldest: 丢弃积压最多的会话中最早的消息; drop_newest: 丢弃新到达的消息; coalesce: 积压最多的会话只保留最新的一条消息。重启后生效。",
+                    },
+                    "event_bus_session_serial": {
+                        "description": "同一会话按顺序处理消息",
+                        "type": "bool",
+                        "hint": "开启后, 同一会话的消息在上一条处理完成后才会开始处理, 避免乱序和并发冲突。重启后生效。",
+                    },
+                    "pipeline_metrics_enable": {
+                        "description": "统计消息处理耗时",
+                        "type": "bool",
+                        "hint": "按配置文件统计消息管道各阶段及插件处理函数的耗时分布, 可在 /api/stat/pipeline-metrics 查看。重启后生效。",
+                    },
+                    "pipeline_metrics_prometheus": {
+                        "description": "导出 Prometheus 指标",
+                        "type": "bool",
+                        "hint": "开启后可通过 /api/stat/metrics 以 Prometheus 文本格式获取耗时指标。需要同时开启「统计消息处理耗时」。",
+                    },
+                    "pipeline_metrics_prometheus_token": {
+                        "description": "Prometheus 指标访问令牌",
+                        "type": "string",
+                        "hint": "设置后, 访问 /api/stat/metrics 需要携带请求头 Authorization: Bearer <令牌>。为空时需要使用 WebUI 登录后获得的 JWT 访问。",
+                    },
+                    "conversation_cache_size": {
+                        "description": "对话缓存数量",
+                        "type": "int",
+                        "hint": "在内存中缓存最近使用的对话及其历史记录的数量, 活跃会话无需每条消息都从数据库读取。0 表示不缓存。重启后生效。",
+                    },
+                    "conversation_flush_interval": {
+                        "description": "对话历史写入间隔(秒)",
+                        "type": "int",
+                        "hint": "缓存中新增的对话历史记录先写入预写日志, 每隔该时间批量写入数据库。意外退出后会在下次启动时从预写日志恢复。重启后生效。",
+                    },
+                    "http_pool_limit": {
+                        "description": "HTTP 连接池最大连接数",
+                        "type": "int",
+                        "hint": "下载图片/文件、文转图、网页搜索等请求共用同一个连接池, 复用连接以减少建立连接的开销。重启后生效。",
+                    },
+                    "http_pool_limit_per_host": {
+                        "description": "HTTP 连接池单个主机最大连接数",
+                        "type": "int",
+                        "hint": "连接池中同一主机同时使用的最大连接数。重启后生效。",
+                    },
                     "callback_api_base": {
                         "description": "对外可达的回调接口地址",
                         "type": "string",
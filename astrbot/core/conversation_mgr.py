@@ -4,26 +4,294 @@
 在一个会话中可以建立多个对话, 并且支持对话的切换和删除
 """
 
+import asyncio
+import dataclasses
 import json
+import os
+from collections import OrderedDict
 from collections.abc import Awaitable, Callable
+from typing import IO
 
-from astrbot.core import sp
+from astrbot.core import logger, sp
 from astrbot.core.agent.message import AssistantMessageSegment, UserMessageSegment
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import Conversation, ConversationV2
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+
+
+@dataclasses.dataclass
+class _CachedConversation:
+    conversation: Conversation
+    """对话对象, 其 history 字段不使用"""
+    history: list[dict]
+    history_turns: int
+    """加载时的历史记录轮数, -1 表示完整的历史记录"""
+    flushed: int = 0
+    """history 中已写入数据库的消息条数, 之后的消息暂时只记录在预写日志中"""
+    token_usage_dirty: bool = False
+    generation: int = 0
+    """历史记录被整体改写 (而不是追加) 的次数"""
+    history_json: str | None = None
 
 
 class ConversationManager:
-    """负责管理会话与 LLM 的对话，某个会话当前正在用哪个对话。"""
+    """负责管理会话与 LLM 的对话，某个会话当前正在用哪个对话。
+
+    cache_size > 0 时, 最近使用的对话 (含解码后的历史记录) 保存在 LRU 缓存中。只追加消息的更新
+    先写入缓存和预写日志 (WAL), 每 save_interval 秒、对话被淘汰时或关闭时再批量写入数据库;
+    预写日志的每条记录都会 fsync, 进程意外退出或断电后, 下次启动时会重放预写日志。
+    改写已有消息的更新 (如截断、压缩、手动编辑) 立即写入数据库, 预写日志中只记录一个标记,
+    使重放时跳过该对话更早的记录。
+    """
 
-    def __init__(self, db_helper: BaseDatabase):
+    def __init__(
+        self,
+        db_helper: BaseDatabase,
+        cache_size: int = 0,
+        save_interval: float = 60,
+        wal_path: str | None = None,
+    ):
         self.session_conversations: dict[str, str] = {}
         self.db = db_helper
-        self.save_interval = 60  # 每 60 秒保存一次
+        self.save_interval = save_interval
+
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, _CachedConversation] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self.wal_path = wal_path or os.path.join(
+            get_astrbot_data_path(), "conversation_wal.jsonl"
+        )
+        self._wal: IO[str] | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         # 会话删除回调函数列表（用于级联清理，如知识库配置）
         self._on_session_deleted_callbacks: list[Callable[[str], Awaitable[None]]] = []
 
+    async def initialize(self) -> None:
+        """重放上次未写入数据库的预写日志, 并启动定时写入任务"""
+        if self.cache_size <= 0:
+            return
+        paths = (self.wal_path + ".flushing", self.wal_path)
+        records = [r for path in paths for r in self._read_wal(path)]
+        # 历史记录被改写时已直接写入数据库, 该对话在此之前的记录不再需要重放
+        reset_at = {r["cid"]: i for i, r in enumerate(records) if r.get("reset")}
+        records = [
+            r
+            for i, r in enumerate(records)
+            if not r.get("reset") and i > reset_at.get(r["cid"], -1)
+        ]
+        if records:
+            logger.info(f"正在从预写日志恢复 {len(records)} 条对话记录更新...")
+        for record in records:
+            await self.db.save_conversation_messages(
+                record["cid"], record["messages"], start_seq=record["seq"]
+            )
+            if record.get("token_usage") is not None:
+                await self.db.update_conversation(
+                    cid=record["cid"], token_usage=record["token_usage"]
+                )
+        for path in paths:
+            self._remove_wal(path)
+        self._open_wal()
+        self._flush_task = asyncio.create_task(
+            self._flush_loop(), name="conversation_flush"
+        )
+
+    async def terminate(self) -> None:
+        """停止定时写入任务, 并将缓存中的更新全部写入数据库"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        if self._wal:
+            self._wal.close()
+            self._wal = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"写入对话历史记录失败: {e}", exc_info=True)
+
+    async def flush(self) -> None:
+        """将缓存中只记录在预写日志里的对话更新写入数据库"""
+        if not self._dirty:
+            return
+        async with self._flush_lock:
+            self._rotate_wal()
+            for cid in list(self._dirty):
+                # 不在缓存中的是正在被淘汰的对话, 由 _write_back 写入
+                if entry := self._cache.get(cid):
+                    await self._flush_entry(cid, entry)
+            self._remove_wal(self.wal_path + ".flushing")
+
+    async def _flush_entry(self, cid: str, entry: _CachedConversation) -> None:
+        self._dirty.discard(cid)
+        history, flushed, generation = entry.history, entry.flushed, entry.generation
+        try:
+            if len(history) > flushed:
+                await self.db.save_conversation_messages(
+                    cid,
+                    history[flushed:],
+                    start_seq=entry.conversation.history_offset + flushed,
+                )
+            if entry.token_usage_dirty:
+                entry.token_usage_dirty = False
+                await self.db.update_conversation(
+                    cid=cid, token_usage=entry.conversation.token_usage
+                )
+        except BaseException:
+            self._dirty.add(cid)
+            raise
+        if entry.generation == generation:
+            entry.flushed = max(entry.flushed, len(history))
+
+    def _open_wal(self) -> None:
+        os.makedirs(os.path.dirname(self.wal_path) or ".", exist_ok=True)
+        self._wal = open(self.wal_path, "a", encoding="utf-8")
+
+    def _rotate_wal(self) -> None:
+        """将当前的预写日志转为待写入状态, 之后的更新写入新的日志文件"""
+        if not self._wal:
+            return
+        self._wal.close()
+        flushing = self.wal_path + ".flushing"
+        if os.path.exists(flushing):
+            # 上次写入数据库失败, 合并到一起重试
+            with (
+                open(self.wal_path, encoding="utf-8") as src,
+                open(flushing, "a", encoding="utf-8") as dst,
+            ):
+                dst.write(src.read())
+            os.remove(self.wal_path)
+        else:
+            os.replace(self.wal_path, flushing)
+        self._open_wal()
+
+    async def _append_wal(self, record: dict) -> None:
+        if not self._wal:
+            return
+        wal = self._wal
+        wal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        wal.flush()
+        try:
+            await asyncio.to_thread(os.fsync, wal.fileno())
+        except (OSError, ValueError):
+            # 日志文件已被轮换关闭, 其中的记录会由本次 flush 写入数据库
+            pass
+
+    @staticmethod
+    def _remove_wal(path: str) -> None:
+        if os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def _read_wal(path: str) -> list[dict]:
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 最后一行可能在进程退出时只写了一半
+                    logger.warning(f"跳过预写日志 {path} 中无法解析的记录。")
+                    break
+        return records
+
+    async def _cache_put(self, cid: str, entry: _CachedConversation) -> None:
+        self._cache[cid] = entry
+        self._cache.move_to_end(cid)
+        while len(self._cache) > self.cache_size:
+            old_cid, old = self._cache.popitem(last=False)
+            await self._write_back(old_cid, old)
+
+    async def _evict(self, cid: str) -> None:
+        """将对话移出缓存, 有未写入的更新时先写入数据库"""
+        if entry := self._cache.pop(cid, None):
+            await self._write_back(cid, entry)
+
+    async def _write_back(self, cid: str, entry: _CachedConversation) -> None:
+        """写入已移出缓存的对话的未写入更新, 失败时放回缓存等待下次定时写入"""
+        if cid not in self._dirty:
+            return
+        async with self._flush_lock:
+            try:
+                await self._flush_entry(cid, entry)
+            except Exception as e:
+                logger.error(f"写入对话 {cid} 的历史记录失败: {e}", exc_info=True)
+                self._cache[cid] = entry
+
+    def _drop_cached(self, cid: str) -> None:
+        """对话被删除时丢弃缓存及未写入的更新"""
+        self._cache.pop(cid, None)
+        self._dirty.discard(cid)
+
+    def _cached_conversation(self, entry: _CachedConversation) -> Conversation:
+        if entry.history_json is None:
+            entry.history_json = json.dumps(entry.history)
+        return dataclasses.replace(entry.conversation, history=entry.history_json)
+
+    async def _update_cached_history(
+        self,
+        cid: str,
+        entry: _CachedConversation,
+        history: list[dict],
+        token_usage: int | None,
+    ) -> None:
+        offset = entry.conversation.history_offset
+        old = entry.history
+        if token_usage is not None:
+            entry.conversation.token_usage = token_usage
+        if len(history) >= len(old) and history[: len(old)] == old:
+            # 只追加了消息, 先记录在预写日志中
+            entry.history = list(history)
+            entry.history_json = None
+            entry.token_usage_dirty = entry.token_usage_dirty or token_usage is not None
+            self._dirty.add(cid)
+            await self._append_wal(
+                {
+                    "cid": cid,
+                    "seq": offset + len(old),
+                    "messages": history[len(old) :],
+                    "token_usage": token_usage,
+                },
+            )
+            return
+
+        async with self._flush_lock:
+            # 先写入尚未写入的追加, 之后预写日志中该对话更早的记录都不再需要重放
+            if cid in self._dirty:
+                await self._flush_entry(cid, entry)
+            await self._append_wal({"cid": cid, "reset": True})
+            first_seq = await self.db.save_conversation_messages(
+                cid, history, start_seq=offset
+            )
+            if token_usage is not None:
+                await self.db.update_conversation(cid=cid, token_usage=token_usage)
+            entry.history = list(history)
+            entry.history_json = None
+            entry.conversation.history_offset = first_seq
+            entry.flushed = len(history)
+            entry.generation += 1
+            entry.token_usage_dirty = False
+            self._dirty.discard(cid)
+
+    def cache_stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "max_size": self.cache_size,
+            "dirty": len(self._dirty),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+        }
+
     def register_on_session_deleted(
         self,
         callback: Callable[[str], Awaitable[None]],
@@ -132,6 +400,7 @@ class ConversationManager:
         if not conversation_id:
             conversation_id = self.session_conversations.get(unified_msg_origin)
         if conversation_id:
+            self._drop_cached(conversation_id)
             await self.db.delete_conversation(cid=conversation_id)
             curr_cid = await self.get_curr_conversation_id(unified_msg_origin)
             if curr_cid == conversation_id:
@@ -145,6 +414,9 @@ class ConversationManager:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
 
         """
+        for cid, entry in list(self._cache.items()):
+            if entry.conversation.user_id == unified_msg_origin:
+                self._drop_cached(cid)
         await self.db.delete_conversations_by_user_id(user_id=unified_msg_origin)
         self.session_conversations.pop(unified_msg_origin, None)
         await sp.session_remove(unified_msg_origin, "sel_conv_id")
@@ -173,6 +445,7 @@ class ConversationManager:
         unified_msg_origin: str,
         conversation_id: str,
         create_if_not_exists: bool = False,
+        history_turns: int = -1,
     ) -> Conversation | None:
         """获取会话的对话.
 
@@ -180,18 +453,58 @@ class ConversationManager:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
             create_if_not_exists (bool): 如果对话不存在,是否创建一个新的对话
+            history_turns (int): 只加载最近 N 轮对话的历史记录, -1 表示加载全部。
+                此时返回对象的 history_offset 可能不为 0, 更新历史记录时需要一并传入
         Returns:
             conversation (Conversation): 对话对象
 
         """
-        conv = await self.db.get_conversation_by_id(cid=conversation_id)
+        if self.cache_size > 0:
+            entry = self._cache.get(conversation_id)
+            if entry and (
+                entry.history_turns == -1 or 0 < history_turns <= entry.history_turns
+            ):
+                self._cache.move_to_end(conversation_id)
+                self.cache_hits += 1
+                return self._cached_conversation(entry)
+            self.cache_misses += 1
+            if entry:
+                # 缓存中的历史记录不够长, 重新从数据库加载
+                await self._evict(conversation_id)
+            elif conversation_id in self._dirty:
+                # 刚被淘汰, 等待其更新写入数据库
+                async with self._flush_lock:
+                    pass
+
+        load_content = history_turns <= 0
+        conv = await self.db.get_conversation_by_id(
+            cid=conversation_id, load_content=load_content
+        )
         if not conv and create_if_not_exists:
             # 如果对话不存在且需要创建，则新建一个对话
             conversation_id = await self.new_conversation(unified_msg_origin)
-            conv = await self.db.get_conversation_by_id(cid=conversation_id)
+            conv = await self.db.get_conversation_by_id(
+                cid=conversation_id, load_content=load_content
+            )
         conv_res = None
         if conv:
             conv_res = self._convert_conv_from_v2_to_v1(conv)
+            history = conv.content or []
+            if not load_content:
+                history, offset = await self.db.get_conversation_messages(
+                    conv.conversation_id, last_turns=history_turns
+                )
+                conv_res.history = json.dumps(history)
+                conv_res.history_offset = offset
+            if self.cache_size > 0:
+                entry = _CachedConversation(
+                    conversation=dataclasses.replace(conv_res, history=""),
+                    history=history,
+                    history_turns=history_turns if history_turns > 0 else -1,
+                    flushed=len(history),
+                    history_json=conv_res.history,
+                )
+                await self._cache_put(conv.conversation_id, entry)
         return conv_res
 
     async def get_conversations(
@@ -208,6 +521,7 @@ class ConversationManager:
             conversations (List[Conversation]): 对话对象列表
 
         """
+        await self.flush()
         convs = await self.db.get_conversations(
             user_id=unified_msg_origin,
             platform_id=platform_id,
@@ -237,6 +551,7 @@ class ConversationManager:
             conversations (list[Conversation]): 对话对象列表
 
         """
+        await self.flush()
         convs, cnt = await self.db.get_filtered_conversations(
             page=page,
             page_size=page_size,
@@ -258,27 +573,54 @@ class ConversationManager:
         title: str | None = None,
         persona_id: str | None = None,
         token_usage: int | None = None,
+        history_offset: int = 0,
     ) -> None:
         """更新会话的对话.
 
+        历史记录按条存储, 只有与已保存内容不同的消息会被写入, 通常只是追加本轮新增的消息。
+
         Args:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
             history (List[Dict]): 对话历史记录, 是一个字典列表, 每个字典包含 role 和 content 字段
             token_usage (int | None): token 使用量。None 表示不更新
+            history_offset (int): history 中第一条消息的序号, 即 get_conversation 返回的 history_offset。
+                序号更小的历史记录保持不变
 
         """
         if not conversation_id:
             # 如果没有提供 conversation_id，则获取当前的
             conversation_id = await self.get_curr_conversation_id(unified_msg_origin)
-        if conversation_id:
+        if not conversation_id:
+            return
+        entry = self._cache.get(conversation_id)
+        if entry and history is not None:
+            if history_offset == entry.conversation.history_offset:
+                await self._update_cached_history(
+                    conversation_id, entry, history, token_usage
+                )
+                history = token_usage = None
+            else:
+                await self._evict(conversation_id)
+                entry = None
+        if title is not None or persona_id is not None or token_usage is not None:
             await self.db.update_conversation(
                 cid=conversation_id,
                 title=title,
                 persona_id=persona_id,
-                content=history,
                 token_usage=token_usage,
             )
+        if history is not None:
+            await self.db.save_conversation_messages(
+                conversation_id, history, start_seq=history_offset
+            )
+        if entry:
+            if title is not None:
+                entry.conversation.title = title
+            if persona_id is not None:
+                entry.conversation.persona_id = persona_id
+            if token_usage is not None:
+                entry.conversation.token_usage = token_usage
 
     async def update_conversation_title(
         self,
@@ -340,10 +682,11 @@ class ConversationManager:
         Raises:
             Exception: If the conversation with the given ID is not found
         """
-        conv = await self.db.get_conversation_by_id(cid=cid)
-        if not conv:
+        entry = self._cache.get(cid)
+        if not entry and not await self.db.get_conversation_by_id(
+            cid=cid, load_content=False
+        ):
             raise Exception(f"Conversation with id {cid} not found")
-        history = conv.content or []
         if isinstance(user_message, UserMessageSegment):
             user_msg_dict = user_message.model_dump()
         else:
@@ -352,12 +695,14 @@ class ConversationManager:
             assistant_msg_dict = assistant_message.model_dump()
         else:
             assistant_msg_dict = assistant_message
-        history.append(user_msg_dict)
-        history.append(assistant_msg_dict)
-        await self.db.update_conversation(
-            cid=cid,
-            content=history,
-        )
+        if entry:
+            await self._update_cached_history(
+                cid, entry, [*entry.history, user_msg_dict, assistant_msg_dict], None
+            )
+        else:
+            await self.db.append_conversation_messages(
+                cid, [user_msg_dict, assistant_msg_dict]
+            )
 
     async def get_human_readable_context(
         self,
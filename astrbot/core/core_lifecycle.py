@@ -24,6 +24,7 @@ from astrbot.core.conversation_mgr import ConversationManager
 from astrbot.core.db import BaseDatabase
 from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
 from astrbot.core.persona_mgr import PersonaManager
+from astrbot.core.pipeline.metrics import pipeline_metrics
 from astrbot.core.pipeline.scheduler import PipelineContext, PipelineScheduler
 from astrbot.core.platform.manager import PlatformManager
 from astrbot.core.platform_message_history_mgr import PlatformMessageHistoryManager
@@ -33,11 +34,13 @@ from astrbot.core.star.context import Context
 from astrbot.core.star.star_handler import EventType, star_handlers_registry, star_map
 from astrbot.core.umop_config_router import UmopConfigRouter
 from astrbot.core.updator import AstrBotUpdator
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.utils.llm_metadata import update_llm_metadata
 from astrbot.core.utils.migra_helper import migra
 
 from . import astrbot_config, html_renderer
 from .event_bus import EventBus
+from .event_scheduler import EventScheduler
 
 
 class AstrBotCoreLifecycle:
@@ -72,6 +75,12 @@ class AstrBotCoreLifecycle:
                 del os.environ["no_proxy"]
             logger.debug("HTTP proxy cleared")
 
+        # 共享 HTTP 连接池
+        http_client.configure(
+            limit=self.astrbot_config.get("http_pool_limit", 100),
+            limit_per_host=self.astrbot_config.get("http_pool_limit_per_host", 10),
+        )
+
     async def initialize(self) -> None:
         """初始化 AstrBot 核心生命周期管理类.
 
@@ -85,6 +94,7 @@ class AstrBotCoreLifecycle:
             logger.setLevel(self.astrbot_config["log_level"])  # 设置日志级别
 
         await self.db.initialize()
+        await sp.warm_up()
 
         await html_renderer.initialize()
 
@@ -129,13 +139,22 @@ class AstrBotCoreLifecycle:
         self.platform_manager = PlatformManager(self.astrbot_config, self.event_queue)
 
         # 初始化对话管理器
-        self.conversation_manager = ConversationManager(self.db)
+        self.conversation_manager = ConversationManager(
+            self.db,
+            cache_size=self.astrbot_config.get("conversation_cache_size", 256),
+            save_interval=self.astrbot_config.get("conversation_flush_interval", 60),
+        )
+        await self.conversation_manager.initialize()
 
         # 初始化平台消息历史管理器
         self.platform_message_history_manager = PlatformMessageHistoryManager(self.db)
 
         # 初始化知识库管理器
-        self.kb_manager = KnowledgeBaseManager(self.provider_manager)
+        self.kb_manager = KnowledgeBaseManager(
+            self.provider_manager,
+            faiss_workers=self.astrbot_config.get("kb_faiss_workers", 0),
+            cross_kb_dedup=self.astrbot_config.get("kb_cross_kb_dedup", False),
+        )
 
         # 初始化提供给插件的上下文
         self.star_context = Context(
@@ -169,10 +188,27 @@ class AstrBotCoreLifecycle:
         self.astrbot_updator = AstrBotUpdator()
 
         # 初始化事件总线
+        max_concurrency = self.astrbot_config.get("event_bus_max_concurrency", 32)
         self.event_bus = EventBus(
             self.event_queue,
             self.pipeline_scheduler_mapping,
             self.astrbot_config_mgr,
+            event_scheduler=EventScheduler(
+                max_concurrency=max_concurrency,
+                max_pending=self.astrbot_config.get("event_bus_max_pending", 1000),
+                overflow_policy=self.astrbot_config.get(
+                    "event_bus_overflow_policy", "drop_oldest"
+                ),
+                session_serial=self.astrbot_config.get(
+                    "event_bus_session_serial", True
+                ),
+            )
+            if max_concurrency > 0
+            else None,
+        )
+
+        pipeline_metrics.enabled = self.astrbot_config.get(
+            "pipeline_metrics_enable", False
         )
 
         # 记录启动时间
@@ -271,6 +307,10 @@ class AstrBotCoreLifecycle:
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
+        await self.conversation_manager.terminate()
+        # 等待同步接口在后台发起的偏好设置写入完成
+        await sp.flush()
+        await http_client.close()
         self.dashboard_shutdown_event.set()
 
         # 再次遍历curr_tasks等待每个任务真正结束
@@ -287,6 +327,10 @@ class AstrBotCoreLifecycle:
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
+        await self.conversation_manager.terminate()
+        # 等待同步接口在后台发起的偏好设置写入完成
+        await sp.flush()
+        await http_client.close()
         self.dashboard_shutdown_event.set()
         threading.Thread(
             target=self.astrbot_updator._reboot,
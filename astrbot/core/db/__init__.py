@@ -105,8 +105,16 @@ class BaseDatabase(abc.ABC):
         ...
 
     @abc.abstractmethod
-    async def get_conversation_by_id(self, cid: str) -> ConversationV2:
-        """Get a specific conversation by its ID."""
+    async def get_conversation_by_id(
+        self,
+        cid: str,
+        load_content: bool = True,
+    ) -> ConversationV2:
+        """Get a specific conversation by its ID.
+
+        When `load_content` is False, `content` of the result is an empty list and
+        the history should be fetched with `get_conversation_messages`.
+        """
         ...
 
     @abc.abstractmethod
@@ -157,6 +165,53 @@ class BaseDatabase(abc.ABC):
         """Update a conversation's history."""
         ...
 
+    @abc.abstractmethod
+    async def get_conversation_messages(
+        self,
+        cid: str,
+        last_turns: int = -1,
+    ) -> tuple[list[dict], int]:
+        """Get the history of a conversation.
+
+        Args:
+            cid: Conversation ID.
+            last_turns: Only load messages starting from the N-th last user message. -1 loads all.
+
+        Returns:
+            A tuple of (messages, seq of the first returned message).
+        """
+        ...
+
+    @abc.abstractmethod
+    async def save_conversation_messages(
+        self,
+        cid: str,
+        messages: list[dict],
+        start_seq: int = 0,
+    ) -> int:
+        """Replace the history from `start_seq` onwards with `messages`.
+
+        Only messages that differ from the stored ones are written, so saving a
+        history that merely grew by a few messages appends just those messages.
+        When the leading messages were dropped or the history was rewritten, the
+        messages before `start_seq` are deleted as well, so the stored history
+        always ends with exactly `messages`.
+
+        Returns:
+            The seq of the first message, which is larger than `start_seq` when
+            leading stored messages were dropped.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def append_conversation_messages(
+        self,
+        cid: str,
+        messages: list[dict],
+    ) -> None:
+        """Append messages to the end of a conversation's history."""
+        ...
+
     @abc.abstractmethod
     async def delete_conversation(self, cid: str) -> None:
         """Delete a conversation by its ID."""
@@ -68,6 +68,39 @@ class ConversationV2(SQLModel, table=True):
     )
 
 
+class ConversationMessage(SQLModel, table=True):
+    """A single OpenAI-formatted message of a conversation, stored append-only.
+
+    A conversation whose `ConversationV2.content` is NULL keeps its history here,
+    ordered by `seq`. Legacy conversations still keep the whole history in `content`
+    and are moved to this table the first time their history is written.
+    `digest` is a hash of the payload, used to find the unchanged prefix when
+    the full history is saved again.
+    """
+
+    __tablename__: str = "conversation_messages"
+
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+    )
+    conversation_id: str = Field(max_length=36, nullable=False, index=True)
+    seq: int = Field(nullable=False)
+    role: str = Field(nullable=False)
+    payload: dict = Field(sa_type=JSON, nullable=False)
+    digest: str = Field(max_length=40, nullable=False)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "conversation_id",
+            "seq",
+            name="uix_conversation_message_seq",
+        ),
+    )
+
+
 class Persona(SQLModel, table=True):
     """Persona is a set of instructions for LLMs to follow.
 
@@ -320,6 +353,8 @@ class Conversation:
     updated_at: int = 0
     token_usage: int = 0
     """对话的总 token 数量。AstrBot 会保留最近一次 LLM 请求返回的总 token 数，方便统计。token_usage 可能为 0，表示未知。"""
+    history_offset: int = 0
+    """history 中第一条消息在对话中的序号。只加载了最近若干轮对话时不为 0, 保存时需要原样传回。"""
 
 
 class Personality(TypedDict):
@@ -1,4 +1,6 @@
 import asyncio
+import hashlib
+import json
 import threading
 import typing as T
 from collections.abc import Awaitable, Callable
@@ -6,6 +8,8 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import CursorResult
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import col, delete, desc, func, or_, select, text, update
 
 from astrbot.core.db import BaseDatabase
@@ -13,6 +17,7 @@ from astrbot.core.db.po import (
     Attachment,
     CommandConfig,
     CommandConflict,
+    ConversationMessage,
     ConversationV2,
     Persona,
     PlatformMessageHistory,
@@ -133,15 +138,25 @@ class SQLiteDatabase(BaseDatabase):
             # order by
             query = query.order_by(desc(ConversationV2.created_at))
             result = await session.execute(query)
+            conversations = result.scalars().all()
+            await self._fill_conversation_contents(session, conversations)
+            return conversations
 
-            return result.scalars().all()
-
-    async def get_conversation_by_id(self, cid):
+    async def get_conversation_by_id(self, cid, load_content=True):
         async with self.get_db() as session:
             session: AsyncSession
             query = select(ConversationV2).where(ConversationV2.conversation_id == cid)
+            if not load_content:
+                query = query.options(defer(ConversationV2.content))
             result = await session.execute(query)
-            return result.scalar_one_or_none()
+            conversation = result.scalar_one_or_none()
+            if conversation is None:
+                return None
+            if load_content:
+                await self._fill_conversation_contents(session, [conversation])
+            else:
+                set_committed_value(conversation, "content", [])
+            return conversation
 
     async def get_all_conversations(self, page=1, page_size=20):
         async with self.get_db() as session:
@@ -153,7 +168,9 @@ class SQLiteDatabase(BaseDatabase):
                 .offset(offset)
                 .limit(page_size),
             )
-            return result.scalars().all()
+            conversations = result.scalars().all()
+            await self._fill_conversation_contents(session, conversations)
+            return conversations
 
     async def get_filtered_conversations(
         self,
@@ -178,6 +195,13 @@ class SQLiteDatabase(BaseDatabase):
                     or_(
                         col(ConversationV2.title).ilike(f"%{search_query}%"),
                         col(ConversationV2.content).ilike(f"%{search_query}%"),
+                        col(ConversationV2.conversation_id).in_(
+                            select(ConversationMessage.conversation_id).where(
+                                col(ConversationMessage.payload).ilike(
+                                    f"%{search_query}%"
+                                ),
+                            ),
+                        ),
                         col(ConversationV2.user_id).ilike(f"%{search_query}%"),
                         col(ConversationV2.conversation_id).ilike(f"%{search_query}%"),
                     ),
@@ -206,6 +230,7 @@ class SQLiteDatabase(BaseDatabase):
             )
             result = await session.execute(result_query)
             conversations = result.scalars().all()
+            await self._fill_conversation_contents(session, conversations)
 
             return conversations, total
 
@@ -232,14 +257,20 @@ class SQLiteDatabase(BaseDatabase):
             async with session.begin():
                 new_conversation = ConversationV2(
                     user_id=user_id,
-                    content=content or [],
+                    content=None,
                     platform_id=platform_id,
                     title=title,
                     persona_id=persona_id,
                     **kwargs,
                 )
                 session.add(new_conversation)
-                return new_conversation
+                session.add_all(
+                    self._new_conversation_messages(
+                        new_conversation.conversation_id, content or [], 0
+                    ),
+                )
+            set_committed_value(new_conversation, "content", content or [])
+            return new_conversation
 
     async def update_conversation(
         self, cid, title=None, persona_id=None, content=None, token_usage=None
@@ -255,20 +286,266 @@ class SQLiteDatabase(BaseDatabase):
                     values["title"] = title
                 if persona_id is not None:
                     values["persona_id"] = persona_id
-                if content is not None:
-                    values["content"] = content
                 if token_usage is not None:
                     values["token_usage"] = token_usage
-                if not values:
+                if content is not None:
+                    await self._save_conversation_messages(session, cid, content, 0)
+                elif not values:
                     return None
-                query = query.values(**values)
-                await session.execute(query)
+                if values:
+                    query = query.values(**values)
+                    await session.execute(query)
         return await self.get_conversation_by_id(cid)
 
+    async def get_conversation_messages(self, cid, last_turns=-1):
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(
+                    ConversationV2.inner_conversation_id, ConversationV2.content
+                ).where(col(ConversationV2.conversation_id) == cid),
+            )
+            row = result.first()
+            if row is None:
+                return [], 0
+            if row.content is not None:
+                # 尚未迁移的旧对话, 历史记录仍在 content 列中
+                start = 0
+                if last_turns > 0:
+                    user_indexes = [
+                        i for i, m in enumerate(row.content) if m.get("role") == "user"
+                    ]
+                    if len(user_indexes) >= last_turns:
+                        start = user_indexes[-last_turns]
+                return row.content[start:], start
+
+            start_seq = 0
+            if last_turns > 0:
+                result = await session.execute(
+                    select(ConversationMessage.seq)
+                    .where(
+                        col(ConversationMessage.conversation_id) == cid,
+                        col(ConversationMessage.role) == "user",
+                    )
+                    .order_by(desc(ConversationMessage.seq))
+                    .offset(last_turns - 1)
+                    .limit(1),
+                )
+                start_seq = result.scalar_one_or_none() or 0
+            result = await session.execute(
+                select(ConversationMessage.seq, ConversationMessage.payload)
+                .where(
+                    col(ConversationMessage.conversation_id) == cid,
+                    col(ConversationMessage.seq) >= start_seq,
+                )
+                .order_by(col(ConversationMessage.seq)),
+            )
+            rows = result.all()
+            if not rows:
+                return [], start_seq
+            return [r.payload for r in rows], rows[0].seq
+
+    async def save_conversation_messages(self, cid, messages, start_seq=0):
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                return await self._save_conversation_messages(
+                    session, cid, messages, start_seq
+                )
+
+    async def append_conversation_messages(self, cid, messages):
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await self._save_conversation_messages(session, cid, messages, None)
+
+    @staticmethod
+    def _message_digest(message: dict) -> str:
+        return hashlib.sha1(
+            json.dumps(message, sort_keys=True, ensure_ascii=False, default=str).encode(
+                "utf-8"
+            ),
+        ).hexdigest()
+
+    def _new_conversation_messages(
+        self,
+        cid: str,
+        messages: list[dict],
+        start_seq: int,
+        digests: list[str] | None = None,
+    ) -> list[ConversationMessage]:
+        return [
+            ConversationMessage(
+                conversation_id=cid,
+                seq=start_seq + i,
+                role=message.get("role", ""),
+                payload=message,
+                digest=digests[i] if digests else self._message_digest(message),
+            )
+            for i, message in enumerate(messages)
+        ]
+
+    @staticmethod
+    def _dropped_head(stored: list, digests: list[str]) -> int:
+        """已有记录开头被丢弃的条数 (如按轮次截断)
+
+        优先取使其余已有记录恰好都是 messages 开头的最小条数, 即只截断开头并追加新消息
+        的情形; 逐条比较而不是只找第一条相同的消息, 重复的消息 (如两轮相同的问候) 不会
+        对应到错误的记录。否则 messages 改写了已有记录, 取第一条相同消息的位置。
+        """
+        if not digests:
+            return 0
+        first = len(stored)
+        for i, row in enumerate(stored):
+            if row.digest != digests[0]:
+                continue
+            first = min(first, i)
+            rest = len(stored) - i
+            if rest <= len(digests) and all(
+                stored[i + j].digest == digests[j] for j in range(rest)
+            ):
+                return i
+        return first
+
+    async def _save_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        messages: list[dict],
+        start_seq: int | None,
+    ) -> int:
+        """将 seq >= start_seq 的历史记录替换为 messages, start_seq 为 None 时追加到末尾。
+
+        先比较消息摘要, 保留与 messages 开头一致的已有记录 (允许开头若干条已被截断丢弃),
+        只删除其后不一致的记录并写入新增的消息。返回 messages 中第一条消息的 seq。
+        """
+        result = await session.execute(
+            select(ConversationV2.inner_conversation_id, ConversationV2.content).where(
+                col(ConversationV2.conversation_id) == cid,
+            ),
+        )
+        row = result.first()
+        if row is None:
+            return start_seq or 0
+        now = datetime.now(timezone.utc)
+        if row.content is not None:
+            # 旧对话: 将 content 列中的历史记录迁移到 conversation_messages 表
+            legacy = row.content
+            if start_seq is None:
+                start_seq = len(legacy)
+            if start_seq < len(legacy) and messages[:1] != [legacy[start_seq]]:
+                # 开头的消息被截断或整体被改写, 更早的记录也一并丢弃
+                session.add_all(
+                    self._new_conversation_messages(cid, messages, start_seq),
+                )
+            else:
+                session.add_all(
+                    self._new_conversation_messages(
+                        cid, legacy[:start_seq] + messages, 0
+                    ),
+                )
+            await session.execute(
+                update(ConversationV2)
+                .where(col(ConversationV2.conversation_id) == cid)
+                .values(content=None, updated_at=now),
+            )
+            return start_seq
+
+        if start_seq is None:
+            result = await session.execute(
+                select(func.max(ConversationMessage.seq)).where(
+                    col(ConversationMessage.conversation_id) == cid,
+                ),
+            )
+            last_seq = result.scalar_one_or_none()
+            start_seq = 0 if last_seq is None else last_seq + 1
+            stored = []
+        else:
+            result = await session.execute(
+                select(ConversationMessage.seq, ConversationMessage.digest)
+                .where(
+                    col(ConversationMessage.conversation_id) == cid,
+                    col(ConversationMessage.seq) >= start_seq,
+                )
+                .order_by(col(ConversationMessage.seq)),
+            )
+            stored = result.all()
+
+        digests = [self._message_digest(m) for m in messages]
+        head = self._dropped_head(stored, digests)
+        kept = 0
+        while (
+            head + kept < len(stored)
+            and kept < len(digests)
+            and stored[head + kept].digest == digests[kept]
+        ):
+            kept += 1
+
+        if kept:
+            first_seq, last_seq = stored[head].seq, stored[head + kept - 1].seq
+            stale = or_(
+                col(ConversationMessage.seq) < first_seq,
+                col(ConversationMessage.seq) > last_seq,
+            )
+            next_seq = last_seq + 1
+        else:
+            stale = None
+            next_seq = start_seq
+        if kept < len(stored):
+            query = delete(ConversationMessage).where(
+                col(ConversationMessage.conversation_id) == cid,
+            )
+            # 开头的消息被截断或整体被改写时, 与原先整体覆盖 content 列一样,
+            # start_seq 之前未加载的更早记录也一并删除, 否则它们会夹在保留的记录之前
+            if kept and not head:
+                query = query.where(col(ConversationMessage.seq) >= start_seq)
+            if stale is not None:
+                query = query.where(stale)
+            await session.execute(query)
+        session.add_all(
+            self._new_conversation_messages(
+                cid, messages[kept:], next_seq, digests[kept:]
+            ),
+        )
+        await session.execute(
+            update(ConversationV2)
+            .where(col(ConversationV2.conversation_id) == cid)
+            .values(updated_at=now),
+        )
+        return stored[head].seq if kept else next_seq
+
+    async def _fill_conversation_contents(
+        self,
+        session: AsyncSession,
+        conversations: T.Sequence[ConversationV2],
+    ) -> None:
+        """为历史记录已迁移到 conversation_messages 表的对话填充 content 字段"""
+        pending = {c.conversation_id: c for c in conversations if c.content is None}
+        cids = list(pending)
+        contents: dict[str, list[dict]] = {cid: [] for cid in cids}
+        for i in range(0, len(cids), 500):
+            result = await session.execute(
+                select(ConversationMessage.conversation_id, ConversationMessage.payload)
+                .where(col(ConversationMessage.conversation_id).in_(cids[i : i + 500]))
+                .order_by(
+                    col(ConversationMessage.conversation_id),
+                    col(ConversationMessage.seq),
+                ),
+            )
+            for cid, payload in result.all():
+                contents[cid].append(payload)
+        for cid, conversation in pending.items():
+            set_committed_value(conversation, "content", contents[cid])
+
     async def delete_conversation(self, cid):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id) == cid,
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.conversation_id) == cid,
@@ -279,6 +556,15 @@ class SQLiteDatabase(BaseDatabase):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id).in_(
+                            select(ConversationV2.conversation_id).where(
+                                col(ConversationV2.user_id) == user_id
+                            ),
+                        ),
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.user_id) == user_id
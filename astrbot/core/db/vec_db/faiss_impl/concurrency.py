@@ -0,0 +1,112 @@
+"""FAISS 操作的线程池和读写锁
+
+FAISS 的检索、插入、删除都是 CPU 密集型操作, 且执行期间会释放 GIL。所有
+FaissVecDB 实例共享一个专用线程池, 避免大知识库的检索阻塞事件循环, 同时不与
+asyncio.to_thread 使用的默认线程池争抢线程。
+"""
+
+import asyncio
+import functools
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import TypeVar
+
+from astrbot import logger
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_max_workers = DEFAULT_MAX_WORKERS
+_executor: ThreadPoolExecutor | None = None
+
+
+def set_max_workers(max_workers: int):
+    """设置线程池大小, 对之后创建的线程池生效"""
+    global _max_workers
+    if max_workers <= 0:
+        max_workers = DEFAULT_MAX_WORKERS
+    if max_workers == _max_workers:
+        return
+    _max_workers = max_workers
+    if _executor is not None:
+        # 已提交的任务会在旧线程池中执行完毕
+        shutdown(wait=False)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_max_workers,
+            thread_name_prefix="faiss",
+        )
+        logger.debug(f"FAISS 线程池已创建, 线程数: {_max_workers}")
+    return _executor
+
+
+def shutdown(wait: bool = True):
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+
+async def run_in_executor(func: Callable[..., T], *args) -> T:
+    """在 FAISS 线程池中执行函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args))
+
+
+class AsyncRWLock:
+    """写优先的异步读写锁
+
+    多个读者可以同时持有锁; 写者独占。有写者等待时新的读者会排队, 避免写者饥饿。
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @property
+    def locked(self) -> bool:
+        return self._writer or self._readers > 0
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writer and not self._writers_waiting,
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._cond:
+            self._writers_waiting += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writer and not self._readers,
+                )
+            finally:
+                self._writers_waiting -= 1
+                # 等待被取消时唤醒被阻塞的读者
+                self._cond.notify_all()
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writer = False
+                self._cond.notify_all()
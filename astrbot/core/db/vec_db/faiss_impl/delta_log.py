@@ -0,0 +1,118 @@
+"""FAISS 索引的追加写增量日志
+
+每次插入/删除只向日志追加一条记录, 而不是重写整个索引文件。索引文件会在后台
+定期合并 (compaction) 时整体写入, 随后清空日志; 加载时重放日志即可恢复崩溃前
+尚未合并的修改。每条记录默认在 fsync 之后才返回, 断电也不会丢失已确认的修改。
+
+记录格式 (小端):
+    op (1 字节, b"A" 插入 / b"D" 删除) | count (uint32) | crc32 (uint32) | payload
+    插入 payload: ids (int64 × count) + vectors (float32 × count × dim)
+    删除 payload: ids (int64 × count)
+"""
+
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+
+import numpy as np
+
+from astrbot import logger
+
+OP_ADD = b"A"
+OP_DELETE = b"D"
+_HEADER = struct.Struct("<cII")
+
+
+class DeltaLog:
+    def __init__(self, path: str, dimension: int, fsync: bool = True):
+        """
+        Args:
+            fsync: 每条记录写入后是否 fsync。关闭后进程崩溃不会丢失修改,
+                但断电可能丢失最近已返回成功的修改。
+
+        """
+        self.path = path
+        self.dimension = dimension
+        self.fsync = fsync
+        self._file = None
+
+    @property
+    def size(self) -> int:
+        """日志文件的字节数"""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def append_add(self, vectors: np.ndarray, ids: np.ndarray):
+        payload = (
+            np.ascontiguousarray(ids, dtype="<i8").tobytes()
+            + np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+        )
+        self._append(OP_ADD, len(ids), payload)
+
+    def append_delete(self, ids: np.ndarray):
+        payload = np.ascontiguousarray(ids, dtype="<i8").tobytes()
+        self._append(OP_DELETE, len(ids), payload)
+
+    def _append(self, op: bytes, count: int, payload: bytes):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(_HEADER.pack(op, count, zlib.crc32(payload)) + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def replay(self) -> Iterator[tuple[bytes, np.ndarray, np.ndarray | None]]:
+        """按顺序读取日志中的记录
+
+        遇到不完整或校验失败的记录 (通常是崩溃时写了一半) 时停止读取。
+
+        Yields:
+            (op, ids, vectors): 删除记录的 vectors 为 None
+
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if not header:
+                    return
+                if len(header) < _HEADER.size:
+                    logger.warning(f"向量索引日志 {self.path} 末尾记录不完整, 已忽略")
+                    return
+                op, count, crc = _HEADER.unpack(header)
+                if op == OP_ADD:
+                    size = count * 8 + count * self.dimension * 4
+                elif op == OP_DELETE:
+                    size = count * 8
+                else:
+                    logger.warning(f"向量索引日志 {self.path} 存在未知记录, 已停止重放")
+                    return
+                payload = f.read(size)
+                if len(payload) < size or zlib.crc32(payload) != crc:
+                    logger.warning(f"向量索引日志 {self.path} 末尾记录损坏, 已忽略")
+                    return
+                ids = np.frombuffer(payload, dtype="<i8", count=count).astype(np.int64)
+                if op == OP_DELETE:
+                    yield op, ids, None
+                    continue
+                vectors = (
+                    np.frombuffer(payload, dtype="<f4", offset=count * 8)
+                    .astype(np.float32)
+                    .reshape(count, self.dimension)
+                )
+                yield op, ids, vectors
+
+    def truncate(self):
+        """清空日志 (在索引文件完整写入之后调用)"""
+        self.close()
+        with open(self.path, "wb"):
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -228,6 +228,51 @@ class DocumentStorage:
             if document:
                 await session.delete(document)
 
+    async def delete_documents_by_doc_ids(self, doc_ids: list[str]) -> list[int]:
+        """Delete documents by their doc_ids in one transaction.
+
+        Args:
+            doc_ids (list[str]): The doc_ids of the documents to delete.
+
+        Returns:
+            list[int]: The integer IDs of the deleted documents.
+
+        """
+        assert self.engine is not None, "Database connection is not initialized."
+
+        deleted: list[int] = []
+        async with self.get_session() as session, session.begin():
+            for start in range(0, len(doc_ids), 500):
+                query = select(Document).where(
+                    col(Document.doc_id).in_(doc_ids[start : start + 500]),
+                )
+                result = await session.execute(query)
+                for document in result.scalars().all():
+                    deleted.append(document.id)  # type: ignore
+                    await session.delete(document)
+        return deleted
+
+    async def update_metadata_batch(self, metadatas: dict[str, dict]):
+        """Replace the metadata of several documents.
+
+        Args:
+            metadatas (dict[str, dict]): Mapping from doc_id to the new metadata.
+
+        """
+        assert self.engine is not None, "Database connection is not initialized."
+
+        doc_ids = list(metadatas)
+        async with self.get_session() as session, session.begin():
+            for start in range(0, len(doc_ids), 500):
+                query = select(Document).where(
+                    col(Document.doc_id).in_(doc_ids[start : start + 500]),
+                )
+                result = await session.execute(query)
+                for document in result.scalars().all():
+                    document.metadata_ = json.dumps(metadatas[document.doc_id])
+                    document.updated_at = datetime.now()
+                    session.add(document)
+
     async def get_document_by_doc_id(self, doc_id: str):
         """Retrieve a document by its doc_id.
 
@@ -4,21 +4,316 @@ except ModuleNotFoundError:
     raise ImportError(
         "faiss 未安装。请使用 'pip install faiss-cpu' 或 'pip install faiss-gpu' 安装。",
     )
+import asyncio
+import math
 import os
+import time
 
 import numpy as np
 
+from astrbot import logger
+
+from .concurrency import AsyncRWLock, run_in_executor
+from .delta_log import OP_ADD, OP_DELETE, DeltaLog
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+"""支持的索引类型
+
+- flat: 暴力检索, 结果精确, 内存为 4 字节 × 维度 × 向量数
+- hnsw: 图索引, 检索快、召回高, 内存略高于 flat, 删除的向量先标记为墓碑, 积累到一定比例后在后台重建
+- ivf_flat: 倒排索引, 检索时只扫描 nprobe 个聚类
+- ivf_pq: 倒排 + 乘积量化, 内存约为 flat 的 1/16 ~ 1/64, 召回有损
+"""
+DEFAULT_TRAIN_THRESHOLD = 10000
+"""向量数达到该阈值后, 才会从 flat 索引迁移到配置的近似索引类型"""
+HNSW_M = 32
+HNSW_EF_SEARCH = 128
+DEFAULT_COMPACT_INTERVAL = 60.0
+"""增量日志合并到索引文件的间隔 (秒)"""
+DEFAULT_COMPACT_LOG_BYTES = 64 * 1024 * 1024
+"""增量日志超过该大小时立即合并"""
+DEFAULT_TOMBSTONE_RATIO = 0.1
+"""HNSW 索引中墓碑 (已删除但仍在图中的向量) 的占比超过该值时, 在后台重建索引"""
+
+
+def _ivf_nlist(n: int) -> int:
+    # 每个聚类至少需要约 39 个训练样本
+    return max(1, min(int(4 * math.sqrt(n)), n // 39, 65536))
+
+
+def _pq_nbits(n: int) -> int:
+    # 每个子量化器的 2^nbits 个中心同样需要足够的训练样本
+    return max(1, min(8, int(math.log2(max(n // 39, 2)))))
+
+
+def _pq_m(dimension: int) -> int:
+    for m in (64, 48, 32, 16, 8, 4, 2):
+        if dimension % m == 0 and dimension // m >= 4:
+            return m
+    return 1
+
+
+def detect_index_type(index) -> str:
+    """根据 FAISS 索引对象推断索引类型"""
+    if isinstance(index, faiss.IndexIDMap):
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            return "hnsw"
+        return "flat"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return "flat"
+    if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ):
+        return "ivf_pq"
+    return "ivf_flat"
+
+
+def build_index(
+    index_type: str,
+    dimension: int,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+):
+    """构建指定类型的索引, 需要训练的索引会使用 vectors 训练, 然后写入全部向量"""
+    n = len(vectors)
+    if index_type == "flat":
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+    elif index_type == "hnsw":
+        index = faiss.index_factory(dimension, f"IDMap,HNSW{HNSW_M}")
+    elif index_type == "ivf_flat":
+        index = faiss.index_factory(dimension, f"IVF{_ivf_nlist(n)},Flat")
+    elif index_type == "ivf_pq":
+        index = faiss.index_factory(
+            dimension,
+            f"IVF{_ivf_nlist(n)},PQ{_pq_m(dimension)}x{_pq_nbits(n)}",
+        )
+    else:
+        raise ValueError(f"不支持的索引类型: {index_type}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    _tune_index(index)
+    if n:
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def export_ids(index) -> np.ndarray:
+    """导出索引中的全部向量 ID"""
+    if index.ntotal == 0:
+        return np.empty(0, dtype=np.int64)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map).astype(np.int64)
+
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    id_lists = []
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if size:
+            id_lists.append(
+                faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy(),
+            )
+    return np.concatenate(id_lists).astype(np.int64)
+
+
+def export_vectors(index) -> tuple[np.ndarray, np.ndarray]:
+    """导出索引中的全部向量和 ID, 用于在索引类型之间迁移而无需重新嵌入
+
+    ivf_pq 索引只能导出量化后的近似向量。
+    """
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32), np.empty(0, dtype=np.int64)
+    ids = export_ids(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return index.index.reconstruct_n(0, index.ntotal), ids
+
+    ivf = faiss.extract_index_ivf(index)
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    try:
+        vectors = ivf.reconstruct_batch(ids)
+    finally:
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    return vectors, ids
+
+
+def reconstruct_vectors(index, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """按 ID 取出索引中的向量, 返回 (向量, 找到的 ID), 不存在的 ID 会被忽略
+
+    ivf_pq 索引只能取出量化后的近似向量。
+    """
+    empty = np.empty((0, index.d), dtype=np.float32), np.empty(0, dtype=np.int64)
+    if index.ntotal == 0 or not len(ids):
+        return empty
+    if isinstance(index, faiss.IndexIDMap):
+        id_map = faiss.vector_to_array(index.id_map).astype(np.int64)
+        positions = np.nonzero(np.isin(id_map, ids))[0]
+        if not len(positions):
+            return empty
+        vectors = np.vstack([index.index.reconstruct(int(pos)) for pos in positions])
+        return vectors, id_map[positions]
+
+    found = np.unique(ids)
+    found = found[np.isin(found, export_ids(index))]
+    if not len(found):
+        return empty
+    ivf = faiss.extract_index_ivf(index)
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    try:
+        vectors = ivf.reconstruct_batch(found)
+    finally:
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    return vectors, found
+
+
+def copy_new_vectors(source, target, known_ids: np.ndarray):
+    """将 source 中不在 known_ids 里的向量 (即导出之后新插入的向量) 写入 target"""
+    current = export_ids(source)
+    new_ids = current[~np.isin(current, known_ids)]
+    if len(new_ids):
+        vectors, found = reconstruct_vectors(source, new_ids)
+        target.add_with_ids(vectors, found)
+
+
+def read_tombstones(path: str) -> set[int]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb") as f:
+        return set(np.load(f).tolist())
+
+
+def write_tombstones(path: str, ids: set[int]):
+    if not ids:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.fromiter(ids, dtype=np.int64, count=len(ids)))
+    os.replace(tmp_path, path)
+
+
+def _tune_index(index):
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(ivf.nlist, max(8, ivf.nlist // 16))
+    elif isinstance(index, faiss.IndexIDMap):
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = HNSW_EF_SEARCH
+
 
 class EmbeddingStorage:
-    def __init__(self, dimension: int, path: str | None = None):
+    def __init__(
+        self,
+        dimension: int,
+        path: str | None = None,
+        index_type: str = "flat",
+        train_threshold: int = DEFAULT_TRAIN_THRESHOLD,
+        write_behind: bool = True,
+        compact_interval: float = DEFAULT_COMPACT_INTERVAL,
+        compact_log_bytes: int = DEFAULT_COMPACT_LOG_BYTES,
+        tombstone_ratio: float = DEFAULT_TOMBSTONE_RATIO,
+    ):
+        """
+        Args:
+            write_behind: 为 True 时插入/删除只追加到增量日志 (`{path}.log`),
+                由后台定期或在日志过大时将完整索引写入 path; 为 False 时每次修改
+                都重写整个索引文件。
+            tombstone_ratio: HNSW 索引不支持删除, 删除的向量记为墓碑 (保存在
+                `{path}.deleted`), 检索时过滤; 墓碑占比超过该值时在后台重建索引。
+
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}")
         self.dimension = dimension
         self.path = path
+        self.index_type = index_type
+        """配置的目标索引类型, 向量数未达到 train_threshold 时仍使用 flat"""
+        self.train_threshold = train_threshold
+        self.compact_interval = compact_interval
+        self.compact_log_bytes = compact_log_bytes
+        self.tombstone_ratio = tombstone_ratio
         self.index = None
-        if path and os.path.exists(path):
-            self.index = faiss.read_index(path)
+        self._tombstones: set[int] = set()
+        """HNSW 索引中已删除、但尚未从图中移除的向量 ID"""
+        self._search_params = None
+
+        self._lock = AsyncRWLock()
+        """检索持有读锁可并发执行, 插入/删除/迁移持有写锁"""
+        self._save_lock = asyncio.Lock()
+        self._mutation_seq = 0
+        self._migration_task: asyncio.Task | None = None
+        self._purge_task: asyncio.Task | None = None
+
+        self._log: DeltaLog | None = None
+        self._dirty = False
+        """增量日志中是否有尚未合并到索引文件的修改"""
+        self._compact_now = asyncio.Event()
+        self._compact_task: asyncio.Task | None = None
+        if path and write_behind:
+            self._log = DeltaLog(f"{path}.log", dimension)
+
+    async def initialize(self):
+        """加载索引文件并重放增量日志
+
+        在 FAISS 线程池中执行, 大索引的加载和崩溃恢复不会阻塞事件循环。
+        """
+        if self.index is None:
+            await run_in_executor(self._load)
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            index = faiss.read_index(self.path)
+            _tune_index(index)
         else:
-            base_index = faiss.IndexFlatL2(dimension)
-            self.index = faiss.IndexIDMap(base_index)
+            index = faiss.IndexIDMap(faiss.IndexFlatL2(self.dimension))
+        self.index = index
+        if self.path and detect_index_type(index) == "hnsw":
+            tombstones = read_tombstones(f"{self.path}.deleted")
+            self._mark_deleted(np.fromiter(tombstones, dtype=np.int64))
+        if self._log is not None:
+            self._recover()
+
+    def _recover(self):
+        """重放上次未合并的增量日志 (例如进程崩溃), 并立即合并到索引文件"""
+        assert self.index is not None and self._log is not None
+        existing = set(export_ids(self.index).tolist())
+        replayed = 0
+        for op, ids, vectors in self._log.replay():
+            replayed += 1
+            if op == OP_ADD:
+                # 日志可能已部分合并到索引文件 (合并后、清空日志前崩溃), 跳过已存在的 ID
+                mask = np.fromiter((i not in existing for i in ids.tolist()), bool)
+                if mask.any():
+                    self.index.add_with_ids(vectors[mask], ids[mask])  # type: ignore
+                    existing.update(ids[mask].tolist())
+            else:
+                self._remove(ids)
+                existing.difference_update(ids.tolist())
+        if replayed:
+            logger.info(f"已从增量日志恢复向量索引 {self.path} 的 {replayed} 条修改")
+            self._write_index()
+
+    @property
+    def current_index_type(self) -> str:
+        """当前实际使用的索引类型"""
+        assert self.index is not None, "FAISS index is not initialized."
+        return detect_index_type(self.index)
+
+    @property
+    def ntotal(self) -> int:
+        """索引中有效的向量数 (不含墓碑)"""
+        assert self.index is not None, "FAISS index is not initialized."
+        return self.index.ntotal - len(self._tombstones)
+
+    @property
+    def migrating(self) -> bool:
+        return self._migration_task is not None and not self._migration_task.done()
+
+    @property
+    def purging(self) -> bool:
+        return self._purge_task is not None and not self._purge_task.done()
 
     async def insert(self, vector: np.ndarray, id: int):
         """插入向量
@@ -35,8 +330,13 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vector.shape[0]}",
             )
-        self.index.add_with_ids(vector.reshape(1, -1), np.array([id]))
-        await self.save_index()
+        vectors = vector.reshape(1, -1)
+        ids = np.array([id], dtype=np.int64)
+        async with self._lock.write():
+            await run_in_executor(self.index.add_with_ids, vectors, ids)
+            self._mutation_seq += 1
+            await self._persist(OP_ADD, ids, vectors)
+        self.maybe_migrate()
 
     async def insert_batch(self, vectors: np.ndarray, ids: list[int]):
         """批量插入向量
@@ -53,8 +353,12 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vectors.shape[1]}",
             )
-        self.index.add_with_ids(vectors, np.array(ids))
-        await self.save_index()
+        id_array = np.array(ids, dtype=np.int64)
+        async with self._lock.write():
+            await run_in_executor(self.index.add_with_ids, vectors, id_array)
+            self._mutation_seq += 1
+            await self._persist(OP_ADD, id_array, vectors)
+        self.maybe_migrate()
 
     async def search(self, vector: np.ndarray, k: int) -> tuple:
         """搜索最相似的向量
@@ -67,9 +371,82 @@ class EmbeddingStorage:
 
         """
         assert self.index is not None, "FAISS index is not initialized."
+        async with self._lock.read():
+            return await run_in_executor(
+                self._search,
+                self.index,
+                vector,
+                k,
+                self._get_search_params(),
+            )
+
+    @staticmethod
+    def _search(index, vector: np.ndarray, k: int, params=None) -> tuple:
         faiss.normalize_L2(vector)
-        distances, indices = self.index.search(vector, k)
-        return distances, indices
+        return index.search(vector, k, params=params)
+
+    def _get_search_params(self):
+        """返回过滤墓碑的检索参数, 没有墓碑时返回 None"""
+        if not self._tombstones:
+            return None
+        if self._search_params is None:
+            dead = faiss.IDSelectorBatch(
+                np.fromiter(self._tombstones, dtype=np.int64),
+            )
+            selector = faiss.IDSelectorNot(dead)
+            params = faiss.SearchParametersHNSW(
+                sel=selector,
+                efSearch=HNSW_EF_SEARCH,
+            )
+            # 保持 selector 的引用, 避免被提前回收
+            self._search_params = (params, selector, dead)
+        return self._search_params[0]
+
+    def _mark_deleted(self, ids: np.ndarray):
+        """将 HNSW 索引中存在的 ID 记为墓碑"""
+        id_map = faiss.vector_to_array(self.index.id_map)  # type: ignore
+        self._tombstones.update(ids[np.isin(ids, id_map)].tolist())
+        self._search_params = None
+
+    def _remove(self, ids: np.ndarray):
+        """删除向量, 调用方需持有写锁"""
+        if detect_index_type(self.index) == "hnsw":
+            self._mark_deleted(ids)
+        else:
+            self.index.remove_ids(ids)  # type: ignore
+
+    def _drop_tombstones(
+        self,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if not self._tombstones:
+            return vectors, ids
+        keep = ~np.isin(ids, np.fromiter(self._tombstones, dtype=np.int64))
+        return vectors[keep], ids[keep]
+
+    async def get_vectors(self, ids: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """取出已存储的向量, 用于内容相同的文本块复用向量
+
+        Returns:
+            tuple: (向量, 对应的 ID), 不存在的 ID 会被忽略
+
+        """
+        assert self.index is not None, "FAISS index is not initialized."
+        id_array = np.array(
+            [i for i in ids if i not in self._tombstones],
+            dtype=np.int64,
+        )
+        async with self._lock.read():
+            if isinstance(self.index, faiss.IndexIDMap):
+                return await run_in_executor(
+                    reconstruct_vectors,
+                    self.index,
+                    id_array,
+                )
+        # IVF 索引需要临时建立 ID 映射, 期间不能与检索并发
+        async with self._lock.write():
+            return await run_in_executor(reconstruct_vectors, self.index, id_array)
 
     async def delete(self, ids: list[int]):
         """删除向量
@@ -80,16 +457,247 @@ class EmbeddingStorage:
         """
         assert self.index is not None, "FAISS index is not initialized."
         id_array = np.array(ids, dtype=np.int64)
-        self.index.remove_ids(id_array)
-        await self.save_index()
+        async with self._lock.write():
+            await run_in_executor(self._remove, id_array)
+            self._mutation_seq += 1
+            await self._persist(OP_DELETE, id_array)
+        self.maybe_purge()
 
-    async def save_index(self):
-        """保存索引
+    async def _persist(self, op: bytes, ids: np.ndarray, vectors=None):
+        """持久化一次修改, 调用方需持有写锁"""
+        if self._log is None:
+            await self._save_index_locked()
+            return
+        if op == OP_ADD:
+            await run_in_executor(self._log.append_add, vectors, ids)
+        else:
+            await run_in_executor(self._log.append_delete, ids)
+        self._dirty = True
+        if self._log.size >= self.compact_log_bytes:
+            self._compact_now.set()
+        if self._compact_task is None or self._compact_task.done():
+            self._compact_task = asyncio.create_task(self._compaction_loop())
 
-        Args:
-            path (str): 保存索引的路径
+    async def _compaction_loop(self):
+        while self._dirty:
+            try:
+                await asyncio.wait_for(
+                    self._compact_now.wait(),
+                    timeout=self.compact_interval,
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._compact_now.clear()
+            try:
+                await self.save_index()
+            except Exception as e:
+                logger.error(f"合并向量索引 {self.path} 失败: {e}")
+
+    def _write_index(self):
+        tmp_path = f"{self.path}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        # 确保索引文件落盘后才清空增量日志
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)  # type: ignore
+        # 先替换索引文件再写墓碑: 中途崩溃时旧墓碑中多余的 ID 会在加载时被忽略
+        write_tombstones(f"{self.path}.deleted", set(self._tombstones))
+        if self._log is not None:
+            self._log.truncate()
+        self._dirty = False
+
+    async def _save_index_locked(self):
+        if self.index is None or not self.path:
+            return
+        await run_in_executor(self._write_index)
 
+    async def save_index(self):
+        """将完整索引写入磁盘并清空增量日志
+
+        在线程池中执行, 不阻塞事件循环。写入期间持有读锁, 其他修改会等待, 检索不受影响。
         """
-        if self.index is None:
+        async with self._save_lock, self._lock.read():
+            await self._save_index_locked()
+
+    def set_index_type(self, index_type: str):
+        """修改目标索引类型, 满足条件时在后台迁移现有向量 (无需重新嵌入)"""
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}")
+        self.index_type = index_type
+        self.maybe_migrate()
+
+    def _target_index_type(self) -> str:
+        assert self.index is not None, "FAISS index is not initialized."
+        if self.index_type == "flat" or self.ntotal >= self.train_threshold:
+            return self.index_type
+        # 数据量较小时近似索引没有收益, 且 IVF 无法充分训练, 保持当前索引
+        return self.current_index_type
+
+    def maybe_migrate(self):
+        """如果当前索引类型与目标不一致, 在后台训练/构建新索引并替换"""
+        if self.migrating:
+            return
+        if self._target_index_type() == self.current_index_type:
+            return
+        self._migration_task = asyncio.create_task(self._migrate())
+
+    async def _migrate(self):
+        target = self._target_index_type()
+        source = self.current_index_type
+        start = time.time()
+        try:
+            async with self._lock.write():
+                vectors, ids = await run_in_executor(export_vectors, self.index)
+                vectors, ids = self._drop_tombstones(vectors, ids)
+                seq = self._mutation_seq
+            if source == "ivf_pq":
+                logger.warning("从 ivf_pq 索引迁移只能使用量化后的近似向量。")
+            logger.info(
+                f"正在将向量索引 {self.path} 从 {source} 迁移到 {target} ({len(ids)} 个向量)...",
+            )
+            # 训练和构建不持有写锁, 期间检索仍使用旧索引
+            new_index = await run_in_executor(
+                build_index,
+                target,
+                self.dimension,
+                vectors,
+                ids,
+            )
+            async with self._lock.write():
+                if seq != self._mutation_seq:
+                    # 构建期间有写入, 复用训练结果重新写入最新的向量
+                    vectors, ids = await run_in_executor(export_vectors, self.index)
+                    vectors, ids = self._drop_tombstones(vectors, ids)
+                    await run_in_executor(self._refill, new_index, vectors, ids)
+                self.index = new_index
+                self._tombstones = set()
+                self._search_params = None
+                self._mutation_seq += 1
+                await self._save_index_locked()
+            logger.info(
+                f"向量索引 {self.path} 已迁移到 {target}, 耗时 {time.time() - start:.2f}s",
+            )
+        except Exception as e:
+            logger.error(f"向量索引 {self.path} 迁移到 {target} 失败: {e}")
+
+    def maybe_purge(self):
+        """HNSW 索引的墓碑占比超过 tombstone_ratio 时, 在后台重建索引"""
+        if self.purging or self.migrating or not self._tombstones:
+            return
+        assert self.index is not None, "FAISS index is not initialized."
+        if len(self._tombstones) < self.index.ntotal * self.tombstone_ratio:
             return
-        faiss.write_index(self.index, self.path)
+        self._purge_task = asyncio.create_task(self._purge())
+
+    async def _purge(self):
+        start = time.time()
+        try:
+            async with self._lock.read():
+                index = self.index
+                dead = set(self._tombstones)
+                vectors, ids = await run_in_executor(export_vectors, index)
+            keep = ~np.isin(ids, np.fromiter(dead, dtype=np.int64))
+            # 构建不持有锁, 期间检索和修改照常进行
+            new_index = await run_in_executor(
+                build_index,
+                "hnsw",
+                self.dimension,
+                vectors[keep],
+                ids[keep],
+            )
+            async with self._lock.write():
+                if self.index is not index:
+                    # 构建期间索引已被迁移替换
+                    return
+                await run_in_executor(copy_new_vectors, index, new_index, ids)
+                # 构建期间新增的墓碑仍在新索引中, 保留
+                self._tombstones -= dead
+                self._search_params = None
+                self.index = new_index
+                self._mutation_seq += 1
+            await self.save_index()
+            logger.info(
+                f"向量索引 {self.path} 已移除 {len(dead)} 个墓碑, 耗时 {time.time() - start:.2f}s",
+            )
+        except Exception as e:
+            logger.error(f"重建向量索引 {self.path} 失败: {e}")
+
+    @staticmethod
+    def _refill(index, vectors: np.ndarray, ids: np.ndarray):
+        index.reset()
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+
+    async def evaluate(self, sample_size: int = 100, k: int = 10) -> dict:
+        """评估当前索引相对于精确检索的召回率和延迟
+
+        从索引中抽样向量作为查询, 以 flat 索引的结果作为真值计算 recall@k。
+        """
+        assert self.index is not None, "FAISS index is not initialized."
+        async with self._lock.write():
+            # 导出 IVF 向量需要修改 direct map, 因此持有写锁
+            vectors, ids = await run_in_executor(export_vectors, self.index)
+            vectors, ids = self._drop_tombstones(vectors, ids)
+            index = self.index
+            params = self._get_search_params()
+        k = min(k, len(ids))
+
+        def _run() -> dict:
+            report = {
+                "index_type": detect_index_type(index),
+                "target_index_type": self.index_type,
+                "ntotal": len(ids),
+                "k": k,
+                "sample_size": 0,
+                "recall_at_k": None,
+                "ann_latency_ms": None,
+                "flat_latency_ms": None,
+                "index_size_bytes": int(faiss.serialize_index(index).nbytes),
+            }
+            if k == 0:
+                return report
+            rng = np.random.default_rng(0)
+            sample = rng.choice(
+                len(ids), size=min(sample_size, len(ids)), replace=False
+            )
+            queries = np.ascontiguousarray(vectors[sample])
+            faiss.normalize_L2(queries)
+
+            exact = faiss.IndexFlatL2(self.dimension)
+            exact.add(vectors)
+            t0 = time.perf_counter()
+            _, exact_pos = exact.search(queries, k)
+            flat_latency = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            _, ann_ids = index.search(queries, k, params=params)
+            ann_latency = time.perf_counter() - t0
+
+            exact_ids = ids[exact_pos]
+            hits = sum(
+                len(set(a[a != -1].tolist()) & set(e.tolist()))
+                for a, e in zip(ann_ids, exact_ids)
+            )
+            report.update(
+                sample_size=len(queries),
+                recall_at_k=hits / (len(queries) * k),
+                ann_latency_ms=ann_latency * 1000 / len(queries),
+                flat_latency_ms=flat_latency * 1000 / len(queries),
+            )
+            return report
+
+        async with self._lock.read():
+            return await run_in_executor(_run)
+
+    async def close(self):
+        if self.migrating:
+            self._migration_task.cancel()  # type: ignore
+        if self.purging:
+            self._purge_task.cancel()  # type: ignore
+        if self._compact_task is not None and not self._compact_task.done():
+            self._compact_now.set()
+            await self._compact_task
+        if self._dirty:
+            await self.save_index()
+        if self._log is not None:
+            self._log.close()
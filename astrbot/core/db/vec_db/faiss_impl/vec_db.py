@@ -20,6 +20,7 @@ class FaissVecDB(BaseVecDB):
         index_store_path: str,
         embedding_provider: EmbeddingProvider,
         rerank_provider: RerankProvider | None = None,
+        index_type: str = "flat",
     ):
         self.doc_store_path = doc_store_path
         self.index_store_path = index_store_path
@@ -28,12 +29,16 @@ class FaissVecDB(BaseVecDB):
         self.embedding_storage = EmbeddingStorage(
             embedding_provider.get_dim(),
             index_store_path,
+            index_type=index_type,
         )
         self.embedding_provider = embedding_provider
         self.rerank_provider = rerank_provider
 
     async def initialize(self):
         await self.document_storage.initialize()
+        await self.embedding_storage.initialize()
+        # 向量数已达到阈值但索引类型与配置不一致时, 在后台迁移
+        self.embedding_storage.maybe_migrate()
 
     async def insert(
         self,
@@ -88,6 +93,16 @@ class FaissVecDB(BaseVecDB):
             f"Generated embeddings for {len(contents)} contents in {end - start:.2f} seconds.",
         )
 
+        return await self.insert_embeddings(contents, vectors, metadatas, ids)
+
+    async def insert_embeddings(
+        self,
+        contents: list[str],
+        vectors: list[list[float]],
+        metadatas: list[dict],
+        ids: list[str],
+    ) -> list[int]:
+        """插入已经计算好向量的文本, 返回对应的整数 ID"""
         # 使用 DocumentStorage 的批量插入方法
         int_ids = await self.document_storage.insert_documents_batch(
             ids,
@@ -107,6 +122,7 @@ class FaissVecDB(BaseVecDB):
         fetch_k: int = 20,
         rerank: bool = False,
         metadata_filters: dict | None = None,
+        query_embedding: list[float] | None = None,
     ) -> list[Result]:
         """搜索最相似的文档。
 
@@ -116,12 +132,16 @@ class FaissVecDB(BaseVecDB):
             fetch_k (int): 在根据 metadata 过滤前从 FAISS 中获取的数量
             rerank (bool): 是否使用重排序。这需要在实例化时提供 rerank_provider, 如果未提供并且 rerank 为 True, 不会抛出异常。
             metadata_filters (dict): 元数据过滤器
+            query_embedding (list[float] | None): 已计算好的查询向量, 提供时不再调用 embedding_provider
 
         Returns:
             List[Result]: 查询结果
 
         """
-        embedding = await self.embedding_provider.get_embedding(query)
+        if query_embedding is not None:
+            embedding = query_embedding
+        else:
+            embedding = await self.embedding_provider.get_embedding(query)
         scores, indices = await self.embedding_storage.search(
             vector=np.array([embedding]).astype("float32"),
             k=fetch_k if metadata_filters else k,
@@ -167,17 +187,18 @@ class FaissVecDB(BaseVecDB):
 
     async def delete(self, doc_id: str):
         """删除一条文档块（chunk）"""
-        # 获得对应的 int id
-        result = await self.document_storage.get_document_by_doc_id(doc_id)
-        int_id = result["id"] if result else None
-        if int_id is None:
-            return
+        await self.delete_batch([doc_id])
 
-        # 使用 DocumentStorage 的删除方法
-        await self.document_storage.delete_document_by_doc_id(doc_id)
-        await self.embedding_storage.delete([int_id])
+    async def delete_batch(self, doc_ids: list[str]):
+        """批量删除文档块 (chunk), 向量索引只修改一次"""
+        if not doc_ids:
+            return
+        int_ids = await self.document_storage.delete_documents_by_doc_ids(doc_ids)
+        if int_ids:
+            await self.embedding_storage.delete(int_ids)
 
     async def close(self):
+        await self.embedding_storage.close()
         await self.document_storage.close()
 
     async def count_documents(self, metadata_filter: dict | None = None) -> int:
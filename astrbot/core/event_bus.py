@@ -1,13 +1,14 @@
 """事件总线, 用于处理事件的分发和处理
 事件总线是一个异步队列, 用于接收各种消息事件, 并将其发送到Scheduler调度器进行处理
-其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并创建一个新的异步任务来执行管道调度器的处理逻辑
+其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并交给事件调度器 (EventScheduler) 执行管道调度器的处理逻辑
 
 class:
     EventBus: 事件总线, 用于处理事件的分发和处理
 
 工作流程:
 1. 维护一个异步队列, 来接受各种消息事件
-2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑
+2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并提交到事件调度器
+3. 事件调度器限制全局并发, 保证同一会话内按顺序处理, 并在会话、平台之间公平轮转
 """
 
 import asyncio
@@ -15,7 +16,9 @@ from asyncio import Queue
 
 from astrbot.core import logger
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
+from astrbot.core.event_scheduler import EventScheduler
 from astrbot.core.pipeline.scheduler import PipelineScheduler
+from astrbot.core.utils.session_waiter import FILTERS, USER_SESSIONS, WAIT_HOOKS
 
 from .platform import AstrMessageEvent
 
@@ -28,24 +31,82 @@ class EventBus:
         event_queue: Queue,
         pipeline_scheduler_mapping: dict[str, PipelineScheduler],
         astrbot_config_mgr: AstrBotConfigManager,
+        event_scheduler: EventScheduler | None = None,
     ):
+        """
+        Args:
+            event_scheduler: 事件调度器, 为 None 时不限制并发, 每个事件创建一个独立的任务
+
+        """
         self.event_queue = event_queue  # 事件队列
         # abconf uuid -> scheduler
         self.pipeline_scheduler_mapping = pipeline_scheduler_mapping
         self.astrbot_config_mgr = astrbot_config_mgr
+        self.event_scheduler = event_scheduler
+        self._direct_tasks: set[asyncio.Task] = set()
 
     async def dispatch(self):
-        while True:
-            event: AstrMessageEvent = await self.event_queue.get()
-            conf_info = self.astrbot_config_mgr.get_conf_info(event.unified_msg_origin)
-            self._print_event(event, conf_info["name"])
-            scheduler = self.pipeline_scheduler_mapping.get(conf_info["id"])
-            if not scheduler:
-                logger.error(
-                    f"PipelineScheduler not found for id: {conf_info['id']}, event ignored."
+        if self.event_scheduler:
+            self.event_scheduler.start()
+            WAIT_HOOKS.append(self._release_awaited)
+        try:
+            while True:
+                event: AstrMessageEvent = await self.event_queue.get()
+                conf_info = self.astrbot_config_mgr.get_conf_info(
+                    event.unified_msg_origin
                 )
-                continue
-            asyncio.create_task(scheduler.execute(event))
+                self._print_event(event, conf_info["name"])
+                scheduler = self.pipeline_scheduler_mapping.get(conf_info["id"])
+                if not scheduler:
+                    logger.error(
+                        f"PipelineScheduler not found for id: {conf_info['id']}, event ignored."
+                    )
+                    continue
+                if self.event_scheduler and not self._is_awaited(event):
+                    self.event_scheduler.submit(
+                        event.unified_msg_origin,
+                        event.get_platform_id(),
+                        lambda s=scheduler, e=event: s.execute(e),
+                        tag=event,
+                    )
+                else:
+                    self._run_directly(scheduler.execute(event))
+        finally:
+            if self.event_scheduler:
+                WAIT_HOOKS.remove(self._release_awaited)
+                await self.event_scheduler.stop()
+
+    @staticmethod
+    def _is_awaited(event: AstrMessageEvent) -> bool:
+        """该会话是否有正在等待后续消息的 session_waiter。
+
+        等待者所在的流水线会一直占用会话, 这类事件必须绕过调度器直接处理, 否则会互相等待。
+        """
+        if not USER_SESSIONS:
+            return False
+        return any(f.filter(event) in USER_SESSIONS for f in FILTERS)
+
+    def _release_awaited(self):
+        """session_waiter 注册后, 放行在注册前到达、仍排在同一会话之后的后续消息。
+
+        这些消息排在等待者所在的流水线之后, 留在队列中会一直等到等待者超时。
+        """
+        if not self.event_scheduler:
+            return
+        for job in self.event_scheduler.release(self._is_awaited):
+            self._run_directly(job())
+
+    def _run_directly(self, coro):
+        task = asyncio.create_task(coro)
+        self._direct_tasks.add(task)
+        task.add_done_callback(self._direct_tasks.discard)
+
+    def stats(self) -> dict:
+        """事件调度指标"""
+        stats = self.event_scheduler.stats() if self.event_scheduler else {}
+        stats["queued"] = self.event_queue.qsize()
+        stats["direct_running"] = len(self._direct_tasks)
+        return stats
 
     def _print_event(self, event: AstrMessageEvent, conf_name: str):
         """用于记录事件信息
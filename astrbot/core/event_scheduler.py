@@ -0,0 +1,271 @@
+"""事件调度器
+
+EventBus 使用的有界工作池:
+
+- 全局并发上限: 固定数量的 worker 执行事件, 突发消息不会无限制地创建流水线任务
+- 会话内 FIFO: 同一会话的事件按到达顺序逐个处理, 不会互相竞争
+- 公平轮转: 先在平台之间轮转, 再在平台内的会话之间轮转, 单个刷屏的群聊不会饿死其他会话
+- 有界队列: 待处理事件总数超过上限时按溢出策略丢弃事件
+- 指标: 队列深度、排队延迟和执行延迟, 供 WebUI 展示
+"""
+
+import asyncio
+import statistics
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from astrbot.core import logger
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+"""溢出策略:
+
+- drop_oldest: 丢弃积压最多的会话中最早的待处理事件
+- drop_newest: 拒绝新到达的事件
+- coalesce: 将积压最多的会话的待处理事件合并为其中最新的一条
+"""
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class _Session:
+    __slots__ = ("group", "key", "pending", "ready", "running")
+
+    def __init__(self, key: str, group: str):
+        self.key = key
+        self.group = group
+        self.pending: deque[tuple[Job, float, Any]] = deque()
+        self.running = 0
+        self.ready = False
+        """是否在就绪队列中"""
+
+
+class EventScheduler:
+    """有界、公平的事件调度器
+
+    Args:
+        max_concurrency: 同时执行的事件数量上限
+        max_pending: 排队事件数量上限, 0 表示不限制
+        overflow_policy: 队列已满时的处理策略, 见 OVERFLOW_POLICIES
+        session_serial: 同一会话的事件是否串行处理
+        metrics_window: 计算延迟分位数时保留的最近样本数
+
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        max_pending: int = 1000,
+        overflow_policy: str = "drop_oldest",
+        session_serial: bool = True,
+        metrics_window: int = 1000,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(
+                f"未知的事件队列溢出策略: {overflow_policy}, 使用 drop_oldest"
+            )
+            overflow_policy = "drop_oldest"
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(0, max_pending)
+        self.overflow_policy = overflow_policy
+        self.session_serial = session_serial
+
+        self._sessions: dict[str, _Session] = {}
+        # 平台 -> 就绪会话队列, OrderedDict 的顺序即平台之间的轮转顺序
+        self._ready: OrderedDict[str, deque[_Session]] = OrderedDict()
+        # 计数与就绪队列中的条目数一致
+        self._ready_sem = asyncio.Semaphore(0)
+        self._workers: list[asyncio.Task] = []
+
+        self.pending = 0
+        self.running = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self._wait_latencies: deque[float] = deque(maxlen=metrics_window)
+        self._exec_latencies: deque[float] = deque(maxlen=metrics_window)
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"event_worker_{i}")
+            for i in range(self.max_concurrency)
+        ]
+
+    async def stop(self):
+        """取消所有 worker (包括正在执行的事件)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, session_key: str, group: str, job: Job, tag: Any = None) -> bool:
+        """提交一个事件
+
+        Args:
+            session_key: 会话标识, 同一会话的事件按顺序执行
+            group: 会话所属的分组 (如平台 ID), 用于分组间的公平轮转
+            job: 执行事件的协程函数
+            tag: 附加在事件上的对象 (如消息事件), 供 release 判断
+
+        Returns:
+            bool: 事件是否已进入队列。drop_newest 策略下队列已满时返回 False
+
+        """
+        if self.max_pending and self.pending >= self.max_pending:
+            if self.overflow_policy == "drop_newest":
+                self.dropped += 1
+                logger.warning(
+                    f"事件队列已满 ({self.pending}), 丢弃会话 {session_key} 的新事件。"
+                )
+                return False
+            self._shed()
+
+        session = self._sessions.get(session_key)
+        if session is None:
+            session = self._sessions[session_key] = _Session(session_key, group)
+        session.pending.append((job, time.monotonic(), tag))
+        self.pending += 1
+        self.submitted += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        if not (self.session_serial and session.running):
+            self._mark_ready(session)
+        return True
+
+    def release(self, predicate: Callable[[Any], bool]) -> list[Job]:
+        """取出 tag 满足 predicate 的待处理事件, 由调用方绕过调度器自行执行。未设置 tag 的事件不会被取出
+
+        Returns:
+            list[Job]: 按到达顺序排列的事件
+
+        """
+        released: list[Job] = []
+        for session in list(self._sessions.values()):
+            if not session.pending:
+                continue
+            kept: deque[tuple[Job, float, Any]] = deque()
+            for item in session.pending:
+                if item[2] is not None and predicate(item[2]):
+                    released.append(item[0])
+                else:
+                    kept.append(item)
+            if len(kept) == len(session.pending):
+                continue
+            self.pending -= len(session.pending) - len(kept)
+            session.pending = kept
+            self._forget_if_idle(session)
+        return released
+
+    def _shed(self):
+        """从积压最多的会话中丢弃事件, 刷屏的会话优先承担丢弃"""
+        victim = max(
+            (s for s in self._sessions.values() if s.pending),
+            key=lambda s: len(s.pending),
+            default=None,
+        )
+        if victim is None:
+            return
+        if self.overflow_policy == "coalesce" and len(victim.pending) > 1:
+            count = len(victim.pending) - 1
+            latest = victim.pending.pop()
+            victim.pending.clear()
+            victim.pending.append(latest)
+        else:
+            count = 1
+            victim.pending.popleft()
+        self.pending -= count
+        self.dropped += count
+        logger.warning(f"事件队列已满, 丢弃会话 {victim.key} 的 {count} 条待处理事件。")
+
+    def _mark_ready(self, session: _Session):
+        if session.ready:
+            return
+        session.ready = True
+        queue = self._ready.get(session.group)
+        if queue is None:
+            queue = self._ready[session.group] = deque()
+        queue.append(session)
+        self._ready_sem.release()
+
+    def _pop_ready(self) -> _Session:
+        group, queue = next(iter(self._ready.items()))
+        session = queue.popleft()
+        if queue:
+            self._ready.move_to_end(group)
+        else:
+            del self._ready[group]
+        session.ready = False
+        return session
+
+    def _forget_if_idle(self, session: _Session):
+        if not (session.pending or session.running or session.ready):
+            self._sessions.pop(session.key, None)
+
+    async def _worker(self):
+        while True:
+            await self._ready_sem.acquire()
+            session = self._pop_ready()
+            if not session.pending:
+                # 待处理事件已被丢弃
+                self._forget_if_idle(session)
+                continue
+
+            job, enqueued_at, _ = session.pending.popleft()
+            self.pending -= 1
+            session.running += 1
+            self.running += 1
+            if not self.session_serial and session.pending:
+                self._mark_ready(session)
+
+            start = time.monotonic()
+            self._wait_latencies.append(start - enqueued_at)
+            try:
+                await job()
+            except Exception as e:
+                self.failed += 1
+                logger.error(
+                    f"处理会话 {session.key} 的事件时发生错误: {e}", exc_info=True
+                )
+            finally:
+                self._exec_latencies.append(time.monotonic() - start)
+                self.processed += 1
+                self.running -= 1
+                session.running -= 1
+                if session.pending:
+                    self._mark_ready(session)
+                self._forget_if_idle(session)
+
+    @staticmethod
+    def _summarize(latencies: deque[float]) -> dict[str, float]:
+        if not latencies:
+            return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(latencies)
+        return {
+            "avg": statistics.fmean(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max": ordered[-1],
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """调度器指标, 延迟单位为秒"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "overflow_policy": self.overflow_policy,
+            "session_serial": self.session_serial,
+            "running": self.running,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "pending_sessions": sum(1 for s in self._sessions.values() if s.pending),
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "wait_latency": self._summarize(self._wait_latencies),
+            "exec_latency": self._summarize(self._exec_latencies),
+        }
@@ -0,0 +1,439 @@
+"""流式文档导入流水线
+
+解析 → 分块 → 向量化 → 存储 四个阶段以有界队列相连并发执行, 下游处理不过来时
+上游自动等待 (背压)。文本块按窗口提交到向量库, 内存占用与文档大小无关; 每提交一个
+窗口都会记录检查点, 导入中断后重新上传同一文件会从最后提交的窗口继续。检查点存在
+期间文档尚未写入知识库, 其已提交的文本块在检索时被过滤; 超过 CHECKPOINT_TTL 仍未
+继续的导入由 KBHelper 清理。
+
+文本块按内容哈希去重: 同一文档中重复的文本块只保存一次, 与知识库中已有文本块内容
+相同时直接复用其向量, 不再调用嵌入接口。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from astrbot.core import logger
+from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.provider.provider import EmbeddingProvider
+
+from .chunking.base import BaseChunker
+from .parsers.base import MediaItem, ParseResult
+from .retrieval.bm25_index import BM25Index, content_hash
+
+DEFAULT_WINDOW_SIZE = 256
+"""每个提交窗口包含的文本块数量"""
+SEGMENT_CHARS = 32768
+"""分块前将文本切分为不超过该长度的段落, 避免一次性分块整个文档"""
+CHECKPOINT_TTL = 24 * 3600
+"""中断的导入保留检查点的时间 (秒), 超时后清理检查点和已提交的文本块"""
+_QUEUE_SIZE = 1
+
+
+@dataclass
+class UploadCheckpoint:
+    """导入进度检查点, 保存在知识库目录的 uploads/ 下"""
+
+    path: Path
+    doc_id: str
+    committed: int = 0
+    """已处理并提交的文本块数量 (包括文档内重复而未保存的)"""
+    stored: int = 0
+    """已保存到向量库的文本块数量, 即下一个文本块的 chunk_index"""
+
+    @classmethod
+    def load_or_create(cls, path: Path) -> "UploadCheckpoint":
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                committed = int(data["committed"])
+                # 旧的检查点中 chunk_index 即文本块的序号
+                stored = int(data.get("stored", committed))
+                return cls(path, data["doc_id"], committed, stored)
+            except Exception as e:
+                logger.warning(f"导入检查点 {path} 损坏, 将重新导入: {e}")
+        return cls(path, str(uuid.uuid4()))
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "doc_id": self.doc_id,
+                    "committed": self.committed,
+                    "stored": self.stored,
+                },
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+
+def scan_checkpoints(uploads_dir: Path) -> list[tuple[UploadCheckpoint, float]]:
+    """列出未完成的导入检查点及其最后更新时间"""
+    if not uploads_dir.is_dir():
+        return []
+    return [
+        (UploadCheckpoint.load_or_create(path), path.stat().st_mtime)
+        for path in uploads_dir.glob("*.json")
+    ]
+
+
+def upload_key(*parts: bytes | str) -> str:
+    """根据文件内容和分块参数计算导入任务的标识, 用于断点续传"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8") if isinstance(part, str) else part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def iter_segments(text: str, max_chars: int = SEGMENT_CHARS):
+    """在段落或行边界处将长文本切分为不超过 max_chars 的片段"""
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        cut = text.rfind("\n\n", start, end)
+        if cut <= start:
+            cut = text.rfind("\n", start, end)
+        if cut <= start:
+            cut = end
+        yield text[start:cut]
+        start = cut
+    if start < len(text):
+        yield text[start:]
+
+
+async def iter_chunks(
+    segments: AsyncIterator[ParseResult],
+    chunker: BaseChunker,
+    chunk_size: int,
+    chunk_overlap: int,
+    on_media: Callable[[MediaItem], Awaitable[None]] | None = None,
+) -> AsyncIterator[str]:
+    """对解析器产出的分段逐段分块"""
+    async for segment in segments:
+        for media_item in segment.media:
+            if on_media:
+                await on_media(media_item)
+        if not segment.text:
+            continue
+        for piece in iter_segments(segment.text):
+            for chunk in await chunker.chunk(
+                piece,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+            ):
+                yield chunk
+
+
+class VectorResolver:
+    """为文本块获取向量
+
+    内容哈希与已有文本块相同时复用其向量, 只有新内容才调用嵌入接口。
+
+    Args:
+        embedding_provider: 嵌入模型
+        sources: 可复用向量的 (BM25 索引, 向量库) 列表, 按顺序查找。
+            所有来源必须使用同一个嵌入模型
+
+    """
+
+    def __init__(
+        self,
+        embedding_provider: EmbeddingProvider,
+        sources: list[tuple[BM25Index, FaissVecDB]],
+        batch_size: int = 32,
+        tasks_limit: int = 3,
+        max_retries: int = 3,
+    ):
+        self.embedding_provider = embedding_provider
+        self.sources = sources
+        self.batch_size = batch_size
+        self.tasks_limit = tasks_limit
+        self.max_retries = max_retries
+
+        self.reused = 0
+        """复用已有向量的文本块数量"""
+        self.embedded = 0
+        """调用嵌入接口的文本块数量"""
+
+    async def resolve(
+        self,
+        texts: list[str],
+        hashes: list[str] | None = None,
+    ) -> list[list[float]]:
+        """返回与 texts 一一对应的向量, 同一批次中内容相同的文本只嵌入一次"""
+        if hashes is None:
+            hashes = [content_hash(text) for text in texts]
+        vectors = await self._lookup(set(hashes))
+        pending: dict[str, str] = {}
+        for c_hash, text in zip(hashes, texts):
+            if c_hash not in vectors:
+                pending.setdefault(c_hash, text)
+        if pending:
+            embedded = await self.embedding_provider.get_embeddings_batch(
+                list(pending.values()),
+                batch_size=self.batch_size,
+                tasks_limit=self.tasks_limit,
+                max_retries=self.max_retries,
+            )
+            vectors.update(zip(pending, embedded))
+        self.embedded += len(pending)
+        self.reused += len(texts) - len(pending)
+        return [vectors[c_hash] for c_hash in hashes]
+
+    async def _lookup(self, hashes: set[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        for sparse_index, vec_db in self.sources:
+            wanted: dict[int, str] = {}
+            for c_hash in hashes - found.keys():
+                chunk = sparse_index.find_by_hash(c_hash)
+                if chunk is not None:
+                    wanted[chunk.int_id] = c_hash
+            if not wanted:
+                continue
+            try:
+                vectors, ids = await vec_db.embedding_storage.get_vectors(
+                    list(wanted),
+                )
+            except Exception as e:
+                logger.warning(f"读取已有向量失败, 将重新生成: {e}")
+                continue
+            for vector, int_id in zip(vectors, ids):
+                found[wanted[int(int_id)]] = vector.tolist()
+            if len(found) == len(hashes):
+                break
+        return found
+
+
+class IngestionPipeline:
+    """单个文档的流式导入
+
+    Args:
+        vec_db: 目标向量库
+        sparse_index: 目标 BM25 索引
+        kb_id: 知识库 ID
+        checkpoint: 导入检查点, 其中的 doc_id 即文档 ID
+        window_size: 每个提交窗口的文本块数量
+        resolver: 获取文本块向量的方式, 默认复用本知识库中内容相同的文本块的向量
+        on_media: 解析出多媒体资源时的回调
+        progress_callback: 进度回调, 接收参数 (stage, current, total)
+
+    """
+
+    def __init__(
+        self,
+        vec_db: FaissVecDB,
+        sparse_index: BM25Index,
+        kb_id: str,
+        checkpoint: UploadCheckpoint,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        batch_size: int = 32,
+        tasks_limit: int = 3,
+        max_retries: int = 3,
+        resolver: VectorResolver | None = None,
+        on_media: Callable[[MediaItem], Awaitable[None]] | None = None,
+        progress_callback=None,
+    ):
+        self.vec_db = vec_db
+        self.sparse_index = sparse_index
+        self.kb_id = kb_id
+        self.checkpoint = checkpoint
+        self.window_size = max(1, window_size)
+        self.batch_size = batch_size
+        self.tasks_limit = tasks_limit
+        self.max_retries = max_retries
+        self.resolver = resolver or VectorResolver(
+            vec_db.embedding_provider,
+            [(sparse_index, vec_db)],
+            batch_size=batch_size,
+            tasks_limit=tasks_limit,
+            max_retries=max_retries,
+        )
+        self.on_media = on_media
+        self.progress_callback = progress_callback
+
+        self.total_chunks = 0
+        """已分块的文本块总数 (包括续传时跳过的)"""
+        self.duplicates = 0
+        """文档内重复而未保存的文本块数量"""
+        self._seen_hashes: set[str] = set()
+
+    @property
+    def doc_id(self) -> str:
+        return self.checkpoint.doc_id
+
+    async def _progress(self, stage: str, current: int, total: int):
+        if self.progress_callback:
+            await self.progress_callback(stage, current, total)
+
+    async def run_parsed(
+        self,
+        segments: AsyncIterator[ParseResult],
+        chunker: BaseChunker,
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> int:
+        """导入解析器产出的分段, 返回保存的文本块数量"""
+
+        # 解析与分块、向量化交替进行, 解析完成时向量化已经开始, 因此只报告解析开始,
+        # 之后由分块和向量化进度接替
+        await self._progress("parsing", 0, 100)
+        return await self.run(
+            iter_chunks(segments, chunker, chunk_size, chunk_overlap, self.on_media),
+        )
+
+    async def run(self, chunks: AsyncIterator[str]) -> int:
+        """导入文本块流, 返回保存的文本块数量"""
+        await self._discard_uncommitted()
+
+        to_embed: asyncio.Queue = asyncio.Queue(_QUEUE_SIZE)
+        to_store: asyncio.Queue = asyncio.Queue(_QUEUE_SIZE)
+        upstream = [
+            asyncio.create_task(self._chunk_stage(chunks, to_embed)),
+            asyncio.create_task(self._embed_stage(to_embed, to_store)),
+        ]
+        try:
+            # 上游出错时会发送结束标记, 存储阶段先提交已经生成向量的窗口再结束
+            await self._store_stage(to_store)
+        finally:
+            for task in upstream:
+                task.cancel()
+            results = await asyncio.gather(*upstream, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+        # 分批添加 BM25 索引时未写入文件, 在全部提交后写入一次
+        await self.sparse_index.save_async()
+        if self.resolver.reused or self.duplicates:
+            logger.info(
+                f"文档 {self.doc_id} 复用已有向量 {self.resolver.reused} 个, "
+                f"跳过重复文本块 {self.duplicates} 个",
+            )
+        return self.checkpoint.stored
+
+    async def _discard_uncommitted(self):
+        """清理上次中断时已写入但未记录到检查点的文本块"""
+        docs = await self.vec_db.document_storage.get_documents(
+            metadata_filters={"kb_doc_id": self.doc_id},
+            limit=None,
+            offset=None,
+        )
+        stale = [
+            doc["doc_id"]
+            for doc in docs
+            if json.loads(doc["metadata"])["chunk_index"] >= self.checkpoint.stored
+        ]
+        if stale:
+            await self.vec_db.delete_batch(stale)
+            await self.sparse_index.remove_chunks(stale)
+        self._seen_hashes = {
+            c.content_hash
+            for c in self.sparse_index.document_chunks(self.doc_id).values()
+        }
+        if self.checkpoint.committed:
+            logger.info(
+                f"文档 {self.doc_id} 从第 {self.checkpoint.committed} 个文本块继续导入",
+            )
+
+    async def _chunk_stage(self, chunks: AsyncIterator[str], out: asyncio.Queue):
+        window: list[tuple[int, str, str]] = []
+        index = 0
+        # 第一个窗口填满前报告分块进度, 之后由向量化进度接替
+        first_window = True
+        try:
+            async for chunk in chunks:
+                # 续传时跳过已提交的文本块
+                if index >= self.checkpoint.committed:
+                    c_hash = content_hash(chunk)
+                    if c_hash in self._seen_hashes:
+                        self.duplicates += 1
+                    else:
+                        self._seen_hashes.add(c_hash)
+                        window.append((index, chunk, c_hash))
+                index += 1
+                self.total_chunks = index
+                if first_window:
+                    await self._progress("chunking", len(window), self.window_size)
+                if len(window) >= self.window_size:
+                    await out.put(window)
+                    window = []
+                    first_window = False
+            if first_window:
+                await self._progress("chunking", 100, 100)
+            if window:
+                await out.put(window)
+        except Exception:
+            # 通知下游结束, 已产出的数据仍会被处理
+            await out.put(None)
+            raise
+        await out.put(None)
+
+    async def _embed_stage(self, inp: asyncio.Queue, out: asyncio.Queue):
+        try:
+            while (window := await inp.get()) is not None:
+                vectors = await self.resolver.resolve(
+                    [text for _, text, _ in window],
+                    [c_hash for _, _, c_hash in window],
+                )
+                await out.put((window, vectors))
+        except Exception:
+            # 通知下游结束, 已产出的数据仍会被处理
+            await out.put(None)
+            raise
+        await out.put(None)
+
+    async def _store_stage(self, inp: asyncio.Queue):
+        while (item := await inp.get()) is not None:
+            window, vectors = item
+            chunk_ids = [str(uuid.uuid4()) for _ in window]
+            contents = [text for _, text, _ in window]
+            # 文档内重复的文本块不保存, chunk_index 按保存的顺序连续编号
+            indexes = range(
+                self.checkpoint.stored, self.checkpoint.stored + len(window)
+            )
+            int_ids = await self.vec_db.insert_embeddings(
+                contents,
+                vectors,
+                [
+                    {
+                        "kb_id": self.kb_id,
+                        "kb_doc_id": self.doc_id,
+                        "chunk_index": index,
+                    }
+                    for index in indexes
+                ],
+                chunk_ids,
+            )
+            await self.sparse_index.add_chunks(
+                (
+                    (chunk_id, int_id, self.doc_id, index, text)
+                    for chunk_id, int_id, index, text in zip(
+                        chunk_ids,
+                        int_ids,
+                        indexes,
+                        contents,
+                    )
+                ),
+                persist=False,
+            )
+            self.checkpoint.committed = window[-1][0] + 1
+            self.checkpoint.stored += len(window)
+            await asyncio.to_thread(self.checkpoint.save)
+            await self._progress(
+                "embedding",
+                self.checkpoint.committed,
+                max(self.total_chunks, self.checkpoint.committed),
+            )
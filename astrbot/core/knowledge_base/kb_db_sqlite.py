@@ -45,6 +45,12 @@ class KBSQLiteDatabase:
             expire_on_commit=False,
         )
 
+        # 文档名和知识库名缓存, 用于检索结果补全来源信息
+        self._doc_names: dict[str, tuple[str, str]] = {}
+        """doc_id -> (doc_name, kb_id)"""
+        self._kb_names: dict[str, str] = {}
+        """kb_id -> kb_name"""
+
     @asynccontextmanager
     async def get_db(self):
         """获取数据库会话
@@ -161,6 +167,28 @@ class KBSQLiteDatabase:
 
                 await session.commit()
 
+    async def migrate_to_v2(self) -> None:
+        """执行知识库数据库 v2 迁移
+
+        为知识库表添加向量索引类型列
+        """
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                result = await session.execute(
+                    text("PRAGMA table_info(knowledge_bases)"),
+                )
+                columns = {row[1] for row in result.fetchall()}
+                if "index_type" not in columns:
+                    await session.execute(
+                        text(
+                            "ALTER TABLE knowledge_bases "
+                            "ADD COLUMN index_type VARCHAR(20) DEFAULT 'flat'",
+                        ),
+                    )
+
+                await session.commit()
+
     async def close(self) -> None:
         """关闭数据库连接"""
         await self.engine.dispose()
@@ -253,6 +281,85 @@ class KBSQLiteDatabase:
                 "knowledge_base": row[1],
             }
 
+    async def get_documents_with_metadata(self, doc_ids: list[str]) -> dict[str, dict]:
+        """批量获取文档及其所属知识库, 只执行一次查询
+
+        Returns:
+            dict[str, dict]: doc_id -> {"document": ..., "knowledge_base": ...}, 不存在的文档不包含在内
+
+        """
+        if not doc_ids:
+            return {}
+        async with self.get_db() as session:
+            stmt = (
+                select(KBDocument, KnowledgeBase)
+                .join(KnowledgeBase, col(KBDocument.kb_id) == col(KnowledgeBase.kb_id))
+                .where(col(KBDocument.doc_id).in_(set(doc_ids)))
+            )
+            result = await session.execute(stmt)
+            return {
+                row[0].doc_id: {
+                    "document": row[0],
+                    "knowledge_base": row[1],
+                }
+                for row in result.all()
+            }
+
+    async def get_document_names(
+        self,
+        doc_ids: list[str],
+    ) -> dict[str, tuple[str, str]]:
+        """批量获取文档名和所属知识库名, 优先使用缓存
+
+        Returns:
+            dict[str, tuple[str, str]]: doc_id -> (doc_name, kb_name), 不存在的文档不包含在内
+
+        """
+        misses = [
+            doc_id
+            for doc_id in dict.fromkeys(doc_ids)
+            if doc_id not in self._doc_names
+            or self._doc_names[doc_id][1] not in self._kb_names
+        ]
+        if misses:
+            rows = await self.get_documents_with_metadata(misses)
+            if len(self._doc_names) + len(rows) > 10000:
+                self._doc_names.clear()
+            for doc_id, row in rows.items():
+                kb = row["knowledge_base"]
+                self._doc_names[doc_id] = (row["document"].doc_name, kb.kb_id)
+                self._kb_names[kb.kb_id] = kb.kb_name
+
+        names = {}
+        for doc_id in doc_ids:
+            cached = self._doc_names.get(doc_id)
+            if cached and cached[1] in self._kb_names:
+                names[doc_id] = (cached[0], self._kb_names[cached[1]])
+        return names
+
+    def invalidate_name_cache(
+        self,
+        kb_id: str | None = None,
+        doc_id: str | None = None,
+        drop_documents: bool = False,
+    ):
+        """在知识库重命名/删除、文档删除后使名称缓存失效
+
+        Args:
+            kb_id: 知识库 ID
+            doc_id: 文档 ID
+            drop_documents: 是否同时移除该知识库下所有文档的缓存 (删除知识库时)
+
+        """
+        if doc_id:
+            self._doc_names.pop(doc_id, None)
+        if kb_id:
+            self._kb_names.pop(kb_id, None)
+            if drop_documents:
+                self._doc_names = {
+                    k: v for k, v in self._doc_names.items() if v[1] != kb_id
+                }
+
     async def delete_document_by_id(self, doc_id: str, vec_db: FaissVecDB):
         """删除单个文档及其相关数据"""
         # 在知识库表中删除
@@ -261,6 +368,7 @@ class KBSQLiteDatabase:
             delete_stmt = delete(KBDocument).where(col(KBDocument.doc_id) == doc_id)
             await session.execute(delete_stmt)
             await session.commit()
+        self.invalidate_name_cache(doc_id=doc_id)
 
         # 在 vec db 中删除相关向量
         await vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
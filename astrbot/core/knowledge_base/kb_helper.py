@@ -3,6 +3,7 @@ import json
 import re
 import time
 import uuid
+from collections.abc import Callable, Iterable
 from pathlib import Path
 
 import aiofiles
@@ -21,11 +22,23 @@ from astrbot.core.provider.provider import (
 
 from .chunking.base import BaseChunker
 from .chunking.recursive import RecursiveCharacterChunker
+from .ingestion import (
+    CHECKPOINT_TTL,
+    DEFAULT_WINDOW_SIZE,
+    IngestionPipeline,
+    UploadCheckpoint,
+    VectorResolver,
+    iter_chunks,
+    scan_checkpoints,
+    upload_key,
+)
 from .kb_db_sqlite import KBSQLiteDatabase
 from .models import KBDocument, KBMedia, KnowledgeBase
+from .parsers.base import MediaItem
 from .parsers.url_parser import extract_text_from_url
 from .parsers.util import select_parser
 from .prompts import TEXT_REPAIR_SYSTEM_PROMPT
+from .retrieval.bm25_index import BM25Index, content_hash
 
 
 class RateLimiter:
@@ -108,6 +121,7 @@ Text chunk to process:
 class KBHelper:
     vec_db: BaseVecDB
     kb: KnowledgeBase
+    sparse_index: BM25Index
 
     def __init__(
         self,
@@ -116,12 +130,20 @@ class KBHelper:
         provider_manager: ProviderManager,
         kb_root_dir: str,
         chunker: BaseChunker,
+        vector_peers: Callable[[], Iterable["KBHelper"]] | None = None,
     ):
+        """
+        Args:
+            vector_peers: 返回其他知识库实例, 导入时可复用其中使用同一嵌入模型的
+                知识库里内容相同的文本块的向量。为 None 时只在本知识库内复用
+
+        """
         self.kb_db = kb_db
         self.kb = kb
         self.prov_mgr = provider_manager
         self.kb_root_dir = kb_root_dir
         self.chunker = chunker
+        self.vector_peers = vector_peers
 
         self.kb_dir = Path(self.kb_root_dir) / self.kb.kb_id
         self.kb_medias_dir = Path(self.kb_dir) / "medias" / self.kb.kb_id
@@ -130,8 +152,38 @@ class KBHelper:
         self.kb_medias_dir.mkdir(parents=True, exist_ok=True)
         self.kb_files_dir.mkdir(parents=True, exist_ok=True)
 
+        self.sparse_index = BM25Index(str(self.kb_dir / "bm25_index.json"))
+        self._sparse_index_lock = asyncio.Lock()
+        self.pending_docs: set[str] = set()
+        """导入尚未完成的文档 ID, 其已提交的文本块在检索时被过滤"""
+
     async def initialize(self):
         await self._ensure_vec_db()
+        await self.cleanup_uploads()
+
+    async def cleanup_uploads(self, ttl: float = CHECKPOINT_TTL):
+        """登记未完成的导入, 并清理超过 ttl 未继续的导入及其已提交的文本块"""
+        checkpoints = await asyncio.to_thread(
+            scan_checkpoints,
+            self.kb_dir / "uploads",
+        )
+        now = time.time()
+        for checkpoint, updated_at in checkpoints:
+            doc_id = checkpoint.doc_id
+            if await self.kb_db.get_document_by_id(doc_id):
+                # 导入已完成, 检查点未及时清理
+                await asyncio.to_thread(checkpoint.remove)
+                continue
+            if now - updated_at < ttl:
+                self.pending_docs.add(doc_id)
+                continue
+            logger.info(f"清理知识库 {self.kb.kb_name} 中超时未完成的导入 {doc_id}")
+            vec_db: FaissVecDB = self.vec_db  # type: ignore
+            await vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
+            sparse_index = await self.ensure_sparse_index()
+            await sparse_index.remove_document(doc_id)
+            await asyncio.to_thread(checkpoint.remove)
+            self.pending_docs.discard(doc_id)
 
     async def get_ep(self) -> EmbeddingProvider:
         if not self.kb.embedding_provider_id:
@@ -164,16 +216,118 @@ class KBHelper:
         ep = await self.get_ep()
         rp = await self.get_rp()
 
+        # 嵌入模型未变化时复用现有实例, 避免重复加载索引以及打断后台的索引迁移
+        current = getattr(self, "vec_db", None)
+        if isinstance(current, FaissVecDB) and current.embedding_provider is ep:
+            current.rerank_provider = rp
+            return current
+
         vec_db = FaissVecDB(
             doc_store_path=str(self.kb_dir / "doc.db"),
             index_store_path=str(self.kb_dir / "index.faiss"),
             embedding_provider=ep,
             rerank_provider=rp,
+            index_type=self.kb.index_type or "flat",
         )
         await vec_db.initialize()
         self.vec_db = vec_db
         return vec_db
 
+    def set_index_type(self, index_type: str):
+        """修改向量索引类型, 现有向量会在后台迁移, 无需重新嵌入"""
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        vec_db.embedding_storage.set_index_type(index_type)
+
+    async def get_index_stats(self, evaluate: bool = False) -> dict:
+        """获取向量索引信息
+
+        Args:
+            evaluate: 是否抽样评估当前索引相对精确检索的召回率和延迟
+
+        """
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        storage = vec_db.embedding_storage
+        stats = {
+            "index_type": storage.current_index_type,
+            "target_index_type": storage.index_type,
+            "train_threshold": storage.train_threshold,
+            "ntotal": storage.index.ntotal if storage.index else 0,
+            "migrating": storage.migrating,
+        }
+        if evaluate:
+            stats["evaluation"] = await storage.evaluate()
+        return stats
+
+    async def ensure_sparse_index(self) -> BM25Index:
+        """确保 BM25 索引已加载且与向量库中的文本块一致
+
+        索引文件不存在 (如旧版本创建的知识库、从备份恢复) 或与向量库不一致时,
+        从向量库重建一次, 内容未变化的文本块复用已缓存的分词结果。
+        """
+        index = self.sparse_index
+        if index.synced:
+            return index
+        async with self._sparse_index_lock:
+            if index.synced:
+                return index
+            vec_db: FaissVecDB = self.vec_db  # type: ignore
+            loaded = await asyncio.to_thread(index.load)
+            chunk_count = await vec_db.count_documents()
+            if loaded and len(index) == chunk_count:
+                index.synced = True
+                return index
+
+            logger.info(
+                f"正在为知识库 {self.kb.kb_name} 重建 BM25 索引 ({chunk_count} 个块)..."
+            )
+            docs = await vec_db.document_storage.get_documents(
+                metadata_filters={},
+                limit=None,
+                offset=None,
+            )
+            chunks = []
+            for doc in docs:
+                chunk_md = json.loads(doc["metadata"])
+                chunks.append(
+                    (
+                        doc["doc_id"],
+                        doc["id"],
+                        chunk_md["kb_doc_id"],
+                        chunk_md["chunk_index"],
+                        doc["text"],
+                    ),
+                )
+            await index.rebuild(chunks)
+        return index
+
+    async def _vector_resolver(
+        self,
+        batch_size: int,
+        tasks_limit: int,
+        max_retries: int,
+    ) -> VectorResolver:
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        sources = [(await self.ensure_sparse_index(), vec_db)]
+        for peer in self.vector_peers() if self.vector_peers else ():
+            peer_vec_db = getattr(peer, "vec_db", None)
+            if (
+                peer is self
+                or peer.kb.embedding_provider_id != self.kb.embedding_provider_id
+                or not isinstance(peer_vec_db, FaissVecDB)
+            ):
+                continue
+            try:
+                sources.append((await peer.ensure_sparse_index(), peer_vec_db))
+            except Exception as e:
+                logger.warning(f"加载知识库 {peer.kb.kb_name} 的索引失败: {e}")
+        return VectorResolver(
+            vec_db.embedding_provider,
+            sources,
+            batch_size=batch_size,
+            tasks_limit=tasks_limit,
+            max_retries=max_retries,
+        )
+
     async def delete_vec_db(self):
         """删除知识库的向量数据库和所有相关文件"""
         import shutil
@@ -198,113 +352,104 @@ class KBHelper:
         max_retries: int = 3,
         progress_callback=None,
         pre_chunked_text: list[str] | None = None,
+        window_size: int = DEFAULT_WINDOW_SIZE,
     ) -> KBDocument:
-        """上传并处理文档（带原子性保证和失败清理）
+        """上传并处理文档（流式导入, 支持断点续传）
 
         流程:
-        1. 保存原始文件
-        2. 解析文档内容
-        3. 提取多媒体资源
-        4. 分块处理
-        5. 生成向量并存储
-        6. 保存元数据（事务）
-        7. 更新统计
+        1. 逐段解析文档内容并提取多媒体资源
+        2. 分块
+        3. 按窗口生成向量并提交到向量库 (以上阶段并发执行)
+        4. 保存元数据（事务）
+        5. 更新统计
+
+        每提交一个窗口都会记录检查点。导入中断后再次上传同一文件 (分块参数相同)
+        会复用之前的文档 ID, 从最后提交的窗口继续; 在此之前已提交的文本块不会被
+        检索到, 超过 CHECKPOINT_TTL 未继续时被清理。内容与已有文本块相同的文本块
+        复用已有向量, 同一文档中重复的文本块只保存一次。
 
         Args:
             progress_callback: 进度回调函数，接收参数 (stage, current, total)
                 - stage: 当前阶段 ('parsing', 'chunking', 'embedding')
                 - current: 当前进度
                 - total: 总数
+            window_size: 每次提交到向量库的文本块数量
 
         """
         await self._ensure_vec_db()
-        doc_id = str(uuid.uuid4())
+        await self.cleanup_uploads()
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
         media_paths: list[Path] = []
-        file_size = 0
+        saved_media: list[KBMedia] = []
 
-        # file_path = self.kb_files_dir / f"{doc_id}.{file_type}"
-        # async with aiofiles.open(file_path, "wb") as f:
-        #     await f.write(file_content)
+        if pre_chunked_text is not None:
+            file_size = sum(len(chunk) for chunk in pre_chunked_text)
+            key_parts = [file_name, *pre_chunked_text]
+        else:
+            if file_content is None:
+                raise ValueError(
+                    "当未提供 pre_chunked_text 时，file_content 不能为空。"
+                )
+            file_size = len(file_content)
+            key_parts = [file_name, file_content, f"{chunk_size}:{chunk_overlap}"]
+        key = await asyncio.to_thread(upload_key, *key_parts)
+        checkpoint = await asyncio.to_thread(
+            UploadCheckpoint.load_or_create,
+            self.kb_dir / "uploads" / f"{key}.json",
+        )
+        if await self.kb_db.get_document_by_id(checkpoint.doc_id):
+            # 上次导入已完成, 检查点未及时清理
+            await asyncio.to_thread(checkpoint.remove)
+            checkpoint = UploadCheckpoint(checkpoint.path, str(uuid.uuid4()))
+        doc_id = checkpoint.doc_id
+        self.pending_docs.add(doc_id)
+
+        async def on_media(media_item: MediaItem):
+            media = await self._save_media(
+                doc_id=doc_id,
+                media_type=media_item.media_type,
+                file_name=media_item.file_name,
+                content=media_item.content,
+                mime_type=media_item.mime_type,
+            )
+            saved_media.append(media)
+            media_paths.append(Path(media.file_path))
 
-        try:
-            chunks_text = []
-            saved_media = []
+        pipeline = IngestionPipeline(
+            vec_db=vec_db,
+            sparse_index=await self.ensure_sparse_index(),
+            kb_id=self.kb.kb_id,
+            checkpoint=checkpoint,
+            window_size=window_size,
+            batch_size=batch_size,
+            tasks_limit=tasks_limit,
+            max_retries=max_retries,
+            resolver=await self._vector_resolver(batch_size, tasks_limit, max_retries),
+            on_media=on_media,
+            progress_callback=progress_callback,
+        )
 
+        try:
             if pre_chunked_text is not None:
                 # 如果提供了预分块文本，直接使用
-                chunks_text = pre_chunked_text
-                file_size = sum(len(chunk) for chunk in chunks_text)
-                logger.info(f"使用预分块文本进行上传，共 {len(chunks_text)} 个块。")
-            else:
-                # 否则，执行标准的文件解析和分块流程
-                if file_content is None:
-                    raise ValueError(
-                        "当未提供 pre_chunked_text 时，file_content 不能为空。"
-                    )
-
-                file_size = len(file_content)
+                logger.info(
+                    f"使用预分块文本进行上传，共 {len(pre_chunked_text)} 个块。"
+                )
 
-                # 阶段1: 解析文档
-                if progress_callback:
-                    await progress_callback("parsing", 0, 100)
+                async def _chunks():
+                    for chunk in pre_chunked_text:
+                        yield chunk
 
+                chunk_count = await pipeline.run(_chunks())
+            else:
+                # 否则，执行标准的文件解析和分块流程
                 parser = await select_parser(f".{file_type}")
-                parse_result = await parser.parse(file_content, file_name)
-                text_content = parse_result.text
-                media_items = parse_result.media
-
-                if progress_callback:
-                    await progress_callback("parsing", 100, 100)
-
-                # 保存媒体文件
-                for media_item in media_items:
-                    media = await self._save_media(
-                        doc_id=doc_id,
-                        media_type=media_item.media_type,
-                        file_name=media_item.file_name,
-                        content=media_item.content,
-                        mime_type=media_item.mime_type,
-                    )
-                    saved_media.append(media)
-                    media_paths.append(Path(media.file_path))
-
-                # 阶段2: 分块
-                if progress_callback:
-                    await progress_callback("chunking", 0, 100)
-
-                chunks_text = await self.chunker.chunk(
-                    text_content,
+                chunk_count = await pipeline.run_parsed(
+                    parser.parse_stream(file_content, file_name),  # type: ignore
+                    chunker=self.chunker,
                     chunk_size=chunk_size,
                     chunk_overlap=chunk_overlap,
                 )
-            contents = []
-            metadatas = []
-            for idx, chunk_text in enumerate(chunks_text):
-                contents.append(chunk_text)
-                metadatas.append(
-                    {
-                        "kb_id": self.kb.kb_id,
-                        "kb_doc_id": doc_id,
-                        "chunk_index": idx,
-                    },
-                )
-
-            if progress_callback:
-                await progress_callback("chunking", 100, 100)
-
-            # 阶段3: 生成向量（带进度回调）
-            async def embedding_progress_callback(current, total):
-                if progress_callback:
-                    await progress_callback("embedding", current, total)
-
-            await self.vec_db.insert_batch(
-                contents=contents,
-                metadatas=metadatas,
-                batch_size=batch_size,
-                tasks_limit=tasks_limit,
-                max_retries=max_retries,
-                progress_callback=embedding_progress_callback,
-            )
 
             # 保存文档的元数据
             doc = KBDocument(
@@ -315,7 +460,7 @@ class KBHelper:
                 file_size=file_size,
                 # file_path=str(file_path),
                 file_path="",
-                chunk_count=len(chunks_text),
+                chunk_count=chunk_count,
                 media_count=0,
             )
             async with self.kb_db.get_db() as session:
@@ -326,16 +471,19 @@ class KBHelper:
                     await session.commit()
 
                 await session.refresh(doc)
+            self.pending_docs.discard(doc_id)
+            await asyncio.to_thread(checkpoint.remove)
 
-            vec_db: FaissVecDB = self.vec_db  # type: ignore
             await self.kb_db.update_kb_stats(kb_id=self.kb.kb_id, vec_db=vec_db)
             await self.refresh_kb()
             await self.refresh_document(doc_id)
             return doc
         except Exception as e:
-            logger.error(f"上传文档失败: {e}")
-            # if file_path.exists():
-            #     file_path.unlink()
+            logger.error(
+                f"上传文档失败: {e}。已提交 {checkpoint.committed} 个文本块, 重新上传同一文件将从断点继续。"
+            )
+            # 即使尚未提交任何窗口也保留检查点, 超时未继续时由 cleanup_uploads 清理
+            await asyncio.to_thread(checkpoint.save)
 
             for media_path in media_paths:
                 try:
@@ -346,6 +494,150 @@ class KBHelper:
 
             raise e
 
+    async def resync_document(
+        self,
+        doc_id: str,
+        file_content: bytes | None = None,
+        file_type: str | None = None,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
+        batch_size: int = 32,
+        tasks_limit: int = 3,
+        max_retries: int = 3,
+        pre_chunked_text: list[str] | None = None,
+    ) -> dict:
+        """用文档的新版本重新同步已导入的文档
+
+        按内容哈希比对新旧文本块: 未变化的文本块原样保留 (必要时更新位置),
+        只为新增或修改的文本块生成向量, 新版本中已不存在的文本块会被删除。
+
+        Returns:
+            dict: 同步结果, 包括新增、删除、保留的文本块数量以及实际调用嵌入接口的数量
+
+        """
+        doc = await self.get_document(doc_id)
+        if not doc or doc.kb_id != self.kb.kb_id:
+            raise ValueError(f"无法找到 ID 为 {doc_id} 的文档")
+        await self._ensure_vec_db()
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        sparse_index = await self.ensure_sparse_index()
+
+        if pre_chunked_text is not None:
+            texts = list(pre_chunked_text)
+            file_size = sum(len(chunk) for chunk in texts)
+        else:
+            if file_content is None:
+                raise ValueError(
+                    "当未提供 pre_chunked_text 时，file_content 不能为空。"
+                )
+            parser = await select_parser(f".{file_type or doc.file_type}")
+            texts = [
+                chunk
+                async for chunk in iter_chunks(
+                    parser.parse_stream(file_content, doc.doc_name),  # type: ignore
+                    self.chunker,
+                    chunk_size,
+                    chunk_overlap,
+                )
+            ]
+            file_size = len(file_content)
+
+        # 旧文本块按内容哈希分组, 内容相同的文本块按原顺序依次匹配
+        old_by_hash: dict[str, list[str]] = {}
+        for chunk_id, chunk in sorted(
+            sparse_index.document_chunks(doc_id).items(),
+            key=lambda item: item[1].chunk_index,
+        ):
+            old_by_hash.setdefault(chunk.content_hash, []).append(chunk_id)
+
+        kept: dict[str, int] = {}
+        added: list[tuple[int, str, str]] = []
+        seen: set[str] = set()
+        for index, text in enumerate(texts):
+            c_hash = content_hash(text)
+            if c_hash in seen:
+                # 与导入时一致, 同一文档中重复的文本块只保存一次
+                continue
+            seen.add(c_hash)
+            if old_by_hash.get(c_hash):
+                kept[old_by_hash[c_hash].pop(0)] = index
+            else:
+                added.append((index, text, c_hash))
+        removed = [chunk_id for ids in old_by_hash.values() for chunk_id in ids]
+        moved = {
+            chunk_id: index
+            for chunk_id, index in kept.items()
+            if sparse_index.chunks[chunk_id].chunk_index != index
+        }
+
+        resolver = await self._vector_resolver(batch_size, tasks_limit, max_retries)
+        for start in range(0, len(added), DEFAULT_WINDOW_SIZE):
+            window = added[start : start + DEFAULT_WINDOW_SIZE]
+            vectors = await resolver.resolve(
+                [text for _, text, _ in window],
+                [c_hash for _, _, c_hash in window],
+            )
+            chunk_ids = [str(uuid.uuid4()) for _ in window]
+            int_ids = await vec_db.insert_embeddings(
+                [text for _, text, _ in window],
+                vectors,
+                [
+                    {"kb_id": self.kb.kb_id, "kb_doc_id": doc_id, "chunk_index": index}
+                    for index, _, _ in window
+                ],
+                chunk_ids,
+            )
+            await sparse_index.add_chunks(
+                (
+                    (chunk_id, int_id, doc_id, index, text)
+                    for chunk_id, int_id, (index, text, _) in zip(
+                        chunk_ids,
+                        int_ids,
+                        window,
+                    )
+                ),
+                persist=False,
+            )
+        if moved:
+            await vec_db.document_storage.update_metadata_batch(
+                {
+                    chunk_id: {
+                        "kb_id": self.kb.kb_id,
+                        "kb_doc_id": doc_id,
+                        "chunk_index": index,
+                    }
+                    for chunk_id, index in moved.items()
+                },
+            )
+            await sparse_index.update_chunk_indexes(moved, persist=False)
+        if removed:
+            await vec_db.delete_batch(removed)
+        # 删除时会一并写入之前分批添加和移动的结果
+        if not await sparse_index.remove_chunks(removed):
+            await sparse_index.save_async()
+
+        doc.file_size = file_size
+        if file_type:
+            doc.file_type = file_type
+        async with self.kb_db.get_db() as session:
+            async with session.begin():
+                session.add(doc)
+                await session.commit()
+        await self.refresh_document(doc_id)
+        await self.kb_db.update_kb_stats(kb_id=self.kb.kb_id, vec_db=vec_db)
+        await self.refresh_kb()
+
+        result = {
+            "added": len(added),
+            "removed": len(removed),
+            "unchanged": len(kept),
+            "moved": len(moved),
+            "embedded": resolver.embedded,
+            "reused": resolver.reused,
+        }
+        logger.info(f"文档 {doc.doc_name} 已重新同步: {result}")
+        return result
+
     async def list_documents(
         self,
         offset: int = 0,
@@ -362,10 +654,12 @@ class KBHelper:
 
     async def delete_document(self, doc_id: str):
         """删除单个文档及其相关数据"""
+        sparse_index = await self.ensure_sparse_index()
         await self.kb_db.delete_document_by_id(
             doc_id=doc_id,
             vec_db=self.vec_db,  # type: ignore
         )
+        await sparse_index.remove_document(doc_id)
         await self.kb_db.update_kb_stats(
             kb_id=self.kb.kb_id,
             vec_db=self.vec_db,  # type: ignore
@@ -375,7 +669,9 @@ class KBHelper:
     async def delete_chunk(self, chunk_id: str, doc_id: str):
         """删除单个文本块及其相关数据"""
         vec_db: FaissVecDB = self.vec_db  # type: ignore
+        sparse_index = await self.ensure_sparse_index()
         await vec_db.delete(chunk_id)
+        await sparse_index.remove_chunks([chunk_id])
         await self.kb_db.update_kb_stats(
             kb_id=self.kb.kb_id,
             vec_db=self.vec_db,  # type: ignore
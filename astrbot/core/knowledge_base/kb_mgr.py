@@ -2,6 +2,8 @@ import traceback
 from pathlib import Path
 
 from astrbot.core import logger
+from astrbot.core.db.vec_db.faiss_impl import concurrency as faiss_concurrency
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import INDEX_TYPES
 from astrbot.core.provider.manager import ProviderManager
 
 # from .chunking.fixed_size import FixedSizeChunker
@@ -26,9 +28,20 @@ class KnowledgeBaseManager:
     def __init__(
         self,
         provider_manager: ProviderManager,
+        faiss_workers: int = 0,
+        cross_kb_dedup: bool = False,
     ):
+        """
+        Args:
+            faiss_workers: 向量检索线程池大小, 0 表示自动
+            cross_kb_dedup: 导入文档时是否复用其他使用同一嵌入模型的知识库中
+                内容相同的文本块的向量
+
+        """
         Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
         self.provider_manager = provider_manager
+        faiss_concurrency.set_max_workers(faiss_workers)
+        self.cross_kb_dedup = cross_kb_dedup
         self._session_deleted_callback_registered = False
 
         self.kb_insts: dict[str, KBHelper] = {}
@@ -62,6 +75,7 @@ class KnowledgeBaseManager:
         self.kb_db = KBSQLiteDatabase(DB_PATH.as_posix())
         await self.kb_db.initialize()
         await self.kb_db.migrate_to_v1()
+        await self.kb_db.migrate_to_v2()
         logger.info(f"KnowledgeBase database initialized: {DB_PATH}")
 
     async def load_kbs(self):
@@ -74,6 +88,7 @@ class KnowledgeBaseManager:
                 provider_manager=self.provider_manager,
                 kb_root_dir=FILES_PATH,
                 chunker=CHUNKER,
+                vector_peers=self._vector_peers if self.cross_kb_dedup else None,
             )
             await kb_helper.initialize()
             self.kb_insts[record.kb_id] = kb_helper
@@ -90,10 +105,13 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
     ) -> KBHelper:
         """创建新的知识库实例"""
         if embedding_provider_id is None:
             raise ValueError("创建知识库时必须提供embedding_provider_id")
+        if index_type is not None and index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}")
         kb = KnowledgeBase(
             kb_name=kb_name,
             description=description,
@@ -105,6 +123,7 @@ class KnowledgeBaseManager:
             top_k_dense=top_k_dense if top_k_dense is not None else 50,
             top_k_sparse=top_k_sparse if top_k_sparse is not None else 50,
             top_m_final=top_m_final if top_m_final is not None else 5,
+            index_type=index_type or "flat",
         )
         try:
             async with self.kb_db.get_db() as session:
@@ -117,6 +136,7 @@ class KnowledgeBaseManager:
                     provider_manager=self.provider_manager,
                     kb_root_dir=FILES_PATH,
                     chunker=CHUNKER,
+                    vector_peers=self._vector_peers if self.cross_kb_dedup else None,
                 )
                 await kb_helper.initialize()
                 await session.commit()
@@ -127,6 +147,9 @@ class KnowledgeBaseManager:
                 raise ValueError(f"知识库名称 '{kb_name}' 已存在")
             raise
 
+    def _vector_peers(self) -> list[KBHelper]:
+        return list(self.kb_insts.values())
+
     async def get_kb(self, kb_id: str) -> KBHelper | None:
         """获取知识库实例"""
         if kb_id in self.kb_insts:
@@ -150,6 +173,7 @@ class KnowledgeBaseManager:
             await session.delete(kb_helper.kb)
             await session.commit()
 
+        self.kb_db.invalidate_name_cache(kb_id=kb_id, drop_documents=True)
         self.kb_insts.pop(kb_id, None)
         return True
 
@@ -171,11 +195,14 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
     ) -> KBHelper | None:
         """更新知识库实例"""
         kb_helper = await self.get_kb(kb_id)
         if not kb_helper:
             return None
+        if index_type is not None and index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}")
 
         kb = kb_helper.kb
         if kb_name is not None:
@@ -197,11 +224,18 @@ class KnowledgeBaseManager:
             kb.top_k_sparse = top_k_sparse
         if top_m_final is not None:
             kb.top_m_final = top_m_final
+        if index_type is not None:
+            kb.index_type = index_type
         async with self.kb_db.get_db() as session:
             session.add(kb)
             await session.commit()
             await session.refresh(kb)
 
+        if kb_name is not None:
+            self.kb_db.invalidate_name_cache(kb_id=kb_id)
+        if index_type is not None:
+            kb_helper.set_index_type(index_type)
+
         return kb_helper
 
     async def retrieve(
@@ -284,6 +318,7 @@ class KnowledgeBaseManager:
                 logger.error(f"关闭知识库 {kb_id} 失败: {e}")
 
         self.kb_insts.clear()
+        faiss_concurrency.shutdown(wait=False)
 
         # 关闭元数据数据库
         if hasattr(self, "kb_db") and self.kb_db:
@@ -4,6 +4,7 @@
 """
 
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 
 
@@ -49,3 +50,23 @@ class BaseParser(ABC):
             ParseResult: 解析结果
 
         """
+
+    async def parse_stream(
+        self,
+        file_content: bytes,
+        file_name: str,
+    ) -> AsyncIterator[ParseResult]:
+        """分段解析文档
+
+        逐段产出解析结果 (如 PDF 的每一页), 避免一次性在内存中构造完整文本。
+        默认实现将 parse 的结果作为一段产出。
+
+        Args:
+            file_content: 文件内容
+            file_name: 文件名
+
+        Yields:
+            ParseResult: 每一段的解析结果
+
+        """
+        yield await self.parse(file_content, file_name)
@@ -3,7 +3,9 @@
 支持解析 PDF 文件中的文本和图片资源。
 """
 
+import asyncio
 import io
+from collections.abc import AsyncIterator
 
 from pypdf import PdfReader
 
@@ -31,71 +33,95 @@ class PDFParser(BaseParser):
             ParseResult: 包含文本和图片的解析结果
 
         """
-        pdf_file = io.BytesIO(file_content)
-        reader = PdfReader(pdf_file)
-
         text_parts = []
         media_items = []
+        async for page_result in self.parse_stream(file_content, file_name):
+            if page_result.text:
+                text_parts.append(page_result.text)
+            media_items.extend(page_result.media)
 
-        # 提取文本
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_parts.append(text)
+        full_text = "\n\n".join(text_parts)
+        return ParseResult(text=full_text, media=media_items)
+
+    async def parse_stream(
+        self,
+        file_content: bytes,
+        file_name: str,
+    ) -> AsyncIterator[ParseResult]:
+        """逐页解析 PDF 文件, 每页产出一个包含该页文本和图片的结果"""
+        pdf_file = io.BytesIO(file_content)
+        reader = await asyncio.to_thread(PdfReader, pdf_file)
 
-        # 提取图片
         image_counter = 0
         for page_num, page in enumerate(reader.pages):
-            try:
-                # 安全检查 Resources
-                if "/Resources" not in page:
-                    continue
+            text, media_items = await asyncio.to_thread(
+                self._parse_page,
+                page,
+                page_num,
+                image_counter,
+            )
+            image_counter += len(media_items)
+            yield ParseResult(text=text or "", media=media_items)
+
+    @staticmethod
+    def _parse_page(
+        page,
+        page_num: int,
+        image_counter: int,
+    ) -> tuple[str, list[MediaItem]]:
+        # 提取文本
+        text = page.extract_text()
 
-                resources = page["/Resources"]
-                if not resources or "/XObject" not in resources:  # type: ignore
-                    continue
+        # 提取图片
+        media_items = []
+        try:
+            # 安全检查 Resources
+            if "/Resources" not in page:
+                return text, media_items
 
-                xobjects = resources["/XObject"].get_object()  # type: ignore
-                if not xobjects:
-                    continue
+            resources = page["/Resources"]
+            if not resources or "/XObject" not in resources:  # type: ignore
+                return text, media_items
+
+            xobjects = resources["/XObject"].get_object()  # type: ignore
+            if not xobjects:
+                return text, media_items
 
-                for obj_name in xobjects:
-                    try:
-                        obj = xobjects[obj_name]
-
-                        if obj.get("/Subtype") != "/Image":
-                            continue
-
-                        # 提取图片数据
-                        image_data = obj.get_data()
-
-                        # 确定格式
-                        filter_type = obj.get("/Filter", "")
-                        if filter_type == "/DCTDecode":
-                            ext = "jpg"
-                            mime_type = "image/jpeg"
-                        elif filter_type == "/FlateDecode":
-                            ext = "png"
-                            mime_type = "image/png"
-                        else:
-                            ext = "png"
-                            mime_type = "image/png"
-
-                        image_counter += 1
-                        media_items.append(
-                            MediaItem(
-                                media_type="image",
-                                file_name=f"page_{page_num}_img_{image_counter}.{ext}",
-                                content=image_data,
-                                mime_type=mime_type,
-                            ),
-                        )
-                    except Exception:
-                        # 单个图片提取失败不影响整体
+            for obj_name in xobjects:
+                try:
+                    obj = xobjects[obj_name]
+
+                    if obj.get("/Subtype") != "/Image":
                         continue
-            except Exception:
-                # 页面处理失败不影响其他页面
-                continue
 
-        full_text = "\n\n".join(text_parts)
-        return ParseResult(text=full_text, media=media_items)
+                    # 提取图片数据
+                    image_data = obj.get_data()
+
+                    # 确定格式
+                    filter_type = obj.get("/Filter", "")
+                    if filter_type == "/DCTDecode":
+                        ext = "jpg"
+                        mime_type = "image/jpeg"
+                    elif filter_type == "/FlateDecode":
+                        ext = "png"
+                        mime_type = "image/png"
+                    else:
+                        ext = "png"
+                        mime_type = "image/png"
+
+                    image_counter += 1
+                    media_items.append(
+                        MediaItem(
+                            media_type="image",
+                            file_name=f"page_{page_num}_img_{image_counter}.{ext}",
+                            content=image_data,
+                            mime_type=mime_type,
+                        ),
+                    )
+                except Exception:
+                    # 单个图片提取失败不影响整体
+                    continue
+        except Exception:
+            # 页面处理失败不影响其他页面
+            pass
+        return text, media_items
@@ -0,0 +1,488 @@
+"""BM25 倒排索引
+
+为每个知识库维护一份持久化的 BM25 倒排索引, 在上传/删除时增量更新,
+查询时只访问包含查询词的倒排链, 不再对全量语料重新分词和建索引。
+
+索引同时充当文本块的分词缓存: 每个文本块按 chunk_id 和内容哈希保存
+已过滤停用词的词频, 内容未变化的文本块 (包括内容相同的重复文本块)
+永远只会被 jieba 分词一次。
+
+持久化分为快照 (`bm25_index.json`) 和追加写的增量日志 (`bm25_index.json.log`,
+每行一条 JSON 记录)。增删文本块只向日志追加记录, 日志大小超过快照时才重写快照
+并清空日志, 加载时先读快照再重放日志。
+"""
+
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from collections.abc import Callable, Collection, Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import jieba
+
+from astrbot.core import logger
+
+INDEX_VERSION = 2
+DEFAULT_COMPACT_BYTES = 1024 * 1024
+"""增量日志超过该大小且超过快照大小时, 重写快照"""
+
+OP_ADD = "A"
+OP_DELETE = "D"
+OP_MOVE = "M"
+
+
+@lru_cache(maxsize=1)
+def load_stopwords() -> frozenset[str]:
+    """加载停用词表 (hit_stopwords.txt)"""
+    with open(
+        os.path.join(os.path.dirname(__file__), "hit_stopwords.txt"),
+        encoding="utf-8",
+    ) as f:
+        return frozenset(word.strip() for word in f.read().splitlines() if word.strip())
+
+
+def tokenize(text: str) -> list[str]:
+    """使用 jieba 分词并过滤停用词"""
+    stopwords = load_stopwords()
+    return [word for word in jieba.cut(text) if word not in stopwords]
+
+
+def content_hash(text: str) -> str:
+    """计算文本块内容的哈希"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class IndexedChunk:
+    """索引中的一个文本块"""
+
+    int_id: int
+    """文本块在向量库 (DocumentStorage / FAISS) 中的整数 ID"""
+    doc_id: str
+    """文本块所属的知识库文档 ID"""
+    chunk_index: int
+    content_hash: str
+    term_freqs: dict[str, int] = field(default_factory=dict)
+    length: int = 0
+
+
+class BM25Index:
+    """持久化的增量 BM25 (Okapi) 倒排索引
+
+    打分与 `rank_bm25.BM25Okapi` 保持一致。索引以 JSON 快照加增量日志的形式保存在
+    知识库目录中, 只持久化每个文本块的内容哈希和词频, 倒排链在加载时重建。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        tokenizer: Callable[[str], list[str]] = tokenize,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+    ):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.compact_bytes = compact_bytes
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.tokenizer = tokenizer
+
+        self.chunks: dict[str, IndexedChunk] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.total_length = 0
+        self.synced = False
+        """索引是否已确认与向量库中的文本块一致"""
+
+        self._hash_refs: dict[str, set[str]] = {}
+        """内容哈希 -> 拥有该内容的 chunk_id 集合, 用于复用分词结果"""
+        self._doc_chunks: dict[str, set[str]] = {}
+        """知识库文档 ID -> 该文档的 chunk_id 集合"""
+        self._pending: list[str] = []
+        """尚未写入增量日志的记录"""
+        self._snapshot_bytes = 0
+        self._log_bytes = 0
+        self._avg_idf: float | None = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_length / len(self.chunks) if self.chunks else 0.0
+
+    def load(self) -> bool:
+        """从磁盘加载快照并重放增量日志, 文件不存在、版本不符或损坏时返回 False"""
+        has_snapshot = os.path.exists(self.path)
+        if not has_snapshot and not os.path.exists(self.log_path):
+            return False
+        try:
+            self._clear()
+            self._snapshot_bytes = 0
+            if has_snapshot:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") != INDEX_VERSION:
+                    return False
+                self._snapshot_bytes = os.path.getsize(self.path)
+                for chunk_id, record in data["chunks"].items():
+                    self._load_chunk(chunk_id, *record)
+            self._replay()
+        except Exception as e:
+            logger.warning(f"加载 BM25 索引 {self.path} 失败, 将重新构建: {e}")
+            self._clear()
+            return False
+        return True
+
+    def _load_chunk(
+        self,
+        chunk_id: str,
+        int_id: int,
+        doc_id: str,
+        chunk_index: int,
+        c_hash: str,
+        term_freqs: dict[str, int],
+    ):
+        term_freqs = self.cached_term_freqs(chunk_id, c_hash) or term_freqs
+        self._remove(chunk_id)
+        self._add(
+            chunk_id, IndexedChunk(int_id, doc_id, chunk_index, c_hash), term_freqs
+        )
+
+    def _replay(self):
+        """重放增量日志。日志在快照写入后才清空, 重放需要是幂等的"""
+        self._log_bytes = 0
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    op, chunk_id, *args = json.loads(line)
+                except ValueError:
+                    # 通常是崩溃时写了一半的最后一条记录, 与向量库的差异由重建修复
+                    logger.warning(
+                        f"BM25 索引日志 {self.log_path} 存在损坏的记录, 已忽略"
+                    )
+                    return
+                if op == OP_ADD:
+                    self._load_chunk(chunk_id, *args)
+                elif op == OP_DELETE:
+                    self._remove(chunk_id)
+                elif op == OP_MOVE and chunk_id in self.chunks:
+                    self.chunks[chunk_id].chunk_index = args[0]
+                self._log_bytes += len(line)
+
+    def _record(self, *record):
+        self._pending.append(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n",
+        )
+
+    def flush(self):
+        """将尚未持久化的修改追加到增量日志, 日志过大时重写快照"""
+        if self._pending:
+            data = "".join(self._pending).encode("utf-8")
+            with open(self.log_path, "ab") as f:
+                f.write(data)
+            self._pending.clear()
+            self._log_bytes += len(data)
+        if self._log_bytes > max(self.compact_bytes, self._snapshot_bytes):
+            self.save()
+
+    def save(self):
+        """将完整的索引快照原子地写入磁盘, 并清空增量日志"""
+        data = {
+            "version": INDEX_VERSION,
+            "chunks": {
+                chunk_id: [
+                    c.int_id,
+                    c.doc_id,
+                    c.chunk_index,
+                    c.content_hash,
+                    c.term_freqs,
+                ]
+                for chunk_id, c in self.chunks.items()
+            },
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._snapshot_bytes = os.path.getsize(self.path)
+        with open(self.log_path, "wb"):
+            pass
+        self._log_bytes = 0
+        self._pending.clear()
+
+    def cached_term_freqs(self, chunk_id: str, c_hash: str) -> dict[str, int] | None:
+        """查找已缓存的分词结果
+
+        优先使用同一 chunk_id 的结果, 其次复用任意内容相同的文本块的结果。
+        """
+        chunk = self.chunks.get(chunk_id)
+        if chunk is not None and chunk.content_hash == c_hash:
+            return chunk.term_freqs
+        owners = self._hash_refs.get(c_hash)
+        if owners:
+            return self.chunks[next(iter(owners))].term_freqs
+        return None
+
+    def find_by_hash(self, c_hash: str) -> IndexedChunk | None:
+        """查找任意一个内容哈希相同的文本块"""
+        owners = self._hash_refs.get(c_hash)
+        if owners:
+            return self.chunks[next(iter(owners))]
+        return None
+
+    def document_chunks(self, doc_id: str) -> dict[str, IndexedChunk]:
+        """某个知识库文档的全部文本块"""
+        return {
+            chunk_id: self.chunks[chunk_id]
+            for chunk_id in self._doc_chunks.get(doc_id, ())
+        }
+
+    async def tokenize_chunks(
+        self,
+        chunks: list[tuple[str, str]],
+    ) -> list[tuple[str, dict[str, int]]]:
+        """对 (chunk_id, text) 分词, 命中缓存的文本块不会再次分词
+
+        同一批次中内容相同的文本块也只分词一次, 分词在线程池中执行。
+
+        Returns:
+            list[tuple[str, dict[str, int]]]: 与输入一一对应的 (内容哈希, 词频)
+
+        """
+        hashes = [content_hash(text) for _, text in chunks]
+        results: list[dict[str, int] | None] = [
+            self.cached_term_freqs(chunk_id, c_hash)
+            for (chunk_id, _), c_hash in zip(chunks, hashes)
+        ]
+        pending: dict[str, str] = {}
+        for (_, text), c_hash, term_freqs in zip(chunks, hashes, results):
+            if term_freqs is None:
+                pending.setdefault(c_hash, text)
+
+        if pending:
+            tokenized = await asyncio.to_thread(
+                lambda: {
+                    c_hash: dict(Counter(self.tokenizer(text)))
+                    for c_hash, text in pending.items()
+                },
+            )
+            results = [
+                term_freqs if term_freqs is not None else tokenized[c_hash]
+                for term_freqs, c_hash in zip(results, hashes)
+            ]
+        return list(zip(hashes, results))  # type: ignore
+
+    async def add_chunks(
+        self,
+        chunks: Iterable[tuple[str, int, str, int, str]],
+        persist: bool = True,
+    ):
+        """增量添加文本块并持久化
+
+        Args:
+            chunks: (chunk_id, int_id, doc_id, chunk_index, text) 元组
+            persist: 是否立即写入增量日志。分批添加时可只在最后调用 save_async,
+                中途崩溃导致的不一致会在下次加载时通过重建修复
+
+        """
+        chunks = list(chunks)
+        tokenized = await self.tokenize_chunks(
+            [(chunk[0], chunk[4]) for chunk in chunks],
+        )
+        async with self._lock:
+            for (chunk_id, int_id, doc_id, chunk_index, _), (
+                c_hash,
+                term_freqs,
+            ) in zip(chunks, tokenized):
+                self._remove(chunk_id)
+                self._add(
+                    chunk_id,
+                    IndexedChunk(int_id, doc_id, chunk_index, c_hash),
+                    term_freqs,
+                )
+                self._record(
+                    OP_ADD, chunk_id, int_id, doc_id, chunk_index, c_hash, term_freqs
+                )
+            if persist:
+                await asyncio.to_thread(self.flush)
+
+    async def update_chunk_indexes(
+        self,
+        chunk_indexes: dict[str, int],
+        persist: bool = True,
+    ):
+        """更新文本块在文档中的位置"""
+        async with self._lock:
+            for chunk_id, chunk_index in chunk_indexes.items():
+                chunk = self.chunks.get(chunk_id)
+                if chunk is not None:
+                    chunk.chunk_index = chunk_index
+                    self._record(OP_MOVE, chunk_id, chunk_index)
+            if persist:
+                await asyncio.to_thread(self.flush)
+
+    async def save_async(self):
+        """持久化之前以 persist=False 进行的修改"""
+        async with self._lock:
+            await asyncio.to_thread(self.flush)
+
+    async def remove_chunks(self, chunk_ids: Iterable[str]) -> int:
+        """增量删除文本块并持久化, 返回删除的数量"""
+        async with self._lock:
+            removed = 0
+            for chunk_id in list(chunk_ids):
+                if self._remove(chunk_id):
+                    self._record(OP_DELETE, chunk_id)
+                    removed += 1
+            if removed:
+                await asyncio.to_thread(self.flush)
+            return removed
+
+    async def remove_document(self, doc_id: str) -> int:
+        """删除某个知识库文档的所有文本块"""
+        return await self.remove_chunks(self.document_chunks(doc_id))
+
+    async def rebuild(self, chunks: Iterable[tuple[str, int, str, int, str]]):
+        """根据 (chunk_id, int_id, doc_id, chunk_index, text) 重建索引
+
+        已在索引中且内容未变化的文本块会复用缓存的分词结果, 只有新增或内容变化的
+        文本块需要重新分词。
+        """
+        chunks = list(chunks)
+        tokenized = await self.tokenize_chunks(
+            [(chunk[0], chunk[4]) for chunk in chunks],
+        )
+        async with self._lock:
+            self._clear()
+            for (chunk_id, int_id, doc_id, chunk_index, _), (
+                c_hash,
+                term_freqs,
+            ) in zip(chunks, tokenized):
+                self._add(
+                    chunk_id,
+                    IndexedChunk(int_id, doc_id, chunk_index, c_hash),
+                    term_freqs,
+                )
+            await asyncio.to_thread(self.save)
+            self.synced = True
+
+    def search(
+        self,
+        query_tokens: list[str],
+        top_k: int,
+        exclude_docs: Collection[str] | None = None,
+    ) -> list[tuple[str, float]]:
+        """检索得分最高的 top_k 个文本块
+
+        只遍历查询词的倒排链, 得分为 0 的文本块以及属于 exclude_docs 中文档的
+        文本块不会返回。
+
+        Returns:
+            list[tuple[str, float]]: (chunk_id, score), 按得分降序
+
+        """
+        if not self.chunks or top_k <= 0:
+            return []
+
+        n = len(self.chunks)
+        avgdl = self.avgdl
+        scores: dict[str, float] = {}
+        for token in query_tokens:
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = self._idf(len(postings), n)
+            for chunk_id, tf in postings.items():
+                dl = self.chunks[chunk_id].length
+                denom = tf + self.k1 * (1 - self.b + self.b * dl / avgdl)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * (
+                    tf * (self.k1 + 1) / denom
+                )
+
+        return heapq.nlargest(
+            top_k,
+            (
+                (chunk_id, score)
+                for chunk_id, score in scores.items()
+                if score != 0
+                and not (exclude_docs and self.chunks[chunk_id].doc_id in exclude_docs)
+            ),
+            key=lambda item: item[1],
+        )
+
+    def _idf(self, df: int, n: int) -> float:
+        idf = math.log(n - df + 0.5) - math.log(df + 0.5)
+        if idf < 0:
+            return self.epsilon * self._average_idf()
+        return idf
+
+    def _average_idf(self) -> float:
+        # 与 BM25Okapi 相同, 负 IDF 以 epsilon * 平均 IDF 代替。
+        # 平均 IDF 需要遍历整个词表, 因此缓存到下一次索引变更。
+        if self._avg_idf is None:
+            n = len(self.chunks)
+            if not self.postings:
+                self._avg_idf = 0.0
+            else:
+                total = sum(
+                    math.log(n - len(p) + 0.5) - math.log(len(p) + 0.5)
+                    for p in self.postings.values()
+                )
+                self._avg_idf = total / len(self.postings)
+        return self._avg_idf
+
+    def _add(self, chunk_id: str, chunk: IndexedChunk, term_freqs: dict[str, int]):
+        # 内容相同的文本块共享同一个词频字典, 该字典在加入索引后不再修改
+        chunk.term_freqs = term_freqs
+        chunk.length = sum(term_freqs.values())
+        self.chunks[chunk_id] = chunk
+        self._hash_refs.setdefault(chunk.content_hash, set()).add(chunk_id)
+        self._doc_chunks.setdefault(chunk.doc_id, set()).add(chunk_id)
+        self.total_length += chunk.length
+        for term, tf in term_freqs.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        self._avg_idf = None
+
+    def _remove(self, chunk_id: str) -> bool:
+        chunk = self.chunks.pop(chunk_id, None)
+        if chunk is None:
+            return False
+        owners = self._hash_refs.get(chunk.content_hash)
+        if owners is not None:
+            owners.discard(chunk_id)
+            if not owners:
+                del self._hash_refs[chunk.content_hash]
+        doc_chunks = self._doc_chunks.get(chunk.doc_id)
+        if doc_chunks is not None:
+            doc_chunks.discard(chunk_id)
+            if not doc_chunks:
+                del self._doc_chunks[chunk.doc_id]
+        self.total_length -= chunk.length
+        for term in chunk.term_freqs:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(chunk_id, None)
+            if not postings:
+                del self.postings[term]
+        self._avg_idf = None
+        return True
+
+    def _clear(self):
+        self.chunks.clear()
+        self.postings.clear()
+        self._hash_refs.clear()
+        self._doc_chunks.clear()
+        self.total_length = 0
+        self._avg_idf = None
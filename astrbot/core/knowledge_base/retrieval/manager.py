@@ -3,8 +3,11 @@
 协调稠密检索、稀疏检索和 Rerank,提供统一的检索接口
 """
 
+import asyncio
+import json
 import time
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from astrbot import logger
 from astrbot.core.db.vec_db.base import Result
@@ -12,9 +15,10 @@ from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
 from astrbot.core.knowledge_base.retrieval.rank_fusion import RankFusion
 from astrbot.core.knowledge_base.retrieval.sparse_retriever import SparseRetriever
-from astrbot.core.provider.provider import RerankProvider
+from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
 
-from ..kb_helper import KBHelper
+if TYPE_CHECKING:
+    from ..kb_helper import KBHelper
 
 
 @dataclass
@@ -62,7 +66,7 @@ class RetrievalManager:
         self,
         query: str,
         kb_ids: list[str],
-        kb_id_helper_map: dict[str, KBHelper],
+        kb_id_helper_map: dict[str, "KBHelper"],
         top_k_fusion: int = 20,
         top_m_final: int = 5,
     ) -> list[RetrievalResult]:
@@ -87,47 +91,51 @@ class RetrievalManager:
         if not kb_ids:
             return []
 
-        kb_options: dict = {}
-        new_kb_ids = []
+        kb_helpers: list[KBHelper] = []
         for kb_id in kb_ids:
             kb_helper = kb_id_helper_map.get(kb_id)
             if kb_helper:
-                kb = kb_helper.kb
-                kb_options[kb_id] = {
-                    "top_k_dense": kb.top_k_dense or 50,
-                    "top_k_sparse": kb.top_k_sparse or 50,
-                    "top_m_final": kb.top_m_final or 5,
-                    "vec_db": kb_helper.vec_db,
-                    "rerank_provider_id": kb.rerank_provider_id,
-                }
-                new_kb_ids.append(kb_id)
+                kb_helpers.append(kb_helper)
             else:
                 logger.warning(f"知识库 ID {kb_id} 实例未找到, 已跳过该知识库的检索")
 
-        kb_ids = new_kb_ids
-
-        # 1. 稠密检索
-        time_start = time.time()
-        dense_results = await self._dense_retrieve(
-            query=query,
-            kb_ids=kb_ids,
-            kb_options=kb_options,
+        sparse_indexes = await asyncio.gather(
+            *(kb_helper.ensure_sparse_index() for kb_helper in kb_helpers),
         )
-        time_end = time.time()
-        logger.debug(
-            f"Dense retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(dense_results)} results.",
-        )
-
-        # 2. 稀疏检索
-        time_start = time.time()
-        sparse_results = await self.sparse_retriever.retrieve(
-            query=query,
-            kb_ids=kb_ids,
-            kb_options=kb_options,
-        )
-        time_end = time.time()
-        logger.debug(
-            f"Sparse retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(sparse_results)} results.",
+        kb_options: dict = {}
+        for kb_helper, sparse_index in zip(kb_helpers, sparse_indexes):
+            kb = kb_helper.kb
+            kb_options[kb.kb_id] = {
+                "top_k_dense": kb.top_k_dense or 50,
+                "top_k_sparse": kb.top_k_sparse or 50,
+                "top_m_final": kb.top_m_final or 5,
+                "vec_db": kb_helper.vec_db,
+                "sparse_index": sparse_index,
+                "pending_docs": kb_helper.pending_docs,
+                "rerank_provider_id": kb.rerank_provider_id,
+            }
+        kb_ids = list(kb_options)
+
+        # 1. 稠密检索和 2. 稀疏检索并发执行
+        dense_results, sparse_results = await asyncio.gather(
+            self._timed(
+                "Dense",
+                kb_ids,
+                self._dense_retrieve(
+                    query=query,
+                    kb_ids=kb_ids,
+                    kb_options=kb_options,
+                ),
+            ),
+            self._timed(
+                "Sparse",
+                kb_ids,
+                self.sparse_retriever.retrieve(
+                    query=query,
+                    kb_ids=kb_ids,
+                    kb_options=kb_options,
+                ),
+            ),
         )
 
         # 3. 结果融合
@@ -142,26 +150,30 @@ class RetrievalManager:
             f"Rank fusion took {time_end - time_start:.2f}s and returned {len(fused_results)} results.",
         )
 
-        # 4. 转换为 RetrievalResult (获取元数据)
+        # 4. 转换为 RetrievalResult (批量获取文档名和知识库名)
+        names = await self.kb_db.get_document_names(
+            [fr.doc_id for fr in fused_results],
+        )
         retrieval_results = []
         for fr in fused_results:
-            metadata_dict = await self.kb_db.get_document_with_metadata(fr.doc_id)
-            if metadata_dict:
-                retrieval_results.append(
-                    RetrievalResult(
-                        chunk_id=fr.chunk_id,
-                        doc_id=fr.doc_id,
-                        doc_name=metadata_dict["document"].doc_name,
-                        kb_id=fr.kb_id,
-                        kb_name=metadata_dict["knowledge_base"].kb_name,
-                        content=fr.content,
-                        score=fr.score,
-                        metadata={
-                            "chunk_index": fr.chunk_index,
-                            "char_count": len(fr.content),
-                        },
-                    ),
-                )
+            if fr.doc_id not in names:
+                continue
+            doc_name, kb_name = names[fr.doc_id]
+            retrieval_results.append(
+                RetrievalResult(
+                    chunk_id=fr.chunk_id,
+                    doc_id=fr.doc_id,
+                    doc_name=doc_name,
+                    kb_id=fr.kb_id,
+                    kb_name=kb_name,
+                    content=fr.content,
+                    score=fr.score,
+                    metadata={
+                        "chunk_index": fr.chunk_index,
+                        "char_count": len(fr.content),
+                    },
+                ),
+            )
 
         # 5. Rerank
         first_rerank = None
@@ -190,6 +202,16 @@ class RetrievalManager:
 
         return retrieval_results[:top_m_final]
 
+    @staticmethod
+    async def _timed(name: str, kb_ids: list[str], coro):
+        time_start = time.time()
+        results = await coro
+        time_end = time.time()
+        logger.debug(
+            f"{name} retrieval across {len(kb_ids)} bases took {time_end - time_start:.2f}s and returned {len(results)} results.",
+        )
+        return results
+
     async def _dense_retrieve(
         self,
         query: str,
@@ -198,7 +220,8 @@ class RetrievalManager:
     ):
         """稠密检索 (向量相似度)
 
-        为每个知识库使用独立的向量数据库进行检索,然后合并结果。
+        各知识库并发检索, 然后合并结果。使用同一个 Embedding Provider 的知识库共享
+        查询向量, 每个 Provider 只调用一次嵌入接口。
 
         Args:
             query: 查询文本
@@ -209,27 +232,57 @@ class RetrievalManager:
             List[Result]: 检索结果列表
 
         """
-        all_results: list[Result] = []
+        kb_ids_by_provider: dict[EmbeddingProvider, list[str]] = {}
         for kb_id in kb_ids:
             if kb_id not in kb_options:
                 continue
+            vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
+            kb_ids_by_provider.setdefault(vec_db.embedding_provider, []).append(kb_id)
+
+        providers = list(kb_ids_by_provider)
+        embeddings = await asyncio.gather(
+            *(provider.get_embedding(query) for provider in providers),
+            return_exceptions=True,
+        )
+
+        async def _retrieve(kb_id: str, embedding: list[float]) -> list[Result]:
+            vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
+            dense_k = int(kb_options[kb_id]["top_k_dense"])
             try:
-                vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
-                dense_k = int(kb_options[kb_id]["top_k_dense"])
-                vec_results = await vec_db.retrieve(
+                results = await vec_db.retrieve(
                     query=query,
                     k=dense_k,
                     fetch_k=dense_k * 2,
                     rerank=False,  # 稠密检索阶段不进行 rerank
                     metadata_filters={"kb_id": kb_id},
+                    query_embedding=embedding,
                 )
-
-                all_results.extend(vec_results)
             except Exception as e:
-                from astrbot.core import logger
-
                 logger.warning(f"知识库 {kb_id} 稠密检索失败: {e}")
+                return []
+            # 过滤导入尚未完成的文档的文本块
+            pending = kb_options[kb_id].get("pending_docs")
+            if pending:
+                results = [
+                    r
+                    for r in results
+                    if json.loads(r.data["metadata"])["kb_doc_id"] not in pending
+                ]
+            return results
+
+        tasks = []
+        for provider, embedding in zip(providers, embeddings):
+            if isinstance(embedding, BaseException):
+                for kb_id in kb_ids_by_provider[provider]:
+                    logger.warning(f"知识库 {kb_id} 稠密检索失败: {embedding}")
                 continue
+            tasks.extend(
+                _retrieve(kb_id, embedding) for kb_id in kb_ids_by_provider[provider]
+            )
+
+        all_results: list[Result] = []
+        for vec_results in await asyncio.gather(*tasks):
+            all_results.extend(vec_results)
 
         # 按相似度排序并返回 top_k
         all_results.sort(key=lambda x: x.similarity, reverse=True)
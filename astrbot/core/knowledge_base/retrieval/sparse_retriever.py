@@ -4,14 +4,15 @@
 """
 
 import json
-import os
 from dataclasses import dataclass
 
-import jieba
-from rank_bm25 import BM25Okapi
-
 from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.retrieval.bm25_index import (
+    BM25Index,
+    load_stopwords,
+    tokenize,
+)
 
 
 @dataclass
@@ -42,15 +43,7 @@ class SparseRetriever:
 
         """
         self.kb_db = kb_db
-        self._index_cache = {}  # 缓存 BM25 索引
-
-        with open(
-            os.path.join(os.path.dirname(__file__), "hit_stopwords.txt"),
-            encoding="utf-8",
-        ) as f:
-            self.hit_stopwords = {
-                word.strip() for word in set(f.read().splitlines()) if word.strip()
-            }
+        self.hit_stopwords = load_stopwords()
 
     async def retrieve(
         self,
@@ -69,68 +62,55 @@ class SparseRetriever:
             List[SparseResult]: 检索结果列表
 
         """
-        # 1. 获取所有相关块
+        tokenized_query = tokenize(query)
+        if not tokenized_query:
+            return []
+
+        # 1. 在每个知识库的 BM25 索引中检索
         top_k_sparse = 0
-        chunks = []
+        results: list[SparseResult] = []
         for kb_id in kb_ids:
-            vec_db: FaissVecDB = kb_options.get(kb_id, {}).get("vec_db")
-            if not vec_db:
+            options = kb_options.get(kb_id, {})
+            vec_db: FaissVecDB = options.get("vec_db")
+            sparse_index: BM25Index | None = options.get("sparse_index")
+            if not vec_db or sparse_index is None:
+                continue
+            kb_top_k = options.get("top_k_sparse", 50)
+            top_k_sparse += kb_top_k
+
+            hits = sparse_index.search(
+                tokenized_query,
+                kb_top_k,
+                exclude_docs=options.get("pending_docs"),
+            )
+            if not hits:
                 continue
-            result = await vec_db.document_storage.get_documents(
+
+            # 2. 仅获取命中文本块的内容
+            int_ids = [sparse_index.chunks[chunk_id].int_id for chunk_id, _ in hits]
+            docs = await vec_db.document_storage.get_documents(
                 metadata_filters={},
+                ids=int_ids,
                 limit=None,
                 offset=None,
             )
-            chunk_mds = [json.loads(doc["metadata"]) for doc in result]
-            result = [
-                {
-                    "chunk_id": doc["doc_id"],
-                    "chunk_index": chunk_md["chunk_index"],
-                    "doc_id": chunk_md["kb_doc_id"],
-                    "kb_id": kb_id,
-                    "text": doc["text"],
-                }
-                for doc, chunk_md in zip(result, chunk_mds)
-            ]
-            chunks.extend(result)
-            top_k_sparse += kb_options.get(kb_id, {}).get("top_k_sparse", 50)
-
-        if not chunks:
-            return []
-
-        # 2. 准备文档和索引
-        corpus = [chunk["text"] for chunk in chunks]
-        tokenized_corpus = [list(jieba.cut(doc)) for doc in corpus]
-        tokenized_corpus = [
-            [word for word in doc if word not in self.hit_stopwords]
-            for doc in tokenized_corpus
-        ]
-
-        # 3. 构建 BM25 索引
-        bm25 = BM25Okapi(tokenized_corpus)
-
-        # 4. 执行检索
-        tokenized_query = list(jieba.cut(query))
-        tokenized_query = [
-            word for word in tokenized_query if word not in self.hit_stopwords
-        ]
-        scores = bm25.get_scores(tokenized_query)
-
-        # 5. 排序并返回 Top-K
-        results = []
-        for idx, score in enumerate(scores):
-            chunk = chunks[idx]
-            results.append(
-                SparseResult(
-                    chunk_id=chunk["chunk_id"],
-                    chunk_index=chunk["chunk_index"],
-                    doc_id=chunk["doc_id"],
-                    kb_id=chunk["kb_id"],
-                    content=chunk["text"],
-                    score=float(score),
-                ),
-            )
-
+            docs_by_chunk_id = {doc["doc_id"]: doc for doc in docs}
+            for chunk_id, score in hits:
+                doc = docs_by_chunk_id.get(chunk_id)
+                if not doc:
+                    continue
+                chunk_md = json.loads(doc["metadata"])
+                results.append(
+                    SparseResult(
+                        chunk_id=chunk_id,
+                        chunk_index=chunk_md["chunk_index"],
+                        doc_id=chunk_md["kb_doc_id"],
+                        kb_id=kb_id,
+                        content=doc["text"],
+                        score=float(score),
+                    ),
+                )
+
+        # 3. 排序并返回 Top-K
         results.sort(key=lambda x: x.score, reverse=True)
-        # return results[: len(results) // len(kb_ids)]
         return results[:top_k_sparse]
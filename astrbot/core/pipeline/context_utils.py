@@ -1,4 +1,5 @@
 import inspect
+import time
 import traceback
 import typing as T
 
@@ -8,6 +9,8 @@ from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import EventType, star_handlers_registry
 
+from .metrics import pipeline_metrics
+
 
 async def call_handler(
     event: AstrMessageEvent,
@@ -95,7 +98,19 @@ async def call_event_hook(
             logger.debug(
                 f"hook({hook_type.name}) -> {star_map[handler.handler_module_path].name} - {handler.handler_name}",
             )
-            await handler.handler(event, *args, **kwargs)
+            if pipeline_metrics.enabled:
+                start = time.perf_counter()
+                try:
+                    await handler.handler(event, *args, **kwargs)
+                finally:
+                    pipeline_metrics.observe(
+                        "hook",
+                        f"{hook_type.name}:{star_map[handler.handler_module_path].name}/{handler.handler_name}",
+                        "pre",
+                        time.perf_counter() - start,
+                    )
+            else:
+                await handler.handler(event, *args, **kwargs)
         except BaseException:
             logger.error(traceback.format_exc())
 
@@ -0,0 +1,161 @@
+"""消息管道耗时统计
+
+按配置文件 ID 聚合各阶段 (Stage) 与插件处理函数的耗时直方图。洋葱模型中的阶段分为两段计时:
+
+- pre: 从开始执行到 yield (交给后续阶段) 之前的耗时, 普通协程阶段的全部耗时也计入 pre
+- post: 后续阶段全部执行完毕、从 yield 恢复执行之后的耗时
+
+两段均不包含后续阶段本身的耗时。默认关闭, 关闭时不计时, 每个阶段只多一次布尔判断。
+"""
+
+import bisect
+from contextvars import ContextVar
+from typing import Any
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+"""直方图桶的上界 (秒), 最后还有一个 +Inf 桶"""
+
+current_conf_id: ContextVar[str] = ContextVar("pipeline_conf_id", default="default")
+"""当前正在执行的管道所属的配置文件 ID, 用于在没有 PipelineContext 的地方 (如事件钩子) 归类耗时"""
+
+
+class LatencyHistogram:
+    __slots__ = ("bounds", "buckets", "count", "max", "sum")
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """根据桶内线性插值估算分位数"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if seen + n >= rank and n:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": dict(zip([*map(str, self.bounds), "+Inf"], self.buckets)),
+        }
+
+
+class PipelineMetrics:
+    """管道耗时统计
+
+    每个直方图以 (kind, name, phase) 标识, kind 取值:
+
+    - pipeline: 整条管道, name 为 total
+    - stage: 管道阶段, name 为阶段类名
+    - handler: 插件消息处理函数, name 为 "插件名/函数名"
+    - hook: 插件事件钩子, name 为 "事件类型:插件名/函数名"
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._histograms: dict[str, dict[tuple[str, str, str], LatencyHistogram]] = {}
+
+    def observe(
+        self,
+        kind: str,
+        name: str,
+        phase: str,
+        seconds: float,
+        conf_id: str | None = None,
+    ):
+        if conf_id is None:
+            conf_id = current_conf_id.get()
+        histograms = self._histograms.setdefault(conf_id, {})
+        key = (kind, name, phase)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def snapshot(self, conf_id: str | None = None) -> dict[str, list[dict]]:
+        """返回 {配置文件 ID: [直方图, ...]}, 按总耗时降序排列"""
+        result = {}
+        for cid, histograms in self._histograms.items():
+            if conf_id is not None and cid != conf_id:
+                continue
+            items = [
+                {"kind": kind, "name": name, "phase": phase, **h.to_dict()}
+                for (kind, name, phase), h in histograms.items()
+            ]
+            items.sort(key=lambda x: x["sum"], reverse=True)
+            result[cid] = items
+        return result
+
+    def reset(self, conf_id: str | None = None):
+        if conf_id is None:
+            self._histograms.clear()
+        else:
+            self._histograms.pop(conf_id, None)
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        metric = "astrbot_pipeline_latency_seconds"
+        lines = [
+            f"# HELP {metric} AstrBot message pipeline latency by stage and handler.",
+            f"# TYPE {metric} histogram",
+        ]
+        for conf_id, histograms in self._histograms.items():
+            for (kind, name, phase), h in histograms.items():
+                labels = (
+                    f'conf_id="{_escape(conf_id)}",kind="{kind}",'
+                    f'name="{_escape(name)}",phase="{phase}"'
+                )
+                cumulative = 0
+                for bound, n in zip([*map(str, h.bounds), "+Inf"], h.buckets):
+                    cumulative += n
+                    lines.append(
+                        f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{metric}_sum{{{labels}}} {h.sum}")
+                lines.append(f"{metric}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+pipeline_metrics = PipelineMetrics()
@@ -5,6 +5,7 @@ import json
 from collections.abc import AsyncGenerator
 
 from astrbot.core import logger
+from astrbot.core.agent.context.token_counter import TiktokenTokenCounter
 from astrbot.core.agent.message import Message
 from astrbot.core.agent.response import AgentStats
 from astrbot.core.agent.tool import ToolSet
@@ -79,6 +80,7 @@ class InternalAgentSubStage(Stage):
         ]
         self.max_step: int = settings.get("max_agent_step", 30)
         self.tool_call_timeout: int = settings.get("tool_call_timeout", 60)
+        self.max_parallel_tool_calls: int = settings.get("max_parallel_tool_calls", 1)
         if isinstance(self.max_step, bool):  # workaround: #2622
             self.max_step = 30
         self.show_tool_use: bool = settings.get("show_tool_use_status", True)
@@ -107,6 +109,14 @@ class InternalAgentSubStage(Stage):
         self.llm_compress_provider_id: str = settings.get(
             "llm_compress_provider_id", ""
         )
+        self.token_counter: TiktokenTokenCounter | None = None
+        if settings.get("context_token_counter", "estimate") == "tiktoken":
+            try:
+                self.token_counter = TiktokenTokenCounter()
+            except Exception as e:
+                logger.warning(
+                    f"加载 tiktoken 分词器失败: {e}。将使用按字符估算的 Token 计数。"
+                )
         self.max_context_length = settings["max_context_length"]  # int
         self.dequeue_context_length: int = min(
             max(1, settings["dequeue_context_length"]),
@@ -137,10 +147,20 @@ class InternalAgentSubStage(Stage):
         cid = await conv_mgr.get_curr_conversation_id(umo)
         if not cid:
             cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-        conversation = await conv_mgr.get_conversation(umo, cid)
+        # 只加载最近 max_context_length + 1 轮的历史记录。截断后保存时会删除更早的记录,
+        # 因此已保存的历史记录通常不超过这个长度, 会被完整加载; 更长时加载的部分也足以
+        # 触发与完整加载时相同的按 dequeue_context_length 批量截断, 结果保持一致。
+        history_turns = (
+            self.max_context_length + 1 if self.max_context_length > 0 else -1
+        )
+        conversation = await conv_mgr.get_conversation(
+            umo, cid, history_turns=history_turns
+        )
         if not conversation:
             cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-            conversation = await conv_mgr.get_conversation(umo, cid)
+            conversation = await conv_mgr.get_conversation(
+                umo, cid, history_turns=history_turns
+            )
         if not conversation:
             raise RuntimeError("无法创建新的对话。")
         return conversation
@@ -450,12 +470,18 @@ class InternalAgentSubStage(Stage):
         token_usage = None
         if runner_stats:
             token_usage = runner_stats.token_usage.total
+            if runner_stats.token_usage.input:
+                logger.debug(
+                    f"输入 token: {runner_stats.token_usage.input}，"
+                    f"缓存命中率: {runner_stats.token_usage.cache_hit_ratio:.2%}"
+                )
 
         await self.conv_manager.update_conversation(
             event.unified_msg_origin,
             req.conversation.cid,
             history=message_to_save,
             token_usage=token_usage,
+            history_offset=req.conversation.history_offset,
         )
 
     def _get_compress_provider(self) -> Provider | None:
@@ -631,7 +657,12 @@ class InternalAgentSubStage(Stage):
                     llm_compress_keep_recent=self.llm_compress_keep_recent,
                     llm_compress_provider=self._get_compress_provider(),
                     truncate_turns=self.dequeue_context_length,
+                    block_truncate=(
+                        self.context_limit_reached_strategy == "truncate_by_blocks"
+                    ),
                     enforce_max_turns=self.max_context_length,
+                    max_parallel_tool_calls=self.max_parallel_tool_calls,
+                    custom_token_counter=self.token_counter,
                 )
 
                 if streaming_response and not stream_to_general:
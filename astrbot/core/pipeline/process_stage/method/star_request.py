@@ -1,5 +1,6 @@
 """本地 Agent 模式的 AstrBot 插件调用 Stage"""
 
+import time
 import traceback
 from collections.abc import AsyncGenerator
 from typing import Any
@@ -11,6 +12,7 @@ from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import StarHandlerMetadata
 
 from ...context import PipelineContext, call_handler
+from ...metrics import pipeline_metrics
 from ..stage import Stage
 
 
@@ -42,10 +44,22 @@ class StarRequestSubStage(Stage):
                 )
                 continue
             logger.debug(f"plugin -> {md.name} - {handler.handler_name}")
+            metrics = pipeline_metrics if pipeline_metrics.enabled else None
+            metric_name = f"{md.name}/{handler.handler_name}"
             try:
                 wrapper = call_handler(event, handler.handler, **params)
+                phase, start = "pre", time.perf_counter() if metrics else 0.0
                 async for ret in wrapper:
+                    if metrics:
+                        metrics.observe(
+                            "handler", metric_name, phase, time.perf_counter() - start
+                        )
                     yield ret
+                    phase, start = "post", time.perf_counter() if metrics else 0.0
+                if metrics:
+                    metrics.observe(
+                        "handler", metric_name, phase, time.perf_counter() - start
+                    )
                 event.clear_result()  # 清除上一个 handler 的结果
             except Exception as e:
                 logger.error(traceback.format_exc())
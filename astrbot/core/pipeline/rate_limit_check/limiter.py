@@ -0,0 +1,70 @@
+import time
+
+
+class TokenBucketLimiter:
+    """令牌桶限流器
+
+    每个键对应一个容量为 capacity 的令牌桶, 每 period 秒匀速补满。每个键只保存
+    (剩余令牌数, 更新时间) 两个数, 已补满的空闲桶会被定期清理。
+
+    令牌不足时调用方可以预约一个令牌 (令牌数记为负数), 并得到需要等待的时间。预约在
+    取令牌时同步完成, 等待期间不需要持有任何锁, 多个等待者按预约顺序依次放行。
+
+    Args:
+        capacity: 桶容量, 即允许的突发消息数
+        period: 补满一个空桶所需的秒数
+        max_queue: 每个键最多允许预约等待的请求数, 0 表示令牌不足时直接拒绝, -1 表示不限制
+
+    """
+
+    def __init__(self, capacity: int, period: float, max_queue: int = 0):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.max_queue = max_queue
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._last_sweep = time.monotonic()
+
+    def _tokens(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        tokens, updated_at = bucket
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    def acquire(self, key: str) -> float | None:
+        """取一个令牌
+
+        Returns:
+            float | None: 需要等待的秒数, 0 表示立即放行; 等待队列已满时返回 None, 此时不占用令牌
+
+        """
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        tokens = self._tokens(key, now) - 1
+        if self.max_queue >= 0 and tokens < -self.max_queue:
+            return None
+        self._buckets[key] = (tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def release(self, key: str):
+        """归还一个未使用的令牌, 如预约等待被取消时"""
+        now = time.monotonic()
+        if key in self._buckets:
+            self._buckets[key] = (min(self.capacity, self._tokens(key, now) + 1), now)
+
+    def retry_after(self, key: str) -> float:
+        """距离下一个令牌可用的秒数"""
+        tokens = self._tokens(key, time.monotonic())
+        return max(0.0, (1 - tokens) / self.rate)
+
+    def _maybe_sweep(self, now: float):
+        """每个周期清理一次已补满的桶, 它们与不存在的桶等价"""
+        if now - self._last_sweep < self.period:
+            return
+        self._last_sweep = now
+        for key in [k for k in self._buckets if self._tokens(k, now) >= self.capacity]:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
@@ -1,99 +1,108 @@
 import asyncio
-from collections import defaultdict, deque
-from collections.abc import AsyncGenerator
-from datetime import datetime, timedelta
+from collections.abc import AsyncGenerator, Callable
 
 from astrbot.core import logger
 from astrbot.core.config.astrbot_config import RateLimitStrategy
+from astrbot.core.message.message_event_result import MessageChain
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage
+from .limiter import TokenBucketLimiter
+
+RATE_LIMIT_SCOPES: dict[str, Callable[[AstrMessageEvent], str]] = {
+    "session": lambda e: e.session_id,
+    "sender": lambda e: f"{e.get_platform_id()}:{e.get_sender_id()}",
+    "platform": lambda e: e.get_platform_id(),
+    "global": lambda e: "global",
+}
+"""限流范围 -> 计算限流键的函数"""
 
 
 @register_stage
 class RateLimitStage(Stage):
     """检查是否需要限制消息发送的限流器。
 
-    使用 Fixed Window 算法。
-    如果触发限流，将 stall 流水线，直到下一个时间窗口来临时自动唤醒。
+    使用令牌桶算法, 每个限流键 (会话、发送者、平台或全局) 允许突发 count 条消息,
+    并以 count / time 条每秒的速率恢复。
+    如果触发限流, stall 策略会让事件排队等待下一个令牌, discard 策略直接丢弃事件。
+    开启 notify 后, 排队或丢弃时会回复一条提示。
     """
 
     def __init__(self):
-        # 存储每个会话的请求时间队列
-        self.event_timestamps: defaultdict[str, deque[datetime]] = defaultdict(deque)
-        # 为每个会话设置一个锁，避免并发冲突
-        self.locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
-        # 限流参数
-        self.rate_limit_count: int = 0
-        self.rate_limit_time: timedelta = timedelta(0)
+        self.limiter: TokenBucketLimiter | None = None
+        self.scope = "session"
+        self.notify = False
 
     async def initialize(self, ctx: PipelineContext) -> None:
         """初始化限流器，根据配置设置限流参数。"""
-        self.rate_limit_count = ctx.astrbot_config["platform_settings"]["rate_limit"][
-            "count"
-        ]
-        self.rate_limit_time = timedelta(
-            seconds=ctx.astrbot_config["platform_settings"]["rate_limit"]["time"],
+        rate_limit = ctx.astrbot_config["platform_settings"]["rate_limit"]
+        self.rl_strategy = rate_limit["strategy"]  # stall or discard
+        self.scope = rate_limit.get("scope", "session")
+        self.notify = rate_limit.get("notify", False)
+        if self.scope not in RATE_LIMIT_SCOPES:
+            logger.warning(f"未知的限流范围: {self.scope}, 使用 session")
+            self.scope = "session"
+
+        count, period = rate_limit["count"], rate_limit["time"]
+        if count <= 0 or period <= 0:
+            self.limiter = None
+            return
+        self.limiter = TokenBucketLimiter(
+            capacity=count,
+            period=period,
+            max_queue=(
+                rate_limit.get("max_queue", -1)
+                if self.rl_strategy == RateLimitStrategy.STALL.value
+                else 0
+            ),
         )
-        self.rl_strategy = ctx.astrbot_config["platform_settings"]["rate_limit"][
-            "strategy"
-        ]  # stall or discard
 
     async def process(
         self,
         event: AstrMessageEvent,
     ) -> None | AsyncGenerator[None, None]:
-        """检查并处理限流逻辑。如果触发限流，流水线会 stall 并在窗口期后自动恢复。
-
-        Args:
-            event (AstrMessageEvent): 当前消息事件。
-            ctx (PipelineContext): 流水线上下文。
-
-        Returns:
-            MessageEventResult: 继续或停止事件处理的结果。
-
-        """
-        session_id = event.session_id
-        now = datetime.now()
-
-        async with self.locks[session_id]:  # 确保同一会话不会并发修改队列
-            # 检查并处理限流，可能需要多次检查直到满足条件
-            while True:
-                timestamps = self.event_timestamps[session_id]
-                self._remove_expired_timestamps(timestamps, now)
-
-                if len(timestamps) < self.rate_limit_count:
-                    timestamps.append(now)
-                    break
-                next_window_time = timestamps[0] + self.rate_limit_time
-                stall_duration = (next_window_time - now).total_seconds() + 0.3
+        """检查并处理限流逻辑。如果触发限流，流水线会 stall 到下一个令牌可用时, 或丢弃事件。
 
-                match self.rl_strategy:
-                    case RateLimitStrategy.STALL.value:
-                        logger.info(
-                            f"会话 {session_id} 被限流。根据限流策略，此会话处理将被暂停 {stall_duration:.2f} 秒。",
-                        )
-                        await asyncio.sleep(stall_duration)
-                        now = datetime.now()
-                    case RateLimitStrategy.DISCARD.value:
-                        logger.info(
-                            f"会话 {session_id} 被限流。根据限流策略，此请求已被丢弃，直到限额于 {stall_duration:.2f} 秒后重置。",
-                        )
-                        return event.stop_event()
-
-    def _remove_expired_timestamps(
-        self,
-        timestamps: deque[datetime],
-        now: datetime,
-    ) -> None:
-        """移除时间窗口外的时间戳。
+        等待期间不持有任何锁, 同一限流键的等待者按到达顺序放行。
+        设置了 max_queue 时, 等待队列已满后即使是 stall 策略也会丢弃事件, 避免突发消息长期占用事件调度器。
 
         Args:
-            timestamps (Deque[datetime]): 当前会话的时间戳队列。
-            now (datetime): 当前时间，用于计算过期时间。
+            event (AstrMessageEvent): 当前消息事件。
 
         """
-        expiry_threshold: datetime = now - self.rate_limit_time
-        while timestamps and timestamps[0] < expiry_threshold:
-            timestamps.popleft()
+        if self.limiter is None:
+            return
+        key = RATE_LIMIT_SCOPES[self.scope](event)
+        wait = self.limiter.acquire(key)
+        if wait is None:
+            retry_after = self.limiter.retry_after(key)
+            logger.info(
+                f"{self.scope} {key} 被限流。此请求已被丢弃，直到限额于 {retry_after:.2f} 秒后恢复。",
+            )
+            await self._notify(
+                event,
+                f"消息过于频繁，本条消息已被忽略，请 {retry_after:.0f} 秒后再试。",
+            )
+            event.stop_event()
+            return
+        if wait > 0:
+            logger.info(
+                f"{self.scope} {key} 被限流。根据限流策略，此会话处理将被暂停 {wait:.2f} 秒。",
+            )
+            await self._notify(
+                event, f"消息过于频繁，本条消息将在 {wait:.0f} 秒后处理。"
+            )
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.limiter.release(key)
+                raise
+
+    async def _notify(self, event: AstrMessageEvent, text: str) -> None:
+        if not self.notify:
+            return
+        try:
+            await event.send(MessageChain().message(text))
+        except Exception as e:
+            logger.warning(f"发送限流提示失败: {e}")
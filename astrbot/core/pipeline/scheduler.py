@@ -1,3 +1,4 @@
+import time
 from collections.abc import AsyncGenerator
 
 from astrbot.core import logger
@@ -9,6 +10,7 @@ from astrbot.core.platform.sources.wecom_ai_bot.wecomai_event import (
 
 from . import STAGES_ORDER
 from .context import PipelineContext
+from .metrics import current_conf_id, pipeline_metrics
 from .stage import registered_stages
 
 
@@ -37,9 +39,11 @@ class PipelineScheduler:
             from_stage (int): 从第几个阶段开始执行, 默认从0开始
 
         """
+        metrics = pipeline_metrics if pipeline_metrics.enabled else None
         for i in range(from_stage, len(self.stages)):
             stage = self.stages[i]  # 获取当前要执行的阶段
             # logger.debug(f"执行阶段 {stage.__class__.__name__}")
+            phase, start = "pre", time.perf_counter() if metrics else 0.0
             coroutine = stage.process(
                 event,
             )  # 调用阶段的process方法, 返回协程或者异步生成器
@@ -47,6 +51,13 @@ class PipelineScheduler:
             if isinstance(coroutine, AsyncGenerator):
                 # 如果返回的是异步生成器, 实现洋葱模型的核心
                 async for _ in coroutine:
+                    if metrics:
+                        metrics.observe(
+                            "stage",
+                            stage.__class__.__name__,
+                            phase,
+                            time.perf_counter() - start,
+                        )
                     # 此处是前置处理完成后的暂停点(yield), 下面开始执行后续阶段
                     if event.is_stopped():
                         logger.debug(
@@ -63,10 +74,26 @@ class PipelineScheduler:
                             f"阶段 {stage.__class__.__name__} 已终止事件传播。",
                         )
                         break
+                    phase, start = "post", time.perf_counter() if metrics else 0.0
+                else:
+                    if metrics:
+                        metrics.observe(
+                            "stage",
+                            stage.__class__.__name__,
+                            phase,
+                            time.perf_counter() - start,
+                        )
             else:
                 # 如果返回的是普通协程(不含yield的async函数), 则不进入下一层(基线条件)
                 # 简单地等待它执行完成, 然后继续执行下一个阶段
                 await coroutine
+                if metrics:
+                    metrics.observe(
+                        "stage",
+                        stage.__class__.__name__,
+                        "pre",
+                        time.perf_counter() - start,
+                    )
 
                 if event.is_stopped():
                     logger.debug(f"阶段 {stage.__class__.__name__} 已终止事件传播。")
@@ -79,10 +106,19 @@ class PipelineScheduler:
             event (AstrMessageEvent): 事件对象
 
         """
-        await self._process_stages(event)
-
-        # 如果没有发送操作, 则发送一个空消息, 以便于后续的处理
-        if isinstance(event, (WebChatMessageEvent, WecomAIBotMessageEvent)):
-            await event.send(None)
+        token = current_conf_id.set(self.ctx.astrbot_config_id)
+        start = time.perf_counter()
+        try:
+            await self._process_stages(event)
+
+            # 如果没有发送操作, 则发送一个空消息, 以便于后续的处理
+            if isinstance(event, (WebChatMessageEvent, WecomAIBotMessageEvent)):
+                await event.send(None)
+        finally:
+            if pipeline_metrics.enabled:
+                pipeline_metrics.observe(
+                    "pipeline", "total", "pre", time.perf_counter() - start
+                )
+            current_conf_id.reset(token)
 
         logger.debug("pipeline 执行完毕。")
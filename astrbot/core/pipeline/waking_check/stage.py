@@ -156,10 +156,24 @@ class WakingCheckStage(Stage):
             event.plugins_name = enabled_plugins_name
         logger.debug(f"enabled_plugins_name: {enabled_plugins_name}")
 
+        # 通过指令前缀树预先筛选出指令名可能匹配的 handler, 其余指令 handler 直接跳过。
+        # 未唤醒时指令过滤器必然不通过。
+        command_trie = star_handlers_registry.get_command_trie()
+        matched_commands = (
+            command_trie.match(event.message_str)
+            if event.is_at_or_wake_command
+            else set()
+        )
+
         for handler in star_handlers_registry.get_handlers_by_event_type(
             EventType.AdapterMessageEvent,
             plugins_name=event.plugins_name,
         ):
+            if (
+                handler.handler_full_name in command_trie.command_handlers
+                and handler.handler_full_name not in matched_commands
+            ):
+                continue
             if (
                 self.disable_builtin_commands
                 and handler.handler_module_path
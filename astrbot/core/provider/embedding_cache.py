@@ -0,0 +1,359 @@
+"""Embedding 向量缓存
+
+以 (Provider ID, 接口地址, 模型, 维度, 规范化后的文本) 为键缓存文本的向量, 分为
+内存 LRU 和 SQLite 磁盘两级 (磁盘缓存默认关闭)。重复的查询以及内容相同的文本块
+不会再调用嵌入接口。Provider 的配置被修改或删除时, 由 ProviderManager 清除其缓存。
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from astrbot.core import logger
+
+from .provider import EmbeddingProvider
+
+_WHITESPACE = re.compile(r"\s+")
+
+DEFAULT_MEMORY_MAX_ENTRIES = 4096
+DEFAULT_DISK_MAX_ENTRIES = 20000
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def normalize_text(content: str) -> str:
+    """规范化文本: Unicode NFKC, 去除首尾空白并合并连续空白"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", content)).strip()
+
+
+class EmbeddingCache:
+    """两级 Embedding 缓存
+
+    Args:
+        db_path: SQLite 缓存文件路径, 为 None 时只使用内存缓存
+        memory_max_entries: 内存 LRU 最大条目数
+        disk_max_entries: 磁盘缓存最大条目数, 超出时淘汰最久未访问的条目
+        ttl: 条目有效期 (秒), 0 表示永不过期
+
+    """
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        memory_max_entries: int = DEFAULT_MEMORY_MAX_ENTRIES,
+        disk_max_entries: int = DEFAULT_DISK_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+    ):
+        self.db_path = db_path
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl = ttl
+
+        self._memory: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+        self._engine: AsyncEngine | None = None
+        self._init_lock = asyncio.Lock()
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        provider_id: str,
+        model: str,
+        dim: int,
+        content: str,
+        api_base: str = "",
+    ) -> str:
+        raw = f"{provider_id}\n{api_base}\n{model}\n{dim}\n{normalize_text(content)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _get_engine(self) -> AsyncEngine | None:
+        if not self.db_path:
+            return None
+        if self._engine is not None:
+            return self._engine
+        async with self._init_lock:
+            if self._engine is None:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+                engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+                async with engine.begin() as conn:
+                    await conn.execute(text("PRAGMA journal_mode=WAL"))
+                    await conn.execute(
+                        text(
+                            "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                            "key TEXT PRIMARY KEY, "
+                            "provider_id TEXT NOT NULL, "
+                            "vector BLOB NOT NULL, "
+                            "created_at REAL NOT NULL, "
+                            "accessed_at REAL NOT NULL)",
+                        ),
+                    )
+                    await conn.execute(
+                        text(
+                            "CREATE INDEX IF NOT EXISTS idx_embedding_cache_accessed_at "
+                            "ON embedding_cache(accessed_at)",
+                        ),
+                    )
+                self._engine = engine
+        return self._engine
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def _remember(self, key: str, vector: list[float], created_at: float):
+        self._memory[key] = (vector, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """批量查询缓存, 返回命中的 {key: vector}"""
+        now = time.time()
+        found: dict[str, list[float]] = {}
+        disk_keys = []
+        for key in dict.fromkeys(keys):
+            item = self._memory.get(key)
+            if item is not None and not self._expired(item[1], now):
+                self._memory.move_to_end(key)
+                found[key] = item[0]
+                self.memory_hits += 1
+            else:
+                if item is not None:
+                    del self._memory[key]
+                disk_keys.append(key)
+
+        disk_found: dict[str, list[float]] = {}
+        engine = await self._get_engine() if disk_keys else None
+        if engine is not None:
+            try:
+                disk_found = await self._get_from_disk(engine, disk_keys, now)
+            except Exception as e:
+                logger.warning(f"读取 Embedding 磁盘缓存失败: {e}")
+
+        self.misses += len(disk_keys) - len(disk_found)
+        found.update(disk_found)
+        return found
+
+    async def _get_from_disk(
+        self,
+        engine: AsyncEngine,
+        keys: list[str],
+        now: float,
+    ) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        async with engine.begin() as conn:
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                params = {f"k{i}": key for i, key in enumerate(batch)}
+                placeholders = ", ".join(f":{name}" for name in params)
+                result = await conn.execute(
+                    text(
+                        "SELECT key, vector, created_at FROM embedding_cache "
+                        f"WHERE key IN ({placeholders})",
+                    ),
+                    params,
+                )
+                for key, blob, created_at in result.fetchall():
+                    if self._expired(created_at, now):
+                        continue
+                    vector = np.frombuffer(blob, dtype="<f4").tolist()
+                    found[key] = vector
+                    self._remember(key, vector, created_at)
+                    self.disk_hits += 1
+            if found:
+                await conn.execute(
+                    text(
+                        "UPDATE embedding_cache SET accessed_at = :now WHERE key = :key"
+                    ),
+                    [{"now": now, "key": key} for key in found],
+                )
+        return found
+
+    async def put_many(self, provider_id: str, items: dict[str, list[float]]):
+        """写入缓存"""
+        if not items:
+            return
+        now = time.time()
+        for key, vector in items.items():
+            self._remember(key, vector, now)
+
+        engine = await self._get_engine()
+        if engine is None:
+            return
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "INSERT OR REPLACE INTO embedding_cache "
+                        "(key, provider_id, vector, created_at, accessed_at) "
+                        "VALUES (:key, :provider_id, :vector, :now, :now)",
+                    ),
+                    [
+                        {
+                            "key": key,
+                            "provider_id": provider_id,
+                            "vector": np.asarray(vector, dtype="<f4").tobytes(),
+                            "now": now,
+                        }
+                        for key, vector in items.items()
+                    ],
+                )
+                self._disk_writes += len(items)
+                if self._disk_writes >= max(1, self.disk_max_entries // 10):
+                    self._disk_writes = 0
+                    await self._prune(conn, now)
+        except Exception as e:
+            logger.warning(f"写入 Embedding 磁盘缓存失败: {e}")
+
+    async def _prune(self, conn, now: float):
+        if self.ttl:
+            await conn.execute(
+                text("DELETE FROM embedding_cache WHERE created_at < :deadline"),
+                {"deadline": now - self.ttl},
+            )
+        await conn.execute(
+            text(
+                "DELETE FROM embedding_cache WHERE key IN ("
+                "SELECT key FROM embedding_cache ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET :limit)",
+            ),
+            {"limit": self.disk_max_entries},
+        )
+
+    async def clear(self, provider_id: str | None = None):
+        """清空缓存。指定 provider_id 时只清除该 Provider 的磁盘缓存, 内存缓存全部清空"""
+        self._memory.clear()
+        engine = await self._get_engine()
+        if engine is None:
+            return
+        async with engine.begin() as conn:
+            if provider_id:
+                await conn.execute(
+                    text(
+                        "DELETE FROM embedding_cache WHERE provider_id = :provider_id"
+                    ),
+                    {"provider_id": provider_id},
+                )
+            else:
+                await conn.execute(text("DELETE FROM embedding_cache"))
+
+    def stats(self) -> dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    async def close(self):
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """为任意 EmbeddingProvider 添加缓存的包装器
+
+    未命中的文本才会交给被包装的 Provider, 同一文本的并发请求只调用一次接口。
+    其余属性和方法 (如 terminate) 透传给被包装的 Provider。
+    """
+
+    def __init__(self, provider: EmbeddingProvider, cache: EmbeddingCache):
+        super().__init__(provider.provider_config, provider.provider_settings)
+        self.provider = provider
+        self.cache = cache
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __getattr__(self, name: str):
+        # 只有在包装器自身找不到属性时才会调用
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    def meta(self):
+        return self.provider.meta()
+
+    def get_model(self) -> str:
+        return self.provider.get_model()
+
+    def get_dim(self) -> int:
+        return self.provider.get_dim()
+
+    async def test(self):
+        # 测试需要真正访问接口, 不使用缓存
+        await self.provider.test()
+
+    def _key(self, content: str) -> str:
+        model = (
+            self.provider_config.get("embedding_model")
+            or self.provider.get_model()
+            or ""
+        )
+        return self.cache.make_key(
+            self.provider_config.get("id", ""),
+            model,
+            self.get_dim(),
+            content,
+            api_base=self.provider_config.get("embedding_api_base") or "",
+        )
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return (await self.get_embeddings([text]))[0]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        keys = [self._key(t) for t in text]
+        found = await self.cache.get_many(keys)
+
+        # 未命中的文本去重; 其他请求正在获取的文本直接等待其结果
+        waiting: dict[str, asyncio.Future] = {}
+        owned: dict[str, str] = {}
+        for key, content in zip(keys, text):
+            if key in found or key in waiting or key in owned:
+                continue
+            if key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                owned[key] = content
+
+        if owned:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in owned}
+            self._inflight.update(futures)
+            try:
+                vectors = await self.provider.get_embeddings(list(owned.values()))
+                fetched = dict(zip(owned, vectors))
+                await self.cache.put_many(self.provider_config.get("id", ""), fetched)
+                for key, future in futures.items():
+                    future.set_result(fetched[key])
+                found.update(fetched)
+            except BaseException as e:
+                error = e if isinstance(e, Exception) else RuntimeError("请求已取消")
+                for future in futures.values():
+                    future.set_exception(error)
+                    # 避免没有其他等待者时出现 "exception was never retrieved"
+                    future.exception()
+                raise
+            finally:
+                for key in futures:
+                    self._inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            found[key] = await future
+
+        return [list(found[key]) for key in keys]
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import base64
 import enum
 import json
 from dataclasses import dataclass, field
@@ -21,7 +20,7 @@ from astrbot.core.agent.message import (
 from astrbot.core.agent.tool import ToolSet
 from astrbot.core.db.po import Conversation
 from astrbot.core.message.message_event_result import MessageChain
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.provider.media_cache import media_cache
 
 
 class ProviderType(enum.Enum):
@@ -188,8 +187,7 @@ class ProviderRequest:
         if self.image_urls:
             for image_url in self.image_urls:
                 if image_url.startswith("http"):
-                    image_path = await download_image_by_url(image_url)
-                    image_data = await self._encode_image_bs64(image_path)
+                    image_data = await media_cache.encode_url(image_url)
                 elif image_url.startswith("file:///"):
                     image_path = image_url.replace("file:///", "")
                     image_data = await self._encode_image_bs64(image_path)
@@ -218,10 +216,7 @@ class ProviderRequest:
         """将图片转换为 base64"""
         if image_url.startswith("base64://"):
             return image_url.replace("base64://", "data:image/jpeg;base64,")
-        with open(image_url, "rb") as f:
-            image_bs64 = base64.b64encode(f.read()).decode("utf-8")
-            return "data:image/jpeg;base64," + image_bs64
-        return ""
+        return await media_cache.encode_file(image_url)
 
 
 @dataclass
@@ -241,6 +236,11 @@ class TokenUsage:
     def input(self) -> int:
         return self.input_other + self.input_cached
 
+    @property
+    def cache_hit_ratio(self) -> float:
+        """The ratio of input tokens served from the provider's prompt cache."""
+        return self.input_cached / self.input if self.input > 0 else 0.0
+
     def __add__(self, other: TokenUsage) -> TokenUsage:
         return TokenUsage(
             input_other=self.input_other + other.input_other,
@@ -119,6 +119,7 @@ class FunctionToolManager:
         func_args: list[dict],
         desc: str,
         handler: Callable[..., Awaitable[Any] | AsyncGenerator[Any]],
+        parallel_safe: bool = False,
     ) -> FuncTool:
         params = {
             "type": "object",  # hard-coded here
@@ -133,6 +134,7 @@ class FunctionToolManager:
             parameters=params,
             description=desc,
             handler=handler,
+            parallel_safe=parallel_safe,
         )
 
     def add_func(
@@ -141,6 +143,7 @@ class FunctionToolManager:
         func_args: list,
         desc: str,
         handler: Callable[..., Awaitable[Any] | AsyncGenerator[Any]],
+        parallel_safe: bool = False,
     ) -> None:
         """添加函数调用工具
 
@@ -148,6 +151,7 @@ class FunctionToolManager:
         @param func_args: 函数参数列表，格式为 [{"type": "string", "name": "arg_name", "description": "arg_description"}, ...]
         @param desc: 函数描述
         @param func_obj: 处理函数
+        @param parallel_safe: 工具是否没有副作用、可以与其他工具并发执行
         """
         # check if the tool has been added before
         self.remove_func(name)
@@ -158,6 +162,7 @@ class FunctionToolManager:
                 func_args=func_args,
                 desc=desc,
                 handler=handler,
+                parallel_safe=parallel_safe,
             ),
         )
         logger.info(f"添加函数调用工具: {name}")
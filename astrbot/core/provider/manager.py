@@ -1,14 +1,18 @@
 import asyncio
 import copy
+import os
 import traceback
 from typing import Protocol, runtime_checkable
 
 from astrbot.core import astrbot_config, logger, sp
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
 from astrbot.core.db import BaseDatabase
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 
 from ..persona_mgr import PersonaManager
+from .embedding_cache import CachedEmbeddingProvider, EmbeddingCache
 from .entities import ProviderType
+from .media_cache import media_cache
 from .provider import (
     EmbeddingProvider,
     Provider,
@@ -71,6 +75,27 @@ class ProviderManager:
         """默认的 Text To Speech Provider 实例。已弃用，请使用 get_using_provider() 方法获取当前使用的 Provider 实例。"""
         self.db_helper = db_helper
 
+        self.embedding_cache: EmbeddingCache | None = None
+        """Embedding 向量缓存, 未启用时为 None"""
+        cache_cfg = self.provider_settings.get("embedding_cache", {})
+        if cache_cfg.get("enable", True):
+            self.embedding_cache = EmbeddingCache(
+                db_path=os.path.join(get_astrbot_data_path(), "embedding_cache.db")
+                if cache_cfg.get("disk", False)
+                else None,
+                memory_max_entries=cache_cfg.get("memory_max_entries", 4096),
+                disk_max_entries=cache_cfg.get("disk_max_entries", 20000),
+                ttl=cache_cfg.get("ttl", 604800),
+            )
+
+        media_cfg = self.provider_settings.get("media_cache", {})
+        media_cache.configure(
+            enable=media_cfg.get("enable", True),
+            max_disk_bytes=media_cfg.get("max_disk_mb", 512) * 1024 * 1024,
+            max_memory_bytes=media_cfg.get("max_memory_mb", 64) * 1024 * 1024,
+            url_ttl=media_cfg.get("url_ttl", 3600),
+        )
+
     @property
     def persona_configs(self) -> list:
         """动态获取最新的 persona 配置"""
@@ -527,6 +552,8 @@ class ProviderManager:
                     inst = cls_type(provider_config, self.provider_settings)
                     if isinstance(inst, HasInitialize):
                         await inst.initialize()
+                    if self.embedding_cache:
+                        inst = CachedEmbeddingProvider(inst, self.embedding_cache)
                     self.embedding_provider_insts.append(inst)
                 case ProviderType.RERANK:
                     if not issubclass(cls_type, RerankProvider):
@@ -647,6 +674,9 @@ class ProviderManager:
                     if prov.get("provider_source_id") == provider_source_id:
                         target_prov_ids.append(prov.get("id"))
             config = self.acm.default_conf
+            for prov in config["provider"]:
+                if prov.get("id") in target_prov_ids:
+                    await self._clear_embedding_cache(prov)
             for tpid in target_prov_ids:
                 await self.terminate_provider(tpid)
                 config["provider"] = [
@@ -676,9 +706,15 @@ class ProviderManager:
             else:
                 raise ValueError(f"Provider ID {origin_provider_id} not found")
             config.save_config()
+            # 接口地址或密钥可能已变化, 旧的向量不能再使用
+            await self._clear_embedding_cache(provider)
             # reload instance
             await self.reload(new_config)
 
+    async def _clear_embedding_cache(self, provider_config: dict):
+        if self.embedding_cache and provider_config.get("provider_type") == "embedding":
+            await self.embedding_cache.clear(provider_config.get("id"))
+
     async def create_provider(self, new_config: dict):
         """Add new provider config and load the instance. Config will be saved after addition."""
         async with self.resource_lock:
@@ -703,3 +739,5 @@ class ProviderManager:
             await self.llm_tools.disable_mcp_server()
         except Exception:
             logger.error("Error while disabling MCP servers", exc_info=True)
+        if self.embedding_cache:
+            await self.embedding_cache.close()
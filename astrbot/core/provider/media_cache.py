@@ -0,0 +1,353 @@
+"""多模态图片缓存
+
+下载的网络图片按内容的 SHA-256 保存在 data/media_cache 目录下 (URL -> 哈希 -> 文件),
+相同内容的图片只保存一份, 磁盘占用超过上限时淘汰最久未使用的文件。编码后的
+base64 data URI 保存在内存 LRU 中, 同一张图片在多轮对话、多个会话中重复出现时
+不会再重复下载和编码。所有 Provider 适配器共用模块级的 ``media_cache`` 实例。
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from astrbot.core import logger
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.io import download_image_by_url
+
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_URL_TTL = 3600
+DEFAULT_URL_MAX_ENTRIES = 4096
+
+DATA_URI_PREFIX = "data:image/jpeg;base64,"
+
+
+def _sha256_file(path: str) -> tuple[str, int]:
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+def _encode_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return DATA_URI_PREFIX + base64.b64encode(f.read()).decode("utf-8")
+
+
+def _file_key(path: str) -> tuple:
+    st = os.stat(path)
+    return ("file", os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def _scan_blobs(cache_dir: str) -> list[tuple[str, int]]:
+    """按修改时间从旧到新列出已有的缓存文件, 并清理残留的临时文件"""
+    os.makedirs(cache_dir, exist_ok=True)
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file():
+            continue
+        if entry.name.endswith(".tmp"):
+            os.remove(entry.path)
+            continue
+        st = entry.stat()
+        entries.append((st.st_mtime, entry.name, st.st_size))
+    entries.sort()
+    return [(name, size) for _, name, size in entries]
+
+
+def _store_blob(tmp_path: str, cache_dir: str) -> tuple[str, int, bool]:
+    """将下载好的临时文件按内容哈希移入缓存目录, 返回 (哈希, 大小, 是否为新文件)"""
+    digest, size = _sha256_file(tmp_path)
+    blob_path = os.path.join(cache_dir, digest)
+    if os.path.exists(blob_path):
+        os.remove(tmp_path)
+        os.utime(blob_path)
+        return digest, size, False
+    os.replace(tmp_path, blob_path)
+    return digest, size, True
+
+
+def _touch(path: str):
+    """更新修改时间, 重启后按修改时间恢复 LRU 顺序"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class MediaCache:
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        enable: bool = True,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        url_ttl: float = DEFAULT_URL_TTL,
+        url_max_entries: int = DEFAULT_URL_MAX_ENTRIES,
+    ):
+        """
+        Args:
+            cache_dir: 缓存文件目录, 默认为 data/media_cache
+            enable: 是否启用缓存, 关闭时每次都重新下载和编码
+            max_disk_bytes: 缓存文件的总大小上限
+            max_memory_bytes: 内存中 data URI 的总大小上限
+            url_ttl: URL 到内容哈希的映射的有效期（秒）, 过期后重新下载, 0 表示永不过期
+            url_max_entries: 记录的 URL 数量上限
+
+        """
+        self.cache_dir = cache_dir
+        self.enable = enable
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.url_ttl = url_ttl
+        self.url_max_entries = url_max_entries
+
+        self._urls: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._blobs: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+        self._encoded: OrderedDict[Any, str] = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: dict[Any, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+
+        self.download_hits = 0
+        self.downloads = 0
+        self.encode_hits = 0
+        self.encodes = 0
+        self.evictions = 0
+
+    def configure(
+        self,
+        enable: bool | None = None,
+        max_disk_bytes: int | None = None,
+        max_memory_bytes: int | None = None,
+        url_ttl: float | None = None,
+    ) -> None:
+        """更新缓存配置。缩小上限后在下一次写入时淘汰多出的内容。"""
+        if enable is not None:
+            self.enable = enable
+        if max_disk_bytes is not None:
+            self.max_disk_bytes = max_disk_bytes
+        if max_memory_bytes is not None:
+            self.max_memory_bytes = max_memory_bytes
+        if url_ttl is not None:
+            self.url_ttl = url_ttl
+
+    def _get_cache_dir(self) -> str:
+        if self.cache_dir is None:
+            self.cache_dir = os.path.join(get_astrbot_data_path(), "media_cache")
+        return self.cache_dir
+
+    async def fetch(self, url: str) -> str:
+        """下载网络图片, 返回本地文件路径。相同 URL 或相同内容的图片只下载、保存一次。"""
+        if not self.enable:
+            return await download_image_by_url(url)
+        digest = await self._fetch_digest(url)
+        return os.path.join(self._get_cache_dir(), digest)
+
+    async def encode_url(self, url: str) -> str:
+        """下载网络图片并转换为 base64 data URI"""
+        if not self.enable:
+            return await asyncio.to_thread(_encode_file, await self.fetch(url))
+        digest = await self._fetch_digest(url)
+        try:
+            return await self._encode(
+                ("blob", digest),
+                os.path.join(self._get_cache_dir(), digest),
+            )
+        except FileNotFoundError:
+            # 读取前文件已被并发的下载淘汰 (或被外部删除), 重新下载
+            await self._forget_blob(digest)
+            digest = await self._fetch_digest(url)
+            return await self._encode(
+                ("blob", digest),
+                os.path.join(self._get_cache_dir(), digest),
+            )
+
+    async def encode_file(self, path: str) -> str:
+        """将本地图片转换为 base64 data URI, 文件修改后会重新编码"""
+        if not self.enable:
+            return await asyncio.to_thread(_encode_file, path)
+        return await self._encode(await asyncio.to_thread(_file_key, path), path)
+
+    async def _encode(self, key: Any, path: str) -> str:
+        data_uri = self._encoded.get(key)
+        if data_uri is not None:
+            self._encoded.move_to_end(key)
+            self.encode_hits += 1
+            return data_uri
+        return await self._single_flight(key, lambda: self._encode_miss(key, path))
+
+    async def _encode_miss(self, key: Any, path: str) -> str:
+        self.encodes += 1
+        data_uri = await asyncio.to_thread(_encode_file, path)
+        self._remember_encoded(key, data_uri)
+        return data_uri
+
+    def _remember_encoded(self, key: Any, data_uri: str):
+        if len(data_uri) > self.max_memory_bytes:
+            return
+        self._forget_encoded(key)
+        self._encoded[key] = data_uri
+        self._memory_bytes += len(data_uri)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, old = self._encoded.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def _forget_encoded(self, key: Any):
+        old = self._encoded.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+
+    async def _fetch_digest(self, url: str) -> str:
+        entry = self._urls.get(url)
+        if entry is not None:
+            digest, fetched_at = entry
+            fresh = not self.url_ttl or time.time() - fetched_at < self.url_ttl
+            if fresh and self._blobs is not None and digest in self._blobs:
+                self._urls.move_to_end(url)
+                self._blobs.move_to_end(digest)
+                self.download_hits += 1
+                await asyncio.to_thread(
+                    _touch,
+                    os.path.join(self._get_cache_dir(), digest),
+                )
+                return digest
+            del self._urls[url]
+
+        return await self._single_flight(("url", url), lambda: self._download(url))
+
+    async def _single_flight(self, key: Any, func: Callable[[], Awaitable[str]]) -> str:
+        """同一个键的并发请求只执行一次, 其余请求等待其结果"""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待方时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _download(self, url: str) -> str:
+        self.downloads += 1
+        cache_dir = self._get_cache_dir()
+        await self._load_blobs()
+        tmp_path = os.path.join(cache_dir, f"{uuid.uuid4().hex}.tmp")
+        try:
+            await download_image_by_url(url, path=tmp_path)
+            digest, size, created = await asyncio.to_thread(
+                _store_blob,
+                tmp_path,
+                cache_dir,
+            )
+        except BaseException:
+            await asyncio.to_thread(_remove_file, tmp_path)
+            raise
+
+        async with self._lock:
+            assert self._blobs is not None
+            if digest not in self._blobs:
+                self._blobs[digest] = size
+                self._disk_bytes += size
+            elif created:
+                # 文件已被淘汰后又重新下载
+                self._disk_bytes += size - self._blobs[digest]
+                self._blobs[digest] = size
+            self._blobs.move_to_end(digest)
+            await self._evict(keep=digest)
+
+        self._urls[url] = (digest, time.time())
+        while len(self._urls) > self.url_max_entries:
+            self._urls.popitem(last=False)
+        return digest
+
+    async def _load_blobs(self):
+        if self._blobs is not None:
+            return
+        async with self._lock:
+            if self._blobs is not None:
+                return
+            blobs: OrderedDict[str, int] = OrderedDict()
+            try:
+                for name, size in await asyncio.to_thread(
+                    _scan_blobs,
+                    self._get_cache_dir(),
+                ):
+                    blobs[name] = size
+            except Exception as e:
+                logger.warning(f"读取图片缓存目录失败: {e}")
+            self._blobs = blobs
+            self._disk_bytes = sum(blobs.values())
+
+    async def _forget_blob(self, digest: str):
+        async with self._lock:
+            if self._blobs is not None and digest in self._blobs:
+                self._disk_bytes -= self._blobs.pop(digest)
+            self._forget_encoded(("blob", digest))
+
+    async def _evict(self, keep: str):
+        assert self._blobs is not None
+        while self._disk_bytes > self.max_disk_bytes and len(self._blobs) > 1:
+            digest, size = next(iter(self._blobs.items()))
+            if digest == keep:
+                break
+            del self._blobs[digest]
+            self._disk_bytes -= size
+            self._forget_encoded(("blob", digest))
+            self.evictions += 1
+            try:
+                await asyncio.to_thread(
+                    _remove_file,
+                    os.path.join(self._get_cache_dir(), digest),
+                )
+            except Exception as e:
+                logger.warning(f"删除图片缓存文件失败: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        fetches = self.download_hits + self.downloads
+        lookups = self.encode_hits + self.encodes
+        return {
+            "urls": len(self._urls),
+            "disk_entries": len(self._blobs or ()),
+            "disk_bytes": self._disk_bytes,
+            "memory_entries": len(self._encoded),
+            "memory_bytes": self._memory_bytes,
+            "download_hits": self.download_hits,
+            "downloads": self.downloads,
+            "encode_hits": self.encode_hits,
+            "encodes": self.encodes,
+            "evictions": self.evictions,
+            "download_hit_rate": self.download_hits / fetches if fetches else 0.0,
+            "encode_hit_rate": self.encode_hits / lookups if lookups else 0.0,
+        }
+
+
+media_cache = MediaCache()
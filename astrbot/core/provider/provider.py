@@ -276,7 +276,7 @@ class EmbeddingProvider(AbstractProvider):
 
         """
         semaphore = asyncio.Semaphore(tasks_limit)
-        all_embeddings: list[list[float]] = []
+        batch_results: dict[int, list[list[float]]] = {}
         failed_batches: list[tuple[int, list[str]]] = []
         completed_count = 0
         total_count = len(texts)
@@ -287,7 +287,8 @@ class EmbeddingProvider(AbstractProvider):
                 for attempt in range(max_retries):
                     try:
                         batch_embeddings = await self.get_embeddings(batch_texts)
-                        all_embeddings.extend(batch_embeddings)
+                        # 批次可能乱序完成, 按批次序号保存以保证与输入顺序一致
+                        batch_results[batch_idx] = batch_embeddings
                         completed_count += len(batch_texts)
                         if progress_callback:
                             await progress_callback(completed_count, total_count)
@@ -319,7 +320,11 @@ class EmbeddingProvider(AbstractProvider):
             )
             raise Exception(error_msg)
 
-        return all_embeddings
+        return [
+            embedding
+            for batch_idx in sorted(batch_results)
+            for embedding in batch_results[batch_idx]
+        ]
 
 
 class RerankProvider(AbstractProvider):
@@ -1,4 +1,3 @@
-import base64
 import json
 from collections.abc import AsyncGenerator
 from mimetypes import guess_type
@@ -14,8 +13,8 @@ from astrbot.api.provider import Provider
 from astrbot.core.agent.message import ContentPart, ImageURLPart, TextPart
 from astrbot.core.provider.entities import LLMResponse, TokenUsage
 from astrbot.core.provider.func_tool_manager import ToolSet
-from astrbot.core.utils.io import download_image_by_url
 
+from ..media_cache import media_cache
 from ..register import register_provider_adapter
 
 
@@ -49,6 +48,7 @@ class ProviderAnthropic(Provider):
         )
 
         self.thinking_config = provider_config.get("anth_thinking_config", {})
+        self.prompt_caching: bool = provider_config.get("anth_prompt_caching", True)
 
         self.set_model(provider_config.get("model", "unknown"))
 
@@ -133,17 +133,66 @@ class ProviderAnthropic(Provider):
 
         return system_prompt, new_messages
 
+    def _add_cache_breakpoints(self, payloads: dict) -> None:
+        """标记提示词缓存断点（最多 4 个）。
+
+        Anthropic 按 tools -> system -> messages 的顺序匹配缓存前缀。在工具定义末尾、
+        系统提示词、上一条用户消息和最新一条消息上各放置一个断点, 对话每增长一轮,
+        之前请求写入的前缀缓存都可以被命中。只复制被修改的消息, 不修改传入的上下文。
+        """
+        if not self.prompt_caching:
+            return
+        cache_control = {"type": "ephemeral"}
+
+        if tools := payloads.get("tools"):
+            tools[-1] = {**tools[-1], "cache_control": cache_control}
+
+        if system := payloads.get("system"):
+            payloads["system"] = [
+                {"type": "text", "text": system, "cache_control": cache_control},
+            ]
+
+        messages: list[dict] = payloads["messages"]
+        breakpoints = [len(messages) - 1]
+        # 上一条用户消息, 用于命中上一次请求写入的缓存
+        for i in range(len(messages) - 2, -1, -1):
+            if messages[i]["role"] == "user":
+                breakpoints.append(i)
+                break
+        for i in breakpoints:
+            if i < 0:
+                continue
+            content = messages[i]["content"]
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            else:
+                content = list(content)
+            # thinking 块和空文本块不能设置 cache_control
+            for j in range(len(content) - 1, -1, -1):
+                block = content[j]
+                if block.get("type") in ("thinking", "redacted_thinking") or (
+                    block.get("type") == "text" and not block.get("text")
+                ):
+                    continue
+                content[j] = {**block, "cache_control": cache_control}
+                messages[i] = {**messages[i], "content": content}
+                break
+
     def _extract_usage(self, usage: Usage) -> TokenUsage:
         # https://docs.claude.com/en/docs/build-with-claude/prompt-caching#tracking-cache-performance
+        # input_tokens 不包含读取和写入缓存的 token
         return TokenUsage(
-            input_other=usage.input_tokens or 0,
+            input_other=(usage.input_tokens or 0)
+            + (usage.cache_creation_input_tokens or 0),
             input_cached=usage.cache_read_input_tokens or 0,
             output=usage.output_tokens,
         )
 
     def _update_usage(self, token_usage: TokenUsage, usage: MessageDeltaUsage) -> None:
         if usage.input_tokens is not None:
-            token_usage.input_other = usage.input_tokens
+            token_usage.input_other = usage.input_tokens + (
+                usage.cache_creation_input_tokens or 0
+            )
         if usage.cache_read_input_tokens is not None:
             token_usage.input_cached = usage.cache_read_input_tokens
         if usage.output_tokens is not None:
@@ -158,6 +207,7 @@ class ProviderAnthropic(Provider):
 
         if "max_tokens" not in payloads:
             payloads["max_tokens"] = 1024
+        self._add_cache_breakpoints(payloads)
         if self.thinking_config.get("budget"):
             payloads["thinking"] = {
                 "budget_tokens": self.thinking_config.get("budget"),
@@ -222,6 +272,7 @@ class ProviderAnthropic(Provider):
 
         if "max_tokens" not in payloads:
             payloads["max_tokens"] = 1024
+        self._add_cache_breakpoints(payloads)
         if self.thinking_config.get("budget"):
             payloads["thinking"] = {
                 "budget_tokens": self.thinking_config.get("budget"),
@@ -468,8 +519,7 @@ class ProviderAnthropic(Provider):
 
         async def resolve_image_url(image_url: str) -> dict | None:
             if image_url.startswith("http"):
-                image_path = await download_image_by_url(image_url)
-                image_data = await self.encode_image_bs64(image_path)
+                image_data = await media_cache.encode_url(image_url)
             elif image_url.startswith("file:///"):
                 image_path = image_url.replace("file:///", "")
                 image_data = await self.encode_image_bs64(image_path)
@@ -546,10 +596,7 @@ class ProviderAnthropic(Provider):
         """将图片转换为 base64"""
         if image_url.startswith("base64://"):
             return image_url.replace("base64://", "data:image/jpeg;base64,")
-        with open(image_url, "rb") as f:
-            image_bs64 = base64.b64encode(f.read()).decode("utf-8")
-            return "data:image/jpeg;base64," + image_bs64
-        return ""
+        return await media_cache.encode_file(image_url)
 
     def get_current_key(self) -> str:
         return self.chosen_api_key
@@ -17,8 +17,8 @@ from astrbot.core.agent.message import ContentPart, ImageURLPart, TextPart
 from astrbot.core.message.message_event_result import MessageChain
 from astrbot.core.provider.entities import LLMResponse, TokenUsage
 from astrbot.core.provider.func_tool_manager import ToolSet
-from astrbot.core.utils.io import download_image_by_url
 
+from ..media_cache import media_cache
 from ..register import register_provider_adapter
 
 
@@ -412,9 +412,11 @@ class ProviderGoogleGenAI(Provider):
         self, usage_metadata: types.GenerateContentResponseUsageMetadata
     ) -> TokenUsage:
         """Extract usage from candidate"""
+        # prompt_token_count 已包含命中缓存的 token
+        cached = usage_metadata.cached_content_token_count or 0
         return TokenUsage(
-            input_other=usage_metadata.prompt_token_count or 0,
-            input_cached=usage_metadata.cached_content_token_count or 0,
+            input_other=(usage_metadata.prompt_token_count or 0) - cached,
+            input_cached=cached,
             output=usage_metadata.candidates_token_count or 0,
         )
 
@@ -848,8 +850,7 @@ class ProviderGoogleGenAI(Provider):
 
         async def resolve_image_part(image_url: str) -> dict | None:
             if image_url.startswith("http"):
-                image_path = await download_image_by_url(image_url)
-                image_data = await self.encode_image_bs64(image_path)
+                image_data = await media_cache.encode_url(image_url)
             elif image_url.startswith("file:///"):
                 image_path = image_url.replace("file:///", "")
                 image_data = await self.encode_image_bs64(image_path)
@@ -912,9 +913,7 @@ class ProviderGoogleGenAI(Provider):
         """将图片转换为 base64"""
         if image_url.startswith("base64://"):
             return image_url.replace("base64://", "data:image/jpeg;base64,")
-        with open(image_url, "rb") as f:
-            image_bs64 = base64.b64encode(f.read()).decode("utf-8")
-            return "data:image/jpeg;base64," + image_bs64
+        return await media_cache.encode_file(image_url)
 
     async def terminate(self):
         logger.info("Google GenAI 适配器已终止。")
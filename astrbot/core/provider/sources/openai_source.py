@@ -1,5 +1,4 @@
 import asyncio
-import base64
 import inspect
 import json
 import os
@@ -21,8 +20,8 @@ from astrbot.core.agent.message import ContentPart, ImageURLPart, Message, TextP
 from astrbot.core.agent.tool import ToolSet
 from astrbot.core.message.message_event_result import MessageChain
 from astrbot.core.provider.entities import LLMResponse, TokenUsage, ToolCallsResult
-from astrbot.core.utils.io import download_image_by_url
 
+from ..media_cache import media_cache
 from ..register import register_provider_adapter
 
 
@@ -225,6 +224,9 @@ class ProviderOpenAIOfficial(Provider):
     def _extract_usage(self, usage: CompletionUsage) -> TokenUsage:
         ptd = usage.prompt_tokens_details
         cached = ptd.cached_tokens if ptd and ptd.cached_tokens else 0
+        if not cached:
+            # DeepSeek 的上下文硬盘缓存
+            cached = getattr(usage, "prompt_cache_hit_tokens", None) or 0
         prompt_tokens = 0 if usage.prompt_tokens is None else usage.prompt_tokens
         completion_tokens = (
             0 if usage.completion_tokens is None else usage.completion_tokens
@@ -630,8 +632,7 @@ class ProviderOpenAIOfficial(Provider):
 
         async def resolve_image_part(image_url: str) -> dict | None:
             if image_url.startswith("http"):
-                image_path = await download_image_by_url(image_url)
-                image_data = await self.encode_image_bs64(image_path)
+                image_data = await media_cache.encode_url(image_url)
             elif image_url.startswith("file:///"):
                 image_path = image_url.replace("file:///", "")
                 image_data = await self.encode_image_bs64(image_path)
@@ -694,6 +695,4 @@ class ProviderOpenAIOfficial(Provider):
         """将图片转换为 base64"""
         if image_url.startswith("base64://"):
             return image_url.replace("base64://", "data:image/jpeg;base64,")
-        with open(image_url, "rb") as f:
-            image_bs64 = base64.b64encode(f.read()).decode("utf-8")
-            return "data:image/jpeg;base64," + image_bs64
+        return await media_cache.encode_file(image_url)
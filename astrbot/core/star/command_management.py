@@ -389,7 +389,9 @@ def _apply_config_to_runtime(
     descriptor: CommandDescriptor,
     config: CommandConfig,
 ) -> None:
-    descriptor.handler.enabled = config.enabled
+    if descriptor.handler.enabled != config.enabled:
+        descriptor.handler.enabled = config.enabled
+        star_handlers_registry.invalidate()
     if descriptor.filter_ref:
         if descriptor.current_fragment:
             _set_filter_fragment(descriptor.filter_ref, descriptor.current_fragment)
@@ -436,6 +438,7 @@ def _set_filter_fragment(
     setattr(filter_ref, attr, fragment)
     if hasattr(filter_ref, "_cmpl_cmd_names"):
         filter_ref._cmpl_cmd_names = None
+    star_handlers_registry.invalidate_command_trie()
 
 
 def _set_filter_aliases(
@@ -448,6 +451,7 @@ def _set_filter_aliases(
     setattr(filter_ref, "alias", set(aliases))
     if hasattr(filter_ref, "_cmpl_cmd_names"):
         filter_ref._cmpl_cmd_names = None
+    star_handlers_registry.invalidate_command_trie()
 
 
 def _is_command_in_use(
@@ -0,0 +1,83 @@
+"""指令前缀树
+
+将所有指令 / 指令组的完整指令名 (含别名和父指令组前缀) 预编译为字符级前缀树,
+唤醒阶段只需沿消息文本走一遍即可得到可能匹配的 handler, 不必逐个调用 CommandFilter。
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from .filter.command import CommandFilter
+from .filter.command_group import CommandGroupFilter
+
+if TYPE_CHECKING:
+    from .star_handler import StarHandlerMetadata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_command_text(text: str) -> str:
+    """与 CommandFilter 一致: 去除首尾空白并将连续空白合并为一个空格"""
+    return _WHITESPACE.sub(" ", text.strip())
+
+
+class _TrieNode:
+    __slots__ = ("children", "commands", "groups")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.commands: set[str] = set()
+        """在此处结束的指令, 要求后面是空格或消息结尾"""
+        self.groups: set[str] = set()
+        """在此处结束的指令组, 只要求前缀匹配"""
+
+
+class CommandTrie:
+    """指令名前缀树
+
+    匹配结果是候选 handler 的超集, 仍需由 handler 自身的过滤器做最终判断 (并解析参数)。
+    """
+
+    def __init__(self, handlers: Iterable[StarHandlerMetadata] = ()):
+        self._root = _TrieNode()
+        self.command_handlers: set[str] = set()
+        """注册了指令 / 指令组过滤器的 handler 全名"""
+        for handler in handlers:
+            self.add(handler)
+
+    def add(self, handler: StarHandlerMetadata):
+        for filter_ in handler.event_filters:
+            if isinstance(filter_, CommandFilter):
+                is_group = False
+            elif isinstance(filter_, CommandGroupFilter):
+                is_group = True
+            else:
+                continue
+            self.command_handlers.add(handler.handler_full_name)
+            for name in filter_.get_complete_command_names():
+                node = self._root
+                for ch in normalize_command_text(name):
+                    node = node.children.setdefault(ch, _TrieNode())
+                if is_group:
+                    node.groups.add(handler.handler_full_name)
+                else:
+                    node.commands.add(handler.handler_full_name)
+
+    def match(self, message_str: str) -> set[str]:
+        """返回指令名可能与消息匹配的 handler 全名集合, 复杂度与消息长度线性相关"""
+        text = normalize_command_text(message_str)
+        node = self._root
+        matched = set(node.groups)
+        if not text:
+            matched |= node.commands
+        for i, ch in enumerate(text):
+            node = node.children.get(ch)
+            if node is None:
+                break
+            matched |= node.groups
+            if node.commands and (i + 1 == len(text) or text[i + 1] == " "):
+                matched |= node.commands
+        return matched
@@ -441,8 +441,12 @@ def register_llm_tool(name: str | None = None, **kwargs):
     yield
     ```
 
+    如果工具没有副作用（如搜索、查询），可以传入 `parallel_safe=True`，
+    开启工具并发执行后，同一轮中的多个此类工具调用会被同时执行。
+
     """
     name_ = name
+    parallel_safe = kwargs.get("parallel_safe", False)
     registering_agent = None
     if kwargs.get("registering_agent"):
         registering_agent = kwargs["registering_agent"]
@@ -493,7 +497,9 @@ def register_llm_tool(name: str | None = None, **kwargs):
         if not registering_agent:
             doc_desc = docstring.description.strip() if docstring.description else ""
             md = get_handler_or_create(awaitable, EventType.OnCallingFuncToolEvent)
-            llm_tools.add_func(llm_tool_name, args, doc_desc, md.handler)
+            llm_tools.add_func(
+                llm_tool_name, args, doc_desc, md.handler, parallel_safe=parallel_safe
+            )
         else:
             assert isinstance(registering_agent, RegisteringAgent)
             # print(f"Registering tool {llm_tool_name} for agent", registering_agent._agent.name)
@@ -501,7 +507,9 @@ def register_llm_tool(name: str | None = None, **kwargs):
                 registering_agent._agent.tools = []
 
             desc = docstring.description.strip() if docstring.description else ""
-            tool = llm_tools.spec_to_func(llm_tool_name, args, desc, awaitable)
+            tool = llm_tools.spec_to_func(
+                llm_tool_name, args, desc, awaitable, parallel_safe=parallel_safe
+            )
             registering_agent._agent.tools.append(tool)
 
         return awaitable
@@ -3,11 +3,14 @@ from __future__ import annotations
 import enum
 from collections.abc import AsyncGenerator, Awaitable, Callable
 from dataclasses import dataclass, field
-from typing import Any, Generic, Literal, TypeVar, overload
+from typing import TYPE_CHECKING, Any, Generic, Literal, TypeVar, overload
 
 from .filter import HandlerFilter
 from .star import star_map
 
+if TYPE_CHECKING:
+    from .command_trie import CommandTrie
+
 T = TypeVar("T", bound="StarHandlerMetadata")
 
 
@@ -15,6 +18,11 @@ class StarHandlerRegistry(Generic[T]):
     def __init__(self):
         self.star_handlers_map: dict[str, StarHandlerMetadata] = {}
         self._handlers: list[StarHandlerMetadata] = []
+        # 按事件类型分桶、按优先级有序的 handler 列表, handler 增删后惰性重建
+        self._buckets: dict[EventType, list[StarHandlerMetadata]] | None = None
+        # (事件类型, only_activated, 插件白名单) -> 过滤后的 handler 列表
+        self._filtered_cache: dict[tuple, list[StarHandlerMetadata]] = {}
+        self._command_trie: CommandTrie | None = None
 
     def append(self, handler: StarHandlerMetadata):
         """添加一个 Handler，并保持按优先级有序"""
@@ -24,6 +32,27 @@ class StarHandlerRegistry(Generic[T]):
         self.star_handlers_map[handler.handler_full_name] = handler
         self._handlers.append(handler)
         self._handlers.sort(key=lambda h: -h.extras_configs["priority"])
+        self._on_handlers_changed()
+
+    def _on_handlers_changed(self):
+        self._buckets = None
+        self._command_trie = None
+        self.invalidate()
+
+    def invalidate(self):
+        """清除按启用状态和插件白名单过滤后的 handler 缓存。
+
+        插件被启用、禁用、重载, 或 handler 的 enabled 状态被修改后需要调用。
+        """
+        self._filtered_cache.clear()
+
+    def _get_bucket(self, event_type: EventType) -> list[StarHandlerMetadata]:
+        if self._buckets is None:
+            buckets: dict[EventType, list[StarHandlerMetadata]] = {}
+            for handler in self._handlers:
+                buckets.setdefault(handler.event_type, []).append(handler)
+            self._buckets = buckets
+        return self._buckets.get(event_type, [])
 
     def _print_handlers(self):
         for handler in self._handlers:
@@ -112,12 +141,27 @@ class StarHandlerRegistry(Generic[T]):
         event_type: EventType,
         only_activated=True,
         plugins_name: list[str] | None = None,
+    ) -> list[StarHandlerMetadata]:
+        if plugins_name is not None and plugins_name != ["*"]:
+            whitelist = tuple(plugins_name)
+        else:
+            whitelist = None
+        key = (event_type, bool(only_activated), whitelist)
+        handlers = self._filtered_cache.get(key)
+        if handlers is None:
+            handlers = self._filter_handlers(event_type, only_activated, whitelist)
+            self._filtered_cache[key] = handlers
+        # 返回副本, 避免调用方修改缓存
+        return list(handlers)
+
+    def _filter_handlers(
+        self,
+        event_type: EventType,
+        only_activated: bool,
+        plugins_name: tuple[str, ...] | None,
     ) -> list[StarHandlerMetadata]:
         handlers = []
-        for handler in self._handlers:
-            # 过滤事件类型
-            if handler.event_type != event_type:
-                continue
+        for handler in self._get_bucket(event_type):
             if not handler.enabled:
                 continue
             # 过滤启用状态
@@ -126,7 +170,7 @@ class StarHandlerRegistry(Generic[T]):
                 if not (plugin and plugin.activated):
                     continue
             # 过滤插件白名单
-            if plugins_name is not None and plugins_name != ["*"]:
+            if plugins_name is not None:
                 plugin = star_map.get(handler.handler_module_path)
                 if not plugin:
                     continue
@@ -143,6 +187,20 @@ class StarHandlerRegistry(Generic[T]):
             handlers.append(handler)
         return handlers
 
+    def get_command_trie(self) -> CommandTrie:
+        """获取消息事件 handler 的指令前缀树, 在 handler 或指令名变化后惰性重建"""
+        if self._command_trie is None:
+            from .command_trie import CommandTrie
+
+            self._command_trie = CommandTrie(
+                self._get_bucket(EventType.AdapterMessageEvent),
+            )
+        return self._command_trie
+
+    def invalidate_command_trie(self):
+        """指令名或别名在运行时被修改后调用"""
+        self._command_trie = None
+
     def get_handler_by_full_name(self, full_name: str) -> StarHandlerMetadata | None:
         return self.star_handlers_map.get(full_name, None)
 
@@ -159,10 +217,12 @@ class StarHandlerRegistry(Generic[T]):
     def clear(self):
         self.star_handlers_map.clear()
         self._handlers.clear()
+        self._on_handlers_changed()
 
     def remove(self, handler: StarHandlerMetadata):
         self.star_handlers_map.pop(handler.handler_full_name, None)
         self._handlers = [h for h in self._handlers if h != handler]
+        self._on_handlers_changed()
 
     def __iter__(self):
         return iter(self._handlers)
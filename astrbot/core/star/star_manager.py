@@ -569,6 +569,7 @@ class PluginManager:
                 # 禁用/启用插件
                 if metadata.module_path in inactivated_plugins:
                     metadata.activated = False
+                star_handlers_registry.invalidate()
 
                 # Plugin logo path
                 if os.path.exists(logo_path):
@@ -901,6 +902,7 @@ class PluginManager:
             await sp.global_put("inactivated_llm_tools", inactivated_llm_tools)
 
             plugin.activated = False
+            star_handlers_registry.invalidate()
 
     @staticmethod
     async def _terminate_plugin(star_metadata: StarMetadata):
@@ -1,16 +1,92 @@
 import fnmatch
+import re
+from collections import OrderedDict
+from collections.abc import Callable
 
 from astrbot.core.utils.shared_preferences import SharedPreferences
 
+_WILDCARD_CHARS = frozenset("*?[")
+
+_NOT_FOUND = object()
+
+RESOLVED_CACHE_SIZE = 4096
+"""已解析的 UMO 缓存数量"""
+
+_PartMatcher = Callable[[str], bool] | None
+"""UMOP 一段的匹配函数, None 表示匹配任意值"""
+
+
+def _compile_part(part: str) -> _PartMatcher:
+    if part == "":
+        return None
+    if _WILDCARD_CHARS.isdisjoint(part):
+        return part.__eq__
+    # 与 fnmatch.fnmatchcase 的规则一致
+    return re.compile(fnmatch.translate(part)).match
+
+
+class _CompiledRoute:
+    __slots__ = ("conf_id", "index", "matchers")
+
+    def __init__(self, index: int, pattern: str, conf_id: str):
+        self.index = index
+        """在路由表中的顺序, 越小优先级越高"""
+        self.conf_id = conf_id
+        self.matchers = [_compile_part(p) for p in pattern.split(":")]
+
+    def match(self, parts: list[str]) -> bool:
+        return all(m is None or m(t) for m, t in zip(self.matchers, parts))
+
 
 class UmopConfigRouter:
-    """UMOP 配置路由器"""
+    """UMOP 配置路由器
+
+    路由表按顺序匹配, 第一条匹配的规则生效。路由表更新时会编译为:
+
+    - 完全指定 (三段都不含通配符) 的 UMOP 的哈希表
+    - 按平台 ID 分桶的其他规则, 平台 ID 含通配符或为空的规则放入所有平台共用的列表
+    - 每一段的通配符预先编译为正则表达式
+
+    并缓存最近解析过的 UMO。直接修改 umop_to_conf_id 后需要调用 update_routing_data。
+    """
 
     def __init__(self, sp: SharedPreferences):
         self.umop_to_conf_id: dict[str, str] = {}
         """UMOP 到配置文件 ID 的映射"""
         self.sp = sp
 
+        self._exact: dict[str, tuple[int, str]] = {}
+        self._by_platform: dict[str, list[_CompiledRoute]] = {}
+        """平台 ID -> 该平台的规则与通用规则, 按 index 排序"""
+        self._generic: list[_CompiledRoute] = []
+        self._resolved: OrderedDict[str, str | object] = OrderedDict()
+
+    def _compile(self):
+        """编译路由表并清空解析缓存"""
+        exact: dict[str, tuple[int, str]] = {}
+        platform_routes: dict[str, list[_CompiledRoute]] = {}
+        generic: list[_CompiledRoute] = []
+        for index, (pattern, conf_id) in enumerate(self.umop_to_conf_id.items()):
+            parts = pattern.split(":")
+            if len(parts) != 3:
+                continue  # 非法格式
+            if all(p and _WILDCARD_CHARS.isdisjoint(p) for p in parts):
+                exact[pattern] = (index, conf_id)
+                continue
+            route = _CompiledRoute(index, pattern, conf_id)
+            if parts[0] and _WILDCARD_CHARS.isdisjoint(parts[0]):
+                platform_routes.setdefault(parts[0], []).append(route)
+            else:
+                generic.append(route)
+
+        self._exact = exact
+        self._generic = generic
+        self._by_platform = {
+            platform_id: sorted(routes + generic, key=lambda r: r.index)
+            for platform_id, routes in platform_routes.items()
+        }
+        self._resolved.clear()
+
     async def initialize(self):
         await self._load_routing_table()
 
@@ -24,16 +100,7 @@ class UmopConfigRouter:
             scope_id="global",
         )
         self.umop_to_conf_id = sp_data
-
-    def _is_umo_match(self, p1: str, p2: str) -> bool:
-        """判断 p2 umo 是否逻辑包含于 p1 umo"""
-        p1_ls = p1.split(":")
-        p2_ls = p2.split(":")
-
-        if len(p1_ls) != 3 or len(p2_ls) != 3:
-            return False  # 非法格式
-
-        return all(p == "" or fnmatch.fnmatchcase(t, p) for p, t in zip(p1_ls, p2_ls))
+        self._compile()
 
     def get_conf_id_for_umop(self, umo: str) -> str | None:
         """根据 UMO 获取对应的配置文件 ID
@@ -45,10 +112,31 @@ class UmopConfigRouter:
             str | None: 配置文件 ID，如果没有找到则返回 None
 
         """
-        for pattern, conf_id in self.umop_to_conf_id.items():
-            if self._is_umo_match(pattern, umo):
-                return conf_id
-        return None
+        cached = self._resolved.get(umo, _NOT_FOUND)
+        if cached is not _NOT_FOUND:
+            self._resolved.move_to_end(umo)
+            return cached  # type: ignore[return-value]
+
+        conf_id = self._resolve(umo)
+        self._resolved[umo] = conf_id
+        if len(self._resolved) > RESOLVED_CACHE_SIZE:
+            self._resolved.popitem(last=False)
+        return conf_id
+
+    def _resolve(self, umo: str) -> str | None:
+        parts = umo.split(":")
+        if len(parts) != 3:
+            return None  # 非法格式
+
+        best_index, best_conf_id = self._exact.get(
+            umo, (len(self.umop_to_conf_id), None)
+        )
+        for route in self._by_platform.get(parts[0], self._generic):
+            if route.index >= best_index:
+                break
+            if route.match(parts):
+                return route.conf_id
+        return best_conf_id
 
     async def update_routing_data(self, new_routing: dict[str, str]):
         """更新路由表
@@ -68,6 +156,7 @@ class UmopConfigRouter:
                 )
 
         self.umop_to_conf_id = new_routing
+        self._compile()
         await self.sp.global_put("umop_config_routing", self.umop_to_conf_id)
 
     async def update_route(self, umo: str, conf_id: str):
@@ -87,6 +176,7 @@ class UmopConfigRouter:
             )
 
         self.umop_to_conf_id[umo] = conf_id
+        self._compile()
         await self.sp.global_put("umop_config_routing", self.umop_to_conf_id)
 
     async def delete_route(self, umo: str):
@@ -106,4 +196,5 @@ class UmopConfigRouter:
 
         if umo in self.umop_to_conf_id:
             del self.umop_to_conf_id[umo]
+            self._compile()
             await self.sp.global_put("umop_config_routing", self.umop_to_conf_id)
@@ -0,0 +1,106 @@
+"""进程内共享的 HTTP 客户端连接池。
+
+下载图片/文件、文转图、网页搜索等场景共用同一个 aiohttp.ClientSession,
+复用 TCP/TLS 连接并缓存 DNS 解析结果, 避免每次请求都重新建立连接。
+
+使用方式::
+
+    session = http_client.get_session()
+    async with session.get(url) as resp:
+        ...
+
+注意不要使用 ``async with http_client.get_session()``, 这会关闭共享的会话。
+代理通过 ``trust_env`` 读取环境变量, 与 AstrBot 的 ``http_proxy`` 配置一致。
+"""
+
+import asyncio
+import logging
+import ssl
+
+import aiohttp
+import certifi
+
+logger = logging.getLogger("astrbot")
+
+
+class HttpClientManager:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 30,
+    ):
+        """
+        Args:
+            limit: 连接池的最大连接数
+            limit_per_host: 每个主机的最大连接数
+            ttl_dns_cache: DNS 解析结果的缓存时间（秒）
+            keepalive_timeout: 空闲连接的保持时间（秒）
+
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._insecure_ssl_context: ssl.SSLContext | None = None
+
+    def configure(
+        self,
+        limit: int | None = None,
+        limit_per_host: int | None = None,
+    ) -> None:
+        """更新连接池配置, 在下一次创建会话时生效。"""
+        if limit is not None:
+            self.limit = limit
+        if limit_per_host is not None:
+            self.limit_per_host = limit_per_host
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的会话。会话与事件循环绑定, 在新的事件循环中会重新创建。"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                # 旧的事件循环已经结束, 其中的连接无法再使用
+                self._session.detach()
+            connector = aiohttp.TCPConnector(
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            # 不保存 Cookie, 避免不同调用方之间互相影响
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trust_env=True,
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+            self._loop = loop
+        return self._session
+
+    @property
+    def insecure_ssl_context(self) -> ssl.SSLContext:
+        """不校验证书的 SSL 上下文, 仅用于证书校验失败时的回退。"""
+        if self._insecure_ssl_context is None:
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            self._insecure_ssl_context = ctx
+        return self._insecure_ssl_context
+
+    async def close(self) -> None:
+        """关闭共享的会话, 等待连接释放。"""
+        session, self._session = self._session, None
+        if session is None or session.closed:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            # 会话属于已经结束的事件循环, 无法在这里关闭
+            return
+        await session.close()
+        logger.debug("已关闭共享的 HTTP 连接池。")
+
+
+http_client = HttpClientManager()
@@ -4,18 +4,17 @@ import logging
 import os
 import shutil
 import socket
-import ssl
 import time
 import uuid
 import zipfile
 from pathlib import Path
 
 import aiohttp
-import certifi
 import psutil
 from PIL import Image
 
 from .astrbot_path import get_astrbot_data_path
+from .http_client import http_client
 
 logger = logging.getLogger("astrbot")
 
@@ -75,6 +74,20 @@ def save_temp_img(img: Image.Image | bytes) -> str:
     return p
 
 
+async def _read_url(
+    url: str,
+    post: bool = False,
+    post_data: dict | None = None,
+    **kwargs,
+) -> bytes:
+    session = http_client.get_session()
+    if post:
+        async with session.post(url, json=post_data, **kwargs) as resp:
+            return await resp.read()
+    async with session.get(url, **kwargs) as resp:
+        return await resp.read()
+
+
 async def download_image_by_url(
     url: str,
     post: bool = False,
@@ -83,28 +96,7 @@ async def download_image_by_url(
 ) -> str:
     """下载图片, 返回 path"""
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where(),
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)  # 使用 certifi 的根证书
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=connector,
-        ) as session:
-            if post:
-                async with session.post(url, json=post_data) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-            else:
-                async with session.get(url) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
+        data = await _read_url(url, post, post_data)
     except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
         # 关闭SSL验证（仅在证书验证失败时作为fallback）
         logger.warning(
@@ -113,65 +105,54 @@ async def download_image_by_url(
             "This is insecure and exposes the application to man-in-the-middle attacks. "
             "Please investigate and resolve certificate issues."
         )
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        async with aiohttp.ClientSession() as session:
-            if post:
-                async with session.post(url, json=post_data, ssl=ssl_context) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-            else:
-                async with session.get(url, ssl=ssl_context) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-    except Exception as e:
-        raise e
+        data = await _read_url(
+            url, post, post_data, ssl=http_client.insecure_ssl_context
+        )
+    if not path:
+        return save_temp_img(data)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+async def _download_to_file(
+    url: str,
+    path: str,
+    show_progress: bool,
+    timeout: int,
+    **kwargs,
+) -> None:
+    session = http_client.get_session()
+    async with session.get(url, timeout=timeout, **kwargs) as resp:
+        if resp.status != 200:
+            raise Exception(f"下载文件失败: {resp.status}")
+        total_size = int(resp.headers.get("content-length", 0))
+        downloaded_size = 0
+        start_time = time.time()
+        if show_progress:
+            print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
+        with open(path, "wb") as f:
+            while True:
+                chunk = await resp.content.read(8192)
+                if not chunk:
+                    break
+                f.write(chunk)
+                downloaded_size += len(chunk)
+                if show_progress:
+                    elapsed_time = (
+                        time.time() - start_time if time.time() - start_time > 0 else 1
+                    )
+                    speed = downloaded_size / 1024 / elapsed_time  # KB/s
+                    print(
+                        f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
+                        end="",
+                    )
 
 
 async def download_file(url: str, path: str, show_progress: bool = False):
     """从指定 url 下载文件到指定路径 path"""
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where(),
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=connector,
-        ) as session:
-            async with session.get(url, timeout=1800) as resp:
-                if resp.status != 200:
-                    raise Exception(f"下载文件失败: {resp.status}")
-                total_size = int(resp.headers.get("content-length", 0))
-                downloaded_size = 0
-                start_time = time.time()
-                if show_progress:
-                    print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
-                with open(path, "wb") as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if show_progress:
-                            elapsed_time = (
-                                time.time() - start_time
-                                if time.time() - start_time > 0
-                                else 1
-                            )
-                            speed = downloaded_size / 1024 / elapsed_time  # KB/s
-                            print(
-                                f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
-                                end="",
-                            )
+        await _download_to_file(url, path, show_progress, timeout=1800)
     except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
         # 关闭SSL验证（仅在证书验证失败时作为fallback）
         logger.warning(
@@ -183,30 +164,13 @@ async def download_file(url: str, path: str, show_progress: bool = False):
             "This is insecure and exposes the application to man-in-the-middle attacks. "
             "Please investigate certificate issues with the remote server."
         )
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, ssl=ssl_context, timeout=120) as resp:
-                total_size = int(resp.headers.get("content-length", 0))
-                downloaded_size = 0
-                start_time = time.time()
-                if show_progress:
-                    print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
-                with open(path, "wb") as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if show_progress:
-                            elapsed_time = time.time() - start_time
-                            speed = downloaded_size / 1024 / elapsed_time  # KB/s
-                            print(
-                                f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
-                                end="",
-                            )
+        await _download_to_file(
+            url,
+            path,
+            show_progress,
+            timeout=120,
+            ssl=http_client.insecure_ssl_context,
+        )
     if show_progress:
         print()
 
@@ -3,10 +3,9 @@ import socket
 import sys
 import uuid
 
-import aiohttp
-
 from astrbot.core import db_helper, logger
 from astrbot.core.config import VERSION
+from astrbot.core.utils.http_client import http_client
 
 
 class Metric:
@@ -67,9 +66,9 @@ class Metric:
             logger.error(f"保存指标到数据库失败: {e}")
 
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.post(base_url, json=payload, timeout=3) as response:
-                    if response.status != 200:
-                        pass
+            session = http_client.get_session()
+            async with session.post(base_url, json=payload, timeout=3) as response:
+                if response.status != 200:
+                    pass
         except Exception:
             pass
@@ -13,6 +13,8 @@ from astrbot.core.platform import AstrMessageEvent
 
 USER_SESSIONS: dict[str, "SessionWaiter"] = {}  # 存储 SessionWaiter 实例
 FILTERS: list["SessionFilter"] = []  # 存储 SessionFilter 实例
+WAIT_HOOKS: list[Callable[[], Any]] = []
+"""等待者注册后调用的回调, 用于放行注册前已经排队的后续消息"""
 
 
 class SessionController:
@@ -129,6 +131,8 @@ class SessionWaiter:
         """等待外部输入并处理"""
         self.handler = handler
         USER_SESSIONS[self.session_id] = self
+        for hook in WAIT_HOOKS:
+            hook()
 
         # 开始一个会话保持事件
         self.session_controller.keep(timeout, reset_timeout=True)
@@ -1,6 +1,10 @@
 import asyncio
+import copy
+import logging
 import os
 import threading
+from collections import OrderedDict
+from collections.abc import Coroutine
 from typing import Any, TypeVar, overload
 
 from astrbot.core.db import BaseDatabase
@@ -8,11 +12,42 @@ from astrbot.core.db.po import Preference
 
 from .astrbot_path import get_astrbot_data_path
 
+logger = logging.getLogger("astrbot")
+
 _VT = TypeVar("_VT")
 
+_MISSING = object()
+"""缓存中表示数据库里没有该偏好设置"""
+_NOT_CACHED = object()
+
+DEFAULT_CACHE_MAX_ENTRIES = 8192
+
+
+def _copy_value(value: Any) -> Any:
+    # 调用方可能会修改取到的 dict / list, 不能让其直接修改缓存
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
 
 class SharedPreferences:
-    def __init__(self, db_helper: BaseDatabase, json_storage_path=None):
+    """偏好设置存储
+
+    读取经过一个按 (scope, scope_id, key) 索引的有界 LRU 缓存。缓存未命中时一次
+    加载整个 (scope, scope_id) 下的全部键, 之后该范围内不存在的键也无需再查询数据库。
+    通过本类写入 (put_async / remove_async / clear_async) 时同步更新缓存; 绕过本类
+    直接修改 preferences 表后需要调用 invalidate()。
+
+    已弃用的同步接口 get / put / remove / clear 优先使用缓存: 在事件循环中调用时,
+    读取只访问缓存, 写入立即更新缓存并在后台按调用顺序写入数据库, 不会阻塞事件循环。
+    """
+
+    def __init__(
+        self,
+        db_helper: BaseDatabase,
+        json_storage_path=None,
+        max_cache_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ):
         if json_storage_path is None:
             json_storage_path = os.path.join(
                 get_astrbot_data_path(),
@@ -21,10 +56,162 @@ class SharedPreferences:
         self.path = json_storage_path
         self.db_helper = db_helper
 
+        self.max_cache_entries = max_cache_entries
+        self._cache: OrderedDict[tuple[str, str, str], Any] = OrderedDict()
+        self._complete: OrderedDict[tuple[str, str], None] = OrderedDict()
+        """已完整加载到缓存的 (scope, scope_id), 与 _cache 一样按 LRU 淘汰。
+        没有任何键的范围不占用 _cache 的条目, 需要单独限制数量"""
+        self._complete_scopes: set[str] = set()
+        """已完整加载到缓存的 scope"""
+        # 已弃用的同步接口会在另一个线程的事件循环中访问缓存
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        """每次写入或失效时递增, 用于丢弃与写入并发的读取结果"""
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._pending_write: asyncio.Task | None = None
+        self._warned_scopes: set[str] = set()
+
         self._sync_loop = asyncio.new_event_loop()
         t = threading.Thread(target=self._sync_loop.run_forever, daemon=True)
         t.start()
 
+    def _cache_lookup(self, scope: str, scope_id: str, key: str) -> Any:
+        """查询缓存, 返回值、_MISSING (确定不存在) 或 _NOT_CACHED"""
+        cache_key = (scope, scope_id, key)
+        with self._cache_lock:
+            value = self._cache.get(cache_key, _NOT_CACHED)
+            if value is not _NOT_CACHED:
+                self._cache.move_to_end(cache_key)
+            elif (scope, scope_id) in self._complete:
+                self._complete.move_to_end((scope, scope_id))
+                value = _MISSING
+            elif scope in self._complete_scopes:
+                value = _MISSING
+            else:
+                self.cache_misses += 1
+                return _NOT_CACHED
+            self.cache_hits += 1
+            return value
+
+    def _evict_locked(self):
+        while len(self._cache) > self.max_cache_entries:
+            (scope, scope_id, _), _ = self._cache.popitem(last=False)
+            self._complete.pop((scope, scope_id), None)
+            self._complete_scopes.discard(scope)
+        while len(self._complete) > self.max_cache_entries:
+            self._complete.popitem(last=False)
+
+    def _cache_set(
+        self,
+        cache_key: tuple[str, str, str],
+        value: Any,
+        generation: int | None = None,
+    ):
+        """写入缓存
+
+        读取时传入读取前的 generation, 若期间发生过写入则放弃, 避免缓存旧值;
+        写入时不传, 同时使正在进行的读取失效。
+        """
+        with self._cache_lock:
+            if generation is None:
+                self._generation += 1
+            elif generation != self._generation:
+                return
+            self._cache[cache_key] = value
+            self._cache.move_to_end(cache_key)
+            self._evict_locked()
+
+    def _cache_fill(
+        self,
+        prefs: list[Preference],
+        generation: int,
+        scope: str,
+        scope_id: str | None,
+    ):
+        """缓存一次范围查询的结果, 并将该范围标记为已完整加载"""
+        with self._cache_lock:
+            if generation != self._generation:
+                return
+            for pref in prefs:
+                cache_key = (pref.scope, pref.scope_id, pref.key)
+                self._cache[cache_key] = pref.value["val"]
+                self._cache.move_to_end(cache_key)
+            if scope_id is None:
+                self._complete_scopes.add(scope)
+            else:
+                self._complete[(scope, scope_id)] = None
+                self._complete.move_to_end((scope, scope_id))
+            self._evict_locked()
+
+    def invalidate(
+        self,
+        scope: str | None = None,
+        scope_id: str | None = None,
+        key: str | None = None,
+    ):
+        """使缓存失效, 参数为 None 时匹配任意值"""
+        with self._cache_lock:
+            self._generation += 1
+            if scope is None and scope_id is None and key is None:
+                self._cache.clear()
+                self._complete.clear()
+                self._complete_scopes.clear()
+                return
+            for cache_key in [
+                k
+                for k in self._cache
+                if (scope is None or k[0] == scope)
+                and (scope_id is None or k[1] == scope_id)
+                and (key is None or k[2] == key)
+            ]:
+                del self._cache[cache_key]
+            for bucket in [
+                (s, s_id)
+                for s, s_id in self._complete
+                if (scope is None or s == scope)
+                and (scope_id is None or s_id == scope_id)
+            ]:
+                del self._complete[bucket]
+            if scope is None:
+                self._complete_scopes.clear()
+            else:
+                self._complete_scopes.discard(scope)
+
+    def cache_stats(self) -> dict[str, Any]:
+        total = self.cache_hits + self.cache_misses
+        return {
+            "entries": len(self._cache),
+            "max_entries": self.max_cache_entries,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / total if total else 0.0,
+        }
+
+    async def warm_up(self, scope: str = "global", scope_id: str | None = None):
+        """预先加载某个范围的全部偏好设置到缓存"""
+        generation = self._generation
+        prefs = await self.db_helper.get_preferences(scope, scope_id)
+        self._cache_fill(prefs, generation, scope, scope_id)
+
+    async def _fetch(self, scope: str, scope_id: str, key: str) -> Any:
+        """读取偏好设置, 返回值或 _MISSING"""
+        value = self._cache_lookup(scope, scope_id, key)
+        if value is not _NOT_CACHED:
+            return value
+        # 一次加载该会话 / 范围下的全部键
+        await self.warm_up(scope, scope_id)
+        value = self._cache_lookup(scope, scope_id, key)
+        if value is not _NOT_CACHED:
+            return value
+        # 加载期间发生了写入, 或该范围的键多于缓存容量
+        generation = self._generation
+        result = await self.db_helper.get_preference(scope, scope_id, key)
+        value = result.value["val"] if result else _MISSING
+        self._cache_set((scope, scope_id, key), value, generation)
+        return value
+
     async def get_async(
         self,
         scope: str,
@@ -34,12 +221,10 @@ class SharedPreferences:
     ) -> _VT:
         """获取指定范围和键的偏好设置"""
         if scope_id is not None and key is not None:
-            result = await self.db_helper.get_preference(scope, scope_id, key)
-            if result:
-                ret = result.value["val"]
-            else:
-                ret = default
-            return ret
+            value = await self._fetch(scope, scope_id, key)
+            if value is _MISSING:
+                return default
+            return _copy_value(value)
 
     async def range_get_async(
         self,
@@ -120,12 +305,21 @@ class SharedPreferences:
 
     async def put_async(self, scope: str, scope_id: str, key: str, value: Any):
         """设置指定范围和键的偏好设置"""
-        await self.db_helper.insert_preference_or_update(
-            scope,
-            scope_id,
-            key,
-            {"val": value},
-        )
+        await self.flush()
+        await self._put(scope, scope_id, key, value)
+
+    async def _put(self, scope: str, scope_id: str, key: str, value: Any):
+        try:
+            await self.db_helper.insert_preference_or_update(
+                scope,
+                scope_id,
+                key,
+                {"val": value},
+            )
+        except BaseException:
+            self.invalidate(scope, scope_id, key)
+            raise
+        self._cache_set((scope, scope_id, key), _copy_value(value))
 
     async def session_put(self, umo: str, key: str, value: Any):
         await self.put_async("umo", umo, key, value)
@@ -135,7 +329,16 @@ class SharedPreferences:
 
     async def remove_async(self, scope: str, scope_id: str, key: str):
         """删除指定范围和键的偏好设置"""
-        await self.db_helper.remove_preference(scope, scope_id, key)
+        await self.flush()
+        await self._remove(scope, scope_id, key)
+
+    async def _remove(self, scope: str, scope_id: str, key: str):
+        try:
+            await self.db_helper.remove_preference(scope, scope_id, key)
+        except BaseException:
+            self.invalidate(scope, scope_id, key)
+            raise
+        self._cache_set((scope, scope_id, key), _MISSING)
 
     async def session_remove(self, umo: str, key: str):
         await self.remove_async("umo", umo, key)
@@ -146,12 +349,63 @@ class SharedPreferences:
 
     async def clear_async(self, scope: str, scope_id: str):
         """清空指定范围的所有偏好设置"""
-        await self.db_helper.clear_preferences(scope, scope_id)
+        await self.flush()
+        await self._clear(scope, scope_id)
+
+    async def _clear(self, scope: str, scope_id: str):
+        try:
+            await self.db_helper.clear_preferences(scope, scope_id)
+        finally:
+            self.invalidate(scope, scope_id)
+        # 清空后该范围确定没有任何键
+        self._cache_fill([], self._generation, scope, scope_id)
+
+    async def flush(self):
+        """等待同步接口在后台发起的写入完成"""
+        task = self._pending_write
+        if (
+            task is not None
+            and not task.done()
+            and task is not asyncio.current_task()
+            and task.get_loop() is asyncio.get_running_loop()
+        ):
+            await asyncio.wait([task])
 
     # ====
     # DEPRECATED METHODS
     # ====
 
+    def _submit_write(self, coro: Coroutine[Any, Any, None]):
+        """执行同步接口的写入
+
+        不在事件循环中调用时等待写入完成; 在事件循环中调用时不阻塞, 写入按调用
+        顺序在后台执行, 调用方需要先自行更新缓存。
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run_coroutine_threadsafe(coro, self._sync_loop).result()
+            return
+
+        prev = self._pending_write
+
+        async def _run():
+            if prev is not None and not prev.done():
+                await asyncio.wait([prev])
+            await coro
+
+        task = loop.create_task(_run())
+        self._pending_write = task
+        task.add_done_callback(self._on_write_done)
+
+    def _on_write_done(self, task: asyncio.Task):
+        if self._pending_write is task:
+            self._pending_write = None
+        if task.cancelled():
+            return
+        if exc := task.exception():
+            logger.error(f"写入偏好设置失败: {exc}")
+
     def get(
         self,
         key: str,
@@ -159,7 +413,11 @@ class SharedPreferences:
         scope: str | None = None,
         scope_id: str | None = "",
     ) -> _VT:
-        """获取偏好设置（已弃用）"""
+        """获取偏好设置（已弃用）
+
+        优先从缓存读取。缓存中没有且在事件循环中调用时仍会阻塞等待数据库,
+        请改用 get_async。
+        """
         if scope_id == "":
             scope_id = "unknown"
         if scope_id is None or key is None:
@@ -167,12 +425,31 @@ class SharedPreferences:
             raise ValueError(
                 "scope_id and key cannot be None when getting a specific preference.",
             )
-        result = asyncio.run_coroutine_threadsafe(
-            self.get_async(scope or "unknown", scope_id or "unknown", key, default),
-            self._sync_loop,
-        ).result()
-
-        return result if result is not None else default
+        scope = scope or "unknown"
+        value = self._cache_lookup(scope, scope_id, key)
+        if value is _NOT_CACHED:
+            if self._in_event_loop() and scope not in self._warned_scopes:
+                self._warned_scopes.add(scope)
+                logger.warning(
+                    f"在事件循环中同步读取了未缓存的偏好设置 ({scope}, {key}), "
+                    "这会阻塞事件循环, 请改用 get_async。",
+                )
+            value = asyncio.run_coroutine_threadsafe(
+                self._fetch(scope, scope_id, key),
+                self._sync_loop,
+            ).result()
+
+        if value is _MISSING or value is None:
+            return default
+        return _copy_value(value)
+
+    @staticmethod
+    def _in_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
 
     def range_get(
         self,
@@ -190,21 +467,21 @@ class SharedPreferences:
 
     def put(self, key, value, scope: str | None = None, scope_id: str | None = None):
         """设置偏好设置（已弃用）"""
-        asyncio.run_coroutine_threadsafe(
-            self.put_async(scope or "unknown", scope_id or "unknown", key, value),
-            self._sync_loop,
-        ).result()
+        scope, scope_id = scope or "unknown", scope_id or "unknown"
+        # 写入可能在后台执行, 避免调用方之后修改 value 影响写入的内容
+        value = _copy_value(value)
+        self._cache_set((scope, scope_id, key), _copy_value(value))
+        self._submit_write(self._put(scope, scope_id, key, value))
 
     def remove(self, key, scope: str | None = None, scope_id: str | None = None):
         """删除偏好设置（已弃用）"""
-        asyncio.run_coroutine_threadsafe(
-            self.remove_async(scope or "unknown", scope_id or "unknown", key),
-            self._sync_loop,
-        ).result()
+        scope, scope_id = scope or "unknown", scope_id or "unknown"
+        self._cache_set((scope, scope_id, key), _MISSING)
+        self._submit_write(self._remove(scope, scope_id, key))
 
     def clear(self, scope: str | None = None, scope_id: str | None = None):
         """清空偏好设置（已弃用）"""
-        asyncio.run_coroutine_threadsafe(
-            self.clear_async(scope or "unknown", scope_id or "unknown"),
-            self._sync_loop,
-        ).result()
+        scope, scope_id = scope or "unknown", scope_id or "unknown"
+        self.invalidate(scope, scope_id)
+        self._cache_fill([], self._generation, scope, scope_id)
+        self._submit_write(self._clear(scope, scope_id))
@@ -456,7 +456,7 @@ class ConfigRoute(Route):
         config = post_data.get("config", DEFAULT_CONFIG)
 
         try:
-            conf_id = self.acm.create_conf(name=name, config=config)
+            conf_id = await self.acm.create_conf_async(name=name, config=config)
             return Response().ok(message="创建成功", data={"conf_id": conf_id}).__dict__
         except ValueError as e:
             return Response().error(str(e)).__dict__
@@ -494,7 +494,7 @@ class ConfigRoute(Route):
             return Response().error("缺少配置文件 ID").__dict__
 
         try:
-            success = self.acm.delete_conf(conf_id)
+            success = await self.acm.delete_conf_async(conf_id)
             if success:
                 return Response().ok(message="删除成功").__dict__
             return Response().error("删除失败").__dict__
@@ -517,7 +517,7 @@ class ConfigRoute(Route):
         name = post_data.get("name")
 
         try:
-            success = self.acm.update_conf_info(conf_id, name=name)
+            success = await self.acm.update_conf_info_async(conf_id, name=name)
             if success:
                 return Response().ok(message="更新成功").__dict__
             return Response().error("更新失败").__dict__
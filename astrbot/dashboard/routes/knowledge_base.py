@@ -45,6 +45,8 @@ class KnowledgeBaseRoute(Route):
             "/kb/update": ("POST", self.update_kb),
             "/kb/delete": ("POST", self.delete_kb),
             "/kb/stats": ("GET", self.get_kb_stats),
+            "/kb/index/stats": ("GET", self.get_index_stats),
+            "/kb/embedding_cache/stats": ("GET", self.get_embedding_cache_stats),
             # 文档管理
             "/kb/document/list": ("GET", self.list_documents),
             "/kb/document/upload": ("POST", self.upload_document),
@@ -53,6 +55,7 @@ class KnowledgeBaseRoute(Route):
             "/kb/document/upload/progress": ("GET", self.get_upload_progress),
             "/kb/document/get": ("GET", self.get_document),
             "/kb/document/delete": ("POST", self.delete_document),
+            "/kb/document/resync": ("POST", self.resync_document),
             # # 块管理
             "/kb/chunk/list": ("GET", self.list_chunks),
             "/kb/chunk/delete": ("POST", self.delete_chunk),
@@ -340,6 +343,7 @@ class KnowledgeBaseRoute(Route):
         - top_k_dense: 密集检索数量 (可选, 默认50)
         - top_k_sparse: 稀疏检索数量 (可选, 默认50)
         - top_m_final: 最终返回数量 (可选, 默认5)
+        - index_type: 向量索引类型 flat/hnsw/ivf_flat/ivf_pq (可选, 默认flat)
         """
         try:
             kb_manager = self._get_kb_manager()
@@ -357,6 +361,7 @@ class KnowledgeBaseRoute(Route):
             top_k_dense = data.get("top_k_dense")
             top_k_sparse = data.get("top_k_sparse")
             top_m_final = data.get("top_m_final")
+            index_type = data.get("index_type")
 
             # pre-check embedding dim
             if not embedding_provider_id:
@@ -411,6 +416,7 @@ class KnowledgeBaseRoute(Route):
                 top_k_dense=top_k_dense,
                 top_k_sparse=top_k_sparse,
                 top_m_final=top_m_final,
+                index_type=index_type,
             )
             kb = kb_helper.kb
 
@@ -464,6 +470,7 @@ class KnowledgeBaseRoute(Route):
         - top_k_dense: 密集检索数量 (可选)
         - top_k_sparse: 稀疏检索数量 (可选)
         - top_m_final: 最终返回数量 (可选)
+        - index_type: 向量索引类型 flat/hnsw/ivf_flat/ivf_pq (可选)
         """
         try:
             kb_manager = self._get_kb_manager()
@@ -483,6 +490,7 @@ class KnowledgeBaseRoute(Route):
             top_k_dense = data.get("top_k_dense")
             top_k_sparse = data.get("top_k_sparse")
             top_m_final = data.get("top_m_final")
+            index_type = data.get("index_type")
 
             # 检查是否至少提供了一个更新字段
             if all(
@@ -498,6 +506,7 @@ class KnowledgeBaseRoute(Route):
                     top_k_dense,
                     top_k_sparse,
                     top_m_final,
+                    index_type,
                 ]
             ):
                 return Response().error("至少需要提供一个更新字段").__dict__
@@ -514,6 +523,7 @@ class KnowledgeBaseRoute(Route):
                 top_k_dense=top_k_dense,
                 top_k_sparse=top_k_sparse,
                 top_m_final=top_m_final,
+                index_type=index_type,
             )
 
             if not kb_helper:
@@ -591,6 +601,41 @@ class KnowledgeBaseRoute(Route):
             logger.error(traceback.format_exc())
             return Response().error(f"获取知识库统计失败: {e!s}").__dict__
 
+    async def get_index_stats(self):
+        """获取知识库向量索引信息
+
+        Query 参数:
+        - kb_id: 知识库 ID (必填)
+        - evaluate: 是否抽样评估召回率和检索延迟 (可选, 默认 false)
+        """
+        try:
+            kb_manager = self._get_kb_manager()
+            kb_id = request.args.get("kb_id")
+            if not kb_id:
+                return Response().error("缺少参数 kb_id").__dict__
+            evaluate = request.args.get("evaluate", "false").lower() == "true"
+
+            kb_helper = await kb_manager.get_kb(kb_id)
+            if not kb_helper:
+                return Response().error("知识库不存在").__dict__
+
+            stats = await kb_helper.get_index_stats(evaluate=evaluate)
+            return Response().ok(stats).__dict__
+
+        except ValueError as e:
+            return Response().error(str(e)).__dict__
+        except Exception as e:
+            logger.error(f"获取向量索引信息失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"获取向量索引信息失败: {e!s}").__dict__
+
+    async def get_embedding_cache_stats(self):
+        """获取 Embedding 缓存命中情况"""
+        cache = self.core_lifecycle.provider_manager.embedding_cache
+        if not cache:
+            return Response().error("Embedding 缓存未启用").__dict__
+        return Response().ok(cache.stats()).__dict__
+
     # ===== 文档管理 API =====
 
     async def list_documents(self):
@@ -974,6 +1019,56 @@ class KnowledgeBaseRoute(Route):
             logger.error(traceback.format_exc())
             return Response().error(f"删除文档失败: {e!s}").__dict__
 
+    async def resync_document(self):
+        """用新版本文件重新同步文档, 只为新增或修改的文本块生成向量
+
+        Form Data (multipart/form-data):
+        - kb_id: 知识库 ID (必填)
+        - doc_id: 文档 ID (必填)
+        - file: 新版本的文件 (必填)
+        - chunk_size, chunk_overlap: 分块参数 (可选)
+        """
+        try:
+            kb_manager = self._get_kb_manager()
+            form_data = await request.form
+            files = await request.files
+
+            kb_id = form_data.get("kb_id")
+            if not kb_id:
+                return Response().error("缺少参数 kb_id").__dict__
+            doc_id = form_data.get("doc_id")
+            if not doc_id:
+                return Response().error("缺少参数 doc_id").__dict__
+            file = files.get("file")
+            if not file:
+                return Response().error("缺少文件").__dict__
+
+            kb_helper = await kb_manager.get_kb(kb_id)
+            if not kb_helper:
+                return Response().error("知识库不存在").__dict__
+
+            file_name = file.filename or ""
+            result = await kb_helper.resync_document(
+                doc_id=doc_id,
+                file_content=file.read(),
+                file_type=(
+                    file_name.rsplit(".", 1)[-1].lower() if "." in file_name else None
+                ),
+                chunk_size=int(form_data.get("chunk_size", 512)),
+                chunk_overlap=int(form_data.get("chunk_overlap", 50)),
+                batch_size=int(form_data.get("batch_size", 32)),
+                tasks_limit=int(form_data.get("tasks_limit", 3)),
+                max_retries=int(form_data.get("max_retries", 3)),
+            )
+            return Response().ok(result, "同步文档成功").__dict__
+
+        except ValueError as e:
+            return Response().error(str(e)).__dict__
+        except Exception as e:
+            logger.error(f"同步文档失败: {e}")
+            logger.error(traceback.format_exc())
+            return Response().error(f"同步文档失败: {e!s}").__dict__
+
     async def delete_chunk(self):
         """删除文本块
 
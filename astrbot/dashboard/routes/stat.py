@@ -1,3 +1,4 @@
+import hmac
 import os
 import re
 import threading
@@ -7,6 +8,7 @@ from functools import cmp_to_key
 
 import aiohttp
 import psutil
+from quart import Response as QuartResponse
 from quart import request
 
 from astrbot.core import DEMO_MODE, logger
@@ -14,6 +16,8 @@ from astrbot.core.config import VERSION
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.migration.helper import check_migration_needed_v4
+from astrbot.core.pipeline.metrics import pipeline_metrics
+from astrbot.core.provider.media_cache import media_cache
 from astrbot.core.utils.astrbot_path import get_astrbot_path
 from astrbot.core.utils.io import get_dashboard_version
 from astrbot.core.utils.version_comparator import VersionComparator
@@ -33,6 +37,11 @@ class StatRoute(Route):
             "/stat/get": ("GET", self.get_stat),
             "/stat/version": ("GET", self.get_version),
             "/stat/start-time": ("GET", self.get_start_time),
+            "/stat/event-bus": ("GET", self.get_event_bus_stat),
+            "/stat/media-cache": ("GET", self.get_media_cache_stat),
+            "/stat/pipeline-metrics": ("GET", self.get_pipeline_metrics),
+            "/stat/pipeline-metrics/reset": ("POST", self.reset_pipeline_metrics),
+            "/stat/metrics": ("GET", self.get_prometheus_metrics),
             "/stat/restart-core": ("POST", self.restart_core),
             "/stat/test-ghproxy-connection": ("POST", self.test_ghproxy_connection),
             "/stat/changelog": ("GET", self.get_changelog),
@@ -87,6 +96,50 @@ class StatRoute(Route):
     async def get_start_time(self):
         return Response().ok({"start_time": self.core_lifecycle.start_time}).__dict__
 
+    async def get_event_bus_stat(self):
+        """消息事件调度的队列深度和延迟"""
+        return Response().ok(self.core_lifecycle.event_bus.stats()).__dict__
+
+    async def get_media_cache_stat(self):
+        """多模态图片缓存的命中情况和占用"""
+        if not media_cache.enable:
+            return Response().error("图片缓存未启用").__dict__
+        return Response().ok(media_cache.stats()).__dict__
+
+    async def get_pipeline_metrics(self):
+        """消息管道各阶段和插件处理函数的耗时分布"""
+        conf_id = request.args.get("conf_id")
+        return (
+            Response()
+            .ok(
+                {
+                    "enabled": pipeline_metrics.enabled,
+                    "metrics": pipeline_metrics.snapshot(conf_id),
+                },
+            )
+            .__dict__
+        )
+
+    async def reset_pipeline_metrics(self):
+        data = await request.get_json(silent=True) or {}
+        pipeline_metrics.reset(data.get("conf_id"))
+        return Response().ok().__dict__
+
+    async def get_prometheus_metrics(self):
+        """以 Prometheus 文本格式导出耗时指标"""
+        if not self.config.get("pipeline_metrics_prometheus", False):
+            return QuartResponse("Not Found", status=404)
+        # 未设置令牌时由 WebUI 的 JWT 认证保护
+        token = self.config.get("pipeline_metrics_prometheus_token", "")
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            return QuartResponse("Unauthorized", status=401)
+        return QuartResponse(
+            pipeline_metrics.to_prometheus(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
     async def get_stat(self):
         offset_sec = request.args.get("offset_sec", 86400)
         offset_sec = int(offset_sec)
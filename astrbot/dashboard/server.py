@@ -119,6 +119,11 @@ class AstrBotDashboard:
         ]
         if any(request.path.startswith(prefix) for prefix in allowed_endpoints):
             return None
+        if request.path == "/api/stat/metrics" and self.config.get(
+            "pipeline_metrics_prometheus_token"
+        ):
+            # Prometheus 指标设置了单独的访问令牌, 在路由中校验; 未设置时需要登录
+            return None
         # 声明 JWT
         token = request.headers.get("Authorization")
         if not token:
@@ -450,6 +450,90 @@ class TestContextManager:
 
         assert len(result) == 2
 
+    # ==================== Token Counting Cache Tests ====================
+
+    def test_token_count_is_memoized_per_message(self):
+        """Test unchanged messages are not re-estimated."""
+        manager = ContextManager(ContextConfig(max_context_tokens=1000))
+        counter = manager.token_counter
+        messages = [
+            self.create_message("user", "你好" * 20),
+            Message(role="assistant", content=[TextPart(text="hello " * 20)]),
+        ]
+        expected = counter.count_tokens(messages)
+        assert expected == int(40 * 0.6) + int(120 * 0.3)
+
+        with patch.object(
+            counter, "_estimate_tokens", wraps=counter._estimate_tokens
+        ) as estimate:
+            assert counter.count_tokens(messages) == expected
+            assert estimate.call_count == 0
+
+            # 内容被替换后重新计数
+            messages[0].content = "x" * 10
+            assert counter.count_tokens(messages) == 3 + int(120 * 0.3)
+            assert estimate.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_running_total_only_counts_appended_messages(self):
+        """Test the manager keeps a running total for an appended message list."""
+        manager = ContextManager(ContextConfig(max_context_tokens=100000))
+        messages = self.create_messages(10)
+        await manager.process(messages)
+
+        with patch.object(
+            manager.token_counter,
+            "count_tokens",
+            wraps=manager.token_counter.count_tokens,
+        ) as count_tokens:
+            messages.append(self.create_message("user", "a new question"))
+            total = manager._count_tokens(messages)
+            assert count_tokens.call_args.args[0] == messages[-1:]
+
+        assert total == manager.token_counter.count_tokens(messages)
+        # 新的列表重新完整计数
+        assert manager._count_tokens(messages[:5]) == (
+            manager.token_counter.count_tokens(messages[:5])
+        )
+
+    # ==================== Block Truncation Tests ====================
+
+    @pytest.mark.asyncio
+    async def test_block_truncate_drops_oldest_turns_to_target(self):
+        """Test block truncation drops whole turns until below half the limit."""
+        config = ContextConfig(max_context_tokens=100, block_truncate=True)
+        manager = ContextManager(config)
+        # 每条消息 30 字符 = 9 tokens, 共 10 轮 180 tokens
+        messages = [self.create_message("system", "S")] + [
+            self.create_message("user" if i % 2 == 0 else "assistant", "x" * 30)
+            for i in range(20)
+        ]
+
+        result = await manager.process(messages)
+
+        assert result[0].role == "system"
+        assert result[1].role == "user"
+        assert result[-1] is messages[-1]
+        assert manager.token_counter.count_tokens(result) <= 50
+        # 截断后的前缀在后续几轮中保持不变, 不会再次触发截断
+        follow_up = [*result]
+        for i in range(6):
+            follow_up.append(self.create_message("user", f"q{i}"))
+            follow_up.append(self.create_message("assistant", f"a{i}"))
+            assert await manager.process(follow_up) == follow_up
+
+    @pytest.mark.asyncio
+    async def test_block_truncate_keeps_latest_turn(self):
+        """Test block truncation never drops the latest turn."""
+        config = ContextConfig(max_context_tokens=10, block_truncate=True)
+        manager = ContextManager(config)
+        messages = [
+            self.create_message("user", "x" * 100),
+            self.create_message("assistant", "y" * 100),
+        ]
+        compressed = await manager.compressor(messages)
+        assert compressed == messages
+
     # ==================== Compressor should_compress Tests ====================
 
     @pytest.mark.asyncio
@@ -0,0 +1,166 @@
+"""Handler 查找开销基准测试
+
+模拟一条消息流经消息管道时对 StarHandlerRegistry.get_handlers_by_event_type 的调用,
+对比旧实现 (每次调用遍历全部 handler 并查询 star_map) 与按事件类型分桶并缓存过滤
+结果的实现。
+
+用法:
+    python tests/benchmarks/bench_handler_dispatch.py --plugins 120
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import astrbot.api  # noqa: E402, F401
+from astrbot.core.star.star import StarMetadata, star_map  # noqa: E402
+from astrbot.core.star.star_handler import (  # noqa: E402
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+# 一条消息在管道中依次触发的事件类型
+MESSAGE_EVENTS = [
+    EventType.AdapterMessageEvent,
+    EventType.OnWaitingLLMRequestEvent,
+    EventType.OnLLMRequestEvent,
+    EventType.OnLLMResponseEvent,
+    EventType.OnDecoratingResultEvent,
+    EventType.OnAfterMessageSentEvent,
+]
+
+
+async def _handler(self, event):
+    pass
+
+
+def build_registry(plugins: int, handlers_per_plugin: int, seed: int = 0):
+    rng = random.Random(seed)
+    registry = StarHandlerRegistry()
+    for p in range(plugins):
+        module_path = f"bench.plugin_{p}.main"
+        star_map[module_path] = StarMetadata(
+            name=f"plugin_{p}",
+            module_path=module_path,
+            activated=rng.random() > 0.1,
+        )
+        for h in range(handlers_per_plugin):
+            event_type = (
+                EventType.AdapterMessageEvent
+                if rng.random() < 0.6
+                else rng.choice(MESSAGE_EVENTS[1:])
+            )
+            registry.append(
+                StarHandlerMetadata(
+                    event_type=event_type,
+                    handler_full_name=f"{module_path}_h{h}",
+                    handler_name=f"h{h}",
+                    handler_module_path=module_path,
+                    handler=_handler,
+                    event_filters=[],
+                    extras_configs={"priority": rng.randint(0, 3)},
+                ),
+            )
+    return registry
+
+
+def legacy_get_handlers_by_event_type(
+    registry: StarHandlerRegistry,
+    event_type: EventType,
+    only_activated=True,
+    plugins_name: list[str] | None = None,
+):
+    handlers = []
+    for handler in registry._handlers:
+        if handler.event_type != event_type:
+            continue
+        if not handler.enabled:
+            continue
+        if only_activated:
+            plugin = star_map.get(handler.handler_module_path)
+            if not (plugin and plugin.activated):
+                continue
+        if plugins_name is not None and plugins_name != ["*"]:
+            plugin = star_map.get(handler.handler_module_path)
+            if not plugin:
+                continue
+            if (
+                plugin.name not in plugins_name
+                and event_type
+                not in (
+                    EventType.OnAstrBotLoadedEvent,
+                    EventType.OnPlatformLoadedEvent,
+                )
+                and not plugin.reserved
+            ):
+                continue
+        handlers.append(handler)
+    return handlers
+
+
+def bench(lookup, messages: int, plugins_name: list[str] | None) -> list[float]:
+    latencies = []
+    for _ in range(messages):
+        start = time.perf_counter()
+        for event_type in MESSAGE_EVENTS:
+            lookup(event_type, plugins_name=plugins_name)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def fmt(latencies: list[float]) -> str:
+    return (
+        f"mean {statistics.mean(latencies) * 1e6:.1f} us, "
+        f"p50 {statistics.median(latencies) * 1e6:.1f} us, "
+        f"max {max(latencies) * 1e6:.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plugins", type=int, default=120)
+    parser.add_argument("--handlers-per-plugin", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument(
+        "--whitelist",
+        type=int,
+        default=0,
+        help="plugin_set 中启用的插件数量, 0 表示全部启用",
+    )
+    args = parser.parse_args()
+
+    registry = build_registry(args.plugins, args.handlers_per_plugin)
+    plugins_name = (
+        [f"plugin_{p}" for p in range(args.whitelist)] if args.whitelist else None
+    )
+    print(f"plugins: {args.plugins}, handlers: {len(registry)}")
+
+    # 两种实现的结果必须一致
+    for event_type in MESSAGE_EVENTS:
+        assert registry.get_handlers_by_event_type(
+            event_type, plugins_name=plugins_name
+        ) == legacy_get_handlers_by_event_type(
+            registry, event_type, plugins_name=plugins_name
+        )
+
+    legacy = bench(
+        lambda event_type, plugins_name: legacy_get_handlers_by_event_type(
+            registry, event_type, plugins_name=plugins_name
+        ),
+        args.messages,
+        plugins_name,
+    )
+    indexed = bench(registry.get_handlers_by_event_type, args.messages, plugins_name)
+    print(f"before (scan all handlers per lookup): {fmt(legacy)}")
+    print(f"after  (bucketed + cached filtering):  {fmt(indexed)}")
+    print(f"speedup: {statistics.mean(legacy) / statistics.mean(indexed):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""稀疏检索查询延迟基准测试
+
+对比旧实现 (每次查询对全量语料 jieba 分词并构建 BM25Okapi) 与持久化 BM25 索引
+(分词结果缓存在索引中, 查询时仅对查询本身分词) 的单次查询延迟。
+
+用法:
+    python tests/benchmarks/bench_sparse_retrieval.py --chunks 50000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from rank_bm25 import BM25Okapi  # noqa: E402
+
+from astrbot.core.knowledge_base.retrieval.bm25_index import (  # noqa: E402
+    BM25Index,
+    tokenize,
+)
+
+VOCAB = (
+    "知识库 检索 向量 模型 插件 消息 平台 会话 配置 文档 用户 机器人 群聊 "
+    "服务器 网络 数据库 缓存 索引 查询 上传 删除 更新 权限 管理员 日志 "
+    "AstrBot plugin provider embedding rerank chunk token pipeline event"
+).split()
+QUERIES = [
+    "如何配置知识库的向量检索",
+    "插件 消息 平台 权限",
+    "embedding provider 缓存",
+    "群聊机器人日志在哪里",
+    "删除文档后索引会更新吗",
+]
+
+
+def make_corpus(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        "，".join(
+            "".join(rng.choices(VOCAB, k=rng.randint(2, 6)))
+            for _ in range(rng.randint(8, 20))
+        )
+        for _ in range(n)
+    ]
+
+
+def bench_legacy(corpus: list[str], queries: list[str]) -> list[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        bm25 = BM25Okapi([tokenize(text) for text in corpus])
+        scores = bm25.get_scores(tokenize(query))
+        sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:50]
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def bench_index(corpus: list[str], queries: list[str], repeat: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = BM25Index(str(Path(tmp_dir) / "bm25_index.json"))
+        start = time.perf_counter()
+        await index.add_chunks(
+            (f"chunk-{i}", i, f"doc-{i // 100}", i % 100, text)
+            for i, text in enumerate(corpus)
+        )
+        build_time = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(repeat):
+            for query in queries:
+                start = time.perf_counter()
+                index.search(tokenize(query), 50)
+                latencies.append(time.perf_counter() - start)
+    return build_time, latencies
+
+
+def fmt(latencies: list[float]) -> str:
+    return (
+        f"mean {statistics.mean(latencies) * 1000:.2f} ms, "
+        f"p50 {statistics.median(latencies) * 1000:.2f} ms, "
+        f"max {max(latencies) * 1000:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument(
+        "--legacy-queries",
+        type=int,
+        default=2,
+        help="旧实现每次查询耗时很长, 只测少量查询",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.chunks)
+    tokenize("预热 jieba 词典")
+    print(f"corpus: {len(corpus)} chunks")
+
+    build_time, index_latencies = asyncio.run(
+        bench_index(corpus, QUERIES, args.repeat),
+    )
+    print(f"index build (one-off, at upload): {build_time:.2f} s")
+    print(f"after  (BM25Index per query): {fmt(index_latencies)}")
+
+    legacy_latencies = bench_legacy(corpus, QUERIES[: args.legacy_queries])
+    print(f"before (rebuild per query):   {fmt(legacy_latencies)}")
+    print(
+        f"speedup: {statistics.mean(legacy_latencies) / statistics.mean(index_latencies):.0f}x",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import copy
+
+import astrbot.api  # noqa: F401  # 先完成 astrbot.core.star 的初始化
+from astrbot.core.provider.entities import TokenUsage
+from astrbot.core.provider.sources.anthropic_source import ProviderAnthropic
+
+
+def _provider(**config) -> ProviderAnthropic:
+    return ProviderAnthropic({"key": ["test"], "model": "claude", **config}, {})
+
+
+def _cached_blocks(payloads: dict) -> list:
+    blocks = [t for t in payloads.get("tools", []) if "cache_control" in t]
+    blocks += [b for b in payloads.get("system", []) if "cache_control" in b]
+    for message in payloads["messages"]:
+        if isinstance(message["content"], list):
+            blocks += [b for b in message["content"] if "cache_control" in b]
+    return blocks
+
+
+def test_cache_breakpoints_mark_stable_prefix_without_mutating_context():
+    messages = [
+        {"role": "user", "content": "你好"},
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "thinking", "thinking": "...", "signature": "sig"},
+                {"type": "text", "text": "你好！"},
+            ],
+        },
+        {"role": "user", "content": [{"type": "text", "text": "介绍一下你自己"}]},
+    ]
+    original = copy.deepcopy(messages)
+    payloads = {
+        "messages": list(messages),
+        "system": "你是一个助手",
+        "tools": [{"name": "a"}, {"name": "b"}],
+    }
+
+    _provider()._add_cache_breakpoints(payloads)
+
+    assert payloads["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert payloads["system"][0]["text"] == "你是一个助手"
+    assert payloads["messages"][0]["content"][0]["cache_control"]
+    assert payloads["messages"][2]["content"][0]["cache_control"]
+    assert payloads["messages"][1] is messages[1]
+    assert len(_cached_blocks(payloads)) == 4
+    # 原始上下文不被修改
+    assert messages == original
+
+
+def test_cache_breakpoints_can_be_disabled():
+    payloads = {"messages": [{"role": "user", "content": "你好"}], "system": "s"}
+    _provider(anth_prompt_caching=False)._add_cache_breakpoints(payloads)
+    assert payloads == {
+        "messages": [{"role": "user", "content": "你好"}],
+        "system": "s",
+    }
+
+
+def test_cache_hit_ratio():
+    assert TokenUsage().cache_hit_ratio == 0.0
+    assert (
+        TokenUsage(input_other=25, input_cached=75, output=10).cache_hit_ratio == 0.75
+    )
@@ -0,0 +1,98 @@
+import astrbot.api  # noqa: F401  # 先完成 astrbot.core.star 的初始化
+from astrbot.core.star import command_management
+from astrbot.core.star.command_trie import CommandTrie
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+
+async def _handler(self, event):
+    pass
+
+
+def _make_handler(name: str, *filters) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name=name,
+        handler_name=name,
+        handler_module_path="tests.plugin",
+        handler=_handler,
+        event_filters=list(filters),
+    )
+
+
+def _handlers():
+    group = CommandGroupFilter("math", alias={"m"})
+    return [
+        _make_handler("help", CommandFilter("help", alias={"帮助"})),
+        _make_handler("helper", CommandFilter("helper")),
+        _make_handler("math", group),
+        _make_handler(
+            "math_add",
+            CommandFilter(
+                "add", parent_command_names=group.get_complete_command_names()
+            ),
+        ),
+        _make_handler("no_command"),
+    ]
+
+
+def _brute_force(handlers: list[StarHandlerMetadata], message: str) -> set[str]:
+    """与 CommandFilter / CommandGroupFilter 中的指令名判断保持一致"""
+    normalized = " ".join(message.split())
+    matched = set()
+    for handler in handlers:
+        for f in handler.event_filters:
+            names = f.get_complete_command_names()
+            if isinstance(f, CommandGroupFilter):
+                ok = message.startswith(tuple(names))
+            else:
+                ok = any(
+                    normalized == n or normalized.startswith(f"{n} ") for n in names
+                )
+            if ok:
+                matched.add(handler.handler_full_name)
+    return matched
+
+
+def test_trie_matches_same_handlers_as_filters():
+    handlers = _handlers()
+    trie = CommandTrie(handlers)
+    assert trie.command_handlers == {"help", "helper", "math", "math_add"}
+
+    for message in [
+        "help",
+        "help me",
+        "helpme",
+        "helper  1 2",
+        "帮助",
+        "math",
+        "m add 1 2",
+        "math   add 1",
+        "mathematics",
+        "hello",
+        "",
+    ]:
+        assert trie.match(message) == _brute_force(handlers, message), message
+
+
+def test_registry_rebuilds_trie_on_change(monkeypatch):
+    registry = StarHandlerRegistry()
+    monkeypatch.setattr(command_management, "star_handlers_registry", registry)
+    for handler in _handlers():
+        registry.append(handler)
+    trie = registry.get_command_trie()
+    assert registry.get_command_trie() is trie
+    assert trie.match("h 1") == set()
+
+    # 运行时修改别名后重建
+    help_filter = registry.get_handler_by_full_name("help").event_filters[0]
+    command_management._set_filter_aliases(help_filter, ["h"])
+    assert registry.get_command_trie().match("h 1") == {"help"}
+
+    registry.remove(registry.get_handler_by_full_name("help"))
+    assert registry.get_command_trie().match("help") == set()
@@ -0,0 +1,162 @@
+import json
+
+import pytest
+import pytest_asyncio
+
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.db.sqlite import SQLiteDatabase
+
+
+class CountingDatabase(SQLiteDatabase):
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.reads = 0
+        self.writes = 0
+        self.updates = 0
+
+    async def get_conversation_by_id(self, cid, load_content=True):
+        self.reads += 1
+        return await super().get_conversation_by_id(cid, load_content)
+
+    async def update_conversation(self, cid, *args, **kwargs):
+        self.updates += 1
+        return await super().update_conversation(cid, *args, **kwargs)
+
+    async def save_conversation_messages(self, cid, messages, start_seq=0):
+        self.writes += 1
+        return await super().save_conversation_messages(cid, messages, start_seq)
+
+
+def _turn(i: int) -> list[dict]:
+    return [
+        {"role": "user", "content": f"问题 {i}"},
+        {"role": "assistant", "content": f"回答 {i}"},
+    ]
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = CountingDatabase(str(tmp_path / "data.db"))
+    await db.initialize()
+    return db
+
+
+def _manager(db, tmp_path, cache_size=8) -> ConversationManager:
+    return ConversationManager(
+        db,
+        cache_size=cache_size,
+        save_interval=3600,
+        wal_path=str(tmp_path / "conversation_wal.jsonl"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_appends_are_served_from_cache_and_flushed_later(db, tmp_path):
+    mgr = _manager(db, tmp_path)
+    await mgr.initialize()
+    cid = (await db.create_conversation("umo", "p", content=_turn(0))).conversation_id
+
+    conv = await mgr.get_conversation("umo", cid)
+    history = json.loads(conv.history) + _turn(1)
+    await mgr.update_conversation("umo", cid, history=history, token_usage=42)
+    conv = await mgr.get_conversation("umo", cid)
+    assert json.loads(conv.history) == history
+    assert conv.token_usage == 42
+    assert (db.reads, db.writes, db.updates) == (1, 0, 0)
+
+    # 尚未写入数据库, 但已记录在预写日志中
+    messages, _ = await db.get_conversation_messages(cid)
+    assert messages == _turn(0)
+
+    await mgr.flush()
+    messages, _ = await db.get_conversation_messages(cid)
+    assert messages == history
+    assert (await db.get_conversation_by_id(cid)).token_usage == 42
+    await mgr.terminate()
+
+
+@pytest.mark.asyncio
+async def test_wal_is_replayed_after_crash(db, tmp_path):
+    mgr = _manager(db, tmp_path)
+    await mgr.initialize()
+    cid = (await db.create_conversation("umo", "p", content=_turn(0))).conversation_id
+    await mgr.get_conversation("umo", cid)
+    await mgr.update_conversation("umo", cid, history=_turn(0) + _turn(1))
+    await mgr.update_conversation("umo", cid, history=_turn(0) + _turn(1) + _turn(2))
+    # 模拟进程意外退出: 不调用 terminate
+    mgr._flush_task.cancel()
+
+    recovered = _manager(db, tmp_path)
+    await recovered.initialize()
+    messages, _ = await db.get_conversation_messages(cid)
+    assert messages == _turn(0) + _turn(1) + _turn(2)
+    await recovered.terminate()
+
+
+@pytest.mark.asyncio
+async def test_rewrites_are_written_through_and_eviction_flushes(db, tmp_path):
+    mgr = _manager(db, tmp_path, cache_size=1)
+    await mgr.initialize()
+    cid = (
+        await db.create_conversation("umo", "p", content=_turn(0) + _turn(1))
+    ).conversation_id
+    await mgr.get_conversation("umo", cid)
+
+    # 截断掉开头的一轮, 立即写入数据库
+    await mgr.update_conversation("umo", cid, history=_turn(1))
+    assert db.writes == 1
+    messages, offset = await db.get_conversation_messages(cid)
+    assert (messages, offset) == (_turn(1), 2)
+
+    await mgr.update_conversation("umo", cid, history=_turn(1) + _turn(2))
+    other = (await db.create_conversation("umo", "p")).conversation_id
+    await mgr.get_conversation("umo", other)
+    # cid 被淘汰时写入数据库
+    messages, _ = await db.get_conversation_messages(cid)
+    assert messages == _turn(1) + _turn(2)
+    assert mgr.cache_stats()["size"] == 1
+    await mgr.terminate()
+
+
+@pytest.mark.asyncio
+async def test_truncating_a_loaded_window_keeps_history_contiguous(db, tmp_path):
+    mgr = _manager(db, tmp_path)
+    await mgr.initialize()
+    history = [m for i in range(6) for m in _turn(i)]
+    cid = (await db.create_conversation("umo", "p", content=history)).conversation_id
+
+    conv = await mgr.get_conversation("umo", cid, history_turns=3)
+    window = json.loads(conv.history)
+    assert window == _turn(3) + _turn(4) + _turn(5)
+    await mgr.update_conversation(
+        "umo", cid, history=window + _turn(6), history_offset=conv.history_offset
+    )
+    # 截断掉窗口开头的一轮
+    await mgr.update_conversation(
+        "umo",
+        cid,
+        history=_turn(4) + _turn(5) + _turn(6),
+        history_offset=conv.history_offset,
+    )
+    await mgr.flush()
+    messages, _ = await db.get_conversation_messages(cid)
+    assert messages == _turn(4) + _turn(5) + _turn(6)
+
+    # 改写历史记录时预写日志中只记录标记, 重放时跳过该对话更早的记录
+    with open(mgr.wal_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records == [
+        {
+            "cid": cid,
+            "seq": conv.history_offset + 6,
+            "messages": _turn(6),
+            "token_usage": None,
+        },
+        {"cid": cid, "reset": True},
+    ]
+    mgr._flush_task.cancel()
+    recovered = _manager(db, tmp_path)
+    await recovered.initialize()
+    messages, _ = await db.get_conversation_messages(cid)
+    assert messages == _turn(4) + _turn(5) + _turn(6)
+    await recovered.terminate()
@@ -0,0 +1,203 @@
+import pytest
+import pytest_asyncio
+from sqlmodel import select, update
+
+from astrbot.core.agent.context.truncator import ContextTruncator
+from astrbot.core.agent.message import Message
+from astrbot.core.db.po import ConversationMessage, ConversationV2
+from astrbot.core.db.sqlite import SQLiteDatabase
+
+
+def _turn(i: int) -> list[dict]:
+    return [
+        {"role": "user", "content": f"问题 {i}"},
+        {"role": "assistant", "content": f"回答 {i}"},
+    ]
+
+
+async def _rows(db: SQLiteDatabase, cid: str) -> list[tuple[int, int, str]]:
+    async with db.get_db() as session:
+        result = await session.execute(
+            select(
+                ConversationMessage.id,
+                ConversationMessage.seq,
+                ConversationMessage.role,
+            )
+            .where(ConversationMessage.conversation_id == cid)
+            .order_by(ConversationMessage.seq),
+        )
+        return [tuple(r) for r in result.all()]
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data.db"))
+    await db.initialize()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_saving_full_history_only_writes_new_messages(db):
+    conv = await db.create_conversation("umo", "p", content=_turn(0))
+    cid = conv.conversation_id
+    before = await _rows(db, cid)
+
+    history = _turn(0) + _turn(1)
+    await db.update_conversation(cid, content=history, token_usage=10)
+    after = await _rows(db, cid)
+    # 已有的行未被重写, 只追加了新消息
+    assert after[:2] == before
+    assert [seq for _, seq, _ in after] == [0, 1, 2, 3]
+
+    # 开头一轮被截断丢弃, 只删除对应的行
+    await db.save_conversation_messages(cid, _turn(1) + _turn(2))
+    rows = await _rows(db, cid)
+    assert rows[:2] == after[2:]
+    assert [seq for _, seq, _ in rows] == [2, 3, 4, 5]
+
+    # 兼容旧接口: content 仍是完整的历史记录
+    conv = await db.get_conversation_by_id(cid)
+    assert conv.content == _turn(1) + _turn(2)
+    assert conv.token_usage == 10
+    conv = await db.get_conversation_by_id(cid, load_content=False)
+    assert conv.content == []
+
+
+@pytest.mark.asyncio
+async def test_tail_window_and_offset_save(db):
+    history = [m for i in range(5) for m in _turn(i)]
+    conv = await db.create_conversation("umo", "p", content=history)
+    cid = conv.conversation_id
+
+    window, offset = await db.get_conversation_messages(cid, last_turns=2)
+    assert window == _turn(3) + _turn(4)
+    assert offset == 6
+
+    # 只保存窗口部分, 更早的记录保持不变
+    await db.save_conversation_messages(cid, window + _turn(5), start_seq=offset)
+    messages, offset = await db.get_conversation_messages(cid)
+    assert messages == history + _turn(5)
+    assert offset == 0
+
+    await db.append_conversation_messages(cid, _turn(6))
+    window, _ = await db.get_conversation_messages(cid, last_turns=1)
+    assert window == _turn(6)
+
+
+@pytest.mark.asyncio
+async def test_head_truncation_of_window_drops_earlier_rows(db):
+    history = [m for i in range(6) for m in _turn(i)]
+    conv = await db.create_conversation("umo", "p", content=history)
+    cid = conv.conversation_id
+    await db.save_conversation_messages(cid, history)
+
+    window, offset = await db.get_conversation_messages(cid, last_turns=3)
+    assert window == _turn(3) + _turn(4) + _turn(5)
+    # 截断掉窗口开头的一轮, 窗口之前的记录也不再保留
+    first_seq = await db.save_conversation_messages(
+        cid, window[2:] + _turn(6), start_seq=offset
+    )
+    messages, offset = await db.get_conversation_messages(cid)
+    assert messages == _turn(4) + _turn(5) + _turn(6)
+    assert offset == first_seq == 8
+
+    # 旧格式的对话同样如此
+    legacy = await db.create_conversation("umo", "p")
+    async with db.get_db() as session, session.begin():
+        await session.execute(
+            update(ConversationV2)
+            .where(ConversationV2.conversation_id == legacy.conversation_id)
+            .values(content=history),
+        )
+    window, offset = await db.get_conversation_messages(
+        legacy.conversation_id, last_turns=3
+    )
+    await db.save_conversation_messages(
+        legacy.conversation_id, window[2:] + _turn(6), start_seq=offset
+    )
+    messages, _ = await db.get_conversation_messages(legacy.conversation_id)
+    assert messages == _turn(4) + _turn(5) + _turn(6)
+
+
+@pytest.mark.asyncio
+async def test_head_truncation_with_duplicate_turns(db):
+    greeting = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ]
+    conv = await db.create_conversation("umo", "p", content=greeting + greeting)
+    cid = conv.conversation_id
+    before = await _rows(db, cid)
+
+    # 丢弃第一轮后, 剩下的一轮对应的是第二轮的记录, 而不是内容相同的第一轮
+    first_seq = await db.save_conversation_messages(cid, greeting + _turn(1))
+    rows = await _rows(db, cid)
+    assert first_seq == 2
+    assert rows[:2] == before[2:]
+    assert [seq for _, seq, _ in rows] == [2, 3, 4, 5]
+    messages, offset = await db.get_conversation_messages(cid)
+    assert messages == greeting + _turn(1)
+    assert offset == 2
+
+
+@pytest.mark.asyncio
+async def test_windowed_load_matches_full_history_truncation(db):
+    """按 max_context_length + 1 轮加载时, 截断结果与加载完整历史记录时一致"""
+    max_turns, dequeue = 4, 2
+    truncator = ContextTruncator()
+
+    def truncate(messages: list[dict]) -> list[dict]:
+        result = truncator.truncate_by_turns(
+            [Message.model_validate(m) for m in messages],
+            keep_most_recent_turns=max_turns,
+            drop_turns=dequeue,
+        )
+        return [m.model_dump() for m in result]
+
+    # 一开始就超出长度的历史记录, 如调小了 max_context_length
+    full = [m for i in range(10) for m in _turn(i)]
+    conv = await db.create_conversation("umo", "p", content=full)
+    cid = conv.conversation_id
+    await db.save_conversation_messages(cid, full)
+    for i in range(10, 30):
+        prompt = {"role": "user", "content": f"问题 {i}"}
+        reply = {"role": "assistant", "content": f"回答 {i}"}
+        expected = truncate([*full, prompt])
+        window, offset = await db.get_conversation_messages(
+            cid, last_turns=max_turns + 1
+        )
+        assert truncate([*window, prompt]) == expected
+        full = [*expected, reply]
+        await db.save_conversation_messages(
+            cid, [*truncate([*window, prompt]), reply], start_seq=offset
+        )
+        messages, _ = await db.get_conversation_messages(cid)
+        assert messages == full
+
+
+@pytest.mark.asyncio
+async def test_legacy_content_is_migrated_on_first_write(db):
+    conv = await db.create_conversation("umo", "p")
+    cid = conv.conversation_id
+    async with db.get_db() as session, session.begin():
+        await session.execute(
+            update(ConversationV2)
+            .where(ConversationV2.conversation_id == cid)
+            .values(content=_turn(0) + _turn(1)),
+        )
+
+    window, offset = await db.get_conversation_messages(cid, last_turns=1)
+    assert (window, offset) == (_turn(1), 2)
+    assert await _rows(db, cid) == []
+
+    await db.save_conversation_messages(cid, window + _turn(2), start_seq=offset)
+    assert len(await _rows(db, cid)) == 6
+    conv = await db.get_conversation_by_id(cid)
+    assert conv.content == _turn(0) + _turn(1) + _turn(2)
+
+    convs, total = await db.get_filtered_conversations(search_query="回答 2")
+    assert total == 1
+    assert convs[0].conversation_id == cid
+
+    await db.delete_conversation(cid)
+    assert await _rows(db, cid) == []
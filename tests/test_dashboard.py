@@ -93,6 +93,49 @@ async def test_get_stat(app: Quart, authenticated_header: dict):
     assert data["status"] == "ok" and "platform" in data["data"]
 
 
+@pytest.mark.asyncio
+async def test_media_cache_stat(app: Quart, authenticated_header: dict):
+    test_client = app.test_client()
+    response = await test_client.get(
+        "/api/stat/media-cache", headers=authenticated_header
+    )
+    data = await response.get_json()
+    assert data["status"] == "ok"
+    assert {"downloads", "encode_hits", "disk_bytes", "evictions"} <= set(data["data"])
+
+
+@pytest.mark.asyncio
+async def test_prometheus_metrics_auth(
+    app: Quart,
+    authenticated_header: dict,
+    core_lifecycle_td: AstrBotCoreLifecycle,
+):
+    config = core_lifecycle_td.astrbot_config
+    test_client = app.test_client()
+    config["pipeline_metrics_prometheus"] = True
+    try:
+        # 未设置单独的令牌时需要登录
+        config["pipeline_metrics_prometheus_token"] = ""
+        response = await test_client.get("/api/stat/metrics")
+        assert response.status_code == 401
+        response = await test_client.get(
+            "/api/stat/metrics", headers=authenticated_header
+        )
+        assert response.status_code == 200
+
+        config["pipeline_metrics_prometheus_token"] = "scrape-token"
+        response = await test_client.get("/api/stat/metrics")
+        assert response.status_code == 401
+        response = await test_client.get(
+            "/api/stat/metrics",
+            headers={"Authorization": "Bearer scrape-token"},
+        )
+        assert response.status_code == 200
+    finally:
+        config["pipeline_metrics_prometheus"] = False
+        config["pipeline_metrics_prometheus_token"] = ""
+
+
 @pytest.mark.asyncio
 async def test_plugins(app: Quart, authenticated_header: dict):
     test_client = app.test_client()
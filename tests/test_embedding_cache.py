@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.provider.embedding_cache import (
+    CachedEmbeddingProvider,
+    EmbeddingCache,
+)
+from astrbot.core.provider.provider import EmbeddingProvider
+
+
+class CountingEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, model: str = "m1"):
+        super().__init__(
+            {"id": "emb", "type": "openai_embedding", "embedding_model": model},
+            {},
+        )
+        self.requested: list[str] = []
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return (await self.get_embeddings([text]))[0]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        self.requested.extend(text)
+        await asyncio.sleep(0.01)
+        return [[float(len(t)), 1.0] for t in text]
+
+    def get_dim(self) -> int:
+        return 2
+
+
+@pytest.mark.asyncio
+async def test_memory_and_disk_tiers(tmp_path):
+    db_path = str(tmp_path / "embedding_cache.db")
+    inner = CountingEmbeddingProvider()
+    provider = CachedEmbeddingProvider(inner, EmbeddingCache(db_path))
+
+    assert await provider.get_embedding("hello  world") == [12.0, 1.0]
+    # 规范化后相同的文本命中内存缓存
+    assert await provider.get_embedding(" hello world ") == [12.0, 1.0]
+    assert inner.requested == ["hello  world"]
+    assert provider.cache.stats()["memory_hits"] == 1
+    await provider.cache.close()
+
+    # 新的缓存实例 (例如重启后) 从磁盘读取
+    cache = EmbeddingCache(db_path)
+    provider = CachedEmbeddingProvider(inner, cache)
+    vectors = await provider.get_embeddings(["hello world", "new", "new"])
+    assert vectors == [[12.0, 1.0], [3.0, 1.0], [3.0, 1.0]]
+    assert inner.requested == ["hello  world", "new"]
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
+
+    # 模型不同的 Provider 不共享缓存
+    other = CachedEmbeddingProvider(CountingEmbeddingProvider("m2"), cache)
+    await other.get_embedding("new")
+    assert other.provider.requested == ["new"]
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_ttl_and_inflight_dedup():
+    inner = CountingEmbeddingProvider()
+    cache = EmbeddingCache(memory_max_entries=2, ttl=0)
+    provider = CachedEmbeddingProvider(inner, cache)
+
+    await asyncio.gather(*(provider.get_embedding("same") for _ in range(5)))
+    assert inner.requested == ["same"]
+
+    await provider.get_embeddings(["a", "b"])
+    assert cache.stats()["evictions"] == 1
+    await provider.get_embedding("same")
+    assert inner.requested == ["same", "a", "b", "same"]
+
+    cache.ttl = 1
+    for key, (vector, _) in list(cache._memory.items()):
+        cache._memory[key] = (vector, 0)
+    await provider.get_embedding("b")
+    assert inner.requested[-1] == "b"
+
+
+@pytest.mark.asyncio
+async def test_endpoint_change_and_clear_invalidate_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embedding_cache.db"))
+    inner = CountingEmbeddingProvider()
+    await CachedEmbeddingProvider(inner, cache).get_embedding("hello")
+
+    # 同一 Provider ID 与模型改用其他接口地址时不复用旧向量
+    moved = CountingEmbeddingProvider()
+    moved.provider_config["embedding_api_base"] = "https://other.example/v1"
+    await CachedEmbeddingProvider(moved, cache).get_embedding("hello")
+    assert moved.requested == ["hello"]
+
+    # 清除该 Provider 的缓存后, 内存和磁盘中都不再命中
+    await cache.clear("emb")
+    await CachedEmbeddingProvider(inner, cache).get_embedding("hello")
+    assert inner.requested == ["hello", "hello"]
+    await cache.close()
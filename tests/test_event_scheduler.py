@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.event_scheduler import EventScheduler
+
+
+def _job(log: list, name: str, gate: asyncio.Event | None = None):
+    async def run():
+        log.append(("start", name))
+        if gate:
+            await gate.wait()
+        else:
+            await asyncio.sleep(0)
+        log.append(("end", name))
+
+    return run
+
+
+async def _drain(scheduler: EventScheduler):
+    for _ in range(200):
+        if not (scheduler.pending or scheduler.running):
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError
+
+
+@pytest.mark.asyncio
+async def test_session_fifo_and_global_cap():
+    scheduler = EventScheduler(max_concurrency=2, max_pending=0)
+    scheduler.start()
+    log = []
+    gate = asyncio.Event()
+    scheduler.submit("s1", "p", _job(log, "s1-1", gate))
+    scheduler.submit("s1", "p", _job(log, "s1-2"))
+    scheduler.submit("s2", "p", _job(log, "s2-1", gate))
+    scheduler.submit("s3", "p", _job(log, "s3-1"))
+    await asyncio.sleep(0.05)
+
+    # 并发上限为 2, 且 s1 的第二个事件要等第一个结束
+    assert scheduler.running == 2
+    assert [n for e, n in log if e == "start"] == ["s1-1", "s2-1"]
+
+    gate.set()
+    await _drain(scheduler)
+    starts = [n for e, n in log if e == "start"]
+    assert starts.index("s1-2") > log.index(("end", "s1-1"))
+    assert scheduler.processed == 4
+    assert scheduler.stats()["wait_latency"]["max"] > 0
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_round_robin_between_platforms():
+    scheduler = EventScheduler(max_concurrency=1, max_pending=0)
+    log = []
+    # 平台 a 有一个刷屏会话, 平台 b 有两个会话
+    for i in range(3):
+        scheduler.submit("a-group", "a", _job(log, f"a{i}"))
+    scheduler.submit("b-1", "b", _job(log, "b1"))
+    scheduler.submit("b-2", "b", _job(log, "b2"))
+    scheduler.start()
+    await _drain(scheduler)
+    assert [n for e, n in log if e == "start"] == ["a0", "b1", "a1", "b2", "a2"]
+    await scheduler.stop()
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected"),
+    [
+        ("drop_oldest", ["flood1", "flood2", "other"]),
+        ("drop_newest", ["flood0", "flood1", "flood2"]),
+        ("coalesce", ["flood2", "other"]),
+    ],
+)
+@pytest.mark.asyncio
+async def test_overflow_policies(policy, expected):
+    scheduler = EventScheduler(max_concurrency=1, max_pending=3, overflow_policy=policy)
+    log = []
+    for i in range(3):
+        scheduler.submit("flood", "p", _job(log, f"flood{i}"))
+    scheduler.submit("other", "p", _job(log, "other"))
+    assert scheduler.pending <= 3
+
+    scheduler.start()
+    await _drain(scheduler)
+    assert sorted(n for e, n in log if e == "start") == sorted(expected)
+    assert scheduler.dropped == 4 - len(expected)
+    await scheduler.stop()
+
+
+class _ConfigManager:
+    def get_conf_info(self, umo: str) -> dict:
+        return {"id": "default", "name": "default"}
+
+
+class _Event:
+    def __init__(self, text: str):
+        self.text = text
+        self.unified_msg_origin = "p:FriendMessage:u1"
+
+    def get_platform_id(self):
+        return "p"
+
+    def get_platform_name(self):
+        return "p"
+
+    def get_sender_name(self):
+        return "u1"
+
+    def get_sender_id(self):
+        return "u1"
+
+    def get_message_outline(self):
+        return self.text
+
+
+@pytest.mark.asyncio
+async def test_follow_up_queued_before_waiter_registers_is_released():
+    import astrbot.api  # noqa: F401
+    from astrbot.core.event_bus import EventBus
+    from astrbot.core.utils.session_waiter import (
+        USER_SESSIONS,
+        SessionWaiter,
+        session_waiter,
+    )
+
+    replies = []
+    first_started = asyncio.Event()
+    allow_register = asyncio.Event()
+
+    @session_waiter(timeout=5)
+    async def wait_reply(controller, event):
+        replies.append(event.text)
+        controller.stop()
+
+    class _Pipeline:
+        async def execute(self, event):
+            if event.unified_msg_origin in USER_SESSIONS:
+                await SessionWaiter.trigger(event.unified_msg_origin, event)
+                return
+            first_started.set()
+            await allow_register.wait()
+            await wait_reply(event)
+            replies.append("done")
+
+    queue = asyncio.Queue()
+    scheduler = EventScheduler(max_concurrency=4, max_pending=0)
+    bus = EventBus(queue, {"default": _Pipeline()}, _ConfigManager(), scheduler)  # type: ignore
+    dispatcher = asyncio.create_task(bus.dispatch())
+
+    queue.put_nowait(_Event("ask"))
+    await asyncio.wait_for(first_started.wait(), 1)
+    # 后续消息在等待者注册之前到达, 排在同一会话的流水线之后
+    queue.put_nowait(_Event("answer"))
+    for _ in range(100):
+        if scheduler.pending:
+            break
+        await asyncio.sleep(0.01)
+    assert scheduler.pending == 1
+
+    allow_register.set()
+    for _ in range(100):
+        if "done" in replies:
+            break
+        await asyncio.sleep(0.01)
+    assert replies == ["answer", "done"]
+    assert scheduler.pending == 0
+
+    dispatcher.cancel()
+    await asyncio.gather(dispatcher, return_exceptions=True)
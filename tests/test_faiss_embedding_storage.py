@@ -0,0 +1,225 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from astrbot.core.db.vec_db.faiss_impl.concurrency import AsyncRWLock
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import EmbeddingStorage
+
+DIM = 32
+
+
+async def _open(*args, **kwargs) -> EmbeddingStorage:
+    storage = EmbeddingStorage(*args, **kwargs)
+    await storage.initialize()
+    return storage
+
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((n, DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat", "ivf_pq"])
+async def test_migrates_after_threshold(tmp_path, index_type):
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(DIM, path, index_type=index_type, train_threshold=500)
+    vectors = _vectors(1000)
+
+    await storage.insert_batch(vectors[:400], list(range(400)))
+    assert storage.current_index_type == "flat"
+    assert not storage.migrating
+
+    await storage.insert_batch(vectors[400:], list(range(400, 1000)))
+    await storage._migration_task
+    assert storage.current_index_type == index_type
+    assert storage.index.ntotal == 1000
+
+    # 迁移结果已持久化
+    reloaded = await _open(DIM, path, index_type=index_type)
+    assert reloaded.current_index_type == index_type
+
+    await storage.delete([0, 1])
+    assert storage.ntotal == 998
+
+    report = await storage.evaluate(sample_size=50, k=5)
+    assert report["index_type"] == index_type
+    assert report["sample_size"] == 50
+    assert 0 < report["recall_at_k"] <= 1
+
+
+@pytest.mark.asyncio
+async def test_hnsw_delete_marks_tombstones_and_purges_in_background(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(
+        DIM,
+        path,
+        index_type="hnsw",
+        train_threshold=100,
+        write_behind=False,
+        tombstone_ratio=0.5,
+    )
+    vectors = _vectors(200)
+    await storage.insert_batch(vectors, list(range(200)))
+    await storage._migration_task
+    assert storage.current_index_type == "hnsw"
+    index = storage.index
+
+    # 删除只记为墓碑, 不重建索引, 检索时过滤
+    await storage.delete([0, 1])
+    assert storage.index is index
+    assert storage.ntotal == 198
+    assert not storage.purging
+    _, ids = await storage.search(vectors[:1].copy(), 5)
+    assert 0 not in ids[0] and 1 not in ids[0]
+
+    # 墓碑持久化, 重新加载后仍然过滤
+    reloaded = await _open(DIM, path, index_type="hnsw", write_behind=False)
+    assert reloaded.ntotal == 198
+    _, ids = await reloaded.search(vectors[1:2].copy(), 5)
+    assert 1 not in ids[0]
+
+    # 墓碑占比超过阈值后在后台重建
+    await storage.delete(list(range(2, 100)))
+    assert storage.purging
+    await storage._purge_task
+    assert storage.index is not index
+    assert storage.index.ntotal == 100
+    assert storage.ntotal == 100
+    _, ids = await storage.search(vectors[150:151].copy(), 1)
+    assert ids[0][0] == 150
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_migrate_back_to_flat_keeps_vectors(tmp_path):
+    storage = await _open(
+        DIM,
+        str(tmp_path / "index.faiss"),
+        index_type="ivf_flat",
+        train_threshold=100,
+    )
+    vectors = _vectors(300)
+    await storage.insert_batch(vectors, list(range(300)))
+    await storage._migration_task
+
+    storage.set_index_type("flat")
+    await storage._migration_task
+    assert storage.current_index_type == "flat"
+
+    _, ids = await storage.search(vectors[:1].copy(), 1)
+    assert ids[0][0] == 0
+    report = await storage.evaluate(sample_size=20, k=5)
+    assert report["recall_at_k"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_recovers_from_log(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(DIM, path, compact_interval=3600)
+    vectors = _vectors(20)
+    await storage.insert_batch(vectors[:10], list(range(10)))
+    await storage.insert(vectors[10], 10)
+    await storage.delete([3])
+
+    # 修改只写入增量日志, 模拟进程崩溃 (未合并、未关闭)
+    assert storage._log.size > 0
+    storage._compact_task.cancel()
+    storage._log.close()
+
+    recovered = EmbeddingStorage(DIM, path)
+    # 重放在 initialize 中进行, 构造时不读取文件
+    assert recovered.index is None
+    await recovered.initialize()
+    assert recovered.index.ntotal == 10
+    assert recovered._log.size == 0
+    _, ids = await recovered.search(vectors[10:11].copy(), 1)
+    assert ids[0][0] == 10
+    _, ids = await recovered.search(vectors[3:4].copy(), 1)
+    assert ids[0][0] != 3
+    await recovered.close()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_replay_is_idempotent(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(DIM, path, compact_interval=3600)
+    vectors = _vectors(10)
+    await storage.insert_batch(vectors, list(range(10)))
+    log_bytes = open(f"{path}.log", "rb").read()
+    await storage.close()
+
+    # 模拟索引文件已写入、但日志未清空时崩溃
+    with open(f"{path}.log", "wb") as f:
+        f.write(log_bytes + b"A\x01")
+    recovered = await _open(DIM, path)
+    assert recovered.index.ntotal == 10
+
+
+@pytest.mark.asyncio
+async def test_compaction_triggered_by_log_size(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    storage = await _open(
+        DIM,
+        path,
+        compact_interval=3600,
+        compact_log_bytes=1024,
+    )
+    await storage.insert_batch(_vectors(50), list(range(50)))
+    await storage._compact_task
+    assert storage._log.size == 0
+    assert (await _open(DIM, path, write_behind=False)).index.ntotal == 50
+
+
+@pytest.mark.asyncio
+async def test_rw_lock_readers_share_writers_exclusive():
+    lock = AsyncRWLock()
+    events = []
+
+    async def reader(name, delay):
+        async with lock.read():
+            events.append(f"{name}+")
+            await asyncio.sleep(delay)
+            events.append(f"{name}-")
+
+    async def writer():
+        async with lock.write():
+            events.append("w+")
+            await asyncio.sleep(0.01)
+            events.append("w-")
+
+    r1 = asyncio.create_task(reader("r1", 0.05))
+    r2 = asyncio.create_task(reader("r2", 0.05))
+    await asyncio.sleep(0)
+    w = asyncio.create_task(writer())
+    await asyncio.sleep(0)
+    # 有写者等待时, 新的读者排在写者之后
+    r3 = asyncio.create_task(reader("r3", 0))
+    await asyncio.gather(r1, r2, w, r3)
+
+    assert events[:2] == ["r1+", "r2+"]
+    assert events.index("w+") > max(events.index("r1-"), events.index("r2-"))
+    assert events.index("r3+") > events.index("w-")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_search_during_writes(tmp_path):
+    storage = await _open(DIM, str(tmp_path / "index.faiss"))
+    vectors = _vectors(400)
+    await storage.insert_batch(vectors[:200], list(range(200)))
+
+    async def search(i):
+        _, ids = await storage.search(vectors[i : i + 1].copy(), 1)
+        return ids[0][0]
+
+    results = await asyncio.gather(
+        *(search(i) for i in range(50)),
+        storage.insert_batch(vectors[200:], list(range(200, 400))),
+        storage.delete([399]),
+    )
+    assert results[:50] == list(range(50))
+    assert storage.index.ntotal == 399
+    await storage.close()
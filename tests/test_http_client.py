@@ -0,0 +1,55 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from astrbot.core.utils.http_client import HttpClientManager, http_client
+from astrbot.core.utils.io import download_file, download_image_by_url
+
+
+async def _start_server(seen_connections: set) -> TestServer:
+    async def handler(request: web.Request) -> web.Response:
+        seen_connections.add(request.transport.get_extra_info("peername"))
+        return web.Response(body=b"\x89PNG" + b"0" * 32)
+
+    app = web.Application()
+    app.router.add_get("/img", handler)
+    app.router.add_post("/img", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+@pytest.mark.asyncio
+async def test_downloads_reuse_pooled_connections(tmp_path):
+    seen_connections = set()
+    server = await _start_server(seen_connections)
+    try:
+        url = str(server.make_url("/img"))
+        for i in range(5):
+            path = str(tmp_path / f"{i}.png")
+            assert await download_image_by_url(url, path=path) == path
+        await download_image_by_url(url, post=True, path=str(tmp_path / "p.png"))
+        await download_file(url, str(tmp_path / "f.bin"))
+        assert (tmp_path / "f.bin").read_bytes().startswith(b"\x89PNG")
+        # 所有请求复用同一个连接
+        assert len(seen_connections) == 1
+    finally:
+        await http_client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_session_is_recreated_after_close():
+    manager = HttpClientManager(limit=5, limit_per_host=2)
+    session = manager.get_session()
+    assert manager.get_session() is session
+    assert session.connector.limit == 5
+    assert session.connector.limit_per_host == 2
+
+    await manager.close()
+    assert session.closed
+    manager.configure(limit_per_host=3)
+    new_session = manager.get_session()
+    assert new_session is not session
+    assert new_session.connector.limit_per_host == 3
+    await manager.close()
@@ -0,0 +1,124 @@
+import pytest
+from rank_bm25 import BM25Okapi
+
+from astrbot.core.knowledge_base.retrieval.bm25_index import BM25Index
+
+CORPUS = [
+    ["apple", "banana", "apple"],
+    ["banana", "cherry"],
+    ["cherry", "durian", "elderberry", "fig"],
+    ["apple", "fig"],
+    ["grape"],
+]
+
+
+def _chunks(corpus):
+    return [
+        (f"chunk-{i}", i, f"doc-{i % 2}", i, " ".join(tokens))
+        for i, tokens in enumerate(corpus)
+    ]
+
+
+def _index(path):
+    return BM25Index(str(path), tokenizer=str.split)
+
+
+@pytest.mark.asyncio
+async def test_scores_match_bm25okapi(tmp_path):
+    index = _index(tmp_path / "bm25_index.json")
+    await index.add_chunks(_chunks(CORPUS))
+
+    query = ["apple", "fig", "unknown"]
+    expected = BM25Okapi(CORPUS).get_scores(query)
+    hits = dict(index.search(query, top_k=len(CORPUS)))
+
+    for i, score in enumerate(expected):
+        if score == 0:
+            assert f"chunk-{i}" not in hits
+        else:
+            assert hits[f"chunk-{i}"] == pytest.approx(score)
+
+
+@pytest.mark.asyncio
+async def test_incremental_remove_matches_fresh_index(tmp_path):
+    index = _index(tmp_path / "bm25_index.json")
+    await index.add_chunks(_chunks(CORPUS))
+    await index.remove_document("doc-1")
+
+    remaining = [tokens for i, tokens in enumerate(CORPUS) if i % 2 == 0]
+    expected = BM25Okapi(remaining).get_scores(["cherry", "grape"])
+    hits = index.search(["cherry", "grape"], top_k=10)
+
+    assert {chunk_id for chunk_id, _ in hits} == {"chunk-2", "chunk-4"}
+    assert sorted(score for _, score in hits) == pytest.approx(
+        sorted(s for s in expected if s != 0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_persistence_roundtrip(tmp_path):
+    path = tmp_path / "bm25_index.json"
+    index = _index(path)
+    await index.add_chunks(_chunks(CORPUS))
+    await index.remove_chunks(["chunk-0"])
+
+    reloaded = _index(path)
+    assert reloaded.load()
+    assert len(reloaded) == len(CORPUS) - 1
+    assert reloaded.search(["banana"], top_k=5) == index.search(["banana"], top_k=5)
+    assert reloaded.chunks["chunk-3"].int_id == 3
+
+
+def test_load_missing_file(tmp_path):
+    assert not BM25Index(str(tmp_path / "missing.json")).load()
+
+
+@pytest.mark.asyncio
+async def test_tokenizes_each_content_once(tmp_path):
+    calls = []
+
+    def tokenizer(text):
+        calls.append(text)
+        return text.split()
+
+    index = BM25Index(str(tmp_path / "bm25_index.json"), tokenizer=tokenizer)
+    chunks = _chunks(CORPUS) + [("dup", 99, "doc-2", 0, "apple banana apple")]
+    await index.add_chunks(chunks)
+    assert len(calls) == len(CORPUS)
+
+    # 重建时内容未变化的文本块复用缓存, 只对新内容分词
+    calls.clear()
+    await index.rebuild(chunks + [("new", 100, "doc-3", 0, "kiwi")])
+    assert calls == ["kiwi"]
+    assert index.synced
+    assert index.chunks["dup"].term_freqs is index.chunks["chunk-0"].term_freqs
+
+
+@pytest.mark.asyncio
+async def test_mutations_append_to_log_until_compaction(tmp_path):
+    path = tmp_path / "bm25_index.json"
+    index = BM25Index(str(path), tokenizer=str.split, compact_bytes=0)
+    await index.rebuild(_chunks(CORPUS))
+    snapshot = path.read_bytes()
+
+    # 小修改只追加到日志, 不重写快照
+    await index.remove_chunks(["chunk-0"])
+    await index.update_chunk_indexes({"chunk-1": 7})
+    assert path.read_bytes() == snapshot
+    assert index.document_chunks("doc-0").keys() == {"chunk-2", "chunk-4"}
+
+    reloaded = _index(path)
+    assert reloaded.load()
+    assert reloaded.chunks.keys() == index.chunks.keys()
+    assert reloaded.chunks["chunk-1"].chunk_index == 7
+    assert reloaded.search(["banana"], top_k=5) == index.search(["banana"], top_k=5)
+
+    # 日志超过快照大小后重写快照并清空日志
+    await index.add_chunks(
+        (f"big-{i}", 100 + i, "doc-9", i, "kiwi " * 20) for i in range(20)
+    )
+    assert path.read_bytes() != snapshot
+    assert (tmp_path / "bm25_index.json.log").stat().st_size == 0
+    reloaded = _index(path)
+    assert reloaded.load()
+    assert len(reloaded) == len(index)
@@ -0,0 +1,54 @@
+import pytest
+
+from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.models import KBDocument, KnowledgeBase
+
+
+@pytest.mark.asyncio
+async def test_document_names_bulk_lookup_and_invalidation(tmp_path):
+    kb_db = KBSQLiteDatabase(str(tmp_path / "kb.db"))
+    await kb_db.initialize()
+    kb = KnowledgeBase(kb_name="faq", embedding_provider_id="emb")
+    docs = [
+        KBDocument(
+            kb_id=kb.kb_id,
+            doc_name=f"doc{i}.txt",
+            file_type="txt",
+            file_size=1,
+            file_path="",
+        )
+        for i in range(3)
+    ]
+    async with kb_db.get_db() as session:
+        session.add(kb)
+        session.add_all(docs)
+        await session.commit()
+
+    doc_ids = [doc.doc_id for doc in docs]
+    rows = await kb_db.get_documents_with_metadata([*doc_ids, "missing"])
+    assert set(rows) == set(doc_ids)
+    assert rows[doc_ids[0]]["knowledge_base"].kb_name == "faq"
+
+    names = await kb_db.get_document_names([doc_ids[1], doc_ids[0], "missing"])
+    assert names == {doc_ids[1]: ("doc1.txt", "faq"), doc_ids[0]: ("doc0.txt", "faq")}
+
+    # 重命名知识库: 未失效前仍返回缓存的旧名称
+    kb.kb_name = "faq-renamed"
+    async with kb_db.get_db() as session:
+        session.add(kb)
+        await session.commit()
+    assert (await kb_db.get_document_names([doc_ids[0]]))[doc_ids[0]][1] == "faq"
+    kb_db.invalidate_name_cache(kb_id=kb.kb_id)
+    assert (await kb_db.get_document_names([doc_ids[0]]))[doc_ids[0]][1] == (
+        "faq-renamed"
+    )
+
+    assert doc_ids[2] in await kb_db.get_document_names([doc_ids[2]])
+    await kb_db.delete_document_by_id(doc_ids[2], vec_db=_NoopVecDB())
+    assert await kb_db.get_document_names([doc_ids[2]]) == {}
+    await kb_db.close()
+
+
+class _NoopVecDB:
+    async def delete_documents(self, metadata_filters: dict):
+        pass
@@ -0,0 +1,315 @@
+import json
+
+import pytest
+
+from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.knowledge_base.chunking.base import BaseChunker
+from astrbot.core.knowledge_base.chunking.recursive import RecursiveCharacterChunker
+from astrbot.core.knowledge_base.ingestion import (
+    IngestionPipeline,
+    UploadCheckpoint,
+    iter_segments,
+)
+from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.kb_helper import KBHelper
+from astrbot.core.knowledge_base.models import KnowledgeBase
+from astrbot.core.knowledge_base.parsers.base import ParseResult
+from astrbot.core.knowledge_base.retrieval.bm25_index import BM25Index
+from astrbot.core.provider.provider import EmbeddingProvider
+
+
+class FlakyEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, fail_on_call: int | None = None):
+        super().__init__({"id": "emb", "type": "openai_embedding"}, {})
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.embedded: list[str] = []
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return (await self.get_embeddings([text]))[0]
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("embedding api down")
+        self.embedded.extend(text)
+        return [[float(len(t)), 1.0, 0.0, 0.0] for t in text]
+
+    def get_dim(self) -> int:
+        return 4
+
+
+async def _iterate(items: list):
+    for item in items:
+        yield item
+
+
+class _WordChunker(BaseChunker):
+    async def chunk(self, text: str, **kwargs) -> list[str]:
+        return text.split()
+
+
+async def _chunks(n: int):
+    for i in range(n):
+        yield f"chunk {i}"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_last_committed_window(tmp_path):
+    provider = FlakyEmbeddingProvider(fail_on_call=3)
+    vec_db = FaissVecDB(
+        str(tmp_path / "doc.db"),
+        str(tmp_path / "index.faiss"),
+        provider,
+    )
+    await vec_db.initialize()
+    sparse_index = BM25Index(str(tmp_path / "bm25.json"), tokenizer=str.split)
+    checkpoint_path = tmp_path / "uploads" / "key.json"
+
+    def make_pipeline():
+        return IngestionPipeline(
+            vec_db=vec_db,
+            sparse_index=sparse_index,
+            kb_id="kb",
+            checkpoint=UploadCheckpoint.load_or_create(checkpoint_path),
+            window_size=3,
+            max_retries=1,
+        )
+
+    pipeline = make_pipeline()
+    with pytest.raises(Exception, match="embedding api down"):
+        await pipeline.run(_chunks(10))
+    assert pipeline.checkpoint.committed == 6
+    assert await vec_db.count_documents() == 6
+
+    resumed = make_pipeline()
+    assert resumed.doc_id == pipeline.doc_id
+    assert await resumed.run(_chunks(10)) == 10
+
+    # 已提交的窗口不会重新向量化
+    assert provider.embedded == [f"chunk {i}" for i in range(10)]
+    docs = await vec_db.document_storage.get_documents(
+        metadata_filters={"kb_doc_id": resumed.doc_id},
+        limit=None,
+        offset=None,
+    )
+    indexes = sorted(json.loads(doc["metadata"])["chunk_index"] for doc in docs)
+    assert indexes == list(range(10))
+    assert len(sparse_index) == 10
+    reloaded = BM25Index(str(tmp_path / "bm25.json"), tokenizer=str.split)
+    assert reloaded.load()
+    assert len(reloaded) == 10
+    await vec_db.close()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_stages_in_order(tmp_path):
+    vec_db = FaissVecDB(
+        str(tmp_path / "doc.db"),
+        str(tmp_path / "index.faiss"),
+        FlakyEmbeddingProvider(),
+    )
+    await vec_db.initialize()
+    events = []
+
+    async def progress(stage, current, total):
+        events.append((stage, current, total))
+
+    pipeline = IngestionPipeline(
+        vec_db=vec_db,
+        sparse_index=BM25Index(str(tmp_path / "bm25.json"), tokenizer=str.split),
+        kb_id="kb",
+        checkpoint=UploadCheckpoint.load_or_create(tmp_path / "key.json"),
+        window_size=2,
+        progress_callback=progress,
+    )
+    segments = _iterate([ParseResult(text="a b c d e", media=[])])
+    assert await pipeline.run_parsed(segments, _WordChunker(), 1, 0) == 5
+
+    stages = [stage for stage, _, _ in events]
+    # 阶段只向前推进, 不会回到之前的阶段
+    assert [s for i, s in enumerate(stages) if i == 0 or stages[i - 1] != s] == [
+        "parsing",
+        "chunking",
+        "embedding",
+    ]
+    assert events[-1] == ("embedding", 5, 5)
+    await vec_db.close()
+
+
+def test_iter_segments_splits_on_paragraphs():
+    text = "a" * 6 + "\n\n" + "b" * 6 + "\n" + "c" * 20
+    segments = list(iter_segments(text, max_chars=10))
+    assert "".join(segments) == text
+    assert all(len(s) <= 10 for s in segments)
+    assert segments[0] == "a" * 6
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reuses_vectors_of_identical_chunks(tmp_path):
+    provider = FlakyEmbeddingProvider()
+    vec_db = FaissVecDB(
+        str(tmp_path / "doc.db"),
+        str(tmp_path / "index.faiss"),
+        provider,
+    )
+    await vec_db.initialize()
+    sparse_index = BM25Index(str(tmp_path / "bm25.json"), tokenizer=str.split)
+
+    def make_pipeline(name: str):
+        return IngestionPipeline(
+            vec_db=vec_db,
+            sparse_index=sparse_index,
+            kb_id="kb",
+            checkpoint=UploadCheckpoint.load_or_create(tmp_path / f"{name}.json"),
+            window_size=2,
+        )
+
+    first = make_pipeline("first")
+    assert await first.run(_iterate(["a", "b", "a", "c"])) == 3
+    # 同一文档中重复的文本块只保存一次, chunk_index 连续编号
+    assert first.duplicates == 1
+    assert await vec_db.count_documents({"kb_doc_id": first.doc_id}) == 3
+    docs = await vec_db.document_storage.get_documents(
+        metadata_filters={"kb_doc_id": first.doc_id},
+        limit=None,
+        offset=None,
+    )
+    assert sorted(
+        (json.loads(doc["metadata"])["chunk_index"], doc["text"]) for doc in docs
+    ) == [(0, "a"), (1, "b"), (2, "c")]
+    assert sorted(
+        c.chunk_index for c in sparse_index.document_chunks(first.doc_id).values()
+    ) == [0, 1, 2]
+    assert provider.embedded == ["a", "b", "c"]
+
+    second = make_pipeline("second")
+    await second.run(_iterate(["c", "d", "b"]))
+    assert provider.embedded == ["a", "b", "c", "d"]
+    assert second.resolver.reused == 2
+    assert await vec_db.count_documents({"kb_doc_id": second.doc_id}) == 3
+    await vec_db.close()
+
+
+class _ProviderManager:
+    def __init__(self, provider):
+        self.provider = provider
+
+    async def get_provider_by_id(self, provider_id: str):
+        return self.provider
+
+
+@pytest.mark.asyncio
+async def test_resync_document_only_embeds_changed_chunks(tmp_path):
+    provider = FlakyEmbeddingProvider()
+    kb_db = KBSQLiteDatabase(str(tmp_path / "kb.db"))
+    await kb_db.initialize()
+    kb = KnowledgeBase(kb_name="handbook", embedding_provider_id="emb")
+    async with kb_db.get_db() as session:
+        session.add(kb)
+        await session.commit()
+        await session.refresh(kb)
+    helper = KBHelper(
+        kb_db=kb_db,
+        kb=kb,
+        provider_manager=_ProviderManager(provider),  # type: ignore
+        kb_root_dir=str(tmp_path / "kb"),
+        chunker=RecursiveCharacterChunker(),
+    )
+    await helper.initialize()
+    helper.sparse_index.tokenizer = str.split
+
+    doc = await helper.upload_document(
+        file_name="handbook.txt",
+        file_content=None,
+        file_type="txt",
+        pre_chunked_text=["intro", "rules", "faq", "contact"],
+    )
+    provider.embedded.clear()
+
+    result = await helper.resync_document(
+        doc.doc_id,
+        pre_chunked_text=["intro", "new rules", "faq", "appendix"],
+    )
+    assert result["added"] == 2
+    assert result["removed"] == 2
+    assert result["unchanged"] == 2
+    assert provider.embedded == ["new rules", "appendix"]
+
+    chunks = await helper.get_chunks_by_doc_id(doc.doc_id)
+    assert sorted((c["chunk_index"], c["content"]) for c in chunks) == [
+        (0, "intro"),
+        (1, "new rules"),
+        (2, "faq"),
+        (3, "appendix"),
+    ]
+    assert (await helper.get_document(doc.doc_id)).chunk_count == 4  # type: ignore
+    assert sorted(
+        c.chunk_index for c in helper.sparse_index.document_chunks(doc.doc_id).values()
+    ) == [0, 1, 2, 3]
+    assert helper.vec_db.embedding_storage.index.ntotal == 4  # type: ignore
+
+    # 只调整顺序时不调用嵌入接口
+    provider.embedded.clear()
+    result = await helper.resync_document(
+        doc.doc_id,
+        pre_chunked_text=["faq", "intro", "new rules", "appendix"],
+    )
+    assert result["moved"] == 3
+    assert provider.embedded == []
+    await helper.terminate()
+    await kb_db.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_upload_is_hidden_and_cleaned_up(tmp_path):
+    provider = FlakyEmbeddingProvider(fail_on_call=3)
+    kb_db = KBSQLiteDatabase(str(tmp_path / "kb.db"))
+    await kb_db.initialize()
+    kb = KnowledgeBase(kb_name="handbook", embedding_provider_id="emb")
+    async with kb_db.get_db() as session:
+        session.add(kb)
+        await session.commit()
+        await session.refresh(kb)
+
+    def make_helper():
+        return KBHelper(
+            kb_db=kb_db,
+            kb=kb,
+            provider_manager=_ProviderManager(provider),  # type: ignore
+            kb_root_dir=str(tmp_path / "kb"),
+            chunker=RecursiveCharacterChunker(),
+        )
+
+    helper = make_helper()
+    await helper.initialize()
+    helper.sparse_index.tokenizer = str.split
+    with pytest.raises(Exception, match="embedding api down"):
+        await helper.upload_document(
+            file_name="handbook.txt",
+            file_content=None,
+            file_type="txt",
+            pre_chunked_text=["intro", "rules", "faq", "contact", "a", "b"],
+            max_retries=1,
+            window_size=2,
+        )
+    vec_db = helper.vec_db
+    assert await vec_db.count_documents() == 4  # type: ignore
+    (doc_id,) = helper.pending_docs
+    # 已提交但文档尚未写入的文本块不会被检索到
+    assert helper.sparse_index.search(["intro"], 5)
+    assert not helper.sparse_index.search(["intro"], 5, exclude_docs={doc_id})
+    await helper.terminate()
+
+    # 重启后仍视为未完成的导入, 超时后清理文本块和检查点
+    helper = make_helper()
+    await helper.initialize()
+    helper.sparse_index.tokenizer = str.split
+    assert helper.pending_docs == {doc_id}
+    await helper.cleanup_uploads(ttl=0)
+    assert not helper.pending_docs
+    assert await helper.vec_db.count_documents() == 0  # type: ignore
+    assert not helper.sparse_index.document_chunks(doc_id)
+    assert not list((tmp_path / "kb" / kb.kb_id / "uploads").glob("*.json"))
+    await helper.terminate()
+    await kb_db.close()
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from astrbot.core.db.vec_db.base import Result
+from astrbot.core.knowledge_base.retrieval.manager import RetrievalManager
+
+
+class FakeEmbeddingProvider:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_embedding(self, text: str) -> list[float]:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return [float(len(text))]
+
+
+class FakeVecDB:
+    def __init__(self, provider, similarity: float, fail: bool = False):
+        self.embedding_provider = provider
+        self.similarity = similarity
+        self.fail = fail
+        self.embeddings = []
+
+    async def retrieve(self, query, k, fetch_k, rerank, metadata_filters, **kwargs):
+        if self.fail:
+            raise RuntimeError("boom")
+        self.embeddings.append(kwargs["query_embedding"])
+        return [Result(similarity=self.similarity, data=metadata_filters)]
+
+
+@pytest.mark.asyncio
+async def test_dense_retrieve_embeds_once_per_provider():
+    provider_a = FakeEmbeddingProvider()
+    provider_b = FakeEmbeddingProvider()
+    vec_dbs = {
+        "kb1": FakeVecDB(provider_a, 0.1),
+        "kb2": FakeVecDB(provider_a, 0.9),
+        "kb3": FakeVecDB(provider_a, 0.5),
+        "kb4": FakeVecDB(provider_b, 0.7),
+        "kb5": FakeVecDB(provider_b, 0.3, fail=True),
+    }
+    kb_options = {
+        kb_id: {"vec_db": vec_db, "top_k_dense": 5} for kb_id, vec_db in vec_dbs.items()
+    }
+    manager = RetrievalManager(None, None, None)  # type: ignore
+
+    results = await manager._dense_retrieve("hello", list(vec_dbs), kb_options)
+
+    assert provider_a.calls == 1
+    assert provider_b.calls == 1
+    assert vec_dbs["kb1"].embeddings == [[5.0]]
+    # 失败的知识库被跳过, 其余结果按相似度排序
+    assert [r.data["kb_id"] for r in results] == ["kb2", "kb4", "kb3", "kb1"]
@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import os
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from astrbot.core.provider.media_cache import MediaCache
+from astrbot.core.utils.http_client import http_client
+
+
+async def _start_server(requests: list) -> TestServer:
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        await asyncio.sleep(0.01)
+        name = request.match_info["name"]
+        # /same 与 /meme 返回相同的内容
+        body = b"meme" if name == "same" else name.encode()
+        return web.Response(body=body * 1024)
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+@pytest.mark.asyncio
+async def test_urls_are_downloaded_once_and_deduplicated_by_content(tmp_path):
+    requests = []
+    server = await _start_server(requests)
+    cache = MediaCache(cache_dir=str(tmp_path))
+    try:
+        url = str(server.make_url("/meme"))
+        results = await asyncio.gather(*(cache.encode_url(url) for _ in range(5)))
+        assert results[0] == "data:image/jpeg;base64," + base64.b64encode(
+            b"meme" * 1024
+        ).decode("utf-8")
+        assert len(set(results)) == 1
+        await cache.encode_url(url)
+        assert requests == ["/meme"]
+
+        # 不同 URL 相同内容的图片只保存一份
+        path = await cache.fetch(str(server.make_url("/same")))
+        assert path == await cache.fetch(url)
+        assert len(os.listdir(tmp_path)) == 1
+
+        stats = cache.stats()
+        assert stats["downloads"] == 2
+        assert stats["encodes"] == 1
+        assert stats["disk_entries"] == 1
+    finally:
+        await http_client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_and_memory_limits_evict_least_recently_used(tmp_path):
+    requests = []
+    server = await _start_server(requests)
+    cache = MediaCache(
+        cache_dir=str(tmp_path),
+        max_disk_bytes=2 * 1024,
+        max_memory_bytes=3 * 1024,
+    )
+    try:
+        a, b, c = (str(server.make_url(f"/{n}")) for n in ("a", "b", "c"))
+        await cache.encode_url(a)
+        await cache.encode_url(b)
+        await cache.encode_url(a)
+        await cache.encode_url(c)
+        # b 最久未使用, 被淘汰
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["disk_bytes"] <= 2 * 1024
+        assert stats["memory_bytes"] <= 3 * 1024
+        assert len(os.listdir(tmp_path)) == 2
+
+        await cache.encode_url(a)
+        await cache.encode_url(b)
+        assert requests == ["/a", "/b", "/c", "/b"]
+
+        # 重启后从目录中恢复已缓存的文件
+        restored = MediaCache(cache_dir=str(tmp_path), max_disk_bytes=2 * 1024)
+        await restored._load_blobs()
+        assert restored.stats()["disk_bytes"] == cache.stats()["disk_bytes"]
+    finally:
+        await http_client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_hits_touch_blobs_and_missing_blobs_are_refetched(tmp_path):
+    requests = []
+    server = await _start_server(requests)
+    cache = MediaCache(cache_dir=str(tmp_path))
+    try:
+        url = str(server.make_url("/a"))
+        path = await cache.fetch(url)
+        os.utime(path, (0, 0))
+        # 命中时更新修改时间, 重启后的淘汰顺序与内存中一致
+        await cache.fetch(url)
+        assert os.stat(path).st_mtime > 0
+
+        # 编码前文件已被删除时重新下载, 而不是抛出 FileNotFoundError
+        os.remove(path)
+        assert await cache.encode_url(url) == "data:image/jpeg;base64," + (
+            base64.b64encode(b"a" * 1024).decode("utf-8")
+        )
+        assert requests == ["/a", "/a"]
+        assert cache.stats()["disk_bytes"] == 1024
+    finally:
+        await http_client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_local_files_are_reencoded_after_change(tmp_path):
+    cache = MediaCache(cache_dir=str(tmp_path / "cache"))
+    path = tmp_path / "img.jpg"
+    path.write_bytes(b"first")
+    first = await cache.encode_file(str(path))
+    assert await cache.encode_file(str(path)) == first
+    assert cache.stats()["encode_hits"] == 1
+
+    path.write_bytes(b"second image")
+    assert await cache.encode_file(str(path)) == "data:image/jpeg;base64," + (
+        base64.b64encode(b"second image").decode("utf-8")
+    )
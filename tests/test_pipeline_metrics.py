@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import astrbot.api  # noqa: F401  # 先完成 astrbot.core.star 的初始化
+from astrbot.core.pipeline.metrics import pipeline_metrics
+from astrbot.core.pipeline.scheduler import PipelineScheduler
+
+
+class FakeEvent:
+    def is_stopped(self):
+        return False
+
+
+class OnionStage:
+    async def process(self, event):
+        await asyncio.sleep(0.01)
+        yield
+        await asyncio.sleep(0.01)
+
+
+class InnerStage:
+    async def process(self, event):
+        await asyncio.sleep(0.05)
+
+
+@pytest.fixture
+def metrics():
+    pipeline_metrics.reset()
+    pipeline_metrics.enabled = True
+    yield pipeline_metrics
+    pipeline_metrics.enabled = False
+    pipeline_metrics.reset()
+
+
+def _histograms(conf_id: str) -> dict:
+    return {
+        (m["kind"], m["name"], m["phase"]): m
+        for m in pipeline_metrics.snapshot()[conf_id]
+    }
+
+
+@pytest.mark.asyncio
+async def test_stage_phases_exclude_downstream_time(metrics):
+    scheduler = PipelineScheduler(SimpleNamespace(astrbot_config_id="conf-1"))
+    scheduler.stages = [OnionStage(), InnerStage()]
+    await scheduler.execute(FakeEvent())
+    await scheduler.execute(FakeEvent())
+
+    hist = _histograms("conf-1")
+    pre = hist[("stage", "OnionStage", "pre")]
+    post = hist[("stage", "OnionStage", "post")]
+    inner = hist[("stage", "InnerStage", "pre")]
+    total = hist[("pipeline", "total", "pre")]
+    assert pre["count"] == post["count"] == total["count"] == 2
+    # 前后两段都不包含后续阶段 (InnerStage) 的耗时
+    assert 0.01 <= pre["avg"] < 0.04
+    assert 0.01 <= post["avg"] < 0.04
+    assert inner["avg"] >= 0.05
+    assert total["avg"] >= 0.07
+
+    text = metrics.to_prometheus()
+    assert (
+        'astrbot_pipeline_latency_seconds_count{conf_id="conf-1",kind="stage",'
+        'name="OnionStage",phase="post"} 2'
+    ) in text
+    assert 'le="+Inf"} 2' in text
+
+
+@pytest.mark.asyncio
+async def test_disabled_metrics_record_nothing():
+    pipeline_metrics.reset()
+    scheduler = PipelineScheduler(SimpleNamespace(astrbot_config_id="conf-2"))
+    scheduler.stages = [InnerStage()]
+    await scheduler.execute(FakeEvent())
+    assert pipeline_metrics.snapshot() == {}
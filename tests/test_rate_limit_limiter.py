@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+import astrbot.api  # noqa: F401  # 先完成 astrbot.core.star 的初始化
+from astrbot.core.pipeline.rate_limit_check import limiter as limiter_module
+from astrbot.core.pipeline.rate_limit_check.limiter import TokenBucketLimiter
+from astrbot.core.pipeline.rate_limit_check.stage import RateLimitStage
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(limiter_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_wait_in_order(clock):
+    limiter = TokenBucketLimiter(capacity=3, period=3, max_queue=2)
+    assert [limiter.acquire("s") for _ in range(3)] == [0.0, 0.0, 0.0]
+    # 令牌耗尽后按预约顺序依次等待
+    assert limiter.acquire("s") == pytest.approx(1.0)
+    assert limiter.acquire("s") == pytest.approx(2.0)
+    # 等待队列已满, 拒绝且不占用令牌
+    assert limiter.acquire("s") is None
+    assert limiter.retry_after("s") == pytest.approx(3.0)
+    # 其他键不受影响
+    assert limiter.acquire("other") == 0.0
+
+    clock[0] += 3
+    assert limiter.acquire("s") == 0.0
+
+
+def test_release_refunds_cancelled_wait(clock):
+    limiter = TokenBucketLimiter(capacity=1, period=1, max_queue=1)
+    limiter.acquire("s")
+    assert limiter.acquire("s") == pytest.approx(1.0)
+    limiter.release("s")
+    assert limiter.acquire("s") == pytest.approx(1.0)
+
+
+def test_discard_mode_rejects_immediately(clock):
+    limiter = TokenBucketLimiter(capacity=1, period=10)
+    assert limiter.acquire("s") == 0.0
+    assert limiter.acquire("s") is None
+
+
+def test_idle_buckets_are_swept(clock):
+    limiter = TokenBucketLimiter(capacity=2, period=1)
+    for i in range(100):
+        limiter.acquire(f"user-{i}")
+    assert len(limiter) == 100
+
+    clock[0] += 2
+    limiter.acquire("fresh")
+    assert len(limiter) == 1
+
+
+def test_negative_max_queue_never_rejects(clock):
+    limiter = TokenBucketLimiter(capacity=1, period=1, max_queue=-1)
+    waits = [limiter.acquire("s") for _ in range(100)]
+    assert None not in waits
+    assert waits[-1] == pytest.approx(99.0)
+
+
+class FakeEvent:
+    session_id = "s"
+
+    def __init__(self):
+        self.sent = []
+        self.stopped = False
+
+    async def send(self, chain):
+        self.sent.append(chain.get_plain_text())
+
+    def stop_event(self):
+        self.stopped = True
+
+
+@pytest.mark.asyncio
+async def test_stage_notifies_when_dropping(clock):
+    def rate_limit(**kwargs):
+        return SimpleNamespace(
+            astrbot_config={
+                "platform_settings": {
+                    "rate_limit": {"time": 60, "count": 1, **kwargs},
+                },
+            },
+        )
+
+    stage = RateLimitStage()
+    await stage.initialize(rate_limit(strategy="discard", notify=True))
+    first, second = FakeEvent(), FakeEvent()
+    await stage.process(first)
+    await stage.process(second)
+    assert (first.stopped, first.sent) == (False, [])
+    assert second.stopped
+    assert second.sent == ["消息过于频繁，本条消息已被忽略，请 60 秒后再试。"]
+
+    # stall 策略默认不限制排队长度, 不丢弃事件
+    await stage.initialize(rate_limit(strategy="stall"))
+    assert stage.limiter.max_queue == -1
+    assert not stage.notify
@@ -114,14 +114,16 @@ def test_ssl_context_fallback_explicit():
 
 
 def test_io_module_has_ssl_imports():
-    """Verify that io.py properly imports ssl module."""
-    from astrbot.core.utils import io
+    """Verify that the shared HTTP client used by io.py provides the SSL fallback."""
+    from astrbot.core.utils import http_client, io
 
-    # Check that ssl is available in the module
-    assert hasattr(io, "ssl")
+    # io.py downloads through the shared HTTP client
+    assert io.http_client is http_client.http_client
 
-    # Check that CERT_NONE constant is accessible
-    assert hasattr(io.ssl, "CERT_NONE")
+    # Check that the fallback context disables certificate verification
+    ssl_context = http_client.http_client.insecure_ssl_context
+    assert ssl_context.check_hostname is False
+    assert ssl_context.verify_mode == ssl.CERT_NONE
 
 
 def test_secrets_module_randomness_quality():
@@ -0,0 +1,114 @@
+import pytest
+
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.utils.shared_preferences import SharedPreferences
+
+
+class CountingDatabase(SQLiteDatabase):
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.reads = 0
+
+    async def get_preference(self, scope, scope_id, key):
+        self.reads += 1
+        return await super().get_preference(scope, scope_id, key)
+
+    async def get_preferences(self, scope, scope_id=None, key=None):
+        self.reads += 1
+        return await super().get_preferences(scope, scope_id, key)
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_cache_and_writes_keep_it_fresh(tmp_path):
+    db = CountingDatabase(str(tmp_path / "data.db"))
+    await db.initialize()
+    sp = SharedPreferences(db, str(tmp_path / "sp.json"), max_cache_entries=3)
+
+    await sp.session_put("umo1", "kb_config", {"kb_ids": ["a"]})
+    assert await sp.session_get("umo1", "kb_config") == {"kb_ids": ["a"]}
+    assert db.reads == 0
+
+    # 未命中时加载整个会话的偏好设置, 之后不存在的键也无需查询
+    assert await sp.session_get("umo1", "missing", "default") == "default"
+    assert await sp.session_get("umo1", "other", "default") == "default"
+    assert db.reads == 1
+
+    # 修改返回值不会影响缓存
+    value = await sp.session_get("umo1", "kb_config")
+    value["kb_ids"].append("b")
+    assert await sp.session_get("umo1", "kb_config") == {"kb_ids": ["a"]}
+
+    await sp.session_remove("umo1", "kb_config")
+    assert await sp.session_get("umo1", "kb_config") is None
+
+    await sp.session_put("umo2", "a", 1)
+    await sp.session_put("umo2", "b", 2)
+    await sp.clear_async("umo", "umo2")
+    assert await sp.session_get("umo2", "a") is None
+    assert len(sp._cache) <= 3
+
+    stats = sp.cache_stats()
+    assert stats["hits"] > 0
+    assert 0 < stats["hit_rate"] < 1
+
+
+@pytest.mark.asyncio
+async def test_empty_scopes_are_bounded(tmp_path):
+    db = CountingDatabase(str(tmp_path / "data.db"))
+    await db.initialize()
+    sp = SharedPreferences(db, str(tmp_path / "sp.json"), max_cache_entries=3)
+
+    # 没有任何键的会话不占用缓存条目, 但同样受容量限制
+    for i in range(10):
+        assert await sp.session_get(f"umo{i}", "k") is None
+    assert len(sp._complete) == 3
+    reads = db.reads
+    assert await sp.session_get("umo9", "k") is None
+    assert db.reads == reads
+    assert await sp.session_get("umo0", "k") is None
+    assert db.reads == reads + 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_and_invalidate(tmp_path):
+    db = CountingDatabase(str(tmp_path / "data.db"))
+    await db.initialize()
+    await db.insert_preference_or_update("global", "global", "k", {"val": "v1"})
+
+    sp = SharedPreferences(db, str(tmp_path / "sp.json"))
+    await sp.warm_up()
+    assert await sp.global_get("k") == "v1"
+    assert db.reads == 1
+
+    # 绕过 SharedPreferences 直接修改数据库后需要手动失效
+    await db.insert_preference_or_update("global", "global", "k", {"val": "v2"})
+    assert await sp.global_get("k") == "v1"
+    sp.invalidate(scope="global")
+    assert await sp.global_get("k") == "v2"
+    assert db.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_api_does_not_block_event_loop(tmp_path):
+    db = CountingDatabase(str(tmp_path / "data.db"))
+    await db.initialize()
+    await db.insert_preference_or_update("global", "global", "k", {"val": [1]})
+    sp = SharedPreferences(db, str(tmp_path / "sp.json"))
+    await sp.warm_up()
+
+    assert sp.get("k", scope="global", scope_id="global") == [1]
+    assert sp.get("missing", "d", scope="global", scope_id="global") == "d"
+    assert db.reads == 1
+
+    # 在事件循环中调用同步写入: 立即可读, 数据库写入在后台完成
+    sp.put("k", [2], scope="global", scope_id="global")
+    sp.remove("k2", scope="global", scope_id="global")
+    assert sp.get("k", scope="global", scope_id="global") == [2]
+    assert await sp.global_get("k") == [2]
+    await sp.flush()
+    assert (await db.get_preference("global", "global", "k")).value["val"] == [2]
+
+    # 异步写入会排在之前的后台写入之后
+    sp.put("k", [3], scope="global", scope_id="global")
+    await sp.global_put("k", [4])
+    assert (await db.get_preference("global", "global", "k")).value["val"] == [4]
@@ -0,0 +1,78 @@
+import astrbot.api  # noqa: F401  # 先完成 astrbot.core.star 的初始化
+from astrbot.core.star.star import StarMetadata, star_map
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+)
+
+
+async def _handler(self, event):
+    pass
+
+
+def _make_handler(
+    module_path: str,
+    name: str,
+    event_type: EventType,
+    priority: int = 0,
+) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=event_type,
+        handler_full_name=f"{module_path}_{name}",
+        handler_name=name,
+        handler_module_path=module_path,
+        handler=_handler,
+        event_filters=[],
+        extras_configs={"priority": priority},
+    )
+
+
+def _names(handlers: list[StarHandlerMetadata]) -> list[str]:
+    return [h.handler_name for h in handlers]
+
+
+def test_handlers_are_bucketed_and_cached(monkeypatch):
+    plugin_a = StarMetadata(name="a", module_path="tests.plugin_a")
+    plugin_b = StarMetadata(name="b", module_path="tests.plugin_b")
+    monkeypatch.setitem(star_map, "tests.plugin_a", plugin_a)
+    monkeypatch.setitem(star_map, "tests.plugin_b", plugin_b)
+
+    registry = StarHandlerRegistry()
+    registry.append(
+        _make_handler("tests.plugin_a", "a_msg", EventType.AdapterMessageEvent)
+    )
+    registry.append(
+        _make_handler("tests.plugin_b", "b_msg", EventType.AdapterMessageEvent, 10),
+    )
+    registry.append(
+        _make_handler("tests.plugin_a", "a_llm", EventType.OnLLMRequestEvent)
+    )
+
+    msg = EventType.AdapterMessageEvent
+    assert _names(registry.get_handlers_by_event_type(msg)) == ["b_msg", "a_msg"]
+    assert _names(registry.get_handlers_by_event_type(msg, plugins_name=["a"])) == [
+        "a_msg",
+    ]
+    assert _names(registry.get_handlers_by_event_type(EventType.OnLLMRequestEvent)) == [
+        "a_llm",
+    ]
+
+    # 修改返回值不影响缓存
+    registry.get_handlers_by_event_type(msg).clear()
+    assert len(registry.get_handlers_by_event_type(msg)) == 2
+
+    # 状态变化后需要调用 invalidate
+    plugin_b.activated = False
+    assert len(registry.get_handlers_by_event_type(msg)) == 2
+    registry.invalidate()
+    assert _names(registry.get_handlers_by_event_type(msg)) == ["a_msg"]
+    assert len(registry.get_handlers_by_event_type(msg, only_activated=False)) == 2
+
+    # 增删 handler 时自动失效
+    registry.append(
+        _make_handler("tests.plugin_a", "a_msg2", EventType.AdapterMessageEvent, 5)
+    )
+    assert _names(registry.get_handlers_by_event_type(msg)) == ["a_msg2", "a_msg"]
+    registry.remove(registry.get_handler_by_full_name("tests.plugin_a_a_msg"))
+    assert _names(registry.get_handlers_by_event_type(msg)) == ["a_msg2"]
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from unittest.mock import AsyncMock
@@ -324,3 +325,132 @@ async def test_hooks_called_with_max_step(
 if __name__ == "__main__":
     # 运行测试
     pytest.main([__file__, "-v"])
+
+
+class MultiToolProvider(MockProvider):
+    """第一轮同时调用多个工具的模拟Provider"""
+
+    def __init__(self, calls: list[str]):
+        super().__init__()
+        self.calls = calls
+
+    async def text_chat(self, **kwargs) -> LLMResponse:
+        self.call_count += 1
+        if self.call_count > 1:
+            return LLMResponse(role="assistant", completion_text="这是我的最终回答")
+        return LLMResponse(
+            role="assistant",
+            completion_text="",
+            tools_call_name=self.calls,
+            tools_call_args=[{"query": str(i)} for i in range(len(self.calls))],
+            tools_call_ids=[f"call_{i}" for i in range(len(self.calls))],
+        )
+
+
+class SlowToolExecutor:
+    """按工具名决定耗时的模拟执行器，并记录同时执行的工具数量"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    def execute(self, tool, run_context, **tool_args):
+        async def generator():
+            from mcp.types import CallToolResult, TextContent
+
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            # 先调用的工具更晚完成
+            await asyncio.sleep(0.05 / (int(tool_args["query"]) + 1))
+            self.running -= 1
+            yield CallToolResult(
+                content=[
+                    TextContent(type="text", text=f"{tool.name}:{tool_args['query']}")
+                ]
+            )
+
+        return generator()
+
+
+def _tools(*names: str, parallel_safe: bool) -> list[FunctionTool]:
+    return [
+        FunctionTool(
+            name=name,
+            description="测试工具",
+            parameters={
+                "type": "object",
+                "properties": {"query": {"type": "string"}},
+            },
+            handler=AsyncMock(),
+            parallel_safe=parallel_safe,
+        )
+        for name in names
+    ]
+
+
+async def _run_tools(calls, tool_set, max_parallel_tool_calls):
+    runner = ToolLoopAgentRunner()
+    executor = SlowToolExecutor()
+    await runner.reset(
+        provider=MultiToolProvider(calls),
+        request=ProviderRequest(prompt="查询", func_tool=tool_set, contexts=[]),
+        run_context=ContextWrapper(context=None),
+        tool_executor=executor,
+        agent_hooks=MockHooks(),
+        max_parallel_tool_calls=max_parallel_tool_calls,
+    )
+    responses = [r async for r in runner.step_until_done(5)]
+    tool_messages = [m for m in runner.run_context.messages if m.role == "tool"]
+    return runner, executor, responses, tool_messages
+
+
+@pytest.mark.asyncio
+async def test_parallel_safe_tools_run_concurrently_in_call_order():
+    calls = ["search", "search", "fetch"]
+    tool_set = ToolSet(tools=_tools("search", "fetch", parallel_safe=True))
+    runner, executor, responses, tool_messages = await _run_tools(
+        calls, tool_set, max_parallel_tool_calls=2
+    )
+
+    # 受并发上限限制
+    assert executor.max_running == 2
+    # 结果按照原始调用顺序返回
+    assert [m.tool_call_id for m in tool_messages] == ["call_0", "call_1", "call_2"]
+    assert [m.content for m in tool_messages] == ["search:0", "search:1", "fetch:2"]
+    tool_call_events = [r for r in responses if r.type == "tool_call"]
+    assert len(tool_call_events) == 3
+
+    timings = runner.run_context.tool_call_timings
+    assert [t["id"] for t in timings] == ["call_0", "call_1", "call_2"]
+    assert all(t["concurrent"] and t["duration"] > 0 for t in timings)
+
+
+@pytest.mark.asyncio
+async def test_tools_run_sequentially_unless_parallel_safe():
+    calls = ["search", "write", "search", "search"]
+    tool_set = ToolSet(
+        tools=[
+            *_tools("search", parallel_safe=True),
+            *_tools("write", parallel_safe=False),
+        ]
+    )
+    runner, executor, _, tool_messages = await _run_tools(
+        calls, tool_set, max_parallel_tool_calls=4
+    )
+    assert executor.max_running == 2
+    assert [m.content for m in tool_messages] == [
+        "search:0",
+        "write:1",
+        "search:2",
+        "search:3",
+    ]
+    assert [t["concurrent"] for t in runner.run_context.tool_call_timings] == [
+        False,
+        False,
+        True,
+        True,
+    ]
+
+    # 默认不开启并发
+    _, executor, _, _ = await _run_tools(calls, tool_set, max_parallel_tool_calls=1)
+    assert executor.max_running == 1
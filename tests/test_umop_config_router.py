@@ -0,0 +1,77 @@
+import fnmatch
+import random
+
+import pytest
+
+from astrbot.core.umop_config_router import UmopConfigRouter
+
+
+class FakeSharedPreferences:
+    def __init__(self):
+        self.data = {}
+
+    async def get_async(self, scope, scope_id, key, default=None):
+        return self.data.get(key, default)
+
+    async def global_put(self, key, value):
+        self.data[key] = value
+
+
+def _linear_lookup(routing: dict[str, str], umo: str) -> str | None:
+    """原先逐条 fnmatch 匹配的实现"""
+    umo_parts = umo.split(":")
+    for pattern, conf_id in routing.items():
+        parts = pattern.split(":")
+        if len(parts) != 3 or len(umo_parts) != 3:
+            continue
+        if all(p == "" or fnmatch.fnmatchcase(t, p) for p, t in zip(parts, umo_parts)):
+            return conf_id
+    return None
+
+
+@pytest.mark.asyncio
+async def test_first_matching_rule_wins():
+    router = UmopConfigRouter(FakeSharedPreferences())
+    await router.update_routing_data(
+        {
+            "qq:GroupMessage:1*": "qq-group-1x",
+            "qq:GroupMessage:123": "qq-group-123",
+            "qq::": "qq",
+            "*:FriendMessage:": "friends",
+            "::": "all",
+        },
+    )
+    # 精确规则排在通配规则之后时不生效
+    assert router.get_conf_id_for_umop("qq:GroupMessage:123") == "qq-group-1x"
+    assert router.get_conf_id_for_umop("qq:GroupMessage:456") == "qq"
+    assert router.get_conf_id_for_umop("tg:FriendMessage:1") == "friends"
+    assert router.get_conf_id_for_umop("tg:GroupMessage:1") == "all"
+    assert router.get_conf_id_for_umop("bad-umo") is None
+
+    # 更新路由后缓存失效
+    await router.update_route("tg:GroupMessage:1", "tg-group-1")
+    assert router.get_conf_id_for_umop("tg:GroupMessage:1") == "all"
+    await router.delete_route("::")
+    assert router.get_conf_id_for_umop("tg:GroupMessage:1") == "tg-group-1"
+
+
+@pytest.mark.asyncio
+async def test_matches_linear_scan_for_random_rules():
+    rng = random.Random(7)
+    platforms = ["qq", "tg", "slack", "wx"]
+    types = ["GroupMessage", "FriendMessage"]
+
+    def pick(values):
+        return rng.choice([*values, "", "*", f"{rng.choice(values)[:1]}*", "[qt]?"])
+
+    routing = {}
+    for i in range(300):
+        routing[f"{pick(platforms)}:{pick(types)}:{pick([str(i), str(i % 7)])}"] = (
+            f"conf-{i}"
+        )
+    router = UmopConfigRouter(FakeSharedPreferences())
+    await router.update_routing_data(routing)
+
+    for _ in range(2000):
+        umo = f"{rng.choice(platforms)}:{rng.choice(types)}:{rng.randrange(320)}"
+        assert router.get_conf_id_for_umop(umo) == _linear_lookup(routing, umo)